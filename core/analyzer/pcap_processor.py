@@ -1,21 +1,41 @@
 import logging
 import os
-from pathlib import Path
-from typing import Tuple, TextIO, Any
+from itertools import islice
+from typing import Tuple, TextIO, Any, Iterable, Callable, Iterator, Optional
 
 import dpkt
 
 from core.analyzer.base_processor import BaseProcessor
 from core.configuration.data import ConfigurationData
 from core.errors.generic_errors import GenericError
-from core.file_processor.base import FileProcessorBase
 from core.file_processor.errors import FileError, FileErrorType
+from core.file_processor.result_writer import CSV_FORMAT, CsvResultWriter, ResultWriterBase, get_result_writer
+from core.lib.batch_decoder import BatchPacketDecoder
+from core.lib.compression import detect_compression, open_compressed_file, split_compression_extension
 from core.lib.dpkt_utils import DpktUtils
-from core.lib.file_utils import check_valid_path
-from core.models.packet_data import PacketData
+from core.lib.file_utils import check_valid_path, has_valid_extension
+from core.lib.manifest import ProcessingCheckpoint
+from core.lib.p0f_process import P0fResultWriter
+from core.lib.packet_filter import PacketFilter
+from core.lib.pcap_utils import PCAP_FILE_EXTENSIONS, PCAP_FORMAT, PCAPNG_FORMAT, PCAP_GLOBAL_HEADER_SIZE, \
+    PCAP_RECORD_HEADER_SIZE, PcapMmapReader, PcapRangeReader, PcapngReader, detect_capture_file_format
+from core.models.packet_layers import APPLICATION_LAYER, ETHERNET_LAYER, NETWORK_LAYER, SYN_FINGERPRINT, \
+    TRANSPORT_LAYER, get_required_layers, get_result_fields
+from core.models.packet_record import PacketRecord
 from core.models.pcap_file_info import PcapFileInfo
 from core.static.utils import StaticData
 
+# Version of data extracted from packets. Increase it when extracted data changes, so that files which were processed
+# with an older version are processed again.
+PROCESSOR_VERSION = 2
+DEFAULT_CHECKPOINT_INTERVAL = 1000000   # Packets
+ETH_TYPES_WITHOUT_LAYER4_DATA = frozenset((
+    dpkt.ethernet.ETH_TYPE_ARP,
+    6,  # IEEE 802.1 Link Layer Control
+    34958,  # IEEE 802.1X Authentication
+    35085  # TDLS Discovery request
+))
+
 
 class PcapProcessor(BaseProcessor):
     def __init__(self, config: ConfigurationData, static_data: StaticData = None) -> None:
@@ -28,13 +48,39 @@ class PcapProcessor(BaseProcessor):
         static_data: StaticData
             Static data which is used in analyzing PCAP files. This data contains protocol numbers, port numbers to
             description mappings.
+
+        Only the layers of packets which are needed for `ResultFields` in configuration are processed, e.g. DNS and
+        other application layer data are not extracted if no application layer fields are written to result files.
         """
         self.pcap_file_info = PcapFileInfo()
         self.config = config
         self.static_data = static_data
         if self.static_data is None or not isinstance(self.static_data, StaticData):
             self.static_data = StaticData()
-        self.dpkt_utils = DpktUtils(config=config, static_data=static_data)
+        self.dpkt_utils = DpktUtils(config=config, static_data=self.static_data)
+        # Only layers which are needed for result fields are processed
+        self.result_fields = get_result_fields(config.ResultFields)
+        # Fields which partition results are extracted, even if these are not written to result files
+        self.partition_fields = get_result_fields(config.ResultPartitionFields) if config.ResultPartitionFields else ()
+        self.packet_layers = get_required_layers(self.result_fields + self.partition_fields)
+        # Headers of common packets are decoded in batches, other packets are processed using dpkt
+        self.batch_decoder = None
+        if config.decode_batch_size > 0:
+            self.batch_decoder = BatchPacketDecoder(
+                config=config,
+                parsers=self.dpkt_utils.parsers,
+                decode_syn_packets=SYN_FINGERPRINT not in self.packet_layers,
+                decode_layer7_packets=APPLICATION_LAYER not in self.packet_layers
+            )
+        # A single p0f process is used for all SYN packets processed by this processor
+        self.p0f_process = None
+        if config.syn_fingerprint_backend == 'p0f' and SYN_FINGERPRINT in self.packet_layers:
+            self.p0f_process = self.dpkt_utils.start_p0f_process()
+
+    def close(self) -> None:
+        """Stop p0f process (if any) used by the processor."""
+        if self.p0f_process is not None:
+            self.p0f_process.close()
 
     # pylint: disable=arguments-differ
     def process(
@@ -51,10 +97,12 @@ class PcapProcessor(BaseProcessor):
         input_file: str
             Path to input pcap_files file which needs to be processed
         output_file: str
-            Path to output file where results should be written
+            Path to output file where results should be written. If `ResultPartitionFields` are set in configuration,
+            results are written to a file for each value of these fields (e.g. for each device), and an index of these
+            files is written to output file, see `PartitionedResultWriter`.
         pcap_filter: str, optional
-            Set up a pypcap's BRF expression to filter packets read from PCAP file. For example, to only process DNS
-            packets use pcap_filter='udp dst port 53'.
+            Filter expression for packets read from PCAP file, see `PacketFilter`. For example, to only process DNS
+            packets use pcap_filter='udp dst port 53'. Packets are filtered before they are parsed.
 
         Returns
         --------
@@ -73,97 +121,338 @@ class PcapProcessor(BaseProcessor):
         if pcap_file is None:
             return pcap_file_info
 
-        result_file = self.open_output_file_and_write_headers(output_file)
+        result_writer = self.open_result_writer(output_file)
 
-        initial_ts = 0
-        count = 0
-        total_data = 0
         try:
-            for ts, buff in captures:
-                if initial_ts == 0:
-                    initial_ts = ts
-                pcap_file_info.stop_time = ts
-                try:
-                    count += 1
-                    total_data += len(buff)
-
-                    packet_data = self.extract_stats_from_packet(ts=ts, packet=buff, initial_timestamp=initial_ts)
-                    if packet_data is None:
-                        pass
-                    result_file.write(packet_data.to_csv_string(delimiter=self.config.ResultFileDelimiter) + '\n')
-
-                except Exception as ex:
-                    logging.error('Unable to process packate at ts: `%s`. Error `%s`'.format(ts, ex))
+            pcap_file_info = self.process_captures(captures=captures, result_writer=result_writer)
 
         except Exception as ex:
             raise GenericError(message='Unable to process pcap file `{}`. Error `{}`'.format(pcap_file, ex)) from ex
 
-        logging.info('%s packets processed from %s', count, input_file)
+        logging.info('%s packets processed from %s', pcap_file_info.packet_count, input_file)
         pcap_file.close()
-        result_file.close()
+        result_writer.close()
 
         pcap_file_info.file_name = input_file
         pcap_file_info.results_file_name = output_file
-        pcap_file_info.start_time = initial_ts
+
+        return pcap_file_info
+
+    def process_captures(
+            self,
+            captures: Iterable,
+            result_writer: ResultWriterBase,
+            initial_ts: float = 0,
+            decoded: bool = False
+    ) -> PcapFileInfo:
+        """Extract statistics from each packet read from captures, and write these statistics to result file.
+
+        Parameters
+        ----------
+        captures: Iterable
+            Iterable of (timestamp, packet) tuples, for example, dpkt pcap reader object
+        result_writer: ResultWriterBase
+            Writer for result file where extracted data is written
+        initial_ts: float, optional
+            Timestamp used as reference for `ref_time` of packets. Default: timestamp of the first packet read
+        decoded: bool, optional
+            Captures are (timestamp, packet, record) tuples from `decode_captures`
+
+        Returns
+        --------
+        pcap_file_info: PcapFileInfo
+            Summary information (start/stop time, packet count, total data) about processed packets
+        """
+        pcap_file_info = PcapFileInfo()
+        count = 0
+        total_data = 0
+        result_writer = self.join_p0f_results(result_writer)
+        # Rows with results from p0f are validated when results are joined
+        validate_packet_data = self.config.validate_packet_data and not isinstance(result_writer, P0fResultWriter)
+        if not decoded:
+            captures = self.decode_captures(captures)
+        for ts, buff, packet_data in captures:
+            if initial_ts == 0:
+                initial_ts = ts
+            if count == 0:
+                pcap_file_info.start_time = ts
+            pcap_file_info.stop_time = ts
+            try:
+                count += 1
+                total_data += len(buff)
+
+                if packet_data is None:
+                    packet_data = self.extract_stats_from_packet(ts=ts, packet=buff, initial_timestamp=initial_ts)
+                else:
+                    packet_data.timestamp = ts
+                    packet_data.ref_time = ts - initial_ts
+                if validate_packet_data:
+                    packet_data = packet_data.to_packet_data(validate=True)
+                result_writer.write(packet_data)
+
+            except Exception as ex:
+                logging.error('Unable to process packet at ts: `%s`. Error `%s`', ts, ex)
+
+        if isinstance(result_writer, P0fResultWriter):
+            result_writer.write_pending_rows()
+
         pcap_file_info.packet_count = count
         pcap_file_info.total_data = total_data
 
         return pcap_file_info
 
-    def open_output_file_and_write_headers(self, output_file_path: str) -> TextIO:
-        """Create file for writing data extracted from packet, and write headers.
+    def decode_captures(self, captures: Iterable) -> Iterator[Tuple[float, Any, Optional[PacketRecord]]]:
+        """Decode headers of packets read from captures in batches of `decode_batch_size` packets, see
+        `BatchPacketDecoder`.
 
         Parameters
         ----------
-        output_file_path: str
-            Path to output file to writen data
+        captures: Iterable
+            Iterable of (timestamp, packet) tuples, for example, dpkt pcap reader object
+
+        Returns
+        -------
+        captures: Iterator[Tuple[float, Any, Optional[PacketRecord]]]
+            Iterator of (timestamp, packet, record) tuples, where record is None for packets which are not decoded,
+            and need to be processed using dpkt
+        """
+        if self.batch_decoder is None:
+            for ts, packet in captures:
+                yield ts, packet, None
+            return
+
+        captures = iter(captures)
+        while True:
+            batch = list(islice(captures, self.config.decode_batch_size))
+            if not batch:
+                return
+
+            records = self.batch_decoder.decode([packet for _, packet in batch])
+            for (ts, packet), record in zip(batch, records):
+                yield ts, packet, record
+
+    def process_resumable(
+            self,
+            input_file: str,
+            output_file: str,
+            checkpoint: Optional[ProcessingCheckpoint] = None,
+            checkpoint_callback: Optional[Callable[[ProcessingCheckpoint], None]] = None,
+            checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL
+    ) -> PcapFileInfo:
+        """Process a pcap file, and save a checkpoint after every `checkpoint_interval` packets, from which processing
+        can be resumed if it is interrupted.
+
+        Checkpoints are only supported for uncompressed pcap files with uncompressed csv result files, where both input
+        and output can be resumed at a byte offset. Other files are processed from start using `process`.
+
+        Parameters
+        ----------
+        input_file: str
+            Path to input pcap file which needs to be processed
+        output_file: str
+            Path to output file where results should be written
+        checkpoint: Optional[ProcessingCheckpoint]
+            Checkpoint from an earlier, interrupted processing of the same file to the same output file. Rows written
+            to output file after the checkpoint are discarded, and processing continues from the checkpoint.
+        checkpoint_callback: Optional[Callable[[ProcessingCheckpoint], None]]
+            Function called with each new checkpoint, after all data before the checkpoint is written to output file
+        checkpoint_interval: int
+            Number of packets processed between checkpoints. Checkpoints are not saved if it is 0.
 
         Returns
         --------
-        output_file: TextIO
-            File object for writing output data
+        pcap_file_info: PcapFileInfo
+            Summary information about data extracted from the whole pcap file
+
+        Raises
+        -------
+        FileError: Exception
+            If input pcap file can not be read.
+        GenericError: Exception
+            If there is some issue with processing input pcap file, or writing data to output file.
         """
-        if not os.path.exists(os.path.dirname(output_file_path)):
-            Path(os.path.dirname(output_file_path)).mkdir(parents=True, exist_ok=True)
+        if not self.supports_checkpoints(input_file):
+            logging.debug('Checkpoints are not supported for `%s`, processing file from start', input_file)
+            return self.process(input_file=input_file, output_file=output_file)
+
+        if checkpoint is not None and not self.can_resume_from_checkpoint(output_file, checkpoint):
+            logging.warning('Unable to resume processing of `%s` from checkpoint, processing file from start',
+                            input_file)
+            checkpoint = None
+
+        try:
+            if checkpoint is not None:
+                logging.info('Resuming processing of `%s` after %s packets', input_file, checkpoint.packet_count)
+                with open(output_file, 'r+b') as result_file:
+                    result_file.truncate(checkpoint.results_size)    # Discard rows written after checkpoint
+                result_writer = CsvResultWriter(
+                    output_file,
+                    delimiter=self.config.ResultFileDelimiter,
+                    write_headers=False,
+                    buffer_size=self.config.ResultWriteBufferSize,
+                    background=self.config.ResultWriteInBackground,
+                    append=True,
+                    fields=self.result_fields
+                )
+
+            else:
+                checkpoint = ProcessingCheckpoint(offset=PCAP_GLOBAL_HEADER_SIZE)
+                result_writer = self.open_result_writer(output_file)
+            # Rows are written with results from p0f before each checkpoint
+            result_writer = self.join_p0f_results(result_writer)
+
+            reader_class = PcapMmapReader if self.config.use_mmap_reader else PcapRangeReader
+            pcap_reader = reader_class(input_file, start=checkpoint.offset)
+            # Packets are decoded ahead of checkpoints, which only count packets which are written
+            captures = self.decode_captures(pcap_reader)
+            if checkpoint_callback is not None and checkpoint_interval > 0:
+                captures = self.iterate_with_checkpoints(
+                    captures, checkpoint, result_writer, checkpoint_callback, checkpoint_interval)
+
+            pcap_file_info = self.process_captures(
+                captures=captures, result_writer=result_writer, initial_ts=checkpoint.start_time, decoded=True)
+            result_writer.close()
+            pcap_reader.close()
+
+        except Exception as ex:
+            raise GenericError(message='Unable to process pcap file `{}`. Error `{}`'.format(input_file, ex)) from ex
+
+        if checkpoint.packet_count:
+            pcap_file_info.start_time = checkpoint.start_time
+            pcap_file_info.stop_time = pcap_file_info.stop_time or checkpoint.stop_time
+        pcap_file_info.packet_count += checkpoint.packet_count
+        pcap_file_info.total_data += checkpoint.total_data
+        pcap_file_info.file_name = input_file
+        pcap_file_info.results_file_name = output_file
+        logging.info('%s packets processed from %s', pcap_file_info.packet_count, input_file)
+
+        return pcap_file_info
+
+    def join_p0f_results(self, result_writer: ResultWriterBase) -> ResultWriterBase:
+        """Get writer which joins results from p0f process to rows of SYN packets before writing them to result
+        writer. Result writer is returned as is if p0f process is not used."""
+        if self.p0f_process is None or isinstance(result_writer, P0fResultWriter):
+            return result_writer
+
+        return P0fResultWriter(
+            result_writer, self.p0f_process, validate_packet_data=self.config.validate_packet_data)
+
+    def supports_checkpoints(self, file_path: str) -> bool:
+        if self.config.ResultFileFormat != CSV_FORMAT or self.config.ResultFileCompression or self.partition_fields:
+            return False
+
+        if check_valid_path(file_path) is False or detect_compression(file_path) is not None:
+            return False
+
+        with open(file_path, 'rb') as pcap_file:
+            return detect_capture_file_format(pcap_file.read(4)) == PCAP_FORMAT
+
+    @staticmethod
+    def can_resume_from_checkpoint(output_file: str, checkpoint: ProcessingCheckpoint) -> bool:
+        return checkpoint.offset >= PCAP_GLOBAL_HEADER_SIZE and checkpoint.results_size > 0 and \
+            os.path.exists(output_file) and os.path.getsize(output_file) >= checkpoint.results_size
+
+    @staticmethod
+    def iterate_with_checkpoints(
+            captures: Iterable,
+            checkpoint: ProcessingCheckpoint,
+            result_writer: CsvResultWriter,
+            checkpoint_callback: Callable[[ProcessingCheckpoint], None],
+            checkpoint_interval: int
+    ) -> Iterator:
+        """Iterate over (timestamp, packet, ...) tuples from pcap file reader, and create a checkpoint after every
+        `checkpoint_interval` packets. A packet is processed and written to result writer before the next packet is
+        read, so that a checkpoint is created when all packets before it are written."""
+        offset = checkpoint.offset
+        packet_count = checkpoint.packet_count
+        total_data = checkpoint.total_data
+        start_time = checkpoint.start_time
+        count = 0
+        for capture in captures:
+            ts, packet = capture[0], capture[1]
+            if start_time == 0:
+                start_time = ts
+
+            yield capture
+
+            offset += PCAP_RECORD_HEADER_SIZE + len(packet)
+            total_data += len(packet)
+            count += 1
+            if count % checkpoint_interval == 0:
+                result_writer.sync()
+                checkpoint_callback(ProcessingCheckpoint(
+                    offset=offset,
+                    packet_count=packet_count + count,
+                    total_data=total_data,
+                    start_time=start_time,
+                    stop_time=ts,
+                    results_size=os.path.getsize(result_writer.file_path)
+                ))
+
+    def open_result_writer(self, output_file_path: str) -> ResultWriterBase:
+        """Create result file for writing data extracted from packets, in format specified by `ResultFileFormat` in
+        configuration. For csv files, headers are written to the file.
 
-        output_file = FileProcessorBase.open_file(output_file_path, mode='w')  # Overwrites old file
-        output_file.write(PacketData.packet_data_file_headers(delimiter=self.config.ResultFileDelimiter) + '\n')
+        Parameters
+        ----------
+        output_file_path: str
+            Path to output file to writen data
 
-        return output_file
+        Returns
+        --------
+        result_writer: ResultWriterBase
+            Writer for output data
+        """
+        return get_result_writer(config=self.config, file_path=output_file_path)
 
     def load_pcap_file_for_reading(self, file_path: str, pcap_filter: str = '') -> Tuple[TextIO, Any]:
-        """Open pcap file for reading from specified file path.
+        """Open pcap (or pcapng) file for reading from specified file path. File format is detected from the file
+        header. Compressed files (e.g. `.pcap.gz`, `.pcap.zst`, `.pcap.lz4`) are decompressed while packets are read.
 
         Parameters
         ----------
         file_path : str
             Path to pcap file
         pcap_filter : str, optional
-            Set up a pypcap's BRF expression to filter packets read from PCAP file. For example, to only process DNS
-            packets use pcap_filter='udp dst port 53'.
+            Filter expression for packets read from PCAP file, see `PacketFilter`. For example, to only process DNS
+            packets use pcap_filter='udp dst port 53'. Filter is evaluated on raw packet bytes, so packets which do not
+            match the filter are never parsed.
 
         Returns
         -------
         file_object: TextIO
             File object with open pcap file for reading
         captures: Any
-            dpkt pcap reader object
+            dpkt pcap reader object, or `PcapngReader` for pcapng files. If `use_mmap_reader` is set in configuration,
+            uncompressed pcap files are read with `PcapMmapReader`, which is returned as file object. If `pcap_filter`
+            is given, captures only yield packets which match the filter.
 
         Raises
         ------
         FileError: Exception
             Raised if input pcap file can not be read.
         """
-        if check_valid_path(file_path, valid_extensions=['pcap']) is False:
+        uncompressed_file_path, _ = split_compression_extension(file_path)
+        if check_valid_path(file_path) is False or \
+                has_valid_extension(uncompressed_file_path, PCAP_FILE_EXTENSIONS) is False:
             raise FileError(
                 message='Invalid file path ({}) specified for pcap file'.format(file_path),
                 error_type=FileErrorType.INVALID_FILE_PATH
             )
         try:
-            pcap_file = FileProcessorBase.open_file(file_path, mode='rb')
-            captures = dpkt.pcap.Reader(pcap_file)
-            if pcap_filter:
-                captures.setfilter(pcap_filter)           # pypcap's BRF expression
+            packet_filter = PacketFilter(pcap_filter) if pcap_filter else None
+            with open_compressed_file(file_path, mode='rb') as pcap_file:
+                file_format = detect_capture_file_format(pcap_file.read(4))
+
+            if self.config.use_mmap_reader and file_format == PCAP_FORMAT and detect_compression(file_path) is None:
+                pcap_file = captures = PcapMmapReader(file_path)      # Reader closes the memory map and file
+
+            else:
+                pcap_file = open_compressed_file(file_path, mode='rb')
+                captures = PcapngReader(pcap_file) if file_format == PCAPNG_FORMAT else dpkt.pcap.Reader(pcap_file)
+
+            if packet_filter is not None:
+                captures = packet_filter.filter(captures)
 
             return pcap_file, captures
 
@@ -184,8 +473,10 @@ class PcapProcessor(BaseProcessor):
 
         return first_ts
 
-    def extract_stats_from_packet(self, ts, packet, initial_timestamp: float) -> PacketData:
-        packet_data = PacketData()
+    def extract_stats_from_packet(self, ts, packet, initial_timestamp: float) -> PacketRecord:
+        if packet.__class__ is memoryview:     # Packet from PcapMmapReader, dpkt parses bytes
+            packet = packet.tobytes()
+        packet_data = PacketRecord()
 
         packet_data.timestamp = ts
         packet_data.ref_time = ts - initial_timestamp
@@ -207,17 +498,14 @@ class PcapProcessor(BaseProcessor):
 
                 return packet_data
 
-            packet_data = self.dpkt_utils.extract_data_from_eth_frame(
-                eth_frame=eth,
-                packet_data=packet_data
-            )
-            # Skip further processing for packets which do not have layer 4 data
-            if eth.type in [
-                    dpkt.ethernet.ETH_TYPE_ARP,
-                    6,  # IEEE 802.1 Link Layer Control
-                    34958,  # IEEE 802.1X Authentication
-                    35085  # TDLS Discovery request
-            ]:
+            if ETHERNET_LAYER in self.packet_layers:
+                packet_data = self.dpkt_utils.extract_data_from_eth_frame(
+                    eth_frame=eth,
+                    packet_data=packet_data
+                )
+            # Skip further processing for packets which do not have layer 4 data, or if it is not needed
+            if eth.type in ETH_TYPES_WITHOUT_LAYER4_DATA or \
+                    self.packet_layers.isdisjoint((NETWORK_LAYER, TRANSPORT_LAYER)):
                 return packet_data
 
             # Handle Layer 3: IP, IGMP, ARP, LLC
@@ -225,7 +513,11 @@ class PcapProcessor(BaseProcessor):
             if layer3_packet is None:
                 return packet_data
 
-            packet_data = self.dpkt_utils.extract_data_from_layer3_packet(layer3_packet, packet_data=packet_data)
+            if NETWORK_LAYER in self.packet_layers:
+                packet_data = self.dpkt_utils.extract_data_from_layer3_packet(layer3_packet, packet_data=packet_data)
+            # Transport layer is also needed for SYN fingerprints and application layer
+            if TRANSPORT_LAYER not in self.packet_layers:
+                return packet_data
 
             # Handler Layer 4: TCP, UDP, ICMP
             layer4_packet = self.dpkt_utils.load_layer4_packet(layer3_packet)
@@ -234,8 +526,11 @@ class PcapProcessor(BaseProcessor):
                 return packet_data
 
             packet_data = self.dpkt_utils.extract_data_from_layer4_packet(layer4_packet, packet_data)
-            if packet_data.tcp_syn_flag is True and packet_data.tcp_ack_flag is False:
+            if packet_data.tcp_syn_flag is True and packet_data.tcp_ack_flag is False and \
+                    SYN_FINGERPRINT in self.packet_layers:
                 packet_data = self.dpkt_utils.extract_tcp_syn_signature(eth.data, packet_data)
+            if APPLICATION_LAYER not in self.packet_layers:
+                return packet_data
 
             # Handler Layer 7: DNS, UPnP, DHCP, mDNS, NTP
             layer7_packet = self.dpkt_utils.load_layer7_packet(layer4_packet, packet_data)
@@ -0,0 +1,330 @@
+import contextlib
+import heapq
+import itertools
+import logging
+import multiprocessing.util
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterator, List, Optional
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+
+except ImportError:     # pragma: no cover
+    pyarrow = None      # pylint: disable=invalid-name
+
+from core.analyzer.pcap_processor import DEFAULT_CHECKPOINT_INTERVAL, PcapProcessor
+from core.configuration.data import ConfigurationData
+from core.errors.generic_errors import GenericError
+from core.file_processor.base import FileProcessorBase
+from core.file_processor.result_writer import ResultWriterBase, CsvResultWriter, ColumnarResultWriter, \
+    COLUMNAR_FILE_FORMATS, ARROW_FORMAT
+from core.lib.compression import detect_compression
+from core.lib.pcap_utils import PcapMmapReader, PcapRangeReader, PcapngReader, find_pcap_shard_boundaries
+from core.lib.file_utils import remove_file
+from core.lib.manifest import ProcessingCheckpoint
+from core.lib.packet_filter import PacketFilter
+from core.models.packet_layers import get_result_fields
+from core.models.pcap_file_info import PcapFileInfo
+from core.static.utils import StaticData
+
+# Files smaller than this are not worth the cost of starting worker processes, and are processed in a single process.
+MIN_SHARD_SIZE = 16 * 1024 * 1024       # Bytes
+
+# PcapProcessor owned by a worker process, created lazily on the first shard processed by the worker.
+_shard_worker_processor = None  # pylint: disable=invalid-name
+
+
+def get_shard_worker_processor(config: ConfigurationData) -> PcapProcessor:
+    global _shard_worker_processor  # pylint: disable=global-statement,invalid-name
+    if _shard_worker_processor is None:
+        _shard_worker_processor = PcapProcessor(config=config, static_data=StaticData())
+        # Worker processes exit without running `atexit` handlers, but run multiprocessing finalizers
+        multiprocessing.util.Finalize(None, close_shard_worker_processor, exitpriority=10)
+
+    return _shard_worker_processor
+
+
+def close_shard_worker_processor() -> None:
+    """Close PcapProcessor of worker process (e.g. stop its p0f process) when the worker exits."""
+    global _shard_worker_processor  # pylint: disable=global-statement,invalid-name
+    if _shard_worker_processor is not None:
+        _shard_worker_processor.close()
+        _shard_worker_processor = None
+
+
+def get_shard_result_writer(config: ConfigurationData, shard_file: str) -> ResultWriterBase:
+    """Shards are written as csv files without headers, or as Arrow IPC files if result file format is columnar."""
+    fields = get_result_fields(config.ResultFields)
+    if config.ResultFileFormat in COLUMNAR_FILE_FORMATS:
+        return ColumnarResultWriter(
+            shard_file, file_format=ARROW_FORMAT, batch_size=config.ResultBatchSize, fields=fields)
+
+    return CsvResultWriter(
+        shard_file, delimiter=config.ResultFileDelimiter, write_headers=False, buffer_size=config.ResultWriteBufferSize,
+        fields=fields)
+
+
+def process_pcap_shard(
+        config: ConfigurationData,
+        input_file: str,
+        start: int,
+        end: int,
+        shard_file: str,
+        initial_ts: float,
+        pcap_filter: str = ''
+) -> dict:
+    """Process packets in byte range [start, end) of a pcap file in a worker process, and write extracted data to
+    shard file (without headers). If `pcap_filter` is given, only packets matching the filter are processed.
+
+    Returns
+    -------
+    shard_info: dict
+        Summary information about the processed shard, see `PcapFileInfo`
+    """
+    pcap_processor = get_shard_worker_processor(config)
+    reader_class = PcapMmapReader if config.use_mmap_reader else PcapRangeReader
+    captures = reader_class(input_file, start=start, end=end)
+    result_writer = get_shard_result_writer(config, shard_file)
+    try:
+        shard_info = pcap_processor.process_captures(
+            captures=PacketFilter(pcap_filter).filter(captures), result_writer=result_writer, initial_ts=initial_ts)
+
+    finally:
+        captures.close()
+        result_writer.close()
+
+    return shard_info.to_json()
+
+
+class ShardedPcapProcessor(PcapProcessor):
+    def __init__(
+            self,
+            config: ConfigurationData,
+            static_data: StaticData = None,
+            shard_count: int = os.cpu_count(),
+            min_shard_size: int = MIN_SHARD_SIZE
+    ) -> None:
+        """PCAP processor which splits a single large pcap file into byte ranges at packet boundaries and processes
+        each range in a separate process. Per-shard results are merged in timestamp order to the output file.
+
+        Parameters
+        ----------
+        config: ConfigurationData
+            Application configuration data
+        static_data: StaticData
+            Static data which is used in analyzing PCAP files.
+        shard_count: int
+            Maximum number of shards (and worker processes) used for processing a file. Default: number of CPUs
+        min_shard_size: int
+            Minimum size (in bytes) of a shard. Smaller files are processed with fewer shards.
+        """
+        super().__init__(config=config, static_data=static_data)
+        self.shard_count = max(shard_count or 1, 1)
+        self.min_shard_size = max(min_shard_size, 1)
+
+    # pylint: disable=arguments-differ
+    def process(
+            self,
+            input_file: str = None,
+            output_file: str = None,
+            pcap_filter: str = ''
+    ) -> PcapFileInfo:
+        """Process a .pcap file in parallel shards, and write statistics extracted from each packet to an output
+        csv file. `ref_time` of all packets is relative to the first packet in the file.
+
+        Files which are too small for sharding, compressed and pcapng files (which can not be split in byte ranges),
+        and files whose results are partitioned (see `ResultPartitionFields` in configuration) are processed by
+        `PcapProcessor.process` in the current process.
+
+        Parameters
+        -----------
+        input_file: str
+            Path to input pcap_files file which needs to be processed
+        output_file: str
+            Path to output file where results should be written
+        pcap_filter: str, optional
+            Filter expression for packets read from pcap file, see `PacketFilter`. `ref_time` of packets is relative
+            to the first packet which matches the filter.
+
+        Returns
+        --------
+        pcap_file_info: PcapFileInfo
+            JSON object containing summary information about data extracted from PCAP file
+
+        Raises
+        -------
+        FileError: Exception
+            If input pcap file can not be read.
+        GenericError: Exception
+            If processing of a shard fails, or results of shards can not be merged.
+        """
+        # Validates input file path and pcap header
+        pcap_file, captures = self.load_pcap_file_for_reading(input_file)
+        pcap_file.close()
+
+        # Only uncompressed pcap files can be split in byte ranges at packet boundaries
+        can_split = not isinstance(captures, PcapngReader) and detect_compression(input_file) is None
+        shard_count = min(self.shard_count, os.path.getsize(input_file) // self.min_shard_size)
+        # Partitioned results are written directly to partition files, instead of merging shard files
+        if shard_count < 2 or not can_split or self.partition_fields:
+            return super().process(input_file=input_file, output_file=output_file, pcap_filter=pcap_filter)
+
+        shards = find_pcap_shard_boundaries(input_file, shard_count)
+        # Validates filter expression before workers are started
+        initial_ts = self.get_timestamp_of_first_packet_in_pcap_file(input_file, pcap_filter)
+        shard_files = ['{}.shard-{}'.format(output_file, i) for i in range(len(shards))]
+        logging.info('Processing `%s` in %s shards', input_file, len(shards))
+
+        try:
+            # Output directory is created, and headers are written to output file before workers are started.
+            result_writer = self.open_result_writer(output_file)
+            with ProcessPoolExecutor(max_workers=len(shards)) as executor:
+                shard_infos = list(executor.map(
+                    process_pcap_shard,
+                    [self.config] * len(shards),
+                    [input_file] * len(shards),
+                    [start for start, _ in shards],
+                    [end for _, end in shards],
+                    shard_files,
+                    [initial_ts] * len(shards),
+                    [pcap_filter] * len(shards)
+                ))
+
+            if isinstance(result_writer, ColumnarResultWriter):
+                self.merge_columnar_shard_files(shard_files, result_writer)
+            else:
+                self.merge_shard_files(shard_files, result_writer)
+            result_writer.close()
+
+        except Exception as ex:
+            raise GenericError(message='Unable to process pcap file `{}` in shards. Error `{}`'.format(
+                input_file, ex)) from ex
+
+        finally:
+            for shard_file in shard_files:
+                if os.path.exists(shard_file):
+                    remove_file(shard_file)
+
+        pcap_file_info = PcapFileInfo()
+        pcap_file_info.file_name = input_file
+        pcap_file_info.results_file_name = output_file
+        pcap_file_info.start_time = initial_ts
+        pcap_file_info.stop_time = max(shard_info['stop_time'] for shard_info in shard_infos)
+        pcap_file_info.packet_count = sum(shard_info['packet_count'] for shard_info in shard_infos)
+        pcap_file_info.total_data = sum(shard_info['total_data'] for shard_info in shard_infos)
+        logging.info('%s packets processed from %s', pcap_file_info.packet_count, input_file)
+
+        return pcap_file_info
+
+    def process_resumable(
+            self,
+            input_file: str,
+            output_file: str,
+            checkpoint: Optional[ProcessingCheckpoint] = None,
+            checkpoint_callback: Optional[Callable[[ProcessingCheckpoint], None]] = None,
+            checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL
+    ) -> PcapFileInfo:
+        """Checkpoints are not saved when a file is processed in shards, so file is always processed from start, see
+        `process`. Processing is only resumed from checkpoint if sharding is disabled, i.e. `shard_count` is 1."""
+        if self.shard_count < 2:
+            return super().process_resumable(
+                input_file, output_file, checkpoint, checkpoint_callback, checkpoint_interval)
+
+        return self.process(input_file=input_file, output_file=output_file)
+
+    def merge_shard_files(self, shard_files: List[str], result_writer: CsvResultWriter) -> None:
+        """Merge rows from shard files (each ordered as packets in pcap file) to result file in timestamp order. If
+        `timestamp` is not a result field, rows of shards are written in order of shards, i.e. of packets in pcap file.
+        """
+        shard_file_objects = [FileProcessorBase.open_file(shard_file, mode='r') for shard_file in shard_files]
+        try:
+            if 'timestamp' in self.result_fields:
+                lines = heapq.merge(*shard_file_objects, key=self._get_row_timestamp)
+            else:
+                lines = itertools.chain(*shard_file_objects)
+            for line in lines:
+                result_writer.write_line(line)
+
+        finally:
+            for shard_file_object in shard_file_objects:
+                shard_file_object.close()
+
+    def merge_columnar_shard_files(self, shard_files: List[str], result_writer: ColumnarResultWriter) -> None:
+        """Merge rows from Arrow IPC shard files to result file in timestamp order, same as `merge_shard_files`. Shard
+        files are read in record batches, and runs of rows of a shard which come before next row of other shards are
+        written at once. Only current record batch of each shard, and rows of a result batch are held in memory. If
+        `timestamp` is not a result field, rows of shards are written in order of shards.
+        """
+        with contextlib.ExitStack() as stack:
+            shard_batches = [
+                self._read_record_batches(stack.enter_context(pyarrow.memory_map(shard_file)))
+                for shard_file in shard_files
+            ]
+            if 'timestamp' not in self.result_fields:
+                for batch in itertools.chain(*shard_batches):
+                    result_writer.write_table(pyarrow.Table.from_batches([batch]))
+                return
+
+            # Current batch, its timestamps and position of next row, for each shard
+            shard_states = [None] * len(shard_files)    # type: List[Optional[list]]
+            # Timestamp of next row of each shard, and index of shard, so that rows with same timestamp keep order of
+            # shards
+            heap = []
+            pending_batches = []
+            pending_row_count = 0
+
+            def read_next_batch(shard_index: int) -> None:
+                for batch in shard_batches[shard_index]:
+                    timestamps = batch.column(batch.schema.get_field_index('timestamp')).to_numpy(zero_copy_only=False)
+                    shard_states[shard_index] = [batch, timestamps, 0]
+                    heapq.heappush(heap, (timestamps[0], shard_index))
+                    return
+
+            for shard_index in range(len(shard_files)):
+                read_next_batch(shard_index)
+
+            while heap:
+                _, shard_index = heapq.heappop(heap)
+                batch, timestamps, position = shard_states[shard_index]
+                end = len(timestamps)
+                if heap:
+                    next_timestamp, next_shard_index = heap[0]
+                    remaining_timestamps = timestamps[position:]
+                    if shard_index < next_shard_index:
+                        after_next_row = remaining_timestamps > next_timestamp
+                    else:
+                        after_next_row = remaining_timestamps >= next_timestamp
+                    if after_next_row.any():
+                        end = position + int(after_next_row.argmax())
+
+                pending_batches.append(batch.slice(position, end - position))
+                pending_row_count += end - position
+                if pending_row_count >= result_writer.batch_size:
+                    result_writer.write_table(pyarrow.Table.from_batches(pending_batches).combine_chunks())
+                    pending_batches = []
+                    pending_row_count = 0
+
+                if end < len(timestamps):
+                    shard_states[shard_index][2] = end
+                    heapq.heappush(heap, (timestamps[end], shard_index))
+                else:
+                    shard_states[shard_index] = None
+                    read_next_batch(shard_index)
+
+            if pending_batches:
+                result_writer.write_table(pyarrow.Table.from_batches(pending_batches).combine_chunks())
+
+    @staticmethod
+    def _read_record_batches(source: 'pyarrow.MemoryMappedFile') -> Iterator['pyarrow.RecordBatch']:
+        """Read non-empty record batches of Arrow IPC file."""
+        reader = pyarrow.ipc.open_file(source)
+        for index in range(reader.num_record_batches):
+            batch = reader.get_batch(index)
+            if batch.num_rows:
+                yield batch
+
+    def _get_row_timestamp(self, line: str) -> float:
+        index = self.result_fields.index('timestamp')
+        return float(line.split(self.config.ResultFileDelimiter, index + 1)[index])
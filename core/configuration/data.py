@@ -1,3 +1,5 @@
+from typing import List
+
 from pydantic import Extra  # pylint: disable=no-name-in-module
 
 from core.models.common import Model
@@ -8,6 +10,14 @@ class ConfigurationData(Model):
     ResultFileFolder: str = None
     ResultFileDelimiter: str = ','
     FieldDelimiter: str = ';'
+    ResultFileFormat: str = 'csv'   # csv, parquet or arrow
+    ResultFileCompression: str = None  # gzip, zstd or lz4. Default: no compression
+    ResultBatchSize: int = 65536    # Rows buffered before writing a batch to parquet or arrow result file
+    ResultWriteBufferSize: int = 1048576    # Characters buffered before writing a block to csv result file
+    ResultWriteInBackground: bool = False   # Write blocks to csv result file in a background thread
+    ResultFields: List[str] = None  # Packet data fields written to result files. Default: all fields
+    ResultPartitionFields: List[str] = None     # Write a result file for each value of these fields, e.g. src_mac
+    ResultPartitionMaxOpenFiles: int = 128      # Partitioned result files kept open at once
     EtherTypeDataFilePath: str = None
     IpProtocolDataFilePath: str = None
     ManufFilePath: str = None
@@ -15,7 +25,13 @@ class ConfigurationData(Model):
     TcpPortsFilePath: str = None
     p0f_executable: str = None
     p0f_wd: str = None
+    p0f_fingerprint_file: str = None    # Default: p0f.fp in p0f_wd, or the p0f.fp bundled in core/bin
+    syn_fingerprint_backend: str = 'native'     # native (in-process) or p0f (p0f executable)
+    p0f_batch_size: int = 256       # SYN packets written at once to p0f process used by PcapProcessor
     use_numeric_values: bool = False
+    use_mmap_reader: bool = False   # Read uncompressed pcap files using a memory map
+    decode_batch_size: int = 1024   # Packets whose headers are decoded at once. 0: decode each packet using dpkt
+    validate_packet_data: bool = False  # Validate data extracted from each packet using PacketData model (slow)
 
     class Config:
         extra = Extra.allow     # allow extra fields (not specific in schema) in configuration object.
@@ -0,0 +1,599 @@
+import csv
+import logging
+import os
+import queue
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, TextIO
+
+from core.configuration.data import ConfigurationData
+from core.file_processor.errors import FileError, FileErrorType
+from core.lib.compression import COMPRESSIONS, GZIP, get_compression_extension, open_compressed_file
+from core.models.packet_data import PACKET_DATA_FIELDS, format_csv_row, get_field_values_getter
+from core.models.packet_layers import get_result_fields
+from core.models.packet_schema import PACKET_DATA_SCHEMA, FLOAT_FIELD, INT_FIELD, FLAG_FIELD
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+except ImportError:     # pragma: no cover
+    pyarrow = None      # pylint: disable=invalid-name
+
+CSV_FORMAT = 'csv'
+PARQUET_FORMAT = 'parquet'
+ARROW_FORMAT = 'arrow'  # Arrow IPC file format
+RESULT_FILE_FORMATS = (CSV_FORMAT, PARQUET_FORMAT, ARROW_FORMAT)
+COLUMNAR_FILE_FORMATS = (PARQUET_FORMAT, ARROW_FORMAT)
+DEFAULT_RESULT_BATCH_SIZE = 65536     # Rows
+DEFAULT_RESULT_WRITE_BUFFER_SIZE = 1024 * 1024     # Characters
+DEFAULT_PARTITION_WRITE_BUFFER_SIZE = 64 * 1024    # Characters buffered for each partitioned csv result file
+DEFAULT_PARTITION_BATCH_SIZE = 8192   # Rows buffered for each partitioned parquet or arrow result file
+DEFAULT_MAX_OPEN_PARTITIONS = 128
+UNPARTITIONED_VALUE = 'unknown'     # Partition of rows which do not have a value in any partition field
+PARTITION_INDEX_FIELDS = ('partition', 'file', 'row_count')
+
+
+def make_parent_directory(file_path: str) -> None:
+    if not os.path.exists(os.path.dirname(file_path)):
+        Path(os.path.dirname(file_path)).mkdir(parents=True, exist_ok=True)
+
+
+class ResultWriterBase(ABC):
+    """Writer for data extracted from packets. Records written to the writer are objects which have all packet data
+    fields as attributes, e.g. `PacketRecord` or `PacketData`. Writers write all fields, or only the selected fields
+    (see `ResultFields` in configuration)."""
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+
+    @abstractmethod
+    def write(self, packet_data: Any) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def close(self) -> None:
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class CsvResultWriter(ResultWriterBase):
+    def __init__(
+            self,
+            file_path: str,
+            delimiter: str = ',',
+            write_headers: bool = True,
+            buffer_size: int = DEFAULT_RESULT_WRITE_BUFFER_SIZE,
+            background: bool = False,
+            compression: Optional[str] = None,
+            append: bool = False,
+            fields: Optional[Sequence[str]] = None
+    ):
+        """Write data extracted from each packet as a line in a csv file. Lines are collected in a buffer, and written
+        to the file as a single block when buffer is full.
+
+        Parameters
+        ----------
+        file_path: str
+            Path to output file. Existing file is overwritten, and parent directories are created if needed.
+        delimiter: str
+            Delimiter for values in each line
+        write_headers: bool
+            If True, headers (i.e. names of packet data fields) are written as first line of the file.
+        buffer_size: int
+            Number of characters buffered before these are written to file as one block.
+        background: bool
+            If True, blocks are written to file by a background thread, so that writing to disk overlaps with
+            processing of packets.
+        compression: Optional[str]
+            Compression codec (`gzip`, `zstd` or `lz4`) for streaming compression of the file. Default: no compression
+        append: bool
+            If True, lines are appended to existing file instead of overwriting it. Used for resuming processing of a
+            file from a checkpoint.
+        fields: Optional[Sequence[str]]
+            Packet data fields written to the file, in this order. Default: all packet data fields
+        """
+        super().__init__(file_path)
+        self.delimiter = delimiter
+        self.fields = tuple(fields or PACKET_DATA_FIELDS)
+        self._get_values = get_field_values_getter(self.fields)
+        self.buffer_size = max(buffer_size, 1)
+        self._lines = []        # type: List[str]
+        self._buffered_size = 0
+        make_parent_directory(file_path)
+        self.result_file = open_compressed_file(file_path, mode='a' if append else 'w', compression=compression)
+        self._block_writer = BackgroundBlockWriter(self.result_file) if background else None
+        if write_headers:
+            self.write_line(delimiter.join(self.fields) + '\n')
+
+    def write(self, packet_data: Any) -> None:
+        line = format_csv_row(self._get_values(packet_data), self.delimiter)
+        self._lines.append(line)
+        self._lines.append('\n')
+        self._buffered_size += len(line) + 1
+        if self._buffered_size >= self.buffer_size:
+            self.flush()
+
+    def write_line(self, line: str) -> None:
+        """Write an already formatted line (ending with new line) to the file."""
+        self._lines.append(line)
+        self._buffered_size += len(line)
+        if self._buffered_size >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write buffered lines to file as a single block."""
+        if not self._lines:
+            return
+
+        block = ''.join(self._lines)
+        self._lines = []
+        self._buffered_size = 0
+        if self._block_writer is not None:
+            self._block_writer.write(block)
+        else:
+            self.result_file.write(block)
+
+    def sync(self) -> None:
+        """Write buffered lines, and wait until these are written to the file, e.g. before the size of the file is used
+        as a checkpoint."""
+        self.flush()
+        if self._block_writer is not None:
+            self._block_writer.wait()
+        self.result_file.flush()
+
+    def close(self) -> None:
+        try:
+            self.flush()
+
+        finally:
+            # Background thread is stopped, and file is closed, even if writing last block fails
+            if self._block_writer is not None:
+                self._block_writer.close()
+            self.result_file.close()
+
+
+class BackgroundBlockWriter:
+    """Write blocks of text to a file in a background thread. At most `max_pending_blocks` blocks are queued, after
+    which `write` waits for the thread to catch up. Errors raised in the thread are raised by later `write` or `close`
+    calls."""
+    def __init__(self, file_object: TextIO, max_pending_blocks: int = 4):
+        self.file_object = file_object
+        self._queue = queue.Queue(maxsize=max_pending_blocks)
+        self._error = None      # type: Optional[Exception]
+        self._thread = threading.Thread(target=self._run, name='result-writer', daemon=True)
+        self._thread.start()
+
+    def write(self, block: str) -> None:
+        self._raise_error()
+        self._queue.put(block)
+
+    def wait(self) -> None:
+        """Wait until all queued blocks are written to the file."""
+        self._queue.join()
+        self._raise_error()
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+        self._raise_error()
+
+    def _run(self) -> None:
+        while True:
+            block = self._queue.get()
+            if block is None:
+                self._queue.task_done()
+                return
+
+            if self._error is None:     # After an error, remaining blocks are discarded
+                try:
+                    self.file_object.write(block)
+
+                except Exception as ex:     # pylint: disable=broad-except
+                    self._error = ex
+            self._queue.task_done()
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise FileError(
+                message='Unable to write results to file. Error: {}'.format(self._error),
+                error_type=FileErrorType.FILE_PROCESSING_ERROR
+            )
+
+
+class ColumnarResultWriter(ResultWriterBase):
+    def __init__(
+            self,
+            file_path: str,
+            file_format: str = PARQUET_FORMAT,
+            batch_size: int = DEFAULT_RESULT_BATCH_SIZE,
+            compression: Optional[str] = None,
+            fields: Optional[Sequence[str]] = None
+    ):
+        """Buffer data extracted from packets in columns, and write these to a Parquet or Arrow IPC file in batches of
+        typed columns (see `core.models.packet_schema`). Requires pyarrow.
+
+        Parameters
+        ----------
+        file_path: str
+            Path to output file. Existing file is overwritten, and parent directories are created if needed.
+        file_format: str
+            Output file format, `parquet` or `arrow`
+        batch_size: int
+            Number of rows buffered in memory before these are written as a batch (or a parquet row group)
+        compression: Optional[str]
+            Compression codec (`gzip`, `zstd` or `lz4`) used for column data inside the file. Arrow IPC files support
+            `zstd` and `lz4`. Default: pyarrow's default for file format
+        fields: Optional[Sequence[str]]
+            Packet data fields written to the file, in this order. Default: all packet data fields
+
+        Raises
+        ------
+        FileError: Exception
+            If pyarrow is not installed, or file format or compression is not supported
+        """
+        super().__init__(file_path)
+        if pyarrow is None:
+            raise FileError(
+                message='pyarrow is required for writing `{}` result files'.format(file_format),
+                error_type=FileErrorType.UNSUPPORTED_FILE_TYPE
+            )
+        if file_format not in COLUMNAR_FILE_FORMATS:
+            raise FileError(
+                message='Unsupported columnar file format `{}`'.format(file_format),
+                error_type=FileErrorType.UNSUPPORTED_FILE_TYPE
+            )
+
+        if compression and (compression not in COMPRESSIONS or (file_format == ARROW_FORMAT and compression == GZIP)):
+            raise FileError(
+                message='Unsupported compression `{}` for `{}` files'.format(compression, file_format),
+                error_type=FileErrorType.UNSUPPORTED_FILE_TYPE
+            )
+
+        self.file_format = file_format
+        self.compression = compression
+        self.batch_size = max(batch_size, 1)
+        self.fields = tuple(fields or PACKET_DATA_FIELDS)
+        self.schema = self.get_arrow_schema(self.fields)
+        self.columns = {field: [] for field in self.fields}     # type: Dict[str, List[Any]]
+        self._column_items = list(self.columns.items())
+        self._row_count = 0
+        self._writer = None
+        make_parent_directory(file_path)
+
+    @staticmethod
+    def get_arrow_schema(fields: Sequence[str] = PACKET_DATA_FIELDS) -> 'pyarrow.Schema':
+        arrow_types = {
+            FLOAT_FIELD: pyarrow.float64(),
+            INT_FIELD: pyarrow.int64(),
+            FLAG_FIELD: pyarrow.bool_(),
+        }
+
+        return pyarrow.schema([
+            pyarrow.field(field, arrow_types.get(PACKET_DATA_SCHEMA[field], pyarrow.string())) for field in fields
+        ])
+
+    def write(self, packet_data: Any) -> None:
+        for field, column in self._column_items:
+            column.append(getattr(packet_data, field))
+
+        self._row_count += 1
+        if self._row_count >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write buffered rows to file as a record batch."""
+        if self._row_count == 0:
+            return
+
+        arrays = [
+            pyarrow.array(
+                self.convert_values(self.columns[field], PACKET_DATA_SCHEMA[field]), type=self.schema.field(field).type)
+            for field in self.fields
+        ]
+        self.write_batch(pyarrow.RecordBatch.from_arrays(arrays, schema=self.schema))
+
+        for column in self.columns.values():
+            column.clear()
+        self._row_count = 0
+
+    def write_batch(self, batch: 'pyarrow.RecordBatch') -> None:
+        writer = self._get_writer()
+        if self.file_format == PARQUET_FORMAT:
+            writer.write_table(pyarrow.Table.from_batches([batch], schema=self.schema))
+        else:
+            writer.write_batch(batch)
+
+    def write_table(self, table: 'pyarrow.Table') -> None:
+        """Write a table with same schema as this writer, e.g. table read from another result file."""
+        self.flush()
+        for batch in table.to_batches(max_chunksize=self.batch_size):
+            self.write_batch(batch)
+
+    def close(self) -> None:
+        self.flush()
+        self._get_writer().close()     # Writes an empty file, with schema, if no rows were written
+
+    def _get_writer(self):
+        if self._writer is None:
+            if self.file_format == PARQUET_FORMAT:
+                self._writer = pyarrow.parquet.ParquetWriter(
+                    self.file_path, self.schema, compression=self.compression or 'snappy')
+            elif self.compression:
+                self._writer = pyarrow.ipc.new_file(
+                    self.file_path, self.schema, options=pyarrow.ipc.IpcWriteOptions(compression=self.compression))
+            else:
+                self._writer = pyarrow.ipc.new_file(self.file_path, self.schema)
+
+        return self._writer
+
+    @staticmethod
+    def convert_values(values: List[Any], kind: str) -> List[Any]:
+        """Convert values of a column to python type of the column kind. Values which can not be converted are
+        written as nulls."""
+        if kind == FLOAT_FIELD:
+            return [
+                value if value is None or isinstance(value, float) else _to_number(value, float) for value in values
+            ]
+
+        if kind == INT_FIELD:
+            return [value if value is None or type(value) is int else _to_number(value, int) for value in values]
+
+        if kind == FLAG_FIELD:
+            return [value if value is None else bool(value) for value in values]
+
+        return [value if value is None or isinstance(value, str) else str(value) for value in values]
+
+
+class PartitionedResultWriter(ResultWriterBase):
+    def __init__(
+            self,
+            file_path: str,
+            partition_fields: Sequence[str],
+            create_writer: Callable[[str, bool], ResultWriterBase],
+            max_open_writers: Optional[int] = DEFAULT_MAX_OPEN_PARTITIONS,
+            index_format: str = CSV_FORMAT,
+            index_compression: Optional[str] = None,
+            part_files: bool = False
+    ):
+        """Write each record to a separate result file for each value of `partition_fields`, e.g. a file for each
+        device if records are partitioned by `src_mac` and `dst_mac`. A record is written once to the file of each
+        distinct value in its partition fields, so a packet between two devices is written to files of both devices.
+        Records which do not have a value in any partition field are written to the file of `UNPARTITIONED_VALUE`.
+
+        For `file_path` `<name>.<extension>`, partition files are written as `<name>-<value>.<extension>` in the same
+        directory, same as files written by `core.pandas_utils.split_csv_data.extract_data_as_separate_csv`. If
+        `part_files` is set, each partition is a directory `<name>-<value>` of part files `part-<N>.<extension>`,
+        numbered in order of writing. When the writer is closed, an index of partitions (with `PARTITION_INDEX_FIELDS`)
+        is written to `file_path`.
+
+        Parameters
+        ----------
+        file_path: str
+            Path of the index of partitions, which also names the partition files
+        partition_fields: Sequence[str]
+            Packet data fields whose values partition the records
+        create_writer: Callable[[str, bool], ResultWriterBase]
+            Function which creates writer for a partition file, given path of the file, and whether records are
+            appended to the file (i.e. the writer of the partition was closed earlier)
+        max_open_writers: Optional[int]
+            Maximum number of partition writers open at once. Least recently used writer is closed when another
+            partition is opened, and its file is appended to (or its next part file is written, if `part_files` is
+            set) when it is used again. If None, writers are not closed until this writer is closed.
+        index_format: str
+            Format of index file, `csv`, `parquet` or `arrow`
+        index_compression: Optional[str]
+            Compression codec of csv index file. Default: no compression
+        part_files: bool
+            Write each partition to part files in a directory, for file formats which can not be appended to, e.g.
+            columnar files. Writer of a part file is never created in append mode.
+        """
+        super().__init__(file_path)
+        self.partition_fields = tuple(partition_fields)
+        self.create_writer = create_writer
+        self.max_open_writers = max(max_open_writers, 1) if max_open_writers is not None else None
+        self.index_format = index_format
+        self.index_compression = index_compression
+        self.writers = OrderedDict()    # type: OrderedDict
+        self.file_paths = OrderedDict()     # type: OrderedDict
+        self.row_counts = {}            # type: Dict[Any, int]
+        self.part_files = part_files
+        self.part_counts = {}           # type: Dict[Any, int]
+        directory = os.path.dirname(file_path)
+        name, _, extension = os.path.basename(file_path).partition('.')
+        extension = '.' + extension if extension else ''
+        self._file_path_format = os.path.join(directory, name + '-{}' + ('' if part_files else extension))
+        # Part numbers are zero padded, so that part files are listed in order of writing
+        self._part_file_name_format = 'part-{:05d}' + extension
+
+    def write(self, packet_data: Any) -> None:
+        written_values = []
+        for field in self.partition_fields:
+            value = getattr(packet_data, field)
+            if value is None or value == '' or value in written_values:
+                continue
+
+            written_values.append(value)
+            self.get_writer(value).write(packet_data)
+            self.row_counts[value] += 1
+
+        if not written_values:
+            self.get_writer(UNPARTITIONED_VALUE).write(packet_data)
+            self.row_counts[UNPARTITIONED_VALUE] += 1
+
+    def get_writer(self, value: Any) -> ResultWriterBase:
+        writer = self.writers.get(value)
+        if writer is not None:
+            if self.max_open_writers is not None:
+                self.writers.move_to_end(value)
+            return writer
+
+        if self.max_open_writers is not None and len(self.writers) >= self.max_open_writers:
+            _, least_recently_used_writer = self.writers.popitem(last=False)
+            least_recently_used_writer.close()
+
+        file_path = self.file_paths.get(value)
+        append = file_path is not None
+        if not append:
+            file_path = self.file_paths[value] = self.get_partition_file_path(value)
+            self.row_counts[value] = 0
+
+        if self.part_files:
+            part_number = self.part_counts.get(value, 0)
+            self.part_counts[value] = part_number + 1
+            writer = self.create_writer(os.path.join(file_path, self._part_file_name_format.format(part_number)), False)
+        else:
+            writer = self.create_writer(file_path, append)
+        self.writers[value] = writer
+
+        return writer
+
+    def get_partition_file_path(self, value: Any) -> str:
+        return self._file_path_format.format(str(value).replace(os.sep, '_'))
+
+    def close(self) -> None:
+        try:
+            while self.writers:
+                self.writers.popitem(last=False)[1].close()
+
+        finally:
+            self.write_index()
+
+    def write_index(self) -> None:
+        """Write index of partitions, i.e. value, name of file and number of rows of each partition."""
+        columns = (
+            [str(value) for value in self.file_paths],
+            [os.path.basename(file_path) for file_path in self.file_paths.values()],
+            [self.row_counts[value] for value in self.file_paths],
+        )
+        make_parent_directory(self.file_path)
+        if self.index_format in COLUMNAR_FILE_FORMATS:
+            table = pyarrow.table(dict(zip(PARTITION_INDEX_FIELDS, columns)))
+            if self.index_format == PARQUET_FORMAT:
+                pyarrow.parquet.write_table(table, self.file_path)
+            else:
+                with pyarrow.ipc.new_file(self.file_path, table.schema) as index_writer:
+                    index_writer.write_table(table)
+            return
+
+        with open_compressed_file(self.file_path, mode='w', compression=self.index_compression) as index_file:
+            index_writer = csv.writer(index_file, lineterminator='\n')
+            index_writer.writerow(PARTITION_INDEX_FIELDS)
+            index_writer.writerows(zip(*columns))
+
+
+def _to_number(value: Any, number_type: type) -> Optional[Any]:
+    try:
+        return number_type(value)
+
+    except (TypeError, ValueError):
+        logging.debug('Unable to convert `%s` to %s', value, number_type)
+        return None
+
+
+def get_result_file_extension(config: ConfigurationData) -> str:
+    """Get extension for result files, e.g. `csv`, `csv.gz` or `parquet`. Columnar files are compressed internally, so
+    compression extension is only added for csv files."""
+    if config.ResultFileFormat == CSV_FORMAT:
+        return CSV_FORMAT + get_compression_extension(config.ResultFileCompression)
+
+    return config.ResultFileFormat
+
+
+def get_result_writer(config: ConfigurationData, file_path: str) -> ResultWriterBase:
+    """Create writer for result file in format specified by `ResultFileFormat` in configuration. If
+    `ResultPartitionFields` are set, results are written to a file for each value of these fields, see
+    `PartitionedResultWriter`.
+
+    Parameters
+    ----------
+    config: ConfigurationData
+        Application configuration data
+    file_path: str
+        Path to result file
+
+    Returns
+    -------
+    result_writer: ResultWriterBase
+        Writer for result file
+
+    Raises
+    ------
+    FileError: Exception
+        If result file format is not supported
+    GenericError: Exception
+        If result fields in configuration are not valid
+    """
+    file_format = config.ResultFileFormat
+    fields = get_result_fields(config.ResultFields)
+    if config.ResultPartitionFields:
+        partition_fields = get_result_fields(config.ResultPartitionFields)
+        if file_format == CSV_FORMAT:
+            def create_writer(partition_file_path: str, append: bool) -> ResultWriterBase:
+                # Many partition files are open at once, so each of these has a small buffer and no background thread
+                return CsvResultWriter(
+                    partition_file_path,
+                    delimiter=config.ResultFileDelimiter,
+                    write_headers=not append,
+                    buffer_size=min(config.ResultWriteBufferSize, DEFAULT_PARTITION_WRITE_BUFFER_SIZE),
+                    compression=config.ResultFileCompression,
+                    append=append,
+                    fields=fields
+                )
+
+            return PartitionedResultWriter(
+                file_path,
+                partition_fields,
+                create_writer,
+                max_open_writers=config.ResultPartitionMaxOpenFiles,
+                index_compression=config.ResultFileCompression
+            )
+
+        if file_format in COLUMNAR_FILE_FORMATS:
+            # Columnar files can not be appended to, so a new part file is written when a closed partition is used again
+            return PartitionedResultWriter(
+                file_path,
+                partition_fields,
+                lambda partition_file_path, _: ColumnarResultWriter(
+                    partition_file_path,
+                    file_format=file_format,
+                    batch_size=min(config.ResultBatchSize, DEFAULT_PARTITION_BATCH_SIZE),
+                    compression=config.ResultFileCompression,
+                    fields=fields
+                ),
+                max_open_writers=config.ResultPartitionMaxOpenFiles,
+                index_format=file_format,
+                part_files=True
+            )
+
+    if file_format == CSV_FORMAT:
+        return CsvResultWriter(
+            file_path,
+            delimiter=config.ResultFileDelimiter,
+            buffer_size=config.ResultWriteBufferSize,
+            background=config.ResultWriteInBackground,
+            compression=config.ResultFileCompression,
+            fields=fields
+        )
+
+    if file_format in COLUMNAR_FILE_FORMATS:
+        return ColumnarResultWriter(
+            file_path,
+            file_format=file_format,
+            batch_size=config.ResultBatchSize,
+            compression=config.ResultFileCompression,
+            fields=fields
+        )
+
+    raise FileError(
+        message='Unsupported result file format `{}`. Supported formats: {}'.format(
+            file_format, ', '.join(RESULT_FILE_FORMATS)),
+        error_type=FileErrorType.UNSUPPORTED_FILE_TYPE
+    )
@@ -0,0 +1,315 @@
+"""Vectorized decoding of headers of common packets.
+
+Most captured packets are plain Ethernet frames with IPv4 (without options) or IPv6 (without extension headers)
+packets carrying TCP or UDP segments, where all extracted fields are at fixed offsets. Headers of a batch of packets are
+copied into a single NumPy array, and fields of all packets are read at once using structured dtype views of the array.
+Python code then only runs once per packet to fill a `PacketRecord`, with conversions of addresses, ports and flags
+memoized.
+
+Packets which need more than fixed-offset headers (e.g. VLAN tags, tunnels, IP options, fragments, TCP SYN packets
+which are fingerprinted, or TCP and UDP packets of supported layer 7 protocols) are not decoded, and are processed
+using dpkt.
+SYN and layer 7 packets are decoded if their SYN signatures or layer 7 data are not needed.
+"""
+from functools import lru_cache
+from typing import List, Optional, Sequence, Union
+
+import dpkt
+import numpy as np
+
+from core.configuration.data import ConfigurationData
+from core.lib.dpkt_utils import DpktUtils
+from core.models.packet_record import PacketRecord
+from core.packet_parsers.ethernet_parser import EthernetFrameParser
+from core.packet_parsers.ip_parser import IpPacketParser
+from core.packet_parsers.layer4_parser import TcpPacketParser, UDPPacketParser
+from core.packet_parsers.registry import PacketParserRegistry
+
+DEFAULT_DECODE_BATCH_SIZE = 1024        # Packets
+ETH_HEADER_SIZE = 14
+IP4_HEADER_SIZE = 20
+IP6_HEADER_SIZE = 40
+TCP_HEADER_SIZE = 20
+UDP_HEADER_SIZE = 8
+# Bytes copied from start of each packet: Ethernet, IPv6 and TCP headers (without options)
+DECODED_HEADERS_SIZE = ETH_HEADER_SIZE + IP6_HEADER_SIZE + TCP_HEADER_SIZE
+TCP_FLAG_FIELDS = (
+    'tcp_fin_flag', 'tcp_syn_flag', 'tcp_rst_flag', 'tcp_psh_flag',
+    'tcp_ack_flag', 'tcp_urg_flag', 'tcp_ece_flag', 'tcp_cwr_flag',
+)
+CONVERSION_CACHE_SIZE = 65536           # Converted addresses and ports kept in memory
+
+# Fields of Ethernet + IPv4 + TCP/UDP headers
+IP4_HEADERS_DTYPE = np.dtype({
+    'names': [
+        'dst_mac', 'src_mac', 'eth_type', 'v_hl', 'tos', 'len', 'flags_offset', 'ttl', 'p', 'src', 'dst',
+        'sport', 'dport', 'tcp_off', 'tcp_flags',
+    ],
+    'formats': ['V6', 'V6', '>u2', 'u1', 'u1', '>u2', '>u2', 'u1', 'u1', 'V4', 'V4', '>u2', '>u2', 'u1', 'u1'],
+    'offsets': [0, 6, 12, 14, 15, 16, 20, 22, 23, 26, 30, 34, 36, 46, 47],
+    'itemsize': DECODED_HEADERS_SIZE,
+})
+# Fields of Ethernet + IPv6 + TCP/UDP headers
+IP6_HEADERS_DTYPE = np.dtype({
+    'names': [
+        'dst_mac', 'src_mac', 'eth_type', 'v_fc', 'plen', 'nxt', 'hlim', 'src', 'dst',
+        'sport', 'dport', 'tcp_off', 'tcp_flags',
+    ],
+    'formats': ['V6', 'V6', '>u2', 'u1', '>u2', 'u1', 'u1', 'V16', 'V16', '>u2', '>u2', 'u1', 'u1'],
+    'offsets': [0, 6, 12, 14, 18, 20, 21, 22, 38, 54, 56, 66, 67],
+    'itemsize': DECODED_HEADERS_SIZE,
+})
+
+
+class BatchPacketDecoder:
+    def __init__(
+            self,
+            config: ConfigurationData,
+            parsers: PacketParserRegistry,
+            decode_syn_packets: bool = False,
+            decode_layer7_packets: bool = False
+    ):
+        """Decoder for headers of a batch of packets at once. Values are converted using the same packet parsers as
+        used for packets processed with dpkt, so that decoded data is the same for both.
+
+        Parameters
+        ----------
+        config: ConfigurationData
+            Application configuration data
+        parsers: PacketParserRegistry
+            Registry of packet parsers, used for converting addresses, protocols, ports and flags
+        decode_syn_packets: bool
+            Decode TCP SYN packets, i.e. SYN signatures of packets are not needed
+        decode_layer7_packets: bool
+            Decode TCP and UDP packets on ports of layer 7 protocols (see `DpktUtils.register_layer7_protocol`), i.e.
+            layer 7 data is not needed
+        """
+        self.config = config
+        self.decode_syn_packets = decode_syn_packets
+        eth_parser = parsers.get_parser(EthernetFrameParser)
+        ip_parser = parsers.get_parser(IpPacketParser)
+        tcp_parser = parsers.get_parser(TcpPacketParser)
+        udp_parser = parsers.get_parser(UDPPacketParser)
+
+        self.get_mac_address = lru_cache(maxsize=CONVERSION_CACHE_SIZE)(eth_parser.get_mac_address)
+        self.oui_index = eth_parser.oui_index
+        self.get_ip_address = lru_cache(maxsize=CONVERSION_CACHE_SIZE)(ip_parser.get_ip_address)
+        self.get_tcp_layer7_protocol = lru_cache(maxsize=CONVERSION_CACHE_SIZE)(
+            lambda src_port, dst_port: tcp_parser.get_layer7_protocol_from_ports('tcp', src_port, dst_port))
+        self.get_udp_layer7_protocol = lru_cache(maxsize=CONVERSION_CACHE_SIZE)(
+            lambda src_port, dst_port: udp_parser.get_layer7_protocol_from_ports('udp', src_port, dst_port))
+        self.eth_types = {
+            dpkt.ethernet.ETH_TYPE_IP: eth_parser.get_ether_type_name(dpkt.ethernet.ETH_TYPE_IP),
+            dpkt.ethernet.ETH_TYPE_IP6: eth_parser.get_ether_type_name(dpkt.ethernet.ETH_TYPE_IP6),
+        }
+        self.ip_protocols = {
+            dpkt.ip.IP_PROTO_TCP: ip_parser.get_ip_proto_name(dpkt.ip.IP_PROTO_TCP),
+            dpkt.ip.IP_PROTO_UDP: ip_parser.get_ip_proto_name(dpkt.ip.IP_PROTO_UDP),
+        }
+        self.outgoing = [udp_parser.is_outgoing_port(port) for port in range(65536)]
+        # Values of TCP_FLAG_FIELDS for each value of TCP flags byte
+        self.tcp_flags = [
+            tuple(tcp_parser.get_flags(tcp_flags)[field] for field in TCP_FLAG_FIELDS) for tcp_flags in range(256)
+        ]
+        self.ip_fragment_flags = (1, 0) if config.use_numeric_values else (True, False)
+        # Packets on these ports are parsed by layer 7 parsers, see `DpktUtils.load_layer7_packet`
+        self.tcp_layer7_ports = np.array(
+            [] if decode_layer7_packets else DpktUtils.get_layer7_ports(dpkt.tcp.TCP), dtype=np.uint16)
+        self.udp_layer7_ports = np.array(
+            [] if decode_layer7_packets else DpktUtils.get_layer7_ports(dpkt.udp.UDP), dtype=np.uint16)
+
+    def decode(self, packets: Sequence[Union[bytes, memoryview]]) -> List[Optional[PacketRecord]]:
+        """Decode headers of a batch of packets.
+
+        Parameters
+        ----------
+        packets: Sequence[Union[bytes, memoryview]]
+            Raw packets (Ethernet frames)
+
+        Returns
+        -------
+        records: List[Optional[PacketRecord]]
+            Record of data extracted from each packet, without `timestamp` and `ref_time`. Record is None for packets
+            which are not decoded, and need to be processed using dpkt.
+        """
+        records = [None] * len(packets)     # type: List[Optional[PacketRecord]]
+        if not packets:
+            return records
+
+        headers, sizes = self.load_headers(packets)
+        self.decode_ip4_packets(headers.view(IP4_HEADERS_DTYPE)[:, 0], sizes, records)
+        self.decode_ip6_packets(headers.view(IP6_HEADERS_DTYPE)[:, 0], sizes, records)
+
+        return records
+
+    @staticmethod
+    def load_headers(packets: Sequence[Union[bytes, memoryview]]) -> tuple:
+        """Copy first `DECODED_HEADERS_SIZE` bytes of each packet into a row of an array. Only these bytes are copied,
+        not whole packets (which are views of a memory mapped file, when the pcap file is read using `PcapMmapReader`).
+        Rows of packets shorter than that are padded with zeros, so fields are only used when packet size covers them.
+
+        Returns
+        -------
+        headers: np.ndarray
+            Array of shape (number of packets, DECODED_HEADERS_SIZE) with bytes of headers of each packet
+        sizes: np.ndarray
+            Size of each packet
+        """
+        sizes = np.fromiter(map(len, packets), dtype=np.int64, count=len(packets))
+        padding = bytes(DECODED_HEADERS_SIZE)
+        data = b''.join([
+            packet[:DECODED_HEADERS_SIZE] if size >= DECODED_HEADERS_SIZE else bytes(packet) + padding[size:]
+            for packet, size in zip(packets, sizes.tolist())
+        ])
+        headers = np.frombuffer(data, dtype=np.uint8).reshape(len(packets), DECODED_HEADERS_SIZE)
+
+        return headers, sizes
+
+    def get_decodable_layer4_packets(
+            self,
+            headers: np.ndarray,
+            protocols: np.ndarray,
+            layer4_sizes: np.ndarray
+    ) -> np.ndarray:
+        """Get mask of TCP and UDP segments which are decoded: TCP segments with complete header, which are not SYN
+        packets (unless `decode_syn_packets` is set, these are fingerprinted using dpkt packets), and UDP datagrams,
+        which are not on ports of layer 7 protocols."""
+        tcp_header_sizes = (headers['tcp_off'] >> 4).astype(np.int64) * 4
+        tcp_packets = (protocols == dpkt.ip.IP_PROTO_TCP) & (tcp_header_sizes >= TCP_HEADER_SIZE) & \
+            (tcp_header_sizes <= layer4_sizes)
+        if not self.decode_syn_packets:
+            tcp_packets &= (headers['tcp_flags'] & (dpkt.tcp.TH_SYN | dpkt.tcp.TH_ACK)) != dpkt.tcp.TH_SYN
+        if self.tcp_layer7_ports.size:
+            tcp_packets &= ~np.isin(headers['sport'], self.tcp_layer7_ports) & \
+                ~np.isin(headers['dport'], self.tcp_layer7_ports)
+        udp_packets = (protocols == dpkt.ip.IP_PROTO_UDP) & (layer4_sizes >= UDP_HEADER_SIZE) & \
+            ~np.isin(headers['sport'], self.udp_layer7_ports) & ~np.isin(headers['dport'], self.udp_layer7_ports)
+
+        return tcp_packets | udp_packets
+
+    @staticmethod
+    def get_layer4_payload_sizes(headers: np.ndarray, protocols: np.ndarray, layer4_sizes: np.ndarray) -> np.ndarray:
+        tcp_header_sizes = (headers['tcp_off'] >> 4).astype(np.int64) * 4
+        return np.where(protocols == dpkt.ip.IP_PROTO_TCP, layer4_sizes - tcp_header_sizes,
+                        layer4_sizes - UDP_HEADER_SIZE)
+
+    def decode_ip4_packets(self, headers: np.ndarray, sizes: np.ndarray, records: list) -> None:
+        ip_sizes = headers['len'].astype(np.int64)
+        layer4_sizes = ip_sizes - IP4_HEADER_SIZE
+        protocols = headers['p']
+        # IPv4 packets without options, which are not fragments, and are not truncated
+        decodable = (headers['eth_type'] == dpkt.ethernet.ETH_TYPE_IP) & (headers['v_hl'] == 0x45) & \
+            ((headers['flags_offset'] & (dpkt.ip.IP_MF | dpkt.ip.IP_OFFMASK)) == 0) & \
+            (ETH_HEADER_SIZE + ip_sizes <= sizes) & self.get_decodable_layer4_packets(headers, protocols, layer4_sizes)
+        indices = np.flatnonzero(decodable)
+        if indices.size == 0:
+            return
+
+        headers = headers[indices]
+        layer4_payload_sizes = self.get_layer4_payload_sizes(headers, protocols[indices], layer4_sizes[indices])
+        do_not_fragment_flags = (headers['flags_offset'] & dpkt.ip.IP_DF) != 0
+        eth_type = self.eth_types[dpkt.ethernet.ETH_TYPE_IP]
+        df_flag, no_df_flag = self.ip_fragment_flags
+        more_fragment_flag = no_df_flag
+        columns = zip(
+            indices.tolist(), sizes[indices].tolist(), headers['src_mac'].tolist(), headers['dst_mac'].tolist(),
+            self.oui_index.get_vendors(headers['src_mac']), self.oui_index.get_vendors(headers['dst_mac']),
+            ip_sizes[indices].tolist(), headers['src'].tolist(), headers['dst'].tolist(), headers['p'].tolist(),
+            headers['ttl'].tolist(), headers['tos'].tolist(), do_not_fragment_flags.tolist(),
+            layer4_payload_sizes.tolist(), headers['sport'].tolist(), headers['dport'].tolist(),
+            headers['tcp_flags'].tolist()
+        )
+        for index, size, src_mac, dst_mac, src_mac_vendor, dst_mac_vendor, ip_size, src_ip, dst_ip, protocol, ttl, \
+                tos, do_not_fragment, layer4_payload_size, src_port, dst_port, tcp_flags in columns:
+            record = self.create_record(
+                size, src_mac, dst_mac, src_mac_vendor, dst_mac_vendor, eth_type, ip_size, src_ip, dst_ip, protocol,
+                self.ip_protocols[protocol], ip_size - IP4_HEADER_SIZE, layer4_payload_size, src_port, dst_port,
+                tcp_flags
+            )
+            record.ip_ttl = ttl
+            record.ip_tos = tos
+            record.ip_do_not_fragment = df_flag if do_not_fragment else no_df_flag
+            record.ip_more_fragment = more_fragment_flag
+            records[index] = record
+
+    def decode_ip6_packets(self, headers: np.ndarray, sizes: np.ndarray, records: list) -> None:
+        payload_sizes = headers['plen'].astype(np.int64)
+        protocols = headers['nxt']
+        # IPv6 packets without extension headers, which are not truncated
+        decodable = (headers['eth_type'] == dpkt.ethernet.ETH_TYPE_IP6) & ((headers['v_fc'] >> 4) == 6) & \
+            (payload_sizes > 0) & (ETH_HEADER_SIZE + IP6_HEADER_SIZE + payload_sizes <= sizes) & \
+            self.get_decodable_layer4_packets(headers, protocols, payload_sizes)
+        indices = np.flatnonzero(decodable)
+        if indices.size == 0:
+            return
+
+        headers = headers[indices]
+        payload_sizes = payload_sizes[indices]
+        layer4_payload_sizes = self.get_layer4_payload_sizes(headers, protocols[indices], payload_sizes)
+        eth_type = self.eth_types[dpkt.ethernet.ETH_TYPE_IP6]
+        columns = zip(
+            indices.tolist(), sizes[indices].tolist(), headers['src_mac'].tolist(), headers['dst_mac'].tolist(),
+            self.oui_index.get_vendors(headers['src_mac']), self.oui_index.get_vendors(headers['dst_mac']),
+            payload_sizes.tolist(), headers['src'].tolist(), headers['dst'].tolist(), headers['nxt'].tolist(),
+            layer4_payload_sizes.tolist(), headers['sport'].tolist(), headers['dport'].tolist(),
+            headers['tcp_flags'].tolist()
+        )
+        for index, size, src_mac, dst_mac, src_mac_vendor, dst_mac_vendor, payload_size, src_ip, dst_ip, protocol, \
+                layer4_payload_size, src_port, dst_port, tcp_flags in columns:
+            # Protocol of IPv6 packets is not converted to name, same as in `Ip6PacketParser`
+            records[index] = self.create_record(
+                size, src_mac, dst_mac, src_mac_vendor, dst_mac_vendor, eth_type, IP6_HEADER_SIZE + payload_size,
+                src_ip, dst_ip, protocol, protocol,
+                payload_size, layer4_payload_size, src_port, dst_port, tcp_flags
+            )
+
+    # pylint: disable=too-many-arguments
+    def create_record(
+            self,
+            size: int,
+            src_mac: bytes,
+            dst_mac: bytes,
+            src_mac_vendor: Optional[str],
+            dst_mac_vendor: Optional[str],
+            eth_type: Union[int, str],
+            eth_payload_size: int,
+            src_ip: bytes,
+            dst_ip: bytes,
+            protocol: int,
+            ip_proto: Union[int, str],
+            ip_payload_size: int,
+            layer4_payload_size: int,
+            src_port: int,
+            dst_port: int,
+            tcp_flags: int
+    ) -> PacketRecord:
+        """Create record with data of Ethernet, IP and TCP/UDP headers. Values which are not valid (see
+        `PacketData.is_valid_value`) are not set, same as for packets processed with dpkt."""
+        record = PacketRecord(size=size)
+        record.src_mac = self.get_mac_address(src_mac)
+        record.dst_mac = self.get_mac_address(dst_mac)
+        record.src_mac_vendor = src_mac_vendor
+        record.dst_mac_vendor = dst_mac_vendor
+        record.eth_type = eth_type
+        record.eth_payload_size = eth_payload_size
+        record.src_ip = self.get_ip_address(src_ip)
+        record.dst_ip = self.get_ip_address(dst_ip)
+        record.ip_proto = ip_proto
+        record.ip_payload_size = ip_payload_size
+        record.layer4_payload_size = layer4_payload_size
+        record.src_port = src_port
+        record.dst_port = dst_port
+        record.outgoing = self.outgoing[src_port]
+        if protocol == dpkt.ip.IP_PROTO_TCP:
+            layer7_proto = self.get_tcp_layer7_protocol(src_port, dst_port)
+            record.tcp_fin_flag, record.tcp_syn_flag, record.tcp_rst_flag, record.tcp_psh_flag, \
+                record.tcp_ack_flag, record.tcp_urg_flag, record.tcp_ece_flag, record.tcp_cwr_flag = \
+                self.tcp_flags[tcp_flags]
+
+        else:
+            layer7_proto = self.get_udp_layer7_protocol(src_port, dst_port)
+
+        if layer7_proto is not None and layer7_proto != '':
+            record.layer7_proto = layer7_proto
+
+        return record
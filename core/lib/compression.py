@@ -0,0 +1,177 @@
+import gzip
+import io
+import os
+from typing import IO, Optional, Tuple
+
+from core.file_processor.base import FileProcessorBase
+from core.file_processor.errors import FileError, FileErrorType
+
+try:
+    import zstandard
+except ImportError:     # pragma: no cover
+    zstandard = None    # pylint: disable=invalid-name
+
+try:
+    import lz4.frame
+except ImportError:     # pragma: no cover
+    lz4 = None          # pylint: disable=invalid-name
+
+GZIP = 'gzip'
+ZSTD = 'zstd'
+LZ4 = 'lz4'
+COMPRESSIONS = (GZIP, ZSTD, LZ4)
+# File extension to compression codec
+COMPRESSION_EXTENSIONS = {'gz': GZIP, 'zst': ZSTD, 'lz4': LZ4}
+# Compression codec to file extension
+COMPRESSION_FILE_EXTENSIONS = {compression: ext for ext, compression in COMPRESSION_EXTENSIONS.items()}
+# Magic bytes at start of compressed file (frame) to compression codec
+COMPRESSION_MAGIC_NUMBERS = {
+    b'\x1f\x8b': GZIP,
+    b'\x28\xb5\x2f\xfd': ZSTD,
+    b'\x04\x22\x4d\x18': LZ4,
+}
+# Modes in which compressed files can be opened. Data appended to a compressed file is written in a new frame (gzip
+# member), and all frames are read when the file is read.
+COMPRESSED_FILE_MODES = ('r', 'rb', 'w', 'wb', 'a', 'ab', 'x', 'xb')
+
+
+def detect_compression(file_path: str) -> Optional[str]:
+    """Detect compression codec of a file from the magic bytes at start of the file.
+
+    Parameters
+    ----------
+    file_path: str
+        Path to file
+
+    Returns
+    -------
+    compression: Optional[str]
+        Compression codec (`gzip`, `zstd` or `lz4`), or None if file is not compressed with a supported codec.
+    """
+    with open(file_path, 'rb') as file_object:
+        header = file_object.read(4)
+
+    for magic, compression in COMPRESSION_MAGIC_NUMBERS.items():
+        if header.startswith(magic):
+            return compression
+
+    return None
+
+
+def split_compression_extension(file_path: str) -> Tuple[str, Optional[str]]:
+    """Split compression extension from a file path, e.g. `capture.pcap.gz` -> (`capture.pcap`, `gzip`).
+
+    Returns
+    -------
+    file_path: str
+        File path without compression extension
+    compression: Optional[str]
+        Compression codec for extension, or None if file path does not have a compression extension
+    """
+    if not file_path:
+        return file_path, None
+
+    base_path, ext = os.path.splitext(file_path)
+    compression = COMPRESSION_EXTENSIONS.get(ext[1:].lower())
+    if compression is None:
+        return file_path, None
+
+    return base_path, compression
+
+
+def get_compression_extension(compression: Optional[str]) -> str:
+    """Get file extension suffix (including leading dot) for a compression codec, e.g. `.gz` for gzip."""
+    if not compression:
+        return ''
+
+    validate_compression(compression)
+    return '.' + COMPRESSION_FILE_EXTENSIONS[compression]
+
+
+def validate_compression(compression: str) -> None:
+    """Check that compression codec is supported, and the module required for the codec is installed.
+
+    Raises
+    ------
+    FileError: Exception
+        If compression codec is not supported, or required module is not installed
+    """
+    if compression not in COMPRESSIONS:
+        raise FileError(
+            message='Unsupported compression `{}`. Supported compressions: {}'.format(
+                compression, ', '.join(COMPRESSIONS)),
+            error_type=FileErrorType.UNSUPPORTED_FILE_TYPE
+        )
+
+    if (compression == ZSTD and zstandard is None) or (compression == LZ4 and lz4 is None):
+        raise FileError(
+            message='Module required for `{}` compression is not installed'.format(compression),
+            error_type=FileErrorType.UNSUPPORTED_FILE_TYPE
+        )
+
+
+def open_compressed_file(file_path: str, mode: str = 'rb', compression: Optional[str] = None) -> IO:
+    """Open a file for streaming (de)compression, without writing an uncompressed copy of data to disk.
+
+    Parameters
+    ----------
+    file_path: str
+        Path to file
+    mode: str
+        File opening mode. Compressed files can be opened in modes 'r', 'rb', 'w', 'wb', 'a', 'ab', 'x' and 'xb'.
+        Default: 'rb'
+    compression: Optional[str]
+        Compression codec, `gzip`, `zstd` or `lz4`. When reading, compression is detected from the content of the file
+        if it is not specified. When writing, file is not compressed if compression is not specified.
+
+    Returns
+    -------
+    file: IO
+        File object, which (de)compresses data as it is read or written
+
+    Raises
+    ------
+    FileError: Exception
+        If file can not be opened, or compression or mode is not supported
+    """
+    reading = mode.startswith('r')
+    if reading and compression is None and os.path.isfile(file_path):
+        compression = detect_compression(file_path)
+
+    if not compression:
+        return FileProcessorBase.open_file(file_path, mode=mode)
+
+    validate_compression(compression)
+    if mode not in COMPRESSED_FILE_MODES:
+        raise FileError(
+            message='Unsupported mode `{}` for `{}` compressed file `{}`. Supported modes: {}'.format(
+                mode, compression, file_path, ', '.join(COMPRESSED_FILE_MODES)),
+            error_type=FileErrorType.UNSUPPORTED_FILE_TYPE
+        )
+
+    binary_mode = mode[0] + 'b'
+    text_mode = 'b' not in mode
+    try:
+        if compression == GZIP:
+            file_object = gzip.open(file_path, binary_mode)
+
+        elif compression == LZ4:
+            file_object = lz4.frame.open(file_path, binary_mode)
+
+        elif reading:
+            file_object = io.BufferedReader(
+                zstandard.ZstdDecompressor().stream_reader(open(file_path, 'rb'), read_across_frames=True))
+
+        else:
+            file_object = zstandard.ZstdCompressor().stream_writer(open(file_path, binary_mode))
+
+    except OSError as ex:
+        raise FileError(
+            message='Unable to open `{}` compressed file `{}`. Error: {}'.format(compression, file_path, ex),
+            error_type=FileErrorType.UNSPECIFIED_ERROR
+        ) from ex
+
+    if text_mode:
+        return io.TextIOWrapper(file_object)
+
+    return file_object
@@ -1,7 +1,8 @@
 # pylint: disable=invalid-name
 import binascii
+import itertools
 import logging
-from typing import Union, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Type, Union
 
 import dpkt
 from dpkt import Packet
@@ -23,7 +24,9 @@ from munch import Munch
 
 from core.configuration.data import ConfigurationData
 from core.lib.converters import hex_to_integer
+from core.lib.p0f_process import P0fProcess
 from core.packet_parsers.arp_parser import ArpPacketParser
+from core.packet_parsers.base import PacketParserInterface
 from core.packet_parsers.dhcp_parser import DhcpPacketParser
 from core.packet_parsers.dns_parser import DnsPacketParser
 from core.packet_parsers.icmp_parser import Icmp6PacketParser, IcmpPacketParser
@@ -38,6 +41,7 @@ from core.packet_parsers.llc_parser import LlcPacketParser
 from core.packet_parsers.mdns_parser import MdnsPacketParser
 from core.packet_parsers.natpmp_parser import NatpmpPacketParser
 from core.packet_parsers.ntp_parser import NtpPacketParser
+from core.packet_parsers.registry import PacketParserRegistry
 from core.packet_parsers.syn_parser import SynPacketParser
 from core.packet_parsers.upnp_parser import UpnpPacketParser
 from core.lib.ip_utils import IpAddrUtils
@@ -45,44 +49,173 @@ from core.lib.mac_utils import MacAddressUtils
 from core.pcap.mdns.mdns_unpacker import Mdns
 from core.pcap.natpmp.natpmp import Natpmp
 from core.pcap.upnp.upnp_request import UpnpRequest
-from core.models.packet_data import PacketData
+from core.models.packet_data import PACKET_DATA_FIELD_SET
+from core.models.packet_layers import APPLICATION_LAYER, NETWORK_LAYER, TRANSPORT_LAYER
+from core.models.packet_record import PacketRecord
 from core.static.constants import IEEE80211_PROTOCOL_NUMBER, UPNP_PORTS, MDNS_PORTS, DHCP_PORTS
 from core.static.utils import StaticData
 
+PacketLoader = Callable[[Any], Optional[Any]]  # pylint: disable=invalid-name
+
+
+def get_packet_data(packet_data: Any) -> Any:
+    """Loader for layer 3 packets which are already parsed by dpkt with the Ethernet frame."""
+    return packet_data
+
 
 class DpktUtils:
+    # Loaders of layer 3 packets from data of Ethernet frames, by ether type. IEEE 802.3 frames with LLC data are
+    # identified by type of data.
+    layer3_packet_loaders = {
+        dpkt.ethernet.ETH_TYPE_IP: IpPacketParser.load_ip_packet_from_ethernet_frame,
+        dpkt.ethernet.ETH_TYPE_IP6: get_packet_data,
+        dpkt.ethernet.ETH_TYPE_ARP: get_packet_data,
+        IEEE80211_PROTOCOL_NUMBER: get_packet_data,     # IEEE 802.1X Authentication
+    }   # type: Dict[int, PacketLoader]
+    # IP protocol numbers of layer 4 packets which are processed
+    layer4_protocols = {
+        dpkt.ip.IP_PROTO_TCP, dpkt.ip.IP_PROTO_UDP, dpkt.ip.IP_PROTO_ICMP, dpkt.ip.IP_PROTO_ICMP6,
+        dpkt.ip.IP_PROTO_IGMP,
+    }   # type: Set[int]
+    # Loaders of layer 7 packets with their priority, by (layer 4 packet class, port), see `register_layer7_protocol`
+    layer7_packet_loaders = {}    # type: Dict[Tuple[Type, int], Tuple[int, PacketLoader]]
+    _layer7_priorities = itertools.count()
+    # Parsers used for extracting data from packets of each layer, by packet class
+    packet_parser_classes = {
+        NETWORK_LAYER: {
+            IP: IpPacketParser,
+            IP6: Ip6PacketParser,
+            ARP: ArpPacketParser,
+            LLC: LlcPacketParser,                   # IEEE 802.3 Logical Link Control
+            IEEE80211: IEEE80211PacketParser,       # IEEE 802.1X Authentication
+        },
+        TRANSPORT_LAYER: {
+            TCP: TcpPacketParser,
+            UDP: UDPPacketParser,
+            ICMP: IcmpPacketParser,
+            ICMP6: Icmp6PacketParser,
+            IGMP: IgmpPacketParser,
+        },
+        APPLICATION_LAYER: {
+            Natpmp: NatpmpPacketParser,
+            DNS: DnsPacketParser,
+            Mdns: MdnsPacketParser,
+            NTP: NtpPacketParser,
+            UpnpRequest: UpnpPacketParser,
+            dpkt.http.Response: UpnpPacketParser,
+            DHCP: DhcpPacketParser,
+        },
+    }   # type: Dict[str, Dict[Type, Type]]
+
     def __init__(self, config: ConfigurationData, static_data: StaticData = None):
         self.mac_utils = MacAddressUtils()
         self.ip_utils = IpAddrUtils()
-        self.ether_type_data = StaticData.load_ether_types_data()
         self.config = config
         self.static_data = static_data or StaticData()
+        self.ether_type_data = self.static_data.ether_types_data
+        self.parsers = PacketParserRegistry(config=self.config, static_data=self.static_data)
 
-    def extract_data_from_eth_frame(self, eth_frame: Ethernet, packet_data: PacketData) -> PacketData:
-        eth_frame_parser = EthernetFrameParser(config=self.config, static_data=self.static_data)
+    def extract_data_from_eth_frame(self, eth_frame: Ethernet, packet_data: PacketRecord) -> PacketRecord:
+        eth_frame_parser = self.parsers.get_parser(EthernetFrameParser)
         eth_data = eth_frame_parser.extract_data(packet=eth_frame)
         packet_data = self.load_protocol_data_to_packet_data(eth_data, packet_data)
 
         return packet_data
 
-    def load_layer3_packet(self, eth_frame: Ethernet) -> Optional[Packet]:
+    @classmethod
+    def register_layer3_protocol(cls, eth_type: int, loader: PacketLoader = get_packet_data) -> None:
+        """Register a layer 3 protocol, whose packets are loaded from data of Ethernet frames of the given ether type.
+        Register parser of loaded packets with `register_packet_parser`.
+
+        Parameters
+        ----------
+        eth_type: int
+            Ether type of Ethernet frames
+        loader: PacketLoader
+            Function which takes data of Ethernet frame (parsed by dpkt, if dpkt supports the ether type) and returns
+            layer 3 packet, or None. Default: data of Ethernet frame is used as layer 3 packet
         """
-        Take an ethernet frame and parse its data as layer3 packet. Currently supported protocols are IPv4, IPv6, ARP,
-        LLC, IEEE80211
+        cls.layer3_packet_loaders[eth_type] = loader
+
+    @classmethod
+    def register_layer4_protocol(cls, ip_proto: int) -> None:
+        """Register a layer 4 protocol, whose packets (data of IP packets, parsed by dpkt) are processed. Register
+        parser of the packets with `register_packet_parser`."""
+        cls.layer4_protocols.add(ip_proto)
+
+    @classmethod
+    def register_layer7_protocol(
+            cls,
+            layer4_class: Type,
+            ports: Iterable[int],
+            loader: PacketLoader,
+            priority: int = None
+    ) -> None:
+        """Register a layer 7 protocol, whose packets are loaded from layer 4 packets with given source or destination
+        port. Register parser of loaded packets with `register_packet_parser`.
+
+        Parameters
+        ----------
+        layer4_class: Type
+            Class of layer 4 packets, e.g. `dpkt.udp.UDP`
+        ports: Iterable[int]
+            Source or destination ports of layer 4 packets
+        loader: PacketLoader
+            Function which takes layer 4 packet and returns layer 7 packet, or None
+        priority: int, optional
+            If source and destination port of a packet are registered for different protocols, protocol with lower
+            priority is used. Default: lower than priority of all registered protocols
+
+        Packets on ports of layer 7 protocols are not decoded by `BatchPacketDecoder`, so protocols must be registered
+        before packet processors are created.
+        """
+        if priority is None:
+            priority = next(cls._layer7_priorities)
+        for port in ports:
+            cls.layer7_packet_loaders[(layer4_class, port)] = (priority, loader)
+
+    @classmethod
+    def register_packet_parser(cls, layer: str, packet_class: Type, parser_class: Type) -> None:
+        """Register parser class used for extracting data from packets of a class (and its subclasses).
+
+        Parameters
+        ----------
+        layer: str
+            `NETWORK_LAYER`, `TRANSPORT_LAYER` or `APPLICATION_LAYER`
+        packet_class: Type
+            Class of packets, e.g. `dpkt.dns.DNS`
+        parser_class: Type
+            Class of packet parser, see `PacketParserInterface`. Parser is created by `PacketParserRegistry`.
         """
-        if eth_frame.type == dpkt.ethernet.ETH_TYPE_IP:  # IPv4 Packet
-            return IpPacketParser.load_ip_packet_from_ethernet_frame(eth_frame.data)
+        cls.packet_parser_classes[layer][packet_class] = parser_class
 
-        if eth_frame.type == dpkt.ethernet.ETH_TYPE_IP6:  # IPv6 Packet
-            return eth_frame.data
+    @classmethod
+    def get_layer7_ports(cls, layer4_class: Type) -> List[int]:
+        """Get ports of layer 4 packets of the given class, which are registered for layer 7 protocols."""
+        return sorted(port for packet_class, port in cls.layer7_packet_loaders if packet_class is layer4_class)
 
-        if eth_frame.type == dpkt.ethernet.ETH_TYPE_ARP:  # ARP packet
-            return eth_frame.data
+    def get_packet_parser(self, layer: str, packet: Any) -> Optional[PacketParserInterface]:
+        """Get parser for packet of the given layer, or None if packets of its class are not parsed."""
+        parser_classes = self.packet_parser_classes[layer]
+        parser_class = parser_classes.get(packet.__class__)
+        if parser_class is None:      # Subclass of a packet class
+            parser_class = next(
+                (parser_classes[cls] for cls in packet.__class__.__mro__ if cls in parser_classes), None)
+            if parser_class is None:
+                return None
 
-        if isinstance(eth_frame.data, dpkt.llc.LLC):  # IEEE 802.3 Logical Link Control
-            return eth_frame.data
+        return self.parsers.get_parser(parser_class)
 
-        if eth_frame.type == IEEE80211_PROTOCOL_NUMBER:  # IEEE 802.1X Authentication
+    def load_layer3_packet(self, eth_frame: Ethernet) -> Optional[Packet]:
+        """
+        Take an ethernet frame and parse its data as layer3 packet. Currently supported protocols are IPv4, IPv6, ARP,
+        LLC, IEEE80211, and protocols added with `register_layer3_protocol`
+        """
+        loader = self.layer3_packet_loaders.get(eth_frame.type)
+        if loader is not None:
+            return loader(eth_frame.data)
+
+        if isinstance(eth_frame.data, dpkt.llc.LLC):  # IEEE 802.3 Logical Link Control
             return eth_frame.data
 
         # TODO: Handle other layer 3 packets, e.g. TDLS discovery requests
@@ -92,43 +225,30 @@ class DpktUtils:
 
         return None
 
-    def extract_data_from_layer3_packet(self, layer3_packet, packet_data: PacketData) -> PacketData:
-        data = Munch()
-        if isinstance(layer3_packet, IP):  # IPv4 Packet
-            data = self.extract_data_from_ip4_packet(ip_packet=layer3_packet)
-
-        if isinstance(layer3_packet, IP6):  # IPv6 Packet
-            data = self.extract_data_from_ip6_packet(ip6_packet=layer3_packet)
-
-        if isinstance(layer3_packet, ARP):  # ARP packet
-            data = self.extract_data_from_arp_packet(arp_packet=layer3_packet)
-
-        if isinstance(layer3_packet, LLC):  # IEEE 802.3 Logical Link Control
-            data = self.extract_data_from_llc_packet(llc_packet=layer3_packet)
-
-        if isinstance(layer3_packet, IEEE80211):  # IEEE 802.1X Authentication
-            data = self.extract_data_from_80211_packet(layer3_packet)
+    def extract_data_from_layer3_packet(self, layer3_packet, packet_data: PacketRecord) -> PacketRecord:
+        parser = self.get_packet_parser(NETWORK_LAYER, layer3_packet)
+        data = Munch() if parser is None else parser.extract_data(layer3_packet)
 
         return self.load_protocol_data_to_packet_data(data, packet_data)
 
     def extract_data_from_ip4_packet(self, ip_packet: IP) -> Union[Munch, dict]:
-        ip_packet_parser = IpPacketParser(config=self.config, static_data=self.static_data)
+        ip_packet_parser = self.parsers.get_parser(IpPacketParser)
         return ip_packet_parser.extract_data(packet=ip_packet)
 
     def extract_data_from_ip6_packet(self, ip6_packet: IP6) -> Union[Munch, dict]:
-        ip6_packet_parser = Ip6PacketParser(config=self.config)
+        ip6_packet_parser = self.parsers.get_parser(Ip6PacketParser)
         return ip6_packet_parser.extract_data(packet=ip6_packet)
 
     def extract_data_from_llc_packet(self, llc_packet: LLC) -> Union[Munch, dict]:
-        llc_packet_parser = LlcPacketParser(config=self.config)
+        llc_packet_parser = self.parsers.get_parser(LlcPacketParser)
         return llc_packet_parser.extract_data(llc_packet)
 
     def extract_data_from_80211_packet(self, ieee80211_packet: IEEE80211) -> Union[Munch, dict]:
-        ieee80211_packet_parser = IEEE80211PacketParser(config=self.config)
+        ieee80211_packet_parser = self.parsers.get_parser(IEEE80211PacketParser)
         return ieee80211_packet_parser.extract_data(ieee80211_packet)
 
     def extract_data_from_arp_packet(self, arp_packet: ARP) -> Union[Munch, dict]:
-        arp_packet_parser = ArpPacketParser(config=self.config)
+        arp_packet_parser = self.parsers.get_parser(ArpPacketParser)
         return arp_packet_parser.extract_data(packet=arp_packet)
 
     def load_layer4_packet(self, layer3_packet: Packet) -> Optional[Packet]:
@@ -136,19 +256,7 @@ class DpktUtils:
             return None
 
         packet_data = None
-        if layer3_packet.p == dpkt.ip.IP_PROTO_TCP:  # TCP packet
-            packet_data = layer3_packet.data
-
-        elif layer3_packet.p == dpkt.ip.IP_PROTO_UDP:  # UDP packet
-            packet_data = layer3_packet.data
-
-        elif layer3_packet.p == dpkt.ip.IP_PROTO_ICMP:  # ICMP packet
-            packet_data = layer3_packet.data
-
-        elif layer3_packet.p == dpkt.ip.IP_PROTO_ICMP6:  # ICMPv6 packet
-            packet_data = layer3_packet.data
-
-        elif layer3_packet.p == dpkt.ip.IP_PROTO_IGMP:  # IGMP packet
+        if layer3_packet.p in self.layer4_protocols:  # TCP, UDP, ICMP, ICMPv6, IGMP packet
             packet_data = layer3_packet.data
 
         else:
@@ -159,124 +267,84 @@ class DpktUtils:
             )
         return packet_data
 
-    def extract_data_from_layer4_packet(self, layer4_packet: Packet, packet_data: PacketData) -> PacketData:
-        data = None
-        if isinstance(layer4_packet, TCP):  # TCP packet
-            data = self.extract_data_from_tcp_packet(layer4_packet)
-
-        elif isinstance(layer4_packet, UDP):  # UDP packet
-            data = self.extract_data_from_udp_packet(layer4_packet)
-
-        elif isinstance(layer4_packet, ICMP):
-            data = self.extract_data_from_icmp_packet(layer4_packet)
-
-        elif isinstance(layer4_packet, ICMP6):
-            data = self.extract_data_from_icmp6_packet(layer4_packet)
-
-        elif isinstance(layer4_packet, IGMP):
-            data = self.extract_data_from_igmp_packet(layer4_packet)
+    def extract_data_from_layer4_packet(self, layer4_packet: Packet, packet_data: PacketRecord) -> PacketRecord:
+        parser = self.get_packet_parser(TRANSPORT_LAYER, layer4_packet)
+        data = None if parser is None else parser.extract_data(layer4_packet)
 
         return self.load_protocol_data_to_packet_data(data, packet_data)
 
     def extract_data_from_tcp_packet(self, tcp_packet: TCP) -> Union[Munch, dict]:
-        tcp_packet_parser = TcpPacketParser(config=self.config, static_data=self.static_data)
+        tcp_packet_parser = self.parsers.get_parser(TcpPacketParser)
         return tcp_packet_parser.extract_data(packet=tcp_packet)
 
     def extract_data_from_udp_packet(self, udp_packet: UDP) -> Union[Munch, dict]:
-        udp_packet_parser = UDPPacketParser(config=self.config, static_data=self.static_data)
+        udp_packet_parser = self.parsers.get_parser(UDPPacketParser)
         return udp_packet_parser.extract_data(packet=udp_packet)
 
     def extract_data_from_icmp_packet(self, icmp_packet: ICMP) -> Union[Munch, dict]:
-        icmp_packet_parser = IcmpPacketParser(config=self.config)
+        icmp_packet_parser = self.parsers.get_parser(IcmpPacketParser)
         return icmp_packet_parser.extract_data(icmp_packet)
 
     def extract_data_from_icmp6_packet(self, icmp6_packet: ICMP6) -> Union[Munch, dict]:
-        icmp6_packet_parser = Icmp6PacketParser(config=self.config)
+        icmp6_packet_parser = self.parsers.get_parser(Icmp6PacketParser)
         return icmp6_packet_parser.extract_data(icmp6_packet)
 
     def extract_data_from_igmp_packet(self, igmp_packet: IGMP) -> Union[Munch, dict]:
-        igmp_packet_parser = IgmpPacketParser(config=self.config)
+        igmp_packet_parser = self.parsers.get_parser(IgmpPacketParser)
         return igmp_packet_parser.extract_data(igmp_packet)
 
-    def extract_tcp_syn_signature(self, ip_packet: IP, packet_data: PacketData) -> PacketData:
-        syn_packet_parser = SynPacketParser(config=self.config)
+    def start_p0f_process(self) -> P0fProcess:
+        """Use a single p0f process for fingerprinting all SYN packets, see `SynPacketParser.start_p0f_process`"""
+        return self.parsers.get_parser(SynPacketParser).start_p0f_process()
+
+    def extract_tcp_syn_signature(self, ip_packet: IP, packet_data: PacketRecord) -> PacketRecord:
+        syn_packet_parser = self.parsers.get_parser(SynPacketParser)
         syn_packet_data = syn_packet_parser.extract_data(ip_packet)
         packet_data = self.load_protocol_data_to_packet_data(syn_packet_data, packet_data)
 
         return packet_data
 
-    def load_layer7_packet(self, layer4_packet: Packet, packet_data: PacketData) -> Optional[Union[Natpmp, Packet]]:
-        if not isinstance(layer4_packet, UDP):
+    def load_layer7_packet(self, layer4_packet: Packet, packet_data: PacketRecord) -> Optional[Union[Natpmp, Packet]]:
+        layer4_class = layer4_packet.__class__
+        src_port_loader = self.layer7_packet_loaders.get((layer4_class, packet_data.src_port))
+        dst_port_loader = self.layer7_packet_loaders.get((layer4_class, packet_data.dst_port))
+        if src_port_loader is None or (dst_port_loader is not None and dst_port_loader[0] < src_port_loader[0]):
+            src_port_loader = dst_port_loader
+        if src_port_loader is None:
             return None
 
-        layer7_packet = None
-
-        if packet_data.src_port == 5351 or packet_data.dst_port == 5351:  # This is a NAT-PMP packet.
-            layer7_packet = Natpmp(buf=layer4_packet.data)
-
-        elif packet_data.src_port == 53 or packet_data.dst_port == 53:  # DNS packet
-            layer7_packet = DnsPacketParser.load_dns_packet_from_udp_packet(layer4_packet)
-
-        elif packet_data.src_port == 123 or packet_data.dst_port == 123:  # NTP packet
-            layer7_packet = NtpPacketParser.load_ntp_packet_from_udp_packet(layer4_packet)
+        return src_port_loader[1](layer4_packet)
 
-        elif packet_data.src_port in UPNP_PORTS or packet_data.dst_port in UPNP_PORTS:  # UPnP packet
-            layer7_packet = UpnpPacketParser.load_upnp_packet_from_udp_packet(layer4_packet)
-
-        elif packet_data.src_port in MDNS_PORTS or packet_data.dst_port in MDNS_PORTS:  # mDNS packet
-            layer7_packet = MdnsPacketParser.load_mdns_packet_from_udp_packet(layer4_packet)
-
-        elif packet_data.src_port in DHCP_PORTS or packet_data.dst_port in DHCP_PORTS:  # DHCP packet
-            layer7_packet = DhcpPacketParser.load_dhcp_from_udp_packet(layer4_packet)
-
-        return layer7_packet
-
-    def extract_data_from_layer7_packet(self, layer7_packet: Packet, packet_data: PacketData) -> PacketData:
-        """Currently supported Layer 7 protocols are DHCP, UPNP, MDNS, DNS, NTP"""
-        data = Munch()
-        # This needs to be the first in order
-        if isinstance(layer7_packet, Natpmp):  # NAT-PMP packet
-            data = self.extract_data_from_natpmp_packet(layer7_packet)
-
-        elif isinstance(layer7_packet, DNS):  # DNS packet
-            data = self.extract_data_from_dns_packet(layer7_packet)
-
-        elif isinstance(layer7_packet, Mdns):  # mDNS packet
-            data = self.extract_data_from_mdns_packet(layer7_packet)
-
-        elif isinstance(layer7_packet, NTP):  # NTP packet
-            data = self.extract_data_from_ntp_packet(layer7_packet)
-
-        elif isinstance(layer7_packet, (UpnpRequest, dpkt.http.Response)):  # UPnP packet
-            data = self.extract_data_from_upnp_packet(layer7_packet)
-
-        elif isinstance(layer7_packet, DHCP):  # DNS packet
-            data = self.extract_data_from_dhcp_packet(layer7_packet)
+    def extract_data_from_layer7_packet(self, layer7_packet: Packet, packet_data: PacketRecord) -> PacketRecord:
+        """Currently supported Layer 7 protocols are DHCP, UPNP, MDNS, DNS, NTP, NAT-PMP, and protocols added with
+        `register_layer7_protocol`"""
+        parser = self.get_packet_parser(APPLICATION_LAYER, layer7_packet)
+        data = Munch() if parser is None else parser.extract_data(layer7_packet)
 
         return self.load_protocol_data_to_packet_data(data, packet_data)
 
     def extract_data_from_ntp_packet(self, ntp_packet: NTP) -> Union[Munch, dict]:
-        ntp_packet_parser = NtpPacketParser(config=self.config)
+        ntp_packet_parser = self.parsers.get_parser(NtpPacketParser)
         return ntp_packet_parser.extract_data(ntp_packet)
 
     def extract_data_from_dns_packet(self, dns_packet: DNS) -> Union[Munch, dict]:
-        dns_packet_parser = DnsPacketParser(config=self.config)
+        dns_packet_parser = self.parsers.get_parser(DnsPacketParser)
         return dns_packet_parser.extract_data(dns_packet)
 
     def extract_data_from_upnp_packet(self, upnp_packet: Union[UpnpRequest, dpkt.http.Response]) -> Union[Munch, dict]:
-        upnp_packet_parser = UpnpPacketParser(config=self.config)
+        upnp_packet_parser = self.parsers.get_parser(UpnpPacketParser)
         return upnp_packet_parser.extract_data(upnp_packet)
 
     def extract_data_from_mdns_packet(self, mdns_packet: Mdns) -> Union[Munch, dict]:
-        mdns_packet_parser = MdnsPacketParser(config=self.config)
+        mdns_packet_parser = self.parsers.get_parser(MdnsPacketParser)
         return mdns_packet_parser.extract_data(mdns_packet)
 
     def extract_data_from_dhcp_packet(self, dhcp_packet: DHCP) -> Union[Munch, dict]:
-        dhcp_packet_parser = DhcpPacketParser(config=self.config)
+        dhcp_packet_parser = self.parsers.get_parser(DhcpPacketParser)
         return dhcp_packet_parser.extract_data(dhcp_packet)
 
     def extract_data_from_natpmp_packet(self, natpmp_packet: Natpmp) -> Union[Munch, dict]:
-        nat_packet_parser = NatpmpPacketParser(config=self.config)
+        nat_packet_parser = self.parsers.get_parser(NatpmpPacketParser)
         return nat_packet_parser.extract_data(natpmp_packet)
 
     def parse_byte_data_as_ethernet_headers(self, packet_data: bytes) -> Munch:
@@ -298,21 +366,27 @@ class DpktUtils:
     def load_protocol_data_to_packet_data(
             self,
             protocol_data: Optional[Union[dict, Munch]],
-            packet_data: PacketData
-    ) -> PacketData:
+            packet_data: PacketRecord
+    ) -> PacketRecord:
         if protocol_data is None or not isinstance(protocol_data, dict):
             logging.debug('Unable to load protocol data from `%s` object. <dict> expected', type(protocol_data))
             return packet_data
 
+        is_valid_value = packet_data.is_valid_value
         for key, value in protocol_data.items():
-            if packet_data.is_valid_value(value):  # If it is valid value, load it to packet data
-                if hasattr(packet_data, key) and not callable(getattr(packet_data, key)):
+            if is_valid_value(value):  # If it is valid value, load it to packet data
+                if key in PACKET_DATA_FIELD_SET:
                     setattr(packet_data, key, value)
                 else:
-                    logging.warning(
-                        'Trying to set invalid or callable property `%s` in `%s` object',
-                        key,
-                        type(packet_data)
-                    )
+                    logging.warning('Trying to set invalid property `%s` in `%s` object', key, type(packet_data))
 
         return packet_data
+
+
+# Layer 7 protocols of UDP packets, in order of priority
+DpktUtils.register_layer7_protocol(UDP, [5351], NatpmpPacketParser.load_natpmp_packet_from_udp_packet)
+DpktUtils.register_layer7_protocol(UDP, [53], DnsPacketParser.load_dns_packet_from_udp_packet)
+DpktUtils.register_layer7_protocol(UDP, [123], NtpPacketParser.load_ntp_packet_from_udp_packet)
+DpktUtils.register_layer7_protocol(UDP, UPNP_PORTS, UpnpPacketParser.load_upnp_packet_from_udp_packet)
+DpktUtils.register_layer7_protocol(UDP, MDNS_PORTS, MdnsPacketParser.load_mdns_packet_from_udp_packet)
+DpktUtils.register_layer7_protocol(UDP, DHCP_PORTS, DhcpPacketParser.load_dhcp_from_udp_packet)
@@ -3,6 +3,7 @@ import random
 import re
 import socket
 import struct
+from functools import lru_cache
 from typing import Optional, Union
 from urllib.parse import urlparse
 
@@ -10,6 +11,38 @@ from netaddr import IPAddress
 
 from core.static.patterns import IP4_REGEX, IP6_REGEX
 
+IP4_ADDRESS_SIZE = 4                # Bytes
+IP6_ADDRESS_SIZE = 16               # Bytes
+ADDRESS_CACHE_SIZE = 65536          # Converted IP addresses kept in memory
+IP4_PATTERN = re.compile(IP4_REGEX)
+IP6_PATTERN = re.compile(IP6_REGEX)
+
+
+@lru_cache(maxsize=ADDRESS_CACHE_SIZE)
+def ip_bytes_to_str(inet: bytes) -> Optional[str]:
+    """Convert packed IPv4 (4 bytes) or IPv6 (16 bytes) address to string. None for packed addresses of other sizes.
+    Packed addresses are always valid, so the string is not validated."""
+    if len(inet) == IP4_ADDRESS_SIZE:
+        return socket.inet_ntoa(inet)
+
+    if len(inet) == IP6_ADDRESS_SIZE:
+        return socket.inet_ntop(socket.AF_INET6, inet)
+
+    return None
+
+
+@lru_cache(maxsize=ADDRESS_CACHE_SIZE)
+def ip_str_to_int(ip_address: str) -> Optional[int]:
+    """Convert IPv4 or IPv6 address string to integer, None if it is not a valid address."""
+    for family in (socket.AF_INET, socket.AF_INET6):
+        try:
+            return int.from_bytes(socket.inet_pton(family, ip_address), 'big')
+
+        except (OSError, ValueError):
+            pass
+
+    return None
+
 
 class IpAddrUtils:
     def is_valid_ip(self, ip_address: str) -> bool:
@@ -25,10 +58,10 @@ class IpAddrUtils:
             True if IP address is valid otherwise False
 
         """
-        if re.compile(IP4_REGEX).match(ip_address):
+        if IP4_PATTERN.match(ip_address):
             return True
 
-        if re.compile(IP6_REGEX).match(ip_address):
+        if IP6_PATTERN.match(ip_address):
             return True
 
         return False
@@ -61,7 +94,12 @@ class IpAddrUtils:
             Integer representation of IP address string.
         """
         if self.is_valid_ip(ip_address) is True:
-            return int(IPAddress(ip_address))
+            ip_integer = ip_str_to_int(ip_address)
+            if ip_integer is None:
+                # Address is matched by the regular expressions, but it is not a plain address, e.g. it has a mask
+                ip_integer = int(IPAddress(ip_address))
+
+            return ip_integer
 
         logging.warning('Unable to convert ip: `%s` to integer representation', ip_address)
         return None
@@ -81,6 +119,9 @@ class IpAddrUtils:
         """
         try:
             ip_integer = int(ip_integer)
+            if 0 <= ip_integer < 1 << 32:
+                return ip_bytes_to_str(ip_integer.to_bytes(IP4_ADDRESS_SIZE, 'big'))
+
             ip = str(IPAddress(ip_integer))
             if self.is_valid_ip(ip) is True:
                 return ip
@@ -147,16 +188,23 @@ class IpAddrUtils:
           :type: str
         """
         try:
-            try:
-                ip = socket.inet_ntop(socket.AF_INET, inet)         # IPv4 address
-
-            except ValueError:
-                ip = socket.inet_ntop(socket.AF_INET6, inet)      # IPv6 address
+            if inet.__class__ is not bytes:
+                inet = bytes(inet)                          # bytearray is not hashable
+            ip = ip_bytes_to_str(inet)
+            if ip is None:
+                raise ValueError('invalid size of packed address: {}'.format(len(inet)))
 
-            if self.is_valid_ip(ip):
-                return ip
+            return ip
 
         except Exception as ex:
             logging.error('Unable to convert Inet address to readable string. Error: `%s`', ex)
 
         return None
+
+    def inet_to_int(self, inet: bytes) -> Optional[int]:
+        """Convert packed IPv4 (4 bytes) or IPv6 (16 bytes) address to integer, None for packed addresses of other
+        sizes."""
+        if len(inet) not in (IP4_ADDRESS_SIZE, IP6_ADDRESS_SIZE):
+            return None
+
+        return int.from_bytes(inet, 'big')
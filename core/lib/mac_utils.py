@@ -1,16 +1,28 @@
 import logging
 import random
 import re
+from functools import lru_cache
 from typing import Optional, Union
 
 import binascii
 
-from dpkt import compat_ord
-from netaddr import EUI
-
 from core.static.patterns import MAC_REGEX
 from core.static.constants import EXCLUDED_MACS, EXCLUDED_MACS_W_WILDCARDS
 
+MAC_ADDRESS_SIZE = 6                # Bytes
+ADDRESS_CACHE_SIZE = 65536          # Converted MAC addresses kept in memory
+MAC_PATTERN = re.compile(MAC_REGEX, re.IGNORECASE)
+
+
+@lru_cache(maxsize=ADDRESS_CACHE_SIZE)
+def mac_bytes_to_str(mac_address: bytes) -> Optional[str]:
+    """Convert 6 byte MAC address to string, e.g. `00:01:02:03:04:05`. None if MAC address is not 6 bytes. Binary MAC
+    addresses are always valid, so the string is not validated."""
+    if len(mac_address) != MAC_ADDRESS_SIZE:
+        return None
+
+    return '%02x:%02x:%02x:%02x:%02x:%02x' % tuple(mac_address)
+
 
 class MacAddressUtils:
     def int_to_mac(self, mac_integer: Union[int, str]) -> Optional[str]:
@@ -21,9 +33,7 @@ class MacAddressUtils:
         """
         try:
             mac_integer = int(mac_integer)
-            mac = str(EUI(mac_integer)).lower().replace('-', ':')
-            if self.is_valid_mac(mac) is True:
-                return mac
+            return mac_bytes_to_str(mac_integer.to_bytes(MAC_ADDRESS_SIZE, 'big'))
 
         except Exception as ex:
             logging.error('Unable to convert mac (integer): `%s` to string. Error: `%s`', mac_integer, ex)
@@ -61,11 +71,17 @@ class MacAddressUtils:
         mac: str
             printable/readable mac string
         """
-        mac = ':'.join('%02x' % compat_ord(b) for b in hexadecimal_mac)
-        if self.is_valid_mac(mac) is True:
-            return mac
+        if hexadecimal_mac.__class__ is not bytes:
+            hexadecimal_mac = bytes(hexadecimal_mac)        # bytearray is not hashable
 
-        return None
+        return mac_bytes_to_str(hexadecimal_mac)
+
+    def mac_bytes_to_int(self, mac_address: bytes) -> Optional[int]:
+        """Convert 6 byte MAC address to integer, None if MAC address is not 6 bytes."""
+        if len(mac_address) != MAC_ADDRESS_SIZE:
+            return None
+
+        return int.from_bytes(mac_address, 'big')
 
     def convert_string_mac_to_byte_array(self, mac_address: str) -> Optional[bytearray]:
         """Converts mac address string in hex format to byte array.
@@ -92,7 +108,7 @@ class MacAddressUtils:
         :return: Integer representation of MAC address string.
         """
         if self.is_valid_mac(mac_address):
-            return int(EUI(mac_address.replace(':', '-')))
+            return int(mac_address.replace(':', '').replace('-', ''), 16)
 
         logging.warning('Unable to convert ip: `%s` to integer representation', mac_address)
         return None
@@ -112,7 +128,7 @@ class MacAddressUtils:
         """
         if not mac_address:
             return False
-        if re.compile(MAC_REGEX, re.IGNORECASE).match(mac_address):
+        if MAC_PATTERN.match(mac_address):
             return True
 
         return False
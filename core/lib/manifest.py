@@ -0,0 +1,205 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Optional
+
+from core.configuration.data import ConfigurationData
+from core.lib.file_utils import remove_file
+from core.models.common import Model
+
+# Size of each block of a file which is hashed for the file fingerprint
+FINGERPRINT_BLOCK_SIZE = 1024 * 1024     # Bytes
+# Configuration options which do not change the data written to result files
+CONFIGURATION_KEYS_NOT_AFFECTING_RESULTS = (
+    'ResultWriteBufferSize', 'ResultWriteInBackground', 'ResultPartitionMaxOpenFiles', 'use_mmap_reader',
+    'decode_batch_size'
+)
+CHECKPOINT_FILE_SUFFIX = '.checkpoint'
+
+
+class FileFingerprint(Model):
+    size: int = 0
+    mtime: float = 0
+    content_hash: str = None
+
+
+class ProcessingCheckpoint(Model):
+    offset: int = 0                 # Byte offset in pcap file of the first packet which has not been processed
+    packet_count: int = 0           # Number of packets processed before offset
+    total_data: float = 0           # Total size of packets processed before offset
+    start_time: float = 0           # Timestamp of first packet in pcap file, used for `ref_time` of packets
+    stop_time: float = 0            # Timestamp of last packet processed before offset
+    results_size: int = 0           # Size (in bytes) of result file when all packets before offset were written
+
+
+class ManifestEntry(Model):
+    file_name: str = None
+    results_file_name: str = None
+    fingerprint: FileFingerprint = None
+    processor_version: int = 0
+    config_hash: str = None
+    complete: bool = False
+    results_size: int = 0                           # Size of result file when processing was complete
+    checkpoint: Optional[ProcessingCheckpoint] = None
+
+    def is_same_processing(self, other: 'ManifestEntry') -> bool:
+        """Check that entries are for the same source file content, result file, processor version and
+        configuration."""
+        return self.file_name == other.file_name and self.results_file_name == other.results_file_name and \
+            self.fingerprint == other.fingerprint and self.processor_version == other.processor_version and \
+            self.config_hash == other.config_hash
+
+
+def get_file_fingerprint(file_path: str, block_size: int = FINGERPRINT_BLOCK_SIZE) -> FileFingerprint:
+    """Get fingerprint of a file: its size, modification time, and a hash of file size and content of (at most) three
+    blocks at start, middle and end of the file. Hashing is independent of file size, so that fingerprints of large
+    capture files can be compared in constant time."""
+    stat = os.stat(file_path)
+    content_hash = hashlib.blake2b(str(stat.st_size).encode(), digest_size=16)
+    with open(file_path, 'rb') as file_object:
+        for offset in sorted({0, max(stat.st_size // 2 - block_size // 2, 0), max(stat.st_size - block_size, 0)}):
+            file_object.seek(offset)
+            content_hash.update(file_object.read(block_size))
+
+    return FileFingerprint(size=stat.st_size, mtime=stat.st_mtime, content_hash=content_hash.hexdigest())
+
+
+def get_configuration_hash(config: ConfigurationData) -> str:
+    """Get hash of configuration options which change the data written to result files."""
+    options = {
+        key: value for key, value in config.dict().items() if key not in CONFIGURATION_KEYS_NOT_AFFECTING_RESULTS
+    }
+
+    return hashlib.sha256(json.dumps(options, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def get_checkpoint_file_path(results_file_path: str) -> str:
+    return results_file_path + CHECKPOINT_FILE_SUFFIX
+
+
+def load_processing_state(results_file_path: str) -> Optional[ManifestEntry]:
+    """Load state of an unfinished processing of a pcap file, saved next to its result file.
+
+    Returns
+    -------
+    state: Optional[ManifestEntry]
+        Entry for the unfinished processing, with the last checkpoint (if any). None if the result file has no saved
+        state, i.e. processing was never started, or was completed.
+    """
+    checkpoint_file_path = get_checkpoint_file_path(results_file_path)
+    if not os.path.exists(checkpoint_file_path):
+        return None
+
+    try:
+        with open(checkpoint_file_path) as checkpoint_file:
+            return ManifestEntry(**json.load(checkpoint_file))
+
+    except Exception as ex:     # pylint: disable=broad-except
+        logging.warning('Unable to load checkpoint file `%s`. Error `%s`', checkpoint_file_path, ex)
+
+    return None
+
+
+def save_processing_state(state: ManifestEntry) -> None:
+    """Save state of processing of a pcap file next to its result file. File is replaced atomically, so that a crash
+    while saving does not leave a corrupt checkpoint."""
+    checkpoint_file_path = get_checkpoint_file_path(state.results_file_name)
+    temp_file_path = checkpoint_file_path + '.tmp'
+    os.makedirs(os.path.dirname(os.path.abspath(checkpoint_file_path)), exist_ok=True)
+    with open(temp_file_path, 'w') as checkpoint_file:
+        json.dump(state.dict(), checkpoint_file)
+    os.replace(temp_file_path, checkpoint_file_path)
+
+
+def remove_processing_state(results_file_path: str) -> None:
+    checkpoint_file_path = get_checkpoint_file_path(results_file_path)
+    if os.path.exists(checkpoint_file_path):
+        remove_file(checkpoint_file_path)
+
+
+class ProcessingManifest:
+    def __init__(self, file_path: str, config: ConfigurationData, processor_version: int):
+        """Manifest of processed pcap files. For each file, the manifest records fingerprint of the source file
+        (size, modification time and content hash), processor version and configuration used for processing, and the
+        result file. A file is not processed again unless one of these has changed.
+
+        Manifest is stored as a JSON lines file, and an entry is appended when a file is processed, so that updating
+        the manifest takes constant time. The last entry for a file is used.
+
+        Parameters
+        ----------
+        file_path: str
+            Path to manifest file. It is created if it does not exist.
+        config: ConfigurationData
+            Application configuration data used for processing files
+        processor_version: int
+            Version of pcap processor, see `PROCESSOR_VERSION`
+        """
+        self.file_path = file_path
+        self.config_hash = get_configuration_hash(config)
+        self.processor_version = processor_version
+        self.entries = self.load()
+
+    def load(self) -> Dict[str, ManifestEntry]:
+        entries = dict()
+        if not os.path.exists(self.file_path):
+            return entries
+
+        with open(self.file_path) as manifest_file:
+            for line in manifest_file:
+                try:
+                    entry = ManifestEntry(**json.loads(line))
+
+                except Exception:   # pylint: disable=broad-except
+                    # Last line may be incomplete if a previous run was killed while writing it
+                    logging.warning('Skipping invalid line in manifest file `%s`', self.file_path)
+                    continue
+
+                entries[entry.file_name] = entry
+
+        return entries
+
+    def create_entry(self, pcap_file_path: str, results_file_path: str) -> ManifestEntry:
+        """Create an (incomplete) entry for processing a pcap file with current processor version and configuration."""
+        return ManifestEntry(
+            file_name=os.path.abspath(pcap_file_path),
+            results_file_name=results_file_path,
+            fingerprint=get_file_fingerprint(pcap_file_path),
+            processor_version=self.processor_version,
+            config_hash=self.config_hash
+        )
+
+    def is_processed(self, pcap_file_path: str, results_file_path: str) -> bool:
+        """Check if a pcap file was processed to result file with current processor version and configuration, and has
+        not changed since. Source file content is only hashed if its modification time has changed."""
+        entry = self.entries.get(os.path.abspath(pcap_file_path))
+        if entry is None or entry.complete is False or entry.results_file_name != results_file_path or \
+                entry.processor_version != self.processor_version or entry.config_hash != self.config_hash:
+            return False
+
+        if not os.path.exists(results_file_path) or os.path.getsize(results_file_path) != entry.results_size:
+            return False
+
+        stat = os.stat(pcap_file_path)
+        if stat.st_size != entry.fingerprint.size:
+            return False
+
+        if stat.st_mtime == entry.fingerprint.mtime:
+            return True
+
+        # File was modified (or copied), but may still have the same content
+        return get_file_fingerprint(pcap_file_path).content_hash == entry.fingerprint.content_hash
+
+    def has_entry(self, pcap_file_path: str) -> bool:
+        return os.path.abspath(pcap_file_path) in self.entries
+
+    def mark_processed(self, entry: ManifestEntry) -> None:
+        """Record that pcap file of the entry was completely processed, and remove its saved processing state."""
+        entry = entry.copy(update=dict(
+            complete=True, checkpoint=None, results_size=os.path.getsize(entry.results_file_name)))
+        os.makedirs(os.path.dirname(os.path.abspath(self.file_path)), exist_ok=True)
+        with open(self.file_path, 'a') as manifest_file:
+            manifest_file.write(json.dumps(entry.dict()) + '\n')
+        self.entries[entry.file_name] = entry
+        remove_processing_state(entry.results_file_name)
@@ -1,16 +1,22 @@
 import logging
-from typing import Optional
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 from urllib.error import HTTPError, URLError
 from urllib.request import urlopen
 
+import numpy as np
+
 from core.static.patterns import WIRESHARK_MANUF_FILE
 
+MAC_ADDRESS_BITS = 48
+MAC_ADDRESS_SIZE = 6        # Bytes
+
 
 def get_oui_info(manufs: dict, mac: str) -> Optional[str]:
     """
     This function takes a dictionary object containing OUI manufacturer's
     information and checks the oui_prefix obtained from mac addresses to
     find out the respective manufacturer's information.
+    Only 24 bit OUI prefixes are checked, use `OuiIndex` for looking up /28 and /36 prefixes as well.
     :param manufs: dictionary containing OUI to manufacturer mapping
     :param mac: mac address of the device
     """
@@ -50,6 +56,193 @@ def load_manuf_file(manuf_file_path: str) -> Optional[dict]:
     return None
 
 
+def parse_mac_prefix(prefix: str) -> Optional[Tuple[int, int]]:
+    """Parse a MAC address prefix of manuf file, e.g. `00:1B:C5` or `00:1B:C5:00:10:00/36`.
+
+    Returns
+    -------
+    prefix: Optional[Tuple[int, int]]
+        Prefix as integer (i.e. first `bits` bits of MAC address) and number of bits in prefix. None if prefix is not
+        valid.
+    """
+    address, _, bits = prefix.strip().partition('/')
+    digits = address.replace(':', '').replace('-', '').replace('.', '')
+    if not digits or len(digits) * 4 > MAC_ADDRESS_BITS:
+        return None
+
+    try:
+        value = int(digits, 16) << (MAC_ADDRESS_BITS - len(digits) * 4)
+        bits = int(bits) if bits else len(digits) * 4
+
+    except ValueError:
+        return None
+
+    if not 0 < bits <= MAC_ADDRESS_BITS:
+        return None
+
+    return value >> (MAC_ADDRESS_BITS - bits), bits
+
+
+def mac_address_to_int(mac_address: Union[int, str, bytes, None]) -> Optional[int]:
+    """Convert MAC address (string with `:`, `-` or `.` separators, 6 bytes, or integer) to integer. None if MAC address
+    is not valid."""
+    if isinstance(mac_address, int):
+        return mac_address if 0 <= mac_address < 1 << MAC_ADDRESS_BITS else None
+
+    if isinstance(mac_address, (bytes, bytearray, memoryview)):
+        return int.from_bytes(mac_address, 'big') if len(mac_address) == MAC_ADDRESS_SIZE else None
+
+    if isinstance(mac_address, str):
+        digits = mac_address.replace(':', '').replace('-', '').replace('.', '')
+        if len(digits) == MAC_ADDRESS_SIZE * 2:
+            try:
+                return int(digits, 16)
+
+            except ValueError:
+                pass
+
+    return None
+
+
+class OuiIndex:
+    def __init__(self, manufs: dict):
+        """Index of manufacturers (vendors) by MAC address prefixes of manuf file, i.e. 24 bit OUIs and /28 and /36
+        blocks of OUIs assigned to several vendors. A MAC address is looked up with longest prefix match, so a MAC
+        address in a /36 block is assigned to vendor of the block instead of owner of the OUI.
+
+        Index is stored in arrays (see `get_arrays`), so that index cached by `StaticDataCache` can be memory mapped.
+
+        Parameters
+        ----------
+        manufs: dict
+            Manufacturer data, see `load_manuf_file`. Short name of manufacturer is used as vendor name.
+        """
+        self.set_arrays(self.build_arrays(manufs))
+
+    @staticmethod
+    def build_arrays(manufs: dict) -> Dict[str, np.ndarray]:
+        # Vendor names indexed by prefix, for each prefix length
+        vendors_by_prefix = {}
+        for prefix, names in manufs.items():
+            parsed_prefix = parse_mac_prefix(prefix)
+            if parsed_prefix is None or not names or not names[0]:
+                continue
+
+            value, bits = parsed_prefix
+            vendors_by_prefix.setdefault(bits, {})[value] = names[0]
+
+        # Vendors are stored as indices of `vendor_names`
+        vendor_names = sorted({vendor for vendors in vendors_by_prefix.values() for vendor in vendors.values()})
+        vendor_indices = {vendor: index for index, vendor in enumerate(vendor_names)}
+        arrays = {'vendor_names': np.array(vendor_names, dtype=str)}
+        for bits, vendors in vendors_by_prefix.items():
+            prefixes = sorted(vendors)
+            arrays['prefixes_{}'.format(bits)] = np.array(prefixes, dtype=np.uint64)
+            arrays['vendors_{}'.format(bits)] = np.array([vendor_indices[vendors[prefix]] for prefix in prefixes],
+                                                         dtype=np.int64)
+
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> 'OuiIndex':
+        oui_index = cls.__new__(cls)
+        oui_index.set_arrays(arrays)
+        return oui_index
+
+    def set_arrays(self, arrays: Dict[str, np.ndarray]) -> None:
+        self.arrays = arrays
+        self.vendor_names = arrays['vendor_names']
+        # Sorted prefixes and vendor indices, for each prefix length, longest prefixes first
+        self.prefix_arrays = sorted(
+            [(int(name.split('_')[1]), arrays[name], arrays['vendors_' + name.split('_')[1]])
+             for name in arrays if name.startswith('prefixes_')],
+            key=lambda item: item[0], reverse=True
+        )   # type: List[Tuple[int, np.ndarray, np.ndarray]]
+
+    def get_arrays(self) -> Dict[str, np.ndarray]:
+        """Get arrays of index, see `from_arrays`."""
+        return self.arrays
+
+    def __len__(self) -> int:
+        return sum(len(prefixes) for _, prefixes, _ in self.prefix_arrays)
+
+    def get_vendor(self, mac_address: Union[int, str, bytes, None]) -> Optional[str]:
+        """Get vendor of a MAC address (string, 6 bytes, or integer). None if vendor is not known."""
+        value = mac_address_to_int(mac_address)
+        if value is None:
+            return None
+
+        for bits, prefixes, vendor_indices in self.prefix_arrays:
+            key = value >> (MAC_ADDRESS_BITS - bits)
+            position = int(prefixes.searchsorted(key))
+            if position < len(prefixes) and prefixes.item(position) == key:
+                return self.vendor_names.item(vendor_indices.item(position))
+
+        return None
+
+    def get_vendors(self, mac_addresses: Union[Iterable, np.ndarray]) -> List[Optional[str]]:
+        """Get vendors of a column of MAC addresses at once.
+
+        Parameters
+        ----------
+        mac_addresses: Union[Iterable, np.ndarray]
+            MAC addresses as strings, bytes or integers (e.g. a column of packet data), or a NumPy array of integers
+            or of 6 byte values (e.g. a field of headers of a batch of packets). Invalid or missing values (e.g. None
+            or NaN) have no vendor.
+
+        Returns
+        -------
+        vendors: List[Optional[str]]
+            Vendor of each MAC address, None if vendor is not known
+        """
+        if isinstance(mac_addresses, np.ndarray) and mac_addresses.dtype.kind in 'VS' and \
+                mac_addresses.dtype.itemsize == MAC_ADDRESS_SIZE:
+            octets = np.zeros((len(mac_addresses), 8), dtype=np.uint8)
+            octets[:, 8 - MAC_ADDRESS_SIZE:] = np.frombuffer(mac_addresses.tobytes(), dtype=np.uint8).reshape(
+                -1, MAC_ADDRESS_SIZE)
+            indices = self.get_vendor_indices(octets.view('>u8')[:, 0].astype(np.uint64))
+
+        elif isinstance(mac_addresses, np.ndarray) and mac_addresses.dtype.kind in 'iu':
+            values = mac_addresses.astype(np.int64)
+            indices = self.get_vendor_indices(values.astype(np.uint64))
+            indices[(values < 0) | (values >= 1 << MAC_ADDRESS_BITS)] = -1
+
+        else:
+            # Convert each distinct MAC address once, columns usually contain a few addresses many times
+            positions = {}
+            inverse = np.array(
+                [positions.setdefault(mac_address, len(positions)) for mac_address in mac_addresses], dtype=np.int64)
+            values = [mac_address_to_int(mac_address) for mac_address in positions]
+            unique_indices = self.get_vendor_indices(
+                np.array([-1 if value is None else value for value in values], dtype=np.int64).astype(np.uint64))
+            indices = unique_indices[inverse]
+
+        if not len(self.vendor_names):
+            return [None] * len(indices)
+
+        vendors = self.vendor_names[indices].tolist()
+        for position in np.flatnonzero(indices < 0).tolist():
+            vendors[position] = None
+        return vendors
+
+    def get_vendor_indices(self, values: np.ndarray) -> np.ndarray:
+        """Get indices of vendors (in `vendor_names`) of MAC addresses given as array of integers. Index is -1 for MAC
+        addresses without vendor, including values larger than 48 bits."""
+        indices = np.full(len(values), -1, dtype=np.int64)
+        unmatched = np.flatnonzero(values < np.uint64(1 << MAC_ADDRESS_BITS))
+        for bits, prefixes, prefix_indices in self.prefix_arrays:
+            if unmatched.size == 0:
+                break
+
+            keys = values[unmatched] >> np.uint64(MAC_ADDRESS_BITS - bits)
+            positions = np.minimum(np.searchsorted(prefixes, keys), len(prefixes) - 1)
+            matched = prefixes[positions] == keys
+            indices[unmatched[matched]] = prefix_indices[positions[matched]]
+            unmatched = unmatched[~matched]
+
+        return indices
+
+
 def fetch_manuf_file(manuf_file_uri: str = WIRESHARK_MANUF_FILE, manuf_file_path: str = '') -> bool:
     """
     This function retrieves the latest version of file from web and storesit in local storage.
@@ -0,0 +1,324 @@
+"""Long-lived p0f process used for fingerprinting TCP SYN packets.
+
+SYN packets are written in batches to stdin of a single p0f process (reading an endless pcap stream), and results are
+read from its stdout in a background thread. Each submitted packet gets a sequence number, which is encoded as the
+packet's source address, so that results printed by p0f are joined back to the packets they belong to. Source address
+is not a part of the TCP SYN signature, and since every packet comes from a different host, p0f does not mix state of
+different packets.
+"""
+import io
+import logging
+import queue
+import socket
+import struct
+import subprocess
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Optional
+
+import dpkt
+from munch import Munch
+
+from core.errors.generic_errors import GenericError
+from core.file_processor.result_writer import ResultWriterBase
+
+DEFAULT_P0F_BATCH_SIZE = 256            # SYN packets written to p0f at once
+DEFAULT_MAX_PENDING_ROWS = 65536        # Rows held in memory while waiting for results from p0f
+P0F_RESULT_TIMEOUT = 60                 # Seconds
+P0F_SNAPLEN = 65535
+P0F_RESULT_BLOCK_TYPES = ('syn', 'sendsyn probe')
+# Ethernet header of packets written to p0f. MAC addresses are irrelevant, but required for p0f to be not confused
+P0F_ETHERNET_HEADERS = {
+    4: b'\x08\x00\x27\x70\xe3\xf0' + b'\x08\x00\x27\x70\xa3\xf0' + struct.pack('!H', dpkt.ethernet.ETH_TYPE_IP),
+    6: b'\x08\x00\x27\x70\xe3\xf0' + b'\x08\x00\x27\x70\xa3\xf0' + struct.pack('!H', dpkt.ethernet.ETH_TYPE_IP6),
+}
+IP6_SOURCE_PREFIX = b'\x20\x01\x0d\xb8' + b'\x00' * 8     # Documentation prefix (2001:db8::/32)
+# SYN packet sent after other packets when waiting for results. p0f prints a result for every such packet, so all
+# packets before it are known to have been processed when its result is read.
+P0F_MARKER_PACKET = dpkt.ip.IP(
+    dst=socket.inet_aton('192.0.2.1'), p=dpkt.ip.IP_PROTO_TCP, ttl=64, id=1,
+    data=dpkt.tcp.TCP(sport=1024, dport=80, seq=1, flags=dpkt.tcp.TH_SYN, win=1024)
+)
+
+
+class P0fResult:
+    """Result of p0f for a submitted SYN packet. It is ready when p0f has processed the packet; values are empty if p0f
+    did not print anything for the packet."""
+    __slots__ = ('sequence', 'syn_signature', 'client_os', 'ready')
+
+    def __init__(self, sequence: int):
+        self.sequence = sequence
+        self.syn_signature = None
+        self.client_os = None
+        self.ready = False
+
+
+class P0fProcess:
+    def __init__(
+            self,
+            p0f_executable: str,
+            p0f_wd: str = None,
+            parse_output: Callable[[str], Munch] = None,
+            batch_size: int = DEFAULT_P0F_BATCH_SIZE
+    ):
+        """Single p0f process, which is started when the first packet is submitted, and runs until `close`.
+
+        Parameters
+        ----------
+        p0f_executable: str
+            Path to p0f executable
+        p0f_wd: str
+            Working directory for p0f, containing its fingerprint database `p0f.fp`
+        parse_output: Callable[[str], Munch]
+            Function which extracts `syn_signature` and `client_os` from p0f output for a packet
+        batch_size: int
+            Number of packets buffered before these are written to p0f
+        """
+        self.p0f_executable = p0f_executable
+        self.p0f_wd = p0f_wd
+        self.parse_output = parse_output
+        self.batch_size = max(batch_size, 1)
+        self.process = None
+        self.sequence = 0
+        self.batch_count = 0
+        self.batch = io.BytesIO()
+        self.batch_writer = None
+        self.pending = deque()      # type: Deque[P0fResult]
+        self.condition = threading.Condition()
+        self.input_queue = queue.Queue()
+        self.threads = []
+
+    def start(self) -> None:
+        try:
+            self.process = subprocess.Popen(
+                [self.p0f_executable, '-r', '/dev/stdin'],
+                cwd=self.p0f_wd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                encoding='utf-8'
+            )
+
+        except (OSError, TypeError, ValueError) as ex:
+            raise GenericError('Unable to start `p0f` process. Error: `{}`'.format(ex)) from ex
+
+        # Pcap file header is written with the first batch
+        self.batch_writer = dpkt.pcap.Writer(self.batch, snaplen=P0F_SNAPLEN)
+        self.threads = [
+            threading.Thread(target=self._write_input, name='p0f-input', daemon=True),
+            threading.Thread(target=self._read_output, name='p0f-output', daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, ip_packet: Any) -> P0fResult:
+        """Submit an IP packet containing TCP SYN segment to p0f. The call does not wait for p0f; result is filled in
+        when p0f has processed the packet.
+
+        Returns
+        -------
+        result: P0fResult
+            Result which is ready when p0f has processed the packet
+        """
+        if self.process is None:
+            self.start()
+
+        self.sequence += 1
+        result = P0fResult(self.sequence)
+        if self.process.returncode is not None:
+            result.ready = True     # p0f has exited, see `_read_output`
+            return result
+
+        self.pending.append(result)
+        self.batch_writer.writepkt(self.get_packet_with_sequence(ip_packet, self.sequence), ts=0)
+        self.batch_count += 1
+        if self.batch_count >= self.batch_size:
+            self.flush()
+
+        return result
+
+    @staticmethod
+    def get_packet_with_sequence(ip_packet: Any, sequence: int) -> bytes:
+        """Get Ethernet frame with IP packet, where source address is replaced with sequence number."""
+        ip_bytes = bytes(ip_packet)
+        if isinstance(ip_packet, dpkt.ip6.IP6):
+            return P0F_ETHERNET_HEADERS[6] + ip_bytes[:8] + IP6_SOURCE_PREFIX + struct.pack('!I', sequence) + \
+                ip_bytes[24:]
+
+        return P0F_ETHERNET_HEADERS[4] + ip_bytes[:12] + struct.pack('!I', sequence & 0xFFFFFFFF) + ip_bytes[16:]
+
+    @staticmethod
+    def get_sequence_from_address(address: str) -> Optional[int]:
+        try:
+            if ':' in address:
+                return struct.unpack('!I', socket.inet_pton(socket.AF_INET6, address)[12:])[0]
+
+            return struct.unpack('!I', socket.inet_aton(address))[0]
+
+        except (OSError, struct.error):
+            return None
+
+    def flush(self) -> None:
+        """Write buffered packets to p0f, without waiting for results."""
+        if self.batch_count == 0 and self.batch.tell() == 0:
+            return
+
+        self.input_queue.put(self.batch.getvalue())
+        self.batch.seek(0)
+        self.batch.truncate()
+        self.batch_count = 0
+
+    def sync(self, timeout: float = P0F_RESULT_TIMEOUT) -> None:
+        """Wait until results for all submitted packets are ready."""
+        if not self.pending:
+            return
+
+        marker = self.submit(P0F_MARKER_PACKET)
+        self.flush()
+        with self.condition:
+            ready = self.condition.wait_for(lambda: marker.ready, timeout)
+
+        if not ready:
+            logging.warning('No results from `p0f` in %s seconds, SYN signatures of %s packets are skipped',
+                            timeout, len(self.pending))
+            self._set_ready(self.sequence)
+
+    def close(self) -> None:
+        """Wait for results of all submitted packets, and stop p0f process."""
+        if self.process is None:
+            return
+
+        self.flush()
+        self.input_queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.process.wait()
+        self.process = None
+
+    def _set_ready(self, sequence: int, data: Munch = None) -> None:
+        """Set results of packets up to sequence number ready. p0f processes packets in order, so packets before
+        `sequence` without results are those for which p0f did not print anything."""
+        with self.condition:
+            pending = self.pending
+            while pending and pending[0].sequence <= sequence:
+                result = pending.popleft()
+                if data is not None and result.sequence == sequence:
+                    result.syn_signature = data.get('syn_signature') or None
+                    result.client_os = data.get('client_os') or None
+                result.ready = True
+            self.condition.notify_all()
+
+    def _write_input(self) -> None:
+        stdin = self.process.stdin
+        try:
+            while True:
+                data = self.input_queue.get()
+                if data is None:
+                    break
+                stdin.buffer.write(data)
+                stdin.flush()
+
+        except (BrokenPipeError, ValueError) as ex:
+            logging.error('Unable to write packets to `p0f`. Error: `%s`', ex)
+
+        finally:
+            try:
+                stdin.close()
+            except BrokenPipeError:
+                pass
+
+    def _read_output(self) -> None:
+        block = None
+        sequence = None
+        for line in self.process.stdout:
+            if line.startswith('.-['):
+                # Block header, e.g. `.-[ 1.2.3.4/1234 -> 5.6.7.8/80 (syn) ]-`
+                block = None
+                addresses, _, block_type = line[3:].strip().rstrip(']-').strip().rpartition(' (')
+                if block_type.rstrip(' )') in P0F_RESULT_BLOCK_TYPES:
+                    block = []
+                    sequence = self.get_sequence_from_address(addresses.split(' -> ')[0].strip().rpartition('/')[0])
+
+            elif block is not None:
+                if not line.startswith('`----'):
+                    block.append(line)
+                    continue
+
+                if sequence is not None:
+                    self._set_ready(sequence, self.parse_output(''.join(block)))
+                block = None
+
+        self.process.wait()
+        if self.process.returncode:
+            logging.error('`p0f` process exited with code %s', self.process.returncode)
+        # No more results are printed
+        self._set_ready(self.sequence)
+
+
+class P0fResultWriter(ResultWriterBase):
+    def __init__(
+            self,
+            result_writer: ResultWriterBase,
+            p0f_process: P0fProcess,
+            validate_packet_data: bool = False,
+            max_pending_rows: int = DEFAULT_MAX_PENDING_ROWS
+    ):
+        """Result writer which joins results from p0f to rows of SYN packets, and writes rows to another writer in
+        the same order as these were written. Rows are held in memory (without waiting for p0f) until results of all
+        earlier SYN packets are ready.
+
+        Parameters
+        ----------
+        result_writer: ResultWriterBase
+            Writer for result file
+        p0f_process: P0fProcess
+            p0f process to which SYN packets are submitted
+        validate_packet_data: bool
+            Validate rows using PacketData model when results are joined
+        max_pending_rows: int
+            Maximum number of rows held in memory. When reached, writer waits for results from p0f.
+        """
+        super().__init__(result_writer.file_path)
+        self.result_writer = result_writer
+        self.p0f_process = p0f_process
+        self.validate_packet_data = validate_packet_data
+        self.max_pending_rows = max_pending_rows
+        self.rows = deque()
+
+    def write(self, packet_data: Any) -> None:
+        rows = self.rows
+        rows.append(packet_data)
+        self.write_ready_rows()
+        if len(rows) >= self.max_pending_rows:
+            self.p0f_process.sync()
+            self.write_ready_rows()
+
+    def write_ready_rows(self) -> None:
+        rows = self.rows
+        while rows:
+            packet_data = rows[0]
+            result = packet_data.syn_signature
+            if result.__class__ is P0fResult:
+                if not result.ready:
+                    break
+                packet_data.syn_signature = result.syn_signature
+                packet_data.client_os = result.client_os
+
+            rows.popleft()
+            if self.validate_packet_data:
+                packet_data = packet_data.to_packet_data(validate=True)
+            self.result_writer.write(packet_data)
+
+    def write_pending_rows(self) -> None:
+        """Wait for results of all SYN packets, and write all rows."""
+        if self.rows:
+            self.p0f_process.sync()
+            self.write_ready_rows()
+
+    def sync(self) -> None:
+        self.write_pending_rows()
+        self.result_writer.sync()
+
+    def close(self) -> None:
+        self.write_pending_rows()
+        self.result_writer.close()
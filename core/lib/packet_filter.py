@@ -0,0 +1,368 @@
+"""Filters for packets read from capture files, which are evaluated on raw packet bytes before packets are parsed.
+
+Filter expressions use a subset of pcap-filter (BPF) syntax, and a `time` primitive for timestamps of packets:
+
+    ether [src|dst] host <mac>      ether proto <number|ip|ip6|arp>
+    [src|dst] host <ip>             [src|dst] net <ip>/<prefix length>
+    ip | ip6 | arp                  tcp | udp | icmp | icmp6 | igmp
+    [ip|ip6] proto <number|name>    [tcp|udp] [src|dst] port <number>
+    [tcp|udp] [src|dst] portrange <number>-<number>
+    time <|<=|>|>= <unix timestamp>
+
+Primitives are combined with `and` (`&&`), `or` (`||`), `not` (`!`) and parentheses. Same as in pcap-filter, `not` has
+highest precedence, and `and` and `or` have equal precedence and are evaluated left to right. `host <mac>` is the same
+as `ether host <mac>`. Unlike pcap-filter, headers of IP packets in VLAN (802.1Q) tagged frames are also matched, same
+as these are processed.
+"""
+import ipaddress
+import re
+import struct
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from core.static.patterns import MAC_REGEX
+
+ETH_TYPE_IP = 0x0800
+ETH_TYPE_IP6 = 0x86DD
+ETH_TYPE_ARP = 0x0806
+VLAN_ETH_TYPES = (0x8100, 0x88A8, 0x9100)
+MAX_VLAN_TAGS = 2
+ETHER_TYPE_NAMES = {'ip': ETH_TYPE_IP, 'ip6': ETH_TYPE_IP6, 'arp': ETH_TYPE_ARP}
+IP_PROTOCOL_NAMES = {'icmp': 1, 'igmp': 2, 'tcp': 6, 'udp': 17, 'icmp6': 58}
+PORT_PROTOCOLS = (6, 17, 132)     # TCP, UDP, SCTP
+# IPv6 extension headers which are skipped to find upper layer protocol
+IP6_EXTENSION_HEADERS = (0, 43, 60)     # Hop-by-hop options, routing, destination options
+IP6_FRAGMENT_HEADER = 44
+IP6_AUTHENTICATION_HEADER = 51
+TIME_COMPARISONS = {
+    '<': lambda ts, value: ts < value,
+    '<=': lambda ts, value: ts <= value,
+    '>': lambda ts, value: ts > value,
+    '>=': lambda ts, value: ts >= value,
+}
+TOKEN_REGEX = re.compile(r'\s*(&&|\|\||<=|>=|[()!<>]|[^\s()!<>&|]+)')
+MAC_ADDRESS_REGEX = re.compile(MAC_REGEX, re.IGNORECASE)
+
+Predicate = Callable[[float, 'PacketHeaders'], bool]  # pylint: disable=invalid-name
+
+
+class PacketHeaders:
+    """Addresses, protocols and ports of a packet, read from fixed offsets of raw Ethernet frame. Fields which are not
+    present in the packet are None."""
+    __slots__ = ('src_mac', 'dst_mac', 'eth_type', 'ip_version', 'src_ip', 'dst_ip', 'ip_proto', 'src_port', 'dst_port')
+
+    def __init__(self, packet: bytes):
+        self.src_mac = self.dst_mac = self.eth_type = None
+        self.ip_version = self.src_ip = self.dst_ip = self.ip_proto = None
+        self.src_port = self.dst_port = None
+        size = len(packet)
+        if size < 14:
+            return
+
+        self.dst_mac = packet[0:6]
+        self.src_mac = packet[6:12]
+        eth_type = packet[12] << 8 | packet[13]
+        offset = 14
+        for _ in range(MAX_VLAN_TAGS):
+            if eth_type not in VLAN_ETH_TYPES or size < offset + 4:
+                break
+            eth_type = packet[offset + 2] << 8 | packet[offset + 3]
+            offset += 4
+        self.eth_type = eth_type
+
+        layer4_offset = None
+        if eth_type == ETH_TYPE_IP and size >= offset + 20 and packet[offset] >> 4 == 4:
+            self.ip_version = 4
+            self.ip_proto = packet[offset + 9]
+            self.src_ip = packet[offset + 12:offset + 16]
+            self.dst_ip = packet[offset + 16:offset + 20]
+            if (packet[offset + 6] & 0x1F) == 0 and packet[offset + 7] == 0:    # Not a non-first fragment
+                layer4_offset = offset + (packet[offset] & 0x0F) * 4
+
+        elif eth_type == ETH_TYPE_IP6 and size >= offset + 40 and packet[offset] >> 4 == 6:
+            self.ip_version = 6
+            self.src_ip = packet[offset + 8:offset + 24]
+            self.dst_ip = packet[offset + 24:offset + 40]
+            self.ip_proto, layer4_offset = self.skip_ip6_extension_headers(packet, packet[offset + 6], offset + 40)
+
+        if self.ip_proto in PORT_PROTOCOLS and layer4_offset is not None and size >= layer4_offset + 4:
+            self.src_port, self.dst_port = struct.unpack_from('!HH', packet, layer4_offset)
+
+    @staticmethod
+    def skip_ip6_extension_headers(packet: bytes, next_header: int, offset: int) -> Tuple[int, Optional[int]]:
+        """Get upper layer protocol of IPv6 packet, and offset of its header (None for non-first fragments)."""
+        size = len(packet)
+        while size >= offset + 8:
+            if next_header in IP6_EXTENSION_HEADERS:
+                next_header, offset = packet[offset], offset + (packet[offset + 1] + 1) * 8
+
+            elif next_header == IP6_AUTHENTICATION_HEADER:
+                next_header, offset = packet[offset], offset + (packet[offset + 1] + 2) * 4
+
+            elif next_header == IP6_FRAGMENT_HEADER:
+                fragment_offset = struct.unpack_from('!H', packet, offset + 2)[0] >> 3
+                next_header, offset = packet[offset], offset + 8
+                if fragment_offset != 0:
+                    return next_header, None
+
+            else:
+                break
+
+        return next_header, offset
+
+
+class PacketFilter:
+    def __init__(self, expression: str):
+        """Filter for packets, compiled from a filter expression (see module documentation).
+
+        Parameters
+        ----------
+        expression: str
+            Filter expression, e.g. `udp dst port 53` or `ether host 00:11:22:33:44:55 and time >= 1590000000`. Empty
+            expression matches all packets.
+
+        Raises
+        ------
+        ValueError: Exception
+            If filter expression is not valid
+        """
+        self.expression = expression
+        self.uses_headers = False
+        tokens = tokenize(expression)
+        self._tokens = tokens
+        self._position = 0
+        self.predicate = self.parse_expression() if tokens else None
+        if self._position < len(tokens):
+            raise self.error('Unexpected `{}`'.format(tokens[self._position]))
+
+    def match(self, ts: float, packet: bytes) -> bool:
+        if self.predicate is None:
+            return True
+
+        return self.predicate(ts, PacketHeaders(packet) if self.uses_headers else None)
+
+    def filter(self, captures: Iterable[Tuple[float, Any]]) -> Iterator[Tuple[float, Any]]:
+        """Iterate over (timestamp, packet) tuples which match the filter."""
+        if self.predicate is None:
+            yield from captures
+            return
+
+        match = self.match
+        for ts, packet in captures:
+            if match(ts, packet):
+                yield ts, packet
+
+    def error(self, message: str) -> ValueError:
+        return ValueError('Invalid packet filter `{}`: {}'.format(self.expression, message))
+
+    def peek(self) -> Optional[str]:
+        if self._position < len(self._tokens):
+            return self._tokens[self._position]
+
+        return None
+
+    def next_token(self, expected: str = 'a value') -> str:
+        token = self.peek()
+        if token is None:
+            raise self.error('Expected {} at end of expression'.format(expected))
+
+        self._position += 1
+        return token
+
+    def parse_expression(self) -> Predicate:
+        predicate = self.parse_term()
+        while self.peek() in ('and', '&&', 'or', '||'):
+            operator = self.next_token()
+            left, right = predicate, self.parse_term()
+            if operator in ('and', '&&'):
+                predicate = lambda ts, headers, left=left, right=right: left(ts, headers) and right(ts, headers)
+            else:
+                predicate = lambda ts, headers, left=left, right=right: left(ts, headers) or right(ts, headers)
+
+        return predicate
+
+    def parse_term(self) -> Predicate:
+        token = self.next_token('a filter primitive')
+        if token in ('not', '!'):
+            term = self.parse_term()
+            return lambda ts, headers: not term(ts, headers)
+
+        if token == '(':
+            predicate = self.parse_expression()
+            if self.next_token('`)`') != ')':
+                raise self.error('Expected `)`')
+            return predicate
+
+        if token == 'time':
+            return self.parse_time()
+
+        self.uses_headers = True
+        return self.parse_primitive(token)
+
+    def parse_time(self) -> Predicate:
+        comparison = TIME_COMPARISONS.get(self.next_token('a comparison'))
+        if comparison is None:
+            raise self.error('Expected one of {} after `time`'.format(', '.join(TIME_COMPARISONS)))
+
+        value = self.parse_number(self.next_token('a timestamp'), float)
+        return lambda ts, headers: comparison(ts, value)
+
+    # pylint: disable=too-many-return-statements
+    def parse_primitive(self, token: str) -> Predicate:
+        if token == 'ether':
+            token = self.next_token('`host`, `src`, `dst` or `proto`')
+            if token == 'proto':
+                eth_type = self.parse_ether_type(self.next_token('an ether type'))
+                return lambda ts, headers: headers.eth_type == eth_type
+
+            direction = None
+            if token in ('src', 'dst'):
+                direction, token = token, self.next_token('`host`')
+            if token != 'host':
+                raise self.error('Expected `host` instead of `{}`'.format(token))
+            return self.parse_mac_host(direction, self.next_token('a MAC address'))
+
+        if token in ('src', 'dst'):
+            return self.parse_qualified_primitive(token, None, self.next_token('`host`, `net` or `port`'))
+
+        if token in ('tcp', 'udp') and self.peek() in ('src', 'dst', 'port', 'portrange'):
+            direction = None
+            if self.peek() in ('src', 'dst'):
+                direction = self.next_token()
+            return self.parse_qualified_primitive(direction, IP_PROTOCOL_NAMES[token], self.next_token('`port`'))
+
+        if token in ('ip', 'ip6') and self.peek() == 'proto':
+            self.next_token()
+            ip_version = 4 if token == 'ip' else 6
+            ip_proto = self.parse_ip_proto(self.next_token('a protocol'))
+            return lambda ts, headers: headers.ip_version == ip_version and headers.ip_proto == ip_proto
+
+        if token in ETHER_TYPE_NAMES:
+            eth_type = ETHER_TYPE_NAMES[token]
+            return lambda ts, headers: headers.eth_type == eth_type
+
+        if token == 'proto':
+            ip_proto = self.parse_ip_proto(self.next_token('a protocol'))
+            return lambda ts, headers: headers.ip_proto == ip_proto
+
+        if token in IP_PROTOCOL_NAMES:
+            ip_proto = IP_PROTOCOL_NAMES[token]
+            return lambda ts, headers: headers.ip_proto == ip_proto
+
+        return self.parse_qualified_primitive(None, None, token)
+
+    def parse_qualified_primitive(self, direction: Optional[str], ip_proto: Optional[int], token: str) -> Predicate:
+        """Parse `host`, `net`, `port` or `portrange` primitive, with optional direction and protocol qualifiers."""
+        if token == 'host' and ip_proto is None:
+            address = self.next_token('an address')
+            if MAC_ADDRESS_REGEX.match(address):
+                return self.parse_mac_host(direction, address)
+            network = self.parse_network(address, host=True)
+            return self.get_ip_predicate(direction, network)
+
+        if token == 'net' and ip_proto is None:
+            return self.get_ip_predicate(direction, self.parse_network(self.next_token('a network'), host=False))
+
+        if token == 'port':
+            port = self.parse_port(self.next_token('a port'))
+            return self.get_port_predicate(direction, ip_proto, port, port)
+
+        if token == 'portrange':
+            port_range = self.next_token('a port range')
+            first_port, _, last_port = port_range.partition('-')
+            return self.get_port_predicate(direction, ip_proto, self.parse_port(first_port), self.parse_port(last_port))
+
+        raise self.error('Unknown primitive `{}`'.format(token))
+
+    def parse_mac_host(self, direction: Optional[str], address: str) -> Predicate:
+        if not MAC_ADDRESS_REGEX.match(address):
+            raise self.error('Invalid MAC address `{}`'.format(address))
+
+        mac = bytes.fromhex(address.replace(':', '').replace('-', ''))
+        if direction == 'src':
+            return lambda ts, headers: headers.src_mac == mac
+        if direction == 'dst':
+            return lambda ts, headers: headers.dst_mac == mac
+        return lambda ts, headers: headers.src_mac == mac or headers.dst_mac == mac
+
+    @staticmethod
+    def get_ip_predicate(direction: Optional[str], network: Any) -> Predicate:
+        ip_version = network.version
+        address = int(network.network_address)
+        mask = int(network.netmask)
+
+        def matches(ip_address: bytes) -> bool:
+            return int.from_bytes(ip_address, 'big') & mask == address
+
+        if direction == 'src':
+            return lambda ts, headers: headers.ip_version == ip_version and matches(headers.src_ip)
+        if direction == 'dst':
+            return lambda ts, headers: headers.ip_version == ip_version and matches(headers.dst_ip)
+        return lambda ts, headers: headers.ip_version == ip_version and (
+            matches(headers.src_ip) or matches(headers.dst_ip))
+
+    @staticmethod
+    def get_port_predicate(direction: Optional[str], ip_proto: Optional[int], first_port: int, last_port: int) \
+            -> Predicate:
+        def matches(headers: PacketHeaders) -> bool:
+            if headers.src_port is None or (ip_proto is not None and headers.ip_proto != ip_proto):
+                return False
+            if direction == 'src':
+                return first_port <= headers.src_port <= last_port
+            if direction == 'dst':
+                return first_port <= headers.dst_port <= last_port
+            return first_port <= headers.src_port <= last_port or first_port <= headers.dst_port <= last_port
+
+        return lambda ts, headers: matches(headers)
+
+    def parse_network(self, address: str, host: bool) -> Any:
+        try:
+            if host:
+                return ipaddress.ip_network(ipaddress.ip_address(address))
+            return ipaddress.ip_network(address, strict=False)
+
+        except ValueError:
+            raise self.error('Invalid {} `{}`'.format('address' if host else 'network', address)) from None
+
+    def parse_ether_type(self, token: str) -> int:
+        if token in ETHER_TYPE_NAMES:
+            return ETHER_TYPE_NAMES[token]
+        return self.parse_number(token, int, 0xFFFF)
+
+    def parse_ip_proto(self, token: str) -> int:
+        if token in IP_PROTOCOL_NAMES:
+            return IP_PROTOCOL_NAMES[token]
+        return self.parse_number(token, int, 0xFF)
+
+    def parse_port(self, token: str) -> int:
+        return self.parse_number(token, int, 0xFFFF)
+
+    def parse_number(self, token: str, number_type: type, max_value: int = None) -> Any:
+        try:
+            value = int(token, 0) if number_type is int else number_type(token)
+
+        except ValueError:
+            raise self.error('Invalid number `{}`'.format(token)) from None
+
+        if value < 0 or (max_value is not None and value > max_value):
+            raise self.error('Number `{}` is out of range'.format(token))
+
+        return value
+
+
+def tokenize(expression: str) -> List[str]:
+    expression = (expression or '').strip()
+    tokens = []
+    position = 0
+    while position < len(expression):
+        match = TOKEN_REGEX.match(expression, position)
+        if match is None or match.end() == position:
+            raise ValueError('Invalid packet filter `{}`: unexpected `{}`'.format(expression, expression[position:]))
+        tokens.append(match.group(1))
+        position = match.end()
+
+    return tokens
+
+
+def filter_captures(captures: Iterable[Tuple[float, Any]], expression: str) -> Iterator[Tuple[float, Any]]:
+    """Iterate over (timestamp, packet) tuples from captures which match filter expression, see `PacketFilter`."""
+    return PacketFilter(expression).filter(captures)
@@ -0,0 +1,325 @@
+import logging
+import mmap
+import os
+import struct
+from typing import Iterator, List, Optional, Tuple
+
+from munch import Munch
+
+from core.file_processor.errors import FileError, FileErrorType
+
+# Extensions of capture files, pcapng files are also often saved with `.pcap` extension
+PCAP_FILE_EXTENSIONS = ('pcap', 'pcapng')
+PCAP_GLOBAL_HEADER_SIZE = 24
+PCAP_RECORD_HEADER_SIZE = 16
+# pcap magic number (as read in little-endian order) to byte order and timestamp divisor
+PCAP_MAGIC_NUMBERS = {
+    0xa1b2c3d4: ('<', 1e6),
+    0xd4c3b2a1: ('>', 1e6),
+    0xa1b23c4d: ('<', 1e9),     # Nanosecond resolution
+    0x4d3cb2a1: ('>', 1e9),
+}
+
+
+def read_pcap_global_header(pcap_file) -> Munch:
+    """Read global header of a pcap file from a file object positioned at start of the file.
+
+    Parameters
+    ----------
+    pcap_file: BinaryIO
+        File object opened for reading in binary mode
+
+    Returns
+    -------
+    header: Munch
+        pcap global header information, i.e. `byte_order` ('<' or '>'), timestamp `divisor`, `snaplen` and `linktype`
+
+    Raises
+    ------
+    FileError: Exception
+        If file does not start with a valid pcap global header
+    """
+    buf = pcap_file.read(PCAP_GLOBAL_HEADER_SIZE)
+    if len(buf) < PCAP_GLOBAL_HEADER_SIZE:
+        raise FileError(
+            message='Invalid pcap file: got {} bytes, {} needed for global header'.format(
+                len(buf), PCAP_GLOBAL_HEADER_SIZE),
+            error_type=FileErrorType.FILE_PARSING_ERROR
+        )
+
+    magic = struct.unpack('<I', buf[:4])[0]
+    if magic not in PCAP_MAGIC_NUMBERS:
+        raise FileError(
+            message='Invalid pcap file: unknown magic number `{}`'.format(hex(magic)),
+            error_type=FileErrorType.UNSUPPORTED_FILE_TYPE
+        )
+
+    header = Munch()
+    header.byte_order, header.divisor = PCAP_MAGIC_NUMBERS[magic]
+    header.snaplen, header.linktype = struct.unpack(header.byte_order + 'II', buf[16:24])
+
+    return header
+
+
+def find_pcap_shard_boundaries(file_path: str, shard_count: int) -> List[Tuple[int, int]]:
+    """Scan record headers of a pcap file once, and split the file into byte ranges of roughly equal size, where each
+    range starts and ends at a packet boundary.
+
+    Only the 16 byte record headers are read, packet data is skipped using seek.
+
+    Parameters
+    ----------
+    file_path: str
+        Path to pcap file
+    shard_count: int
+        Number of byte ranges the file should be split in
+
+    Returns
+    -------
+    shards: List[Tuple[int, int]]
+        List of (start, end) byte offsets for each shard. Fewer than `shard_count` shards are returned if file does
+        not contain enough packets.
+    """
+    file_size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as pcap_file:
+        header = read_pcap_global_header(pcap_file)
+        record_header = struct.Struct(header.byte_order + 'IIII')
+
+        data_size = file_size - PCAP_GLOBAL_HEADER_SIZE
+        targets = [PCAP_GLOBAL_HEADER_SIZE + data_size * i // shard_count for i in range(1, shard_count)]
+        boundaries = [PCAP_GLOBAL_HEADER_SIZE]
+
+        offset = PCAP_GLOBAL_HEADER_SIZE
+        while targets:
+            buf = pcap_file.read(PCAP_RECORD_HEADER_SIZE)
+            if len(buf) < PCAP_RECORD_HEADER_SIZE:
+                break
+
+            offset += PCAP_RECORD_HEADER_SIZE + record_header.unpack(buf)[2]
+            pcap_file.seek(offset)
+            if offset >= targets[0] and offset < file_size:
+                boundaries.append(offset)
+                while targets and targets[0] <= offset:
+                    targets.pop(0)
+
+    boundaries.append(file_size)
+
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+class PcapRangeReader:
+    """Iterate over packets in a byte range of a pcap file, yielding (timestamp, packet) tuples similar to
+    `dpkt.pcap.Reader`. The range must start at a packet boundary, see `find_pcap_shard_boundaries`.
+    """
+    def __init__(self, file_path: str, start: int = PCAP_GLOBAL_HEADER_SIZE, end: Optional[int] = None):
+        self.file_path = file_path
+        self.pcap_file = open(file_path, 'rb')
+        self.header = read_pcap_global_header(self.pcap_file)
+        self.start = max(start, PCAP_GLOBAL_HEADER_SIZE)
+        self.end = end if end is not None else os.path.getsize(file_path)
+
+    def __iter__(self) -> Iterator[Tuple[float, bytes]]:
+        record_header = struct.Struct(self.header.byte_order + 'IIII')
+        divisor = self.header.divisor
+
+        self.pcap_file.seek(self.start)
+        offset = self.start
+        while offset < self.end:
+            buf = self.pcap_file.read(PCAP_RECORD_HEADER_SIZE)
+            if len(buf) < PCAP_RECORD_HEADER_SIZE:
+                break
+
+            tv_sec, tv_usec, caplen, _ = record_header.unpack(buf)
+            packet = self.pcap_file.read(caplen)
+            if len(packet) < caplen:
+                logging.warning('Truncated packet at offset `%s` in `%s`', offset, self.file_path)
+                break
+
+            offset += PCAP_RECORD_HEADER_SIZE + caplen
+            yield tv_sec + (tv_usec / divisor), packet
+
+    def close(self) -> None:
+        self.pcap_file.close()
+
+
+class PcapMmapReader:
+    """Iterate over packets in (a byte range of) a pcap file using a memory map of the file, yielding
+    (timestamp, packet) tuples, where packet is a `memoryview` slice of the mapped file. Packet data is not copied by
+    the reader, record headers are unpacked directly from the map.
+
+    Packets are only valid while the reader is open. Use `bytes(packet)` where a copy of packet data is needed.
+    """
+    def __init__(self, file_path: str, start: int = PCAP_GLOBAL_HEADER_SIZE, end: Optional[int] = None):
+        self.file_path = file_path
+        self.name = file_path
+        with open(file_path, 'rb') as pcap_file:
+            self.header = read_pcap_global_header(pcap_file)
+            self.mmap = mmap.mmap(pcap_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.view = memoryview(self.mmap)
+        self.start = max(start, PCAP_GLOBAL_HEADER_SIZE)
+        self.end = min(end if end is not None else len(self.mmap), len(self.mmap))
+
+    def __iter__(self) -> Iterator[Tuple[float, memoryview]]:
+        unpack_record_header = struct.Struct(self.header.byte_order + 'IIII').unpack_from
+        divisor = self.header.divisor
+        view = self.view
+        end = self.end
+        file_size = len(self.mmap)
+
+        offset = self.start
+        while offset + PCAP_RECORD_HEADER_SIZE <= end:
+            tv_sec, tv_usec, caplen, _ = unpack_record_header(self.mmap, offset)
+            offset += PCAP_RECORD_HEADER_SIZE
+            if offset + caplen > file_size:
+                logging.warning('Truncated packet at offset `%s` in `%s`', offset, self.file_path)
+                return
+
+            yield tv_sec + (tv_usec / divisor), view[offset:offset + caplen]
+            offset += caplen
+
+    def close(self) -> None:
+        self.view.release()
+        try:
+            self.mmap.close()
+
+        except BufferError:
+            # A packet memoryview is still referenced; the map is closed when it is garbage collected.
+            logging.debug('Unable to close memory map of `%s`, packet data is still referenced', self.file_path)
+
+
+PCAPNG_SECTION_HEADER_BLOCK = 0x0A0D0D0A
+PCAPNG_INTERFACE_DESCRIPTION_BLOCK = 0x00000001
+PCAPNG_OBSOLETE_PACKET_BLOCK = 0x00000002
+PCAPNG_SIMPLE_PACKET_BLOCK = 0x00000003
+PCAPNG_ENHANCED_PACKET_BLOCK = 0x00000006
+PCAPNG_BYTE_ORDER_MAGIC = 0x1A2B3C4D
+PCAPNG_OPTION_END = 0
+PCAPNG_OPTION_IF_TSRESOL = 9
+PCAPNG_OPTION_IF_TSOFFSET = 14
+PCAP_FORMAT = 'pcap'
+PCAPNG_FORMAT = 'pcapng'
+
+
+def detect_capture_file_format(magic: bytes) -> Optional[str]:
+    """Detect capture file format, `pcap` or `pcapng`, from first 4 bytes of the (uncompressed) file."""
+    if len(magic) < 4:
+        return None
+
+    if struct.unpack('<I', magic[:4])[0] in PCAP_MAGIC_NUMBERS:
+        return PCAP_FORMAT
+
+    if struct.unpack('<I', magic[:4])[0] == PCAPNG_SECTION_HEADER_BLOCK:
+        return PCAPNG_FORMAT
+
+    return None
+
+
+class PcapngReader:
+    """Iterate over packets in a pcapng file, yielding (timestamp, packet) tuples similar to `dpkt.pcap.Reader`.
+
+    Enhanced, simple and (obsolete) packet blocks are read. Timestamps use resolution (`if_tsresol`) and offset
+    (`if_tsoffset`) of the interface on which packet was captured. A file may contain multiple sections, each with its
+    own byte order and interfaces. Packets in simple packet blocks have no timestamp, and get the timestamp of the
+    previous packet.
+    """
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.name = getattr(fileobj, 'name', '<{}>'.format(fileobj.__class__.__name__))
+        self.byte_order = '<'
+        # Interfaces in current section, list of (units per second, offset in seconds, snaplen)
+        self.interfaces = []    # type: List[Tuple[int, int, int]]
+
+        block = self._read_block()
+        if block is None or block[0] != PCAPNG_SECTION_HEADER_BLOCK:
+            raise FileError(
+                message='Invalid pcapng file: file does not start with a section header block',
+                error_type=FileErrorType.UNSUPPORTED_FILE_TYPE
+            )
+
+    def __iter__(self) -> Iterator[Tuple[float, bytes]]:
+        last_ts = 0
+        while True:
+            block = self._read_block()
+            if block is None:
+                return
+
+            block_type, body = block
+            if block_type == PCAPNG_ENHANCED_PACKET_BLOCK:
+                interface_id, ts_high, ts_low, caplen = struct.unpack(self.byte_order + 'IIII', body[:16])
+                last_ts = self._get_timestamp(interface_id, ts_high, ts_low)
+                yield last_ts, body[20:20 + caplen]
+
+            elif block_type == PCAPNG_SIMPLE_PACKET_BLOCK:
+                packet_len = struct.unpack(self.byte_order + 'I', body[:4])[0]
+                snaplen = self.interfaces[0][2] if self.interfaces and self.interfaces[0][2] else packet_len
+                yield last_ts, body[4:4 + min(packet_len, snaplen)]
+
+            elif block_type == PCAPNG_OBSOLETE_PACKET_BLOCK:
+                interface_id, _, ts_high, ts_low, caplen = struct.unpack(self.byte_order + 'HHIII', body[:16])
+                last_ts = self._get_timestamp(interface_id, ts_high, ts_low)
+                yield last_ts, body[20:20 + caplen]
+
+            elif block_type == PCAPNG_INTERFACE_DESCRIPTION_BLOCK:
+                self.interfaces.append(self._parse_interface_description(body))
+
+    def close(self) -> None:
+        self.fileobj.close()
+
+    def _read_block(self) -> Optional[Tuple[int, bytes]]:
+        """Read next block, and return (block type, block body without type and length fields)."""
+        buf = self.fileobj.read(8)
+        if len(buf) < 8:
+            return None
+
+        if buf[:4] == b'\x0a\x0d\x0d\x0a':
+            # Section header block: byte order of the section is given by byte order magic after block length
+            magic = self.fileobj.read(4)
+            if len(magic) < 4:
+                return None
+            self.byte_order = '<' if struct.unpack('<I', magic)[0] == PCAPNG_BYTE_ORDER_MAGIC else '>'
+            self.interfaces = []
+            block_type = PCAPNG_SECTION_HEADER_BLOCK
+            block_length = struct.unpack(self.byte_order + 'I', buf[4:8])[0]
+            body = magic + self.fileobj.read(block_length - 12)
+
+        else:
+            block_type, block_length = struct.unpack(self.byte_order + 'II', buf)
+            body = self.fileobj.read(block_length - 8)
+
+        if block_length < 12 or len(body) < block_length - 8:
+            logging.warning('Truncated pcapng block in `%s`', self.name)
+            return None
+
+        return block_type, body[:-4]    # Block ends with a copy of block length
+
+    def _parse_interface_description(self, body: bytes) -> Tuple[int, int, int]:
+        snaplen = struct.unpack(self.byte_order + 'I', body[4:8])[0]
+        units_per_second = 1000000
+        offset = 0
+        position = 8
+        while position + 4 <= len(body):
+            code, length = struct.unpack(self.byte_order + 'HH', body[position:position + 4])
+            value = body[position + 4:position + 4 + length]
+            if code == PCAPNG_OPTION_END:
+                break
+
+            if code == PCAPNG_OPTION_IF_TSRESOL and length >= 1:
+                resolution = value[0]
+                units_per_second = 2 ** (resolution & 0x7f) if resolution & 0x80 else 10 ** resolution
+
+            elif code == PCAPNG_OPTION_IF_TSOFFSET and length >= 8:
+                offset = struct.unpack(self.byte_order + 'q', value[:8])[0]
+
+            position += 4 + length + (-length % 4)     # Option values are padded to 32 bits
+
+        return units_per_second, offset, snaplen
+
+    def _get_timestamp(self, interface_id: int, ts_high: int, ts_low: int) -> float:
+        if interface_id < len(self.interfaces):
+            units_per_second, offset, _ = self.interfaces[interface_id]
+        else:
+            units_per_second, offset = 1000000, 0
+
+        seconds, units = divmod((ts_high << 32) | ts_low, units_per_second)
+        return offset + seconds + (units / units_per_second)
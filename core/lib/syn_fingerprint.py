@@ -0,0 +1,589 @@
+"""Native (in-process) TCP SYN fingerprinting, compatible with p0f v3.
+
+Raw signatures are built from IP and TCP headers in the same way as p0f builds `raw_sig` for SYN packets, and are
+matched against `[tcp:request]` signatures of a p0f fingerprint database (`p0f.fp`).
+"""
+import logging
+import struct
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import dpkt
+
+from core.file_processor.errors import FileError, FileErrorType
+
+# p0f constants
+MAX_DIST = 35           # Maximum distance (hops) between host and initial TTL
+MAX_TCP_OPT = 24        # Maximum number of TCP options which are parsed
+MIN_TCP4 = 40           # Size of IPv4 and TCP headers, without options
+MIN_TCP6 = 60           # Size of IPv6 and TCP headers, without options
+UNKNOWN_OS = '???'      # OS reported by p0f when signature does not match any fingerprint
+# Window size and MSS of SYN probes sent by p0f-sendsyn utility
+SPECIAL_WIN = 1337
+SPECIAL_MSS = 1331
+
+TCP_FIN = 0x01
+TCP_SYN = 0x02
+TCP_RST = 0x04
+TCP_PUSH = 0x08
+TCP_ACK = 0x10
+TCP_URG = 0x20
+TCP_ECE = 0x40
+TCP_CWR = 0x80
+TCP_NS = 0x01           # NS bit, in data offset byte of TCP header
+
+IP4_MBZ = 0x8000
+IP4_DF = 0x4000
+
+TCPOPT_EOL = 0
+TCPOPT_NOP = 1
+TCPOPT_MAXSEG = 2
+TCPOPT_WSCALE = 3
+TCPOPT_SACKOK = 4
+TCPOPT_SACK = 5
+TCPOPT_TSTAMP = 8
+TCP_OPTION_NAMES = {
+    TCPOPT_NOP: 'nop',
+    TCPOPT_MAXSEG: 'mss',
+    TCPOPT_WSCALE: 'ws',
+    TCPOPT_SACKOK: 'sok',
+    TCPOPT_SACK: 'sack',
+    TCPOPT_TSTAMP: 'ts',
+}
+
+# Quirks, in the order these are written in a raw signature
+QUIRK_NAMES = (
+    'df', 'id+', 'id-', 'ecn', '0+', 'flow', 'seq-', 'ack+', 'ack-', 'uptr+', 'urgf+', 'pushf+', 'ts1-', 'ts2+',
+    'opt+', 'exws', 'bad'
+)
+QUIRKS = OrderedDict((name, 1 << index) for index, name in enumerate(QUIRK_NAMES))
+QUIRK_DF = QUIRKS['df']
+QUIRK_NZ_ID = QUIRKS['id+']
+QUIRK_ZERO_ID = QUIRKS['id-']
+QUIRK_ECN = QUIRKS['ecn']
+QUIRK_NZ_MBZ = QUIRKS['0+']
+QUIRK_FLOW = QUIRKS['flow']
+QUIRK_ZERO_SEQ = QUIRKS['seq-']
+QUIRK_NZ_ACK = QUIRKS['ack+']
+QUIRK_ZERO_ACK = QUIRKS['ack-']
+QUIRK_NZ_URG = QUIRKS['uptr+']
+QUIRK_URG = QUIRKS['urgf+']
+QUIRK_PUSH = QUIRKS['pushf+']
+QUIRK_OPT_ZERO_TS1 = QUIRKS['ts1-']
+QUIRK_OPT_NZ_TS2 = QUIRKS['ts2+']
+QUIRK_OPT_EOL_NZ = QUIRKS['opt+']
+QUIRK_OPT_EXWS = QUIRKS['exws']
+QUIRK_OPT_BAD = QUIRKS['bad']
+
+# Window size types in fingerprint database
+WIN_TYPE_NORMAL = 0
+WIN_TYPE_ANY = 1
+WIN_TYPE_MOD = 2
+WIN_TYPE_MSS = 3
+WIN_TYPE_MTU = 4
+
+IP4_HEADER = struct.Struct('!BBHHHBBH4s4s')
+IP6_HEADER = struct.Struct('!IHBB16s16s')
+TCP_HEADER = struct.Struct('!HHIIBBHHH')
+
+
+def guess_dist(ttl: int) -> int:
+    """Guess distance (hops) of host from TTL of a packet, assuming a common initial TTL."""
+    if ttl <= 32:
+        return 32 - ttl
+
+    if ttl <= 64:
+        return 64 - ttl
+
+    if ttl <= 128:
+        return 128 - ttl
+
+    return 255 - ttl
+
+
+class TcpSynSignature:
+    """Signature of a TCP SYN packet, i.e. parameters of IP and TCP headers which are used by p0f for identifying
+    operating system of the host which sent the packet."""
+    __slots__ = ('ip_ver', 'ttl', 'ip_opt_len', 'mss', 'win', 'wscale', 'olayout', 'quirks', 'pay_class',
+                 'has_ts1', 'tot_hdr')
+
+    def __init__(
+            self,
+            ip_ver: int,
+            ttl: int,
+            ip_opt_len: int,
+            mss: int,
+            win: int,
+            wscale: int,
+            olayout: str,
+            quirks: int,
+            pay_class: int,
+            has_ts1: bool,
+            tot_hdr: int
+    ):
+        self.ip_ver = ip_ver
+        self.ttl = ttl
+        self.ip_opt_len = ip_opt_len
+        self.mss = mss
+        self.win = win
+        self.wscale = wscale
+        self.olayout = olayout          # Option layout as written in signature, e.g. `mss,sok,ts,nop,ws`
+        self.quirks = quirks
+        self.pay_class = pay_class      # 1 if packet has payload, otherwise 0
+        self.has_ts1 = has_ts1          # Timestamp option with non-zero sender timestamp
+        self.tot_hdr = tot_hdr          # Total size of IP and TCP headers, including options
+
+    def key(self) -> tuple:
+        return tuple(getattr(self, field) for field in self.__slots__)
+
+    def get_window_multiplier(self) -> Tuple[int, bool]:
+        """Detect if window size is a multiple of MSS or MTU.
+
+        Returns
+        -------
+        multiplier: int
+            Window size divided by MSS (or MTU), or -1 if window size is not a multiple of either
+        use_mtu: bool
+            True if window size is a multiple of MTU
+        """
+        win = self.win
+        mss = self.mss
+        if not win or mss < 100:
+            return -1, False
+
+        divisors = [(mss, False)]
+        if self.has_ts1:
+            divisors.append((mss - 12, False))      # Some systems subtract 12 bytes when timestamps are in use
+        divisors.extend([(1500 - MIN_TCP4, False), (1500 - MIN_TCP4 - 12, False)])
+        if self.ip_ver == 6:
+            divisors.extend([(1500 - MIN_TCP6, False), (1500 - MIN_TCP6 - 12, False)])
+        divisors.extend([(mss + MIN_TCP4, True), (mss + self.tot_hdr, True)])
+        if self.ip_ver == 6:
+            divisors.append((mss + MIN_TCP6, True))
+        divisors.append((1500, True))
+
+        for divisor, use_mtu in divisors:
+            if divisor and win % divisor == 0:
+                return win // divisor, use_mtu
+
+        return -1, False
+
+    def to_raw_signature(self) -> str:
+        """Get raw signature of packet in p0f format `ver:ittl+dist:olen:mss:wsize,scale:olayout:quirks:pclass`, e.g.
+        `4:64+0:0:1460:mss*44,7:mss,sok,ts,nop,ws:df,id+:0`"""
+        dist = guess_dist(self.ttl)
+        multiplier, use_mtu = self.get_window_multiplier()
+        if multiplier > 0:
+            window = '{}*{}'.format('mtu' if use_mtu else 'mss', multiplier)
+        else:
+            window = str(self.win)
+
+        return '{}:{}+{}:{}:{}:{},{}:{}:{}:{}'.format(
+            self.ip_ver,
+            self.ttl,
+            dist if dist <= MAX_DIST else '?',
+            self.ip_opt_len,
+            self.mss,
+            window,
+            self.wscale,
+            self.olayout,
+            ','.join(name for name, quirk in QUIRKS.items() if self.quirks & quirk),
+            '+' if self.pay_class else '0'
+        )
+
+
+def parse_tcp_options(options: bytes) -> Tuple[str, int, int, int, int]:
+    """Parse TCP options in the same way as p0f, and detect quirks in options.
+
+    Returns
+    -------
+    olayout: str
+        Layout of options, e.g. `mss,sok,ts,nop,ws`
+    mss: int
+        Maximum segment size, 0 if there is no MSS option
+    wscale: int
+        Window scale, 0 if there is no window scale option
+    ts1: int
+        Sender timestamp, 0 if there is no timestamp option
+    quirks: int
+        Quirks detected in options
+    """
+    layout = []
+    mss = wscale = ts1 = quirks = 0
+    opt_end = len(options)
+    ptr = 0
+    aborted = False
+    while ptr < opt_end and len(layout) < MAX_TCP_OPT:
+        opt = options[ptr]
+        ptr += 1
+        if opt == TCPOPT_EOL:
+            # EOL ends option parsing, any non-zero padding after it is a quirk
+            layout.append('eol+{}'.format(opt_end - ptr))
+            while ptr < opt_end:
+                ptr += 1
+                if options[ptr - 1]:
+                    break
+            if ptr != opt_end:
+                quirks |= QUIRK_OPT_EOL_NZ
+                ptr = opt_end
+            continue
+
+        layout.append(TCP_OPTION_NAMES.get(opt, '?{}'.format(opt)))
+        if opt == TCPOPT_NOP:
+            continue
+
+        if opt == TCPOPT_MAXSEG:
+            if ptr + 3 > opt_end:
+                aborted = True
+                break
+            if options[ptr] != 4:
+                quirks |= QUIRK_OPT_BAD
+            mss = (options[ptr + 1] << 8) | options[ptr + 2]
+            ptr += 3
+
+        elif opt == TCPOPT_WSCALE:
+            if ptr + 2 > opt_end:
+                aborted = True
+                break
+            if options[ptr] != 3:
+                quirks |= QUIRK_OPT_BAD
+            wscale = options[ptr + 1]
+            if wscale > 14:
+                quirks |= QUIRK_OPT_EXWS
+            ptr += 2
+
+        elif opt == TCPOPT_SACKOK:
+            if ptr + 1 > opt_end:
+                aborted = True
+                break
+            if options[ptr] != 2:
+                quirks |= QUIRK_OPT_BAD
+            ptr += 1
+
+        elif opt == TCPOPT_SACK:
+            if ptr == opt_end or options[ptr] < 10 or options[ptr] > 34:
+                aborted = True
+                break
+            ptr += options[ptr] - 1
+
+        elif opt == TCPOPT_TSTAMP:
+            if ptr + 9 > opt_end:
+                aborted = True
+                break
+            if options[ptr] != 10:
+                quirks |= QUIRK_OPT_BAD
+            ts1, ts2 = struct.unpack_from('!II', options, ptr + 1)
+            if not ts1:
+                quirks |= QUIRK_OPT_ZERO_TS1
+            if ts2:
+                quirks |= QUIRK_OPT_NZ_TS2
+            ptr += 9
+
+        else:
+            if ptr == opt_end or options[ptr] < 2 or options[ptr] > 40:
+                aborted = True
+                break
+            ptr += options[ptr] - 1
+            if ptr > opt_end:
+                aborted = True
+                break
+
+    if aborted or ptr != opt_end:
+        quirks |= QUIRK_OPT_BAD
+
+    return ','.join(layout), mss, wscale, ts1, quirks
+
+
+def build_tcp_syn_signature(ip_packet) -> Optional[TcpSynSignature]:
+    """Build signature of a TCP SYN packet from IP and TCP headers parsed by dpkt.
+
+    Parameters
+    ----------
+    ip_packet: Union[dpkt.ip.IP, dpkt.ip6.IP6]
+        IP packet containing TCP SYN segment
+
+    Returns
+    -------
+    signature: Optional[TcpSynSignature]
+        Signature of the packet, or None if packet is not a TCP SYN (without ACK) packet which p0f fingerprints,
+        e.g. IP fragments, or segments with FIN or RST flags.
+    """
+    tcp = ip_packet.data
+    if not isinstance(tcp, dpkt.tcp.TCP):
+        return None
+
+    quirks = 0
+    if isinstance(ip_packet, dpkt.ip.IP):
+        v_hl, tos, _, ip_id, flags_off, ttl, _, _, _, _ = IP4_HEADER.unpack(ip_packet.pack_hdr())
+        ip_ver = 4
+        ip_hdr_len = (v_hl & 0x0F) * 4
+        if flags_off & ~(IP4_DF | IP4_MBZ):
+            return None     # Fragment
+        if tos & 0x03:
+            quirks |= QUIRK_ECN
+        if flags_off & IP4_MBZ:
+            quirks |= QUIRK_NZ_MBZ
+        if flags_off & IP4_DF:
+            quirks |= QUIRK_DF
+            if ip_id:
+                quirks |= QUIRK_NZ_ID
+        elif not ip_id:
+            quirks |= QUIRK_ZERO_ID
+
+    elif isinstance(ip_packet, dpkt.ip6.IP6):
+        ver_tos, _, next_header, ttl, _, _ = IP6_HEADER.unpack(ip_packet.pack_hdr())
+        ip_ver = 6
+        ip_hdr_len = IP6_HEADER.size
+        if next_header != dpkt.ip.IP_PROTO_TCP:
+            return None     # p0f does not parse IPv6 extension headers
+        if (ver_tos >> 20) & 0x03:
+            quirks |= QUIRK_ECN
+        if ver_tos & 0xFFFFF:
+            quirks |= QUIRK_FLOW
+
+    else:
+        return None
+
+    _, _, seq, ack, doff_rsvd, flags, win, _, urg = TCP_HEADER.unpack(tcp.pack_hdr())
+    if flags & (TCP_SYN | TCP_ACK | TCP_FIN | TCP_RST) != TCP_SYN:
+        return None
+
+    if flags & (TCP_ECE | TCP_CWR) or doff_rsvd & TCP_NS:
+        quirks |= QUIRK_ECN
+    if not seq:
+        quirks |= QUIRK_ZERO_SEQ
+    if (ack >> 24) & 1:
+        # p0f tests the lowest bit of ack number read in host (little endian) byte order, i.e. the lowest bit of its
+        # most significant byte, for `ack+`
+        quirks |= QUIRK_NZ_ACK
+    if flags & TCP_URG:
+        quirks |= QUIRK_URG
+    elif urg:
+        quirks |= QUIRK_NZ_URG
+    if flags & TCP_PUSH:
+        quirks |= QUIRK_PUSH
+
+    olayout, mss, wscale, ts1, option_quirks = parse_tcp_options(bytes(tcp.opts))
+
+    return TcpSynSignature(
+        ip_ver=ip_ver,
+        ttl=ttl,
+        ip_opt_len=ip_hdr_len - (IP4_HEADER.size if ip_ver == 4 else IP6_HEADER.size),
+        mss=mss,
+        win=win,
+        wscale=wscale,
+        olayout=olayout,
+        quirks=quirks | option_quirks,
+        pay_class=1 if len(tcp.data) else 0,
+        has_ts1=bool(ts1),
+        tot_hdr=ip_hdr_len + (doff_rsvd >> 4) * 4
+    )
+
+
+class P0fFingerprint:
+    """A `[tcp:request]` signature from p0f fingerprint database. Wildcards (`*`) are stored as -1."""
+    __slots__ = ('label', 'generic', 'user_land', 'ip_ver', 'ttl', 'bad_ttl', 'ip_opt_len', 'mss', 'win_type', 'win',
+                 'wscale', 'olayout', 'quirks', 'pay_class')
+
+    def __init__(self, label: str, signature: str):
+        """
+        Parameters
+        ----------
+        label: str
+            Label of signature, e.g. `s:unix:Linux:3.11 and newer`
+        signature: str
+            Signature, e.g. `*:64:0:*:mss*20,10:mss,sok,ts,nop,ws:df,id+:0`
+
+        Raises
+        ------
+        ValueError: Exception
+            If label or signature is malformed
+        """
+        sig_type, os_class, name, flavor = label.split(':', 3)
+        self.label = '{} {}'.format(name, flavor) if flavor else name
+        self.generic = sig_type == 'g'
+        self.user_land = os_class == '!'
+
+        ip_ver, ttl, ip_opt_len, mss, window, olayout, quirks, pay_class = signature.split(':')
+        self.ip_ver = -1 if ip_ver == '*' else int(ip_ver)
+        self.bad_ttl = ttl.endswith('-')
+        if '+' in ttl:
+            ttl, dist = ttl.split('+')
+            self.ttl = int(ttl) + int(dist)
+        else:
+            self.ttl = int(ttl.rstrip('-'))
+        self.ip_opt_len = int(ip_opt_len)
+        self.mss = -1 if mss == '*' else int(mss)
+
+        win, wscale = window.split(',')
+        self.wscale = -1 if wscale == '*' else int(wscale)
+        if win == '*':
+            self.win_type, self.win = WIN_TYPE_ANY, 0
+        elif win.startswith('mss*'):
+            self.win_type, self.win = WIN_TYPE_MSS, int(win[4:])
+        elif win.startswith('mtu*'):
+            self.win_type, self.win = WIN_TYPE_MTU, int(win[4:])
+        elif win.startswith('%'):
+            self.win_type, self.win = WIN_TYPE_MOD, int(win[1:])
+        else:
+            self.win_type, self.win = WIN_TYPE_NORMAL, int(win)
+
+        self.olayout = olayout
+        self.quirks = 0
+        for quirk in filter(None, quirks.split(',')):
+            if quirk not in QUIRKS:
+                raise ValueError('Unknown quirk `{}`'.format(quirk))
+            self.quirks |= QUIRKS[quirk]
+        if pay_class not in ('*', '0', '+'):
+            raise ValueError('Invalid payload class `{}`'.format(pay_class))
+        self.pay_class = -1 if pay_class == '*' else int(pay_class == '+')
+
+
+class P0fFingerprintDatabase:
+    def __init__(self, file_path: str):
+        """TCP SYN fingerprints loaded from a p0f fingerprint database (`p0f.fp`). Fingerprints are indexed by TCP
+        option layout, since only fingerprints with same option layout as a packet can match it.
+
+        Parameters
+        ----------
+        file_path: str
+            Path to p0f fingerprint database file
+
+        Raises
+        ------
+        FileError: Exception
+            If fingerprint database file can not be read
+        """
+        self.file_path = file_path
+        self.fingerprints = self.load_fingerprints(file_path)     # type: Dict[str, List[P0fFingerprint]]
+        self.match_os = lru_cache(maxsize=4096)(self._match_os)
+
+    @staticmethod
+    def load_fingerprints(file_path: str) -> Dict[str, List[P0fFingerprint]]:
+        fingerprints = dict()
+        try:
+            with open(file_path) as fp_file:
+                lines = fp_file.readlines()
+
+        except OSError as ex:
+            raise FileError(
+                message='Unable to read p0f fingerprint database `{}`. Error: {}'.format(file_path, ex),
+                error_type=FileErrorType.UNSPECIFIED_ERROR
+            ) from ex
+
+        section = label = None
+        count = 0
+        for line_number, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line or line.startswith(';'):
+                continue
+
+            if line.startswith('['):
+                section = line
+                continue
+
+            if section != '[tcp:request]':
+                continue
+
+            key, _, value = line.partition('=')
+            key, value = key.strip(), value.strip()
+            if key == 'label':
+                label = value
+
+            elif key == 'sig' and label is not None:
+                try:
+                    fingerprint = P0fFingerprint(label, value)
+
+                except ValueError as ex:
+                    logging.warning('Skipping invalid signature at line %s in `%s`. Error: `%s`',
+                                    line_number, file_path, ex)
+                    continue
+
+                fingerprints.setdefault(fingerprint.olayout, []).append(fingerprint)
+                count += 1
+
+        logging.debug('%s TCP SYN fingerprints loaded from `%s`', count, file_path)
+        return fingerprints
+
+    def match(self, signature: TcpSynSignature) -> Optional[P0fFingerprint]:
+        """Find fingerprint matching a signature, in the same way as p0f. A specific fingerprint is preferred over a
+        generic one, which is preferred over a fuzzy match (e.g. different TTL, or missing `df` quirk)."""
+        fuzzy_match = generic_match = None
+        win_multi, use_mtu = signature.get_window_multiplier()
+        for fingerprint in self.fingerprints.get(signature.olayout, ()):
+            if fingerprint.ip_ver != -1 and fingerprint.ip_ver != signature.ip_ver:
+                continue
+
+            fuzzy = False
+            quirks = fingerprint.quirks
+            if fingerprint.ip_ver == -1:
+                # Remove quirks specific to other IP version from fingerprint
+                quirks &= ~QUIRK_FLOW if signature.ip_ver == 4 else ~(QUIRK_DF | QUIRK_NZ_ID | QUIRK_ZERO_ID)
+
+            if quirks != signature.quirks:
+                deleted = (quirks ^ signature.quirks) & quirks
+                added = (quirks ^ signature.quirks) & signature.quirks
+                # Missing `df` or `id+`, or additional `id-` or `ecn` are allowed in a fuzzy match
+                if fuzzy_match is not None or deleted & ~(QUIRK_DF | QUIRK_NZ_ID) or \
+                        added & ~(QUIRK_ZERO_ID | QUIRK_ECN):
+                    continue
+                fuzzy = True
+
+            if fingerprint.ip_opt_len != signature.ip_opt_len:
+                continue
+
+            if fingerprint.bad_ttl:
+                if fingerprint.ttl < signature.ttl:
+                    continue
+            elif fingerprint.ttl < signature.ttl or fingerprint.ttl - signature.ttl > MAX_DIST:
+                fuzzy = True
+
+            if fingerprint.mss not in (-1, signature.mss) or fingerprint.wscale not in (-1, signature.wscale) or \
+                    fingerprint.pay_class not in (-1, signature.pay_class):
+                continue
+
+            win_type = fingerprint.win_type
+            if (win_type == WIN_TYPE_NORMAL and fingerprint.win != signature.win) or \
+                    (win_type == WIN_TYPE_MOD and signature.win % fingerprint.win) or \
+                    (win_type == WIN_TYPE_MSS and (use_mtu or fingerprint.win != win_multi)) or \
+                    (win_type == WIN_TYPE_MTU and (not use_mtu or fingerprint.win != win_multi)):
+                continue
+
+            if fuzzy:
+                fuzzy_match = fuzzy_match or fingerprint
+            elif not fingerprint.generic:
+                return fingerprint
+            else:
+                generic_match = generic_match or fingerprint
+
+        if generic_match is not None:
+            return generic_match
+
+        if fuzzy_match is not None and fuzzy_match.user_land:
+            return None     # p0f does not use fuzzy matches for user land tools
+
+        return fuzzy_match
+
+    def _match_os(self, signature_key: tuple) -> str:
+        signature = TcpSynSignature(*signature_key)
+        fingerprint = self.match(signature)
+        if fingerprint is None:
+            return UNKNOWN_OS
+
+        # p0f reports matches for user land tools (e.g. NMap), and for p0f-sendsyn probes as application, instead of OS
+        if fingerprint.user_land or (signature.win == SPECIAL_WIN and signature.mss == SPECIAL_MSS):
+            return ''
+
+        return fingerprint.label
+
+    def get_os(self, signature: TcpSynSignature) -> str:
+        """Get OS label (e.g. `Linux 2.2.x-3.x`) of fingerprint matching a signature, as reported by p0f. Results are
+        memoized by signature."""
+        return self.match_os(signature.key())
+
+
+@lru_cache(maxsize=8)
+def load_p0f_fingerprint_database(file_path: str) -> P0fFingerprintDatabase:
+    """Load p0f fingerprint database, which is shared by all parsers using the same database file."""
+    return P0fFingerprintDatabase(file_path)
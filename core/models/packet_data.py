@@ -1,7 +1,148 @@
-from typing import Optional, Union
+from operator import attrgetter
+from typing import Any, Callable, Optional, Sequence, Union
 
 from core.models.common import Model
 
+# Fields of packet data, in the order in which these are written to result files
+PACKET_DATA_FIELDS = (
+    "timestamp",
+    "ref_time",
+    "size",
+    "outgoing",
+    # Layer 2: Data link layer
+    "src_mac",
+    "dst_mac",
+    "src_mac_vendor",
+    "dst_mac_vendor",
+    "eth_type",
+    "eth_payload_size",
+    # Layer 3: Network layer
+    "src_ip",
+    "dst_ip",
+    "ip_tos",
+    "ip_ttl",
+    "ip_opts",
+    "ip_proto",
+    "ip_payload_size",
+    "ip6_nxt_hdr",
+    "ip_do_not_fragment",
+    "ip_more_fragment",
+    # Layer 3: IEEE-80211.Auth
+    "ieee80211_version",
+    "ieee80211_payload_size",
+    # Layer 4: ICMP packets
+    "icmp_type",
+    "icmp_code",
+    "icmp_message",
+    # Layer 4: IGMP Packets
+    "igmp_type",
+    "igmp_addr",
+    # Layer 4: Transport layer
+    "src_port",
+    "dst_port",
+    "layer4_payload_size",
+    # Layer 4: TCP flags
+    "tcp_fin_flag",
+    "tcp_syn_flag",
+    "tcp_rst_flag",
+    "tcp_psh_flag",
+    "tcp_ack_flag",
+    "tcp_urg_flag",
+    "tcp_ece_flag",
+    "tcp_cwr_flag",
+    # TCP Syn packet data
+    "syn_signature",
+    "client_os",
+    # Layer 4: NAT-PMP data
+    "natpmp_version",
+    "natpmp_opcode",
+    "natpmp_reserved",
+    "natpmp_result",
+    "natpmp_sssoe",
+    "natpmp_lifetime",
+    "natpmp_external_ip",
+    "natpmp_internal_port",
+    "natpmp_external_port",
+    # Layer 7: Application layer
+    "layer7_proto",
+    "payload_size",
+    # Layer 7: DNS queries
+    "dns_type",
+    "dns_rcode",
+    "dns_op",
+    "dns_query_domain",
+    "dns_query_type",
+    "dns_query_cls",
+    "dns_query_multiple_domains",
+    # Layer 7: DNS answers
+    "dns_ans_type",
+    "dns_ans_cname",
+    "dns_ans_cname_ttl",
+    "dns_ans_name",
+    "dns_ans_ip",
+    "dns_ans_ttl",
+    # Layer 7: ARP data
+    "arp_request_src",
+    "arp_src_mac",
+    "arp_src_ip",
+    "arp_dst_mac",
+    "arp_dst_ip",
+    # Layer 7: NTP
+    "ntp_mode",
+    "ntp_interval",
+    "ntp_reference_id",
+    "ntp_stratum",
+    # Layer 7: DHCP
+    "dhcp_fingerprint",
+    "dhcp_vendor",
+    "dhcp_hostname",
+    "dhcp_opts",
+    # Layer 7: mDNS
+    "mdns_packet_type",
+    "mdns_hostname",
+    "mdns_services",
+    # Layer 7: UPnP message, SSDP Protocol
+    "upnp_packet_type",  # 1: HTTP Request, 2: HTTP Response
+    "upnp_location",
+    "upnp_cache",
+    "upnp_uns",
+    "upnp_nt",
+    "upnp_nts",
+    "upnp_host",
+    "upnp_st",
+    "upnp_man",
+    "upnp_mx",
+    "upnp_version",
+    "upnp_os_name",
+    "upnp_os_version",
+    "upnp_product_name",
+    "upnp_product_version"
+)
+PACKET_DATA_FIELD_SET = frozenset(PACKET_DATA_FIELDS)
+# Get tuple of values of all packet data fields, in order of PACKET_DATA_FIELDS, from a packet data object
+get_packet_data_values = attrgetter(*PACKET_DATA_FIELDS)  # pylint: disable=invalid-name
+
+
+def get_field_values_getter(fields: Sequence[str]) -> Callable[[Any], tuple]:
+    """Get function which returns tuple of values of the given fields from a packet data object."""
+    if tuple(fields) == PACKET_DATA_FIELDS:
+        return get_packet_data_values
+
+    if len(fields) == 1:
+        field = fields[0]
+        return lambda packet_data: (getattr(packet_data, field),)
+
+    return attrgetter(*fields)
+
+
+def format_csv_row(values: tuple, delimiter: str = ',') -> str:
+    """Format values as a csv row. None and False values are written as empty strings, and `str()` is only called for
+    non-empty values which are not already strings."""
+    return delimiter.join([
+        '' if value is None or value is False else value if value.__class__ is str else str(value)
+        for value in values
+    ])
+
 
 class PacketData(Model):
     timestamp: float = 0
@@ -11,6 +152,8 @@ class PacketData(Model):
     # Layer 2: Data link layer
     src_mac: Optional[str]
     dst_mac: Optional[str]
+    src_mac_vendor: Optional[str]
+    dst_mac_vendor: Optional[str]
     eth_type: Optional[str]
     eth_payload_size: Optional[int]  # Bytes
     # Layer 3: Network layer
@@ -132,125 +275,7 @@ class PacketData(Model):
 
     def to_csv_string(self, delimiter=','):
         """The sequence should be similar to packet_data_file_headers"""
-        values = []
-        for attr in [
-                self.timestamp,
-                self.ref_time,
-                self.size,
-                self.outgoing,
-                # Layer 2: Data link layer
-                self.src_mac,
-                self.dst_mac,
-                self.eth_type,
-                self.eth_payload_size,
-                # Layer 3: Network layer
-                self.src_ip,
-                self.dst_ip,
-                self.ip_tos,
-                self.ip_ttl,
-                self.ip_opts,
-                self.ip_proto,
-                self.ip_payload_size,
-                self.ip6_nxt_hdr,
-                self.ip_do_not_fragment,
-                self.ip_more_fragment,
-                # Layer 3: IEEE-8-1211.Auth
-                self.ieee80211_version,
-                self.ieee80211_payload_size,
-                # Layer 4: ICMP packets
-                self.icmp_type,
-                self.icmp_code,
-                self.icmp_message,
-                # Layer 4: IGMP Packets
-                self.igmp_type,
-                self.igmp_addr,
-                # Layer 4: Transport layer
-                self.src_port,
-                self.dst_port,
-                self.layer4_payload_size,
-                # Layer 4: TCP flags
-                self.tcp_fin_flag,
-                self.tcp_syn_flag,
-                self.tcp_rst_flag,
-                self.tcp_psh_flag,
-                self.tcp_ack_flag,
-                self.tcp_urg_flag,
-                self.tcp_ece_flag,
-                self.tcp_cwr_flag,
-                # TCP Syn packet data
-                self.syn_signature,
-                self.client_os,
-                # Layer 4: NAT-PMP data
-                self.natpmp_version,
-                self.natpmp_opcode,
-                self.natpmp_reserved,
-                self.natpmp_result,
-                self.natpmp_sssoe,
-                self.natpmp_lifetime,
-                self.natpmp_external_ip,
-                self.natpmp_internal_port,
-                self.natpmp_external_port,
-                # Layer 7: Application layer
-                self.layer7_proto,
-                self.payload_size,
-                # Layer 7: DNS queries
-                self.dns_type,
-                self.dns_rcode,
-                self.dns_op,
-                self.dns_query_domain,
-                self.dns_query_type,
-                self.dns_query_cls,
-                self.dns_query_multiple_domains,
-                # Layer 7: DNS answers
-                self.dns_ans_type,
-                self.dns_ans_cname,
-                self.dns_ans_cname_ttl,
-                self.dns_ans_name,
-                self.dns_ans_ip,
-                self.dns_ans_ttl,
-                # Layer 7: ARP data
-                self.arp_request_src,
-                self.arp_src_mac,
-                self.arp_src_ip,
-                self.arp_dst_mac,
-                self.arp_dst_ip,
-                # Layer 7: NTP
-                self.ntp_mode,
-                self.ntp_interval,
-                self.ntp_reference_id,
-                self.ntp_stratum,
-                # Layer 7: DHCP
-                self.dhcp_fingerprint,
-                self.dhcp_vendor,
-                self.dhcp_hostname,
-                self.dhcp_opts,
-                # Layer 7: mDNS
-                self.mdns_packet_type,
-                self.mdns_hostname,
-                self.mdns_services,
-                # Layer 7: UPnP message, SSDP Protocol
-                self.upnp_packet_type,
-                self.upnp_location,
-                self.upnp_cache,
-                self.upnp_uns,
-                self.upnp_nt,
-                self.upnp_nts,
-                self.upnp_host,
-                self.upnp_st,
-                self.upnp_man,
-                self.upnp_mx,
-                self.upnp_version,
-                self.upnp_os_name,
-                self.upnp_os_version,
-                self.upnp_product_name,
-                self.upnp_product_version
-        ]:
-            if attr is not None and attr is not False:
-                values.append(str(attr))
-            else:
-                values.append('')
-
-        return delimiter.join(values)
+        return format_csv_row(get_packet_data_values(self), delimiter)
 
     def to_numeric(self):
         """ Convert all string fields in packet data to string format
@@ -264,115 +289,4 @@ class PacketData(Model):
     @staticmethod
     def packet_data_file_headers(delimiter: str = ','):
         """The sequence of headers should be same as sequence of items in to_csv_string()"""
-        return delimiter.join([str(attr) for attr in [
-            "timestamp",
-            "ref_time",
-            "size",
-            "outgoing",
-            # Layer 2: Data link layer
-            "src_mac",
-            "dst_mac",
-            "eth_type",
-            "eth_payload_size",
-            # Layer 3: Network layer
-            "src_ip",
-            "dst_ip",
-            "ip_tos",
-            "ip_ttl",
-            "ip_opts",
-            "ip_proto",
-            "ip_payload_size",
-            "ip6_nxt_hdr",
-            "ip_do_not_fragment",
-            "ip_more_fragment",
-            # Layer 3: IEEE-80211.Auth
-            "ieee80211_version",
-            "ieee80211_payload_size",
-            # Layer 4: ICMP packets
-            "icmp_type",
-            "icmp_code",
-            "icmp_message",
-            # Layer 4: IGMP Packets
-            "igmp_type",
-            "igmp_addr",
-            # Layer 4: Transport layer
-            "src_port",
-            "dst_port",
-            "layer4_payload_size",
-            # Layer 4: TCP flags
-            "tcp_fin_flag",
-            "tcp_syn_flag",
-            "tcp_rst_flag",
-            "tcp_psh_flag",
-            "tcp_ack_flag",
-            "tcp_urg_flag",
-            "tcp_ece_flag",
-            "tcp_cwr_flag",
-            # TCP Syn packet data
-            "syn_signature",
-            "client_os",
-            # Layer 4: NAT-PMP data
-            "natpmp_version",
-            "natpmp_opcode",
-            "natpmp_reserved",
-            "natpmp_result",
-            "natpmp_sssoe",
-            "natpmp_lifetime",
-            "natpmp_external_ip",
-            "natpmp_internal_port",
-            "natpmp_external_port",
-            # Layer 7: Application layer
-            "layer7_proto",
-            "payload_size",
-            # Layer 7: DNS queries
-            "dns_type",
-            "dns_rcode",
-            "dns_op",
-            "dns_query_domain",
-            "dns_query_type",
-            "dns_query_cls",
-            "dns_query_multiple_domains",
-            # Layer 7: DNS answers
-            "dns_ans_type",
-            "dns_ans_cname",
-            "dns_ans_cname_ttl",
-            "dns_ans_name",
-            "dns_ans_ip",
-            "dns_ans_ttl",
-            # Layer 7: ARP data
-            "arp_request_src",
-            "arp_src_mac",
-            "arp_src_ip",
-            "arp_dst_mac",
-            "arp_dst_ip",
-            # Layer 7: NTP
-            "ntp_mode",
-            "ntp_interval",
-            "ntp_reference_id",
-            "ntp_stratum",
-            # Layer 7: DHCP
-            "dhcp_fingerprint",
-            "dhcp_vendor",
-            "dhcp_hostname",
-            "dhcp_opts",
-            # Layer 7: mDNS
-            "mdns_packet_type",
-            "mdns_hostname",
-            "mdns_services",
-            # Layer 7: UPnP message, SSDP Protocol
-            "upnp_packet_type",  # 1: HTTP Request, 2: HTTP Response
-            "upnp_location",
-            "upnp_cache",
-            "upnp_uns",
-            "upnp_nt",
-            "upnp_nts",
-            "upnp_host",
-            "upnp_st",
-            "upnp_man",
-            "upnp_mx",
-            "upnp_version",
-            "upnp_os_name",
-            "upnp_os_version",
-            "upnp_product_name",
-            "upnp_product_version"
-        ]])
+        return delimiter.join(PACKET_DATA_FIELDS)
@@ -0,0 +1,82 @@
+from typing import FrozenSet, Iterable, Optional, Sequence, Tuple
+
+from core.errors.generic_errors import GenericError
+from core.models.packet_data import PACKET_DATA_FIELDS, PACKET_DATA_FIELD_SET
+
+# Steps of processing a packet, each of which extracts data from a layer of the packet
+ETHERNET_LAYER = 'ethernet'
+NETWORK_LAYER = 'network'               # IPv4, IPv6, ARP, LLC, IEEE 802.11
+TRANSPORT_LAYER = 'transport'           # TCP, UDP, ICMP, IGMP
+SYN_FINGERPRINT = 'syn_fingerprint'     # TCP SYN signature and OS of client
+APPLICATION_LAYER = 'application'       # NAT-PMP, DNS, NTP, UPnP, mDNS, DHCP
+PACKET_LAYERS = (ETHERNET_LAYER, NETWORK_LAYER, TRANSPORT_LAYER, SYN_FINGERPRINT, APPLICATION_LAYER)
+
+# Fields which are known without decoding a packet
+PACKET_METADATA_FIELDS = ('timestamp', 'ref_time', 'size')
+PACKET_LAYER_FIELDS = {
+    ETHERNET_LAYER: ('src_mac', 'dst_mac', 'src_mac_vendor', 'dst_mac_vendor', 'eth_type', 'eth_payload_size'),
+    NETWORK_LAYER: (
+        'src_ip', 'dst_ip', 'ip_tos', 'ip_ttl', 'ip_opts', 'ip_proto', 'ip_payload_size', 'ip6_nxt_hdr',
+        'ip_do_not_fragment', 'ip_more_fragment', 'ieee80211_version', 'ieee80211_payload_size',
+        'arp_request_src', 'arp_src_mac', 'arp_src_ip', 'arp_dst_mac', 'arp_dst_ip',
+    ),
+    TRANSPORT_LAYER: (
+        'outgoing', 'icmp_type', 'icmp_code', 'icmp_message', 'igmp_type', 'igmp_addr', 'src_port', 'dst_port',
+        'layer4_payload_size', 'tcp_fin_flag', 'tcp_syn_flag', 'tcp_rst_flag', 'tcp_psh_flag', 'tcp_ack_flag',
+        'tcp_urg_flag', 'tcp_ece_flag', 'tcp_cwr_flag', 'layer7_proto',
+    ),
+    SYN_FINGERPRINT: ('syn_signature', 'client_os'),
+}
+# All other fields are extracted from application layer
+PACKET_LAYER_FIELDS[APPLICATION_LAYER] = tuple(
+    field for field in PACKET_DATA_FIELDS
+    if field not in PACKET_METADATA_FIELDS and all(field not in fields for fields in PACKET_LAYER_FIELDS.values())
+)
+# Data of these layers is needed for processing a layer, e.g. TCP flags identify SYN packets, and ports identify
+# application layer protocol
+PACKET_LAYER_DEPENDENCIES = {
+    SYN_FINGERPRINT: (TRANSPORT_LAYER,),
+    APPLICATION_LAYER: (TRANSPORT_LAYER,),
+}
+
+
+def get_result_fields(fields: Optional[Sequence[str]] = None) -> Tuple[str, ...]:
+    """Get fields written to result files, in order of writing.
+
+    Parameters
+    ----------
+    fields: Optional[Sequence[str]]
+        Names of packet data fields, e.g. `ResultFields` in configuration. Default: all packet data fields
+
+    Returns
+    -------
+    fields: Tuple[str, ...]
+        Names of result fields
+
+    Raises
+    ------
+    GenericError: Exception
+        If a field is not a packet data field, or a field is given more than once
+    """
+    if not fields:
+        return PACKET_DATA_FIELDS
+
+    unknown_fields = [field for field in fields if field not in PACKET_DATA_FIELD_SET]
+    if unknown_fields:
+        raise GenericError('Unknown result fields: {}'.format(', '.join(unknown_fields)))
+
+    if len(set(fields)) != len(fields):
+        raise GenericError('Result fields must not contain duplicates')
+
+    return tuple(fields)
+
+
+def get_required_layers(fields: Iterable[str]) -> FrozenSet[str]:
+    """Get processing steps (see `PACKET_LAYERS`) which are needed for extracting the given packet data fields. Other
+    steps can be skipped."""
+    fields = set(fields)
+    layers = {layer for layer, layer_fields in PACKET_LAYER_FIELDS.items() if not fields.isdisjoint(layer_fields)}
+    for layer in list(layers):
+        layers.update(PACKET_LAYER_DEPENDENCIES.get(layer, ()))
+
+    return frozenset(layers)
@@ -0,0 +1,57 @@
+from typing import Union
+
+from core.models.packet_data import PACKET_DATA_FIELDS, PacketData, format_csv_row, get_packet_data_values
+
+# Fields which are set to 0 (instead of None) for a new record, same as defaults in PacketData
+PACKET_RECORD_ZERO_FIELDS = ('timestamp', 'ref_time', 'size')
+
+
+class PacketRecord:
+    """Lightweight record of data extracted from a single packet, used in the packet processing hot path instead of
+    `PacketData`.
+
+    The record has the same fields as `PacketData`, but stores them in `__slots__` and does not validate values. Use
+    `to_packet_data` to get a validated `PacketData` object.
+    """
+    __slots__ = PACKET_DATA_FIELDS
+
+    def __init__(self, **kwargs):
+        for field in PACKET_DATA_FIELDS:
+            setattr(self, field, None)
+        for field in PACKET_RECORD_ZERO_FIELDS:
+            setattr(self, field, 0)
+        for field, value in kwargs.items():
+            setattr(self, field, value)
+
+    is_valid_value = staticmethod(PacketData.is_valid_value)
+    packet_data_file_headers = staticmethod(PacketData.packet_data_file_headers)
+
+    def to_csv_string(self, delimiter: str = ',') -> str:
+        """The sequence is same as `packet_data_file_headers`"""
+        return format_csv_row(get_packet_data_values(self), delimiter)
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in PACKET_DATA_FIELDS}
+
+    def to_packet_data(self, validate: bool = True) -> PacketData:
+        """Convert record to `PacketData` object.
+
+        Parameters
+        ----------
+        validate: bool, optional
+            If True, values are validated (and coerced) by pydantic. Otherwise, PacketData object is constructed
+            without validation. Default: True
+
+        Returns
+        -------
+        packet_data: PacketData
+            Packet data object with values of this record
+        """
+        if validate:
+            return PacketData(**self.to_dict())
+
+        return PacketData.construct(**self.to_dict())
+
+    @classmethod
+    def from_packet_data(cls, packet_data: Union[PacketData, 'PacketRecord']) -> 'PacketRecord':
+        return cls(**{field: getattr(packet_data, field) for field in PACKET_DATA_FIELDS})
@@ -0,0 +1,106 @@
+from typing import Dict, Optional, Sequence
+
+from core.models.packet_data import PACKET_DATA_FIELDS
+
+# Kinds of values stored in packet data fields. Kinds are based on values which packet parsers actually extract, e.g.
+# `ip_proto` is a protocol name (or number, if `use_numeric_values` is set), so it is stored as text.
+FLOAT_FIELD = 'float'
+INT_FIELD = 'int'
+FLAG_FIELD = 'flag'
+TEXT_FIELD = 'text'
+
+PACKET_DATA_FLOAT_FIELDS = ('timestamp', 'ref_time', 'size')
+PACKET_DATA_INT_FIELDS = (
+    'eth_payload_size',
+    'ip_tos',
+    'ip_ttl',
+    'ip_payload_size',
+    'ieee80211_version',
+    'ieee80211_payload_size',
+    'icmp_type',
+    'icmp_code',
+    'igmp_type',
+    'src_port',
+    'dst_port',
+    'layer4_payload_size',
+    'natpmp_version',
+    'natpmp_opcode',
+    'natpmp_reserved',
+    'natpmp_result',
+    'natpmp_sssoe',
+    'natpmp_lifetime',
+    'natpmp_internal_port',
+    'natpmp_external_port',
+    'payload_size',
+    'dns_type',
+    'dns_rcode',
+    'dns_op',
+    'dns_ans_type',
+    'dns_ans_cname_ttl',
+    'dns_ans_ttl',
+    'arp_request_src',
+    'ntp_mode',
+    'ntp_interval',
+    'ntp_stratum',
+    'mdns_packet_type',
+    'upnp_packet_type',
+)
+PACKET_DATA_FLAG_FIELDS = (
+    'outgoing',
+    'ip_do_not_fragment',
+    'ip_more_fragment',
+    'tcp_fin_flag',
+    'tcp_syn_flag',
+    'tcp_rst_flag',
+    'tcp_psh_flag',
+    'tcp_ack_flag',
+    'tcp_urg_flag',
+    'tcp_ece_flag',
+    'tcp_cwr_flag',
+    'dns_query_multiple_domains',
+)
+
+
+def get_field_kind(field: str) -> str:
+    """Get kind of values stored in a packet data field. Fields which are not numeric or flags (e.g. addresses which
+    are integers only if `use_numeric_values` is set, and may not fit in 64 bits for IPv6) are stored as text."""
+    if field in PACKET_DATA_FLOAT_FIELDS:
+        return FLOAT_FIELD
+
+    if field in PACKET_DATA_INT_FIELDS:
+        return INT_FIELD
+
+    if field in PACKET_DATA_FLAG_FIELDS:
+        return FLAG_FIELD
+
+    return TEXT_FIELD
+
+
+# Packet data field name to kind of value, in order of fields in result files
+PACKET_DATA_SCHEMA = {field: get_field_kind(field) for field in PACKET_DATA_FIELDS}
+
+# pandas dtype for each kind of values, used for loading result files. Nullable integer and boolean dtypes keep missing
+# values without converting columns to float or object. Text values (addresses, protocol names) repeat a few distinct
+# values in many rows, so these are loaded as categoricals.
+PANDAS_DTYPES = {
+    FLOAT_FIELD: 'float64',
+    INT_FIELD: 'Int64',
+    FLAG_FIELD: 'boolean',      # Flags are written as True (or 1 and 0, if `use_numeric_values` is set)
+    TEXT_FIELD: 'category',
+}
+
+
+def get_pandas_dtypes(fields: Optional[Sequence[str]] = None) -> Dict[str, str]:
+    """Get pandas dtype of each packet data field, e.g. for `dtypes` of `load_csv_to_dataframe`.
+
+    Parameters
+    ----------
+    fields: Optional[Sequence[str]]
+        Names of packet data fields. Default: all packet data fields
+
+    Returns
+    -------
+    dtypes: Dict[str, str]
+        pandas dtype of each field
+    """
+    return {field: PANDAS_DTYPES[PACKET_DATA_SCHEMA[field]] for field in (fields or PACKET_DATA_FIELDS)}
@@ -1,26 +1,34 @@
 import logging
-from typing import Tuple, Union
+from functools import lru_cache
+from typing import Optional, Tuple, Union
 
 from dpkt.ethernet import Ethernet
 from munch import Munch
 
 from core.configuration.data import ConfigurationData
-from core.lib.converters import hex_to_integer
 from core.packet_parsers.base import PacketParserInterface
 from core.lib.mac_utils import MacAddressUtils
 from core.static.utils import StaticData
 
+MAC_VENDOR_CACHE_SIZE = 4096        # Vendors of MAC addresses kept in memory
+
 
 class EthernetFrameParser(PacketParserInterface):
     def __init__(self, config: ConfigurationData, static_data: StaticData = None):
         self.config = config
         self.mac_utils = MacAddressUtils()
         self.static_data = static_data or StaticData()
+        self.ether_type_names = self.static_data.get_ether_type_names()
+        self.oui_index = self.static_data.get_oui_index()
+        # Captures usually contain a few MAC addresses, so each of these is looked up once
+        self.get_cached_mac_vendor = lru_cache(maxsize=MAC_VENDOR_CACHE_SIZE)(self.oui_index.get_vendor)
 
     def extract_data(self, packet: Ethernet) -> Munch:
         data = Munch()
         try:
             data.src_mac, data.dst_mac = self.extract_src_dest_mac_from_eth_frame(eth_frame=packet)
+            data.src_mac_vendor = self.get_mac_vendor(packet.src)
+            data.dst_mac_vendor = self.get_mac_vendor(packet.dst)
             data.eth_type = self.get_eth_type_name(packet)
             data.eth_payload_size = len(packet.data)
 
@@ -31,21 +39,23 @@ class EthernetFrameParser(PacketParserInterface):
         return data
 
     def get_eth_type_name(self, eth_frame: Ethernet) -> Union[int, str]:
-        eth_type = str(hex(eth_frame.type)[2:])
-        if self.config.use_numeric_values is True:
-            return hex_to_integer(eth_type)
+        return self.get_ether_type_name(eth_frame.type)
 
-        eth_type_str = self.static_data.ether_types_data.get(eth_type, {}).get('protocol_abbrv', '').lower()
-        if not eth_type_str:
-            eth_type_str = eth_type
+    def get_ether_type_name(self, ether_type: int) -> Union[int, str]:
+        if self.config.use_numeric_values is True:
+            return ether_type
 
-        return eth_type_str
+        return self.ether_type_names[ether_type]
 
     def extract_src_dest_mac_from_eth_frame(self, eth_frame: Ethernet) -> Tuple:
-        src_mac = self.mac_utils.convert_hexadecimal_mac_to_readable_mac(eth_frame.src)
-        dst_mac = self.mac_utils.convert_hexadecimal_mac_to_readable_mac(eth_frame.dst)
+        return self.get_mac_address(eth_frame.src), self.get_mac_address(eth_frame.dst)
+
+    def get_mac_vendor(self, mac_address: bytes) -> Optional[str]:
+        """Get short name of manufacturer of MAC address, None if it is not known. See `OuiIndex`."""
+        return self.get_cached_mac_vendor(bytes(mac_address))
 
+    def get_mac_address(self, mac_address: bytes) -> Optional[Union[int, str]]:
         if self.config.use_numeric_values is True:
-            return self.mac_utils.mac_to_int(src_mac), self.mac_utils.mac_to_int(dst_mac)
+            return self.mac_utils.mac_bytes_to_int(mac_address)
 
-        return src_mac, dst_mac
+        return self.mac_utils.convert_hexadecimal_mac_to_readable_mac(mac_address)
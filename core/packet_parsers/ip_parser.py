@@ -1,5 +1,5 @@
 import logging
-from typing import Tuple, Union
+from typing import Optional, Tuple, Union
 
 import binascii
 import dpkt
@@ -19,6 +19,7 @@ class IpPacketParser(PacketParserInterface):
         self.config = config
         self.ip_utils = IpAddrUtils()
         self.static_data = static_data or StaticData()
+        self.ip_protocol_names = self.static_data.get_ip_protocol_names()
 
     @staticmethod
     def load_ip_packet_from_ethernet_frame(packet_data: bytes) -> Union[IP, IP6]:
@@ -60,13 +61,14 @@ class IpPacketParser(PacketParserInterface):
 
     # pylint: disable=duplicate-code
     def extract_src_dest_ip(self, ip_packet: IP) -> Tuple:
-        src_ip = self.ip_utils.inet_to_str(ip_packet.src)
-        dst_ip = self.ip_utils.inet_to_str(ip_packet.dst)
+        return self.get_ip_address(ip_packet.src), self.get_ip_address(ip_packet.dst)
 
+    def get_ip_address(self, inet: bytes) -> Optional[Union[int, str]]:
+        """Get IPv4 or IPv6 address from its packed form, as string, or as integer if `use_numeric_values` is set."""
         if self.config.use_numeric_values is True:
-            return self.ip_utils.ip_to_int(src_ip), self.ip_utils.ip_to_int(dst_ip)
+            return self.ip_utils.inet_to_int(inet)
 
-        return src_ip, dst_ip
+        return self.ip_utils.inet_to_str(inet)
 
     def parse_ip_options(self, ip_options: bytes) -> Union[int, str]:
         # Split 4 bytes \x94\x04\x00\x00 to single bytes [94, 04, 00, 00]
@@ -87,13 +89,7 @@ class IpPacketParser(PacketParserInterface):
         if self.config.use_numeric_values is True:
             return proto_num
 
-        try:
-            proto_key = str(proto_num)
-        except ValueError:
-            return proto_num
-
-        proto_name = ''
-        if proto_key in self.static_data.ip_protocol_data:
-            proto_name = self.static_data.ip_protocol_data.get(proto_key, {}).get('keyword', '')
+        if 0 <= proto_num < len(self.ip_protocol_names):
+            return self.ip_protocol_names[proto_num]
 
-        return proto_name or proto_key
+        return str(proto_num)
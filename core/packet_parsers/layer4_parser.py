@@ -17,6 +17,10 @@ class Layer4PacketParser(PacketParserInterface):
     def __init__(self, *args, config: ConfigurationData, static_data: StaticData = None, **kwargs):
         self.config = config
         self.static_data = static_data or StaticData()
+        self.layer4_port_names = {
+            protocol_type: self.static_data.get_layer4_port_names(protocol_type, config.FieldDelimiter)
+            for protocol_type in LAYER4_PROTOCOLS
+        }
 
     def extract_data(self, packet) -> Munch:
         raise NotImplementedError
@@ -39,9 +43,12 @@ class Layer4PacketParser(PacketParserInterface):
         return data
 
     def is_packet_outgoing(self, packet: Union[UDP, TCP]) -> Union[int, bool]:
+        return self.is_outgoing_port(packet.sport)
+
+    def is_outgoing_port(self, src_port: int) -> Union[int, bool]:
         # FIXME: This can be improved?
         outgoing = False
-        if 10000 <= packet.sport < 65536:     # Lower limit from static/layer4_port_data.json
+        if 10000 <= src_port < 65536:     # Lower limit from static/layer4_port_data.json
             outgoing = True
 
         if self.config.use_numeric_values is True:
@@ -60,15 +67,23 @@ class Layer4PacketParser(PacketParserInterface):
         If `use_numeric_values` configuration option is enabled, this function returns port number, otherwise it
         returns protocol name or protocol abbreviation, for example, HTTPS.
         """
-        layer7_port = None
         if packet is None:
-            return layer7_port
+            return None
 
-        if self.is_packet_outgoing(packet):
-            layer7_port = packet.dport
+        return self.get_layer7_protocol_from_ports(
+            protocol_type=protocol_type, src_port=packet.sport, dst_port=packet.dport
+        )
 
-        else:
-            layer7_port = packet.sport
+    def get_layer7_protocol_from_ports(
+            self,
+            protocol_type: str,
+            src_port: int,
+            dst_port: int
+    ) -> Optional[Union[int, str]]:
+        """Identify the layer7 protocol from source and destination port numbers, see `get_layer7_protocol`."""
+        layer7_port = src_port
+        if self.is_outgoing_port(src_port):
+            layer7_port = dst_port
 
         if self.config.use_numeric_values is True:
             return layer7_port
@@ -79,48 +94,17 @@ class Layer4PacketParser(PacketParserInterface):
 
     def get_protocol_info_from_port(self, port_number: int, protocol_type: str) -> Optional[str]:
         # FIXME: Check if we need to find protocol abbrv for source port as well
-        port_number = str(port_number)
-        protocol_data = self.static_data.layer4_ports_data.get(port_number)
-        if protocol_data is None:
-            return None
+        port_names = self.layer4_port_names.get(protocol_type)
+        if port_names is None:
+            port_names = self.static_data.get_layer4_port_names(protocol_type, self.config.FieldDelimiter)
 
-        protocol_abbrv, protocol_desc = self.get_protocol_info_from_protocol_data(protocol_data, protocol_type)
-        return protocol_abbrv or protocol_desc
+        return port_names[port_number]
 
     def get_protocol_info_from_protocol_data(self, data: dict, protocol_type: str) -> Tuple:
-        protocol_abbrv = []
-        protocol_description = []
-
-        if isinstance(data, list):
-            for item in data:
-                _abbrv, _desc = self.extract_protocol_info_from_protocol_data(item, protocol_type)
-                if _abbrv is not None:
-                    protocol_abbrv.append(_abbrv)
-                if _desc is not None:
-                    protocol_description.append(_desc)
-
-        elif isinstance(data, dict):
-            _abbrv, _desc = self.extract_protocol_info_from_protocol_data(data, protocol_type)
-            protocol_abbrv.append(_abbrv)
-            protocol_description.append(_desc)
-
-        else:
-            # Unexpected (invalid) data type
-            return None, None
-
-        return self.config.FieldDelimiter.join([abbrv for abbrv in protocol_abbrv if abbrv]), \
-            self.config.FieldDelimiter.join([desc for desc in protocol_description if desc])
+        return self.static_data.get_port_protocol_info(data, protocol_type, self.config.FieldDelimiter)
 
     def extract_protocol_info_from_protocol_data(self, data: dict, protocol_type: str) -> Tuple:
-        protocol_abbrv = ''
-        protocol_description = ''
-
-        if protocol_type in LAYER4_PROTOCOLS and data[protocol_type] is True:
-            protocol_abbrv = data.get('abbrv')
-            protocol_description = data.get('description')
-
-        return protocol_abbrv.replace(',', self.config.FieldDelimiter),\
-            protocol_description.replace(',', self.config.FieldDelimiter)
+        return self.static_data.get_protocol_info(data, protocol_type, self.config.FieldDelimiter)
 
 
 class TcpPacketParser(Layer4PacketParser):
@@ -135,16 +119,19 @@ class TcpPacketParser(Layer4PacketParser):
         return tcp_packet_data
 
     def extract_flags(self, packet: TCP) -> Munch:
+        return self.get_flags(packet.flags)
+
+    def get_flags(self, tcp_flags: int) -> Munch:
         flags = Munch()
 
-        flags.tcp_fin_flag = (packet.flags & dpkt.tcp.TH_FIN) != 0
-        flags.tcp_syn_flag = (packet.flags & dpkt.tcp.TH_SYN) != 0
-        flags.tcp_rst_flag = (packet.flags & dpkt.tcp.TH_RST) != 0
-        flags.tcp_psh_flag = (packet.flags & dpkt.tcp.TH_PUSH) != 0
-        flags.tcp_ack_flag = (packet.flags & dpkt.tcp.TH_ACK) != 0
-        flags.tcp_urg_flag = (packet.flags & dpkt.tcp.TH_URG) != 0
-        flags.tcp_ece_flag = (packet.flags & dpkt.tcp.TH_ECE) != 0
-        flags.tcp_cwr_flag = (packet.flags & dpkt.tcp.TH_CWR) != 0
+        flags.tcp_fin_flag = (tcp_flags & dpkt.tcp.TH_FIN) != 0
+        flags.tcp_syn_flag = (tcp_flags & dpkt.tcp.TH_SYN) != 0
+        flags.tcp_rst_flag = (tcp_flags & dpkt.tcp.TH_RST) != 0
+        flags.tcp_psh_flag = (tcp_flags & dpkt.tcp.TH_PUSH) != 0
+        flags.tcp_ack_flag = (tcp_flags & dpkt.tcp.TH_ACK) != 0
+        flags.tcp_urg_flag = (tcp_flags & dpkt.tcp.TH_URG) != 0
+        flags.tcp_ece_flag = (tcp_flags & dpkt.tcp.TH_ECE) != 0
+        flags.tcp_cwr_flag = (tcp_flags & dpkt.tcp.TH_CWR) != 0
 
         if self.config.use_numeric_values:
             for k, v in flags.items():
@@ -1,3 +1,4 @@
+from dpkt.udp import UDP
 from munch import Munch
 
 from core.configuration.data import ConfigurationData
@@ -11,6 +12,10 @@ class NatpmpPacketParser(PacketParserInterface):
         self.config = config
         self.ip_addr_utils = IpAddrUtils()
 
+    @staticmethod
+    def load_natpmp_packet_from_udp_packet(udp_packet: UDP) -> Natpmp:
+        return Natpmp(buf=udp_packet.data)
+
     def extract_data(self, packet: Natpmp) -> Munch:
         data = Munch()
 
@@ -0,0 +1,56 @@
+from typing import Dict, Type
+
+from core.configuration.data import ConfigurationData
+from core.packet_parsers.base import PacketParserInterface
+from core.packet_parsers.ethernet_parser import EthernetFrameParser
+from core.packet_parsers.ip_parser import IpPacketParser
+from core.packet_parsers.layer4_parser import TcpPacketParser, UDPPacketParser
+from core.static.utils import StaticData
+
+# Parsers which use static data (protocol, port and manufacturer mappings). These are given the static data owned by
+# the registry, otherwise they load static data from files on creation.
+PARSERS_USING_STATIC_DATA = (EthernetFrameParser, IpPacketParser, TcpPacketParser, UDPPacketParser)
+
+
+class PacketParserRegistry:
+    def __init__(self, config: ConfigurationData, static_data: StaticData = None) -> None:
+        """Registry of packet parsers, which creates each parser once, on first use, and reuses it for all later
+        packets. Parsers do not keep any per-packet state, so a single instance can be shared for the lifetime of a
+        processor.
+
+        Parameters
+        ----------
+        config: ConfigurationData
+            Application configuration data, passed to each parser
+        static_data: StaticData
+            Static data shared by parsers which need protocol, port and manufacturer mappings.
+        """
+        self.config = config
+        self.static_data = static_data or StaticData()
+        self._parsers = {}    # type: Dict[Type, PacketParserInterface]
+
+    def get_parser(self, parser_class: Type) -> PacketParserInterface:
+        """Get parser instance of the given class, creating it if it is not yet created.
+
+        Parameters
+        ----------
+        parser_class: Type
+            Class of required packet parser, e.g. `TcpPacketParser`
+
+        Returns
+        -------
+        parser: PacketParserInterface
+            Parser instance owned by the registry
+        """
+        parser = self._parsers.get(parser_class)
+        if parser is None:
+            parser = self.create_parser(parser_class)
+            self._parsers[parser_class] = parser
+
+        return parser
+
+    def create_parser(self, parser_class: Type) -> PacketParserInterface:
+        if issubclass(parser_class, PARSERS_USING_STATIC_DATA):
+            return parser_class(config=self.config, static_data=self.static_data)
+
+        return parser_class(config=self.config)
@@ -1,4 +1,5 @@
 import logging
+import os
 import re
 import subprocess
 from tempfile import NamedTemporaryFile
@@ -8,12 +9,60 @@ from dpkt.ip import IP
 from munch import Munch
 
 from core.configuration.data import ConfigurationData
+from core.errors.generic_errors import GenericError
+from core.lib.file_utils import remove_file
+from core.lib.p0f_process import P0fProcess
+from core.lib.syn_fingerprint import P0fFingerprintDatabase, TcpSynSignature, build_tcp_syn_signature, \
+    load_p0f_fingerprint_database
 from core.packet_parsers.base import PacketParserInterface
+from core.static.constants import P0F_FINGERPRINT_FILE_PATH
+
+SYN_FINGERPRINT_BACKENDS = ('native', 'p0f')
 
 
 class SynPacketParser(PacketParserInterface):
     def __init__(self, config: ConfigurationData):
         self.config = config
+        if config.syn_fingerprint_backend not in SYN_FINGERPRINT_BACKENDS:
+            raise GenericError('Unsupported SYN fingerprint backend `{}`. Supported backends: {}'.format(
+                config.syn_fingerprint_backend, ', '.join(SYN_FINGERPRINT_BACKENDS)))
+
+        self.use_p0f = config.syn_fingerprint_backend == 'p0f'
+        self.raw_signatures = dict()
+        self._fingerprint_database = None
+        self.p0f_process = None
+
+    @property
+    def fingerprint_database(self) -> P0fFingerprintDatabase:
+        # Database is loaded when first SYN packet is parsed
+        if self._fingerprint_database is None:
+            self._fingerprint_database = load_p0f_fingerprint_database(self.get_fingerprint_file_path())
+
+        return self._fingerprint_database
+
+    def get_fingerprint_file_path(self) -> str:
+        if self.config.p0f_fingerprint_file:
+            return self.config.p0f_fingerprint_file
+
+        # Use the same fingerprints as p0f executable
+        if self.config.p0f_wd and os.path.isfile(os.path.join(self.config.p0f_wd, 'p0f.fp')):
+            return os.path.join(self.config.p0f_wd, 'p0f.fp')
+
+        return P0F_FINGERPRINT_FILE_PATH
+
+    def start_p0f_process(self) -> P0fProcess:
+        """Use a single long-lived p0f process for all SYN packets, instead of running p0f for each packet. Data
+        extracted from a packet then contains a pending `P0fResult` as `syn_signature`, which is joined to the packet
+        data by `P0fResultWriter` when p0f has processed the packet."""
+        if self.p0f_process is None:
+            self.p0f_process = P0fProcess(
+                p0f_executable=self.config.p0f_executable,
+                p0f_wd=self.config.p0f_wd,
+                parse_output=self.extract_data_from_p0f_output,
+                batch_size=self.config.p0f_batch_size
+            )
+
+        return self.p0f_process
 
     def write_ip_to_pcap(self, pcapfile, ip):
         """Write the given IP packet into a PCAP file."""
@@ -21,7 +70,7 @@ class SynPacketParser(PacketParserInterface):
         eth = dpkt.ethernet.Ethernet(
             dst=b"\x08\x00\x27\x70\xe3\xf0",
             src=b"\x08\x00\x27\x70\xa3\xf0",
-            type=dpkt.ethernet.ETH_TYPE_IP,
+            type=dpkt.ethernet.ETH_TYPE_IP6 if isinstance(ip, dpkt.ip6.IP6) else dpkt.ethernet.ETH_TYPE_IP,
         )
         eth.data = ip
 
@@ -33,8 +82,10 @@ class SynPacketParser(PacketParserInterface):
 
     def extract_signature_from_syn_using_p0f(self, p0f_executable, p0f_wd, ip_packet):
         result = None
+        pcap_file_name = None
         try:
             with NamedTemporaryFile(delete=False) as pcap_file:
+                pcap_file_name = pcap_file.name
                 self.write_ip_to_pcap(pcap_file, ip_packet)
 
                 result = subprocess.run(                        # pylint: disable=subprocess-run-check
@@ -48,6 +99,10 @@ class SynPacketParser(PacketParserInterface):
         except ValueError as ex:
             logging.warning('Unable to extract signature from SYN packet using `p0f`. Error: `%s`', ex)
 
+        finally:
+            if pcap_file_name is not None:
+                remove_file(pcap_file_name)
+
         return result
 
     def extract_signature_from_p0f_output(self, p0f_output) -> str:
@@ -67,7 +122,41 @@ class SynPacketParser(PacketParserInterface):
 
         return client_os
 
+    def extract_data_from_p0f_output(self, p0f_output: str) -> Munch:
+        return Munch(
+            syn_signature=self.extract_signature_from_p0f_output(p0f_output=p0f_output),
+            client_os=self.extract_os_from_p0f_output(p0f_output=p0f_output)
+        )
+
+    def get_raw_signature(self, signature: TcpSynSignature) -> str:
+        """Get raw signature in p0f format, with fields of window size and option layout separated using
+        `FieldDelimiter` (as extracted from p0f output). Formatted signatures are memoized."""
+        key = signature.key()
+        raw_signature = self.raw_signatures.get(key)
+        if raw_signature is None:
+            raw_signature = signature.to_raw_signature().replace(',', self.config.FieldDelimiter)
+            self.raw_signatures[key] = raw_signature
+
+        return raw_signature
+
+    def extract_data_using_fingerprint_database(self, packet: IP) -> Munch:
+        signature = build_tcp_syn_signature(packet)
+        if signature is None:
+            # p0f does not report anything for packets which it does not fingerprint
+            return Munch(syn_signature='', client_os='')
+
+        return Munch(
+            syn_signature=self.get_raw_signature(signature),
+            client_os=self.fingerprint_database.get_os(signature)
+        )
+
     def extract_data(self, packet: IP) -> Munch:
+        if not self.use_p0f:
+            return self.extract_data_using_fingerprint_database(packet)
+
+        if self.p0f_process is not None:
+            return Munch(syn_signature=self.p0f_process.submit(packet))
+
         data = Munch()
         result = self.extract_signature_from_syn_using_p0f(
             p0f_executable=self.config.p0f_executable,
@@ -79,8 +168,7 @@ class SynPacketParser(PacketParserInterface):
             if result.returncode != 0:
                 return data
 
-            data.syn_signature = self.extract_signature_from_p0f_output(p0f_output=result.stdout)
-            data.client_os = self.extract_os_from_p0f_output(p0f_output=result.stdout)
+            data = self.extract_data_from_p0f_output(p0f_output=result.stdout)
 
         except BaseException as ex:
             logging.warning('Failed to extract signature from TCP-SYN packet. Error: `%s`', ex)
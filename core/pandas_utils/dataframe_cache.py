@@ -0,0 +1,176 @@
+"""Cache of typed columnar copies of CSV files loaded to data frames (see `load_csv_to_dataframe`).
+
+A CSV file is parsed once, and the data frame is saved to a Parquet file in cache directory. Later loads read columns
+from the Parquet file instead of parsing the CSV file. Cache file is named by hash of path of the CSV file and dtypes of
+the data frame, and by size and modification time of the CSV file, so a changed CSV file is parsed again and cached
+copies of its earlier versions are removed. Least recently used files are removed when total size of cache files
+exceeds a limit.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import pandas as pd
+from pandas import DataFrame
+
+try:
+    import pyarrow      # pylint: disable=unused-import
+
+except ImportError:     # pragma: no cover
+    pyarrow = None      # pylint: disable=invalid-name
+
+DATAFRAME_CACHE_DIR_ENV = 'DATAFRAME_CACHE_DIR'
+DATAFRAME_CACHE_MAX_SIZE_ENV = 'DATAFRAME_CACHE_MAX_SIZE'
+DEFAULT_DATAFRAME_CACHE_MAX_SIZE = 10 * 1024 ** 3     # bytes
+CACHE_FILE_SUFFIX = '.parquet'
+
+
+def get_dataframe_cache(cache_dir: str = None) -> Optional['DataFrameCache']:
+    """Get cache in `cache_dir`, or in directory set in `DATAFRAME_CACHE_DIR` environment variable. Size limit of cache
+    is read from `DATAFRAME_CACHE_MAX_SIZE` environment variable (bytes). Returns None if cache directory is not set, or
+    if Parquet files can not be written (pyarrow is not installed)."""
+    if cache_dir is None:
+        cache_dir = os.environ.get(DATAFRAME_CACHE_DIR_ENV)
+
+    if not cache_dir or pyarrow is None:
+        return None
+
+    max_size = DEFAULT_DATAFRAME_CACHE_MAX_SIZE
+    try:
+        max_size = int(os.environ.get(DATAFRAME_CACHE_MAX_SIZE_ENV, max_size))
+
+    except ValueError:
+        logging.warning('Invalid `%s`, using default size limit of data frame cache', DATAFRAME_CACHE_MAX_SIZE_ENV)
+
+    return DataFrameCache(cache_dir, max_size=max_size)
+
+
+def write_parquet_file(file_path: Path, data: DataFrame) -> None:
+    """Write file atomically, so that other processes never read a partially written file."""
+    file_descriptor, temp_file_path = tempfile.mkstemp(dir=str(file_path.parent), suffix='.tmp')
+    os.close(file_descriptor)
+    try:
+        data.to_parquet(temp_file_path, index=False)
+        os.replace(temp_file_path, str(file_path))
+
+    except BaseException:
+        os.remove(temp_file_path)
+        raise
+
+
+class DataFrameCache:
+    def __init__(self, cache_dir: Union[Path, str], max_size: int = DEFAULT_DATAFRAME_CACHE_MAX_SIZE):
+        """Cache of data frames loaded from CSV files.
+
+        Parameters
+        ----------
+        cache_dir: Union[Path, str]
+            Directory of cache files
+        max_size: int
+            Maximum total size of cache files in bytes. Least recently used files are removed when a file is added to
+            cache, and a data frame larger than `max_size` is not cached.
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_size = max_size
+
+    @staticmethod
+    def get_key(file_path: Path, dtypes: Optional[Dict[str, Any]]) -> str:
+        key = hashlib.sha256(str(file_path.resolve()).encode())
+        for column, dtype in sorted((dtypes or {}).items()):
+            key.update('\0{}={}'.format(column, dtype).encode())
+
+        return key.hexdigest()
+
+    def get_cache_file_path(self, file_path: Path, dtypes: Optional[Dict[str, Any]]) -> Path:
+        file_stat = file_path.stat()
+        return self.cache_dir / '{}-{}-{}{}'.format(
+            self.get_key(file_path, dtypes), file_stat.st_size, file_stat.st_mtime_ns, CACHE_FILE_SUFFIX)
+
+    def load(
+            self,
+            file_path: Union[Path, str],
+            read_file: Callable[[], DataFrame],
+            columns: List[str] = None,
+            dtypes: Dict[str, Any] = None
+    ) -> DataFrame:
+        """Load data frame from cache, or read the file and save data frame to cache.
+
+        Parameters
+        ----------
+        file_path: Union[Path, str]
+            Path to CSV file
+        read_file: Callable[[], DataFrame]
+            Function which reads all columns of the file to data frame, converting columns to `dtypes`
+        columns: List[str]
+            Only these columns are returned. Default: all columns
+        dtypes: Dict[str, Any]
+            dtype of columns, used as part of cache key
+
+        Returns
+        -------
+        data: DataFrame
+            Cached or loaded data frame. Errors in reading or writing cache are logged, and the file is read.
+        """
+        file_path = Path(file_path)
+        cache_file_path = self.get_cache_file_path(file_path, dtypes)
+        try:
+            data = pd.read_parquet(cache_file_path, columns=columns)
+            # Modification time of cache file is the time it was last used, see `remove_least_recently_used_files`
+            os.utime(str(cache_file_path))
+            return data
+
+        except FileNotFoundError:
+            pass
+
+        except Exception as ex:
+            logging.warning('Unable to load cached data frame from `%s`. Error: `%s`', cache_file_path, ex)
+
+        data = read_file()
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self.remove_stale_files(cache_file_path)
+            write_parquet_file(cache_file_path, data)
+            self.remove_least_recently_used_files()
+
+        except Exception as ex:
+            logging.warning('Unable to save data frame to cache `%s`. Error: `%s`', cache_file_path, ex)
+
+        return data if columns is None else data[columns]
+
+    def get_cache_files(self) -> List[Path]:
+        return [path for path in self.cache_dir.glob('*' + CACHE_FILE_SUFFIX) if path.is_file()]
+
+    def remove_stale_files(self, cache_file_path: Path) -> None:
+        """Remove cached copies of earlier versions of the file of `cache_file_path`."""
+        key = cache_file_path.name.split('-')[0]
+        for path in self.get_cache_files():
+            if path != cache_file_path and path.name.split('-')[0] == key:
+                path.unlink()
+
+    def remove_least_recently_used_files(self) -> None:
+        """Remove least recently used files until total size of cache files is at most `max_size`."""
+        cache_files = []
+        for path in self.get_cache_files():
+            try:
+                file_stat = path.stat()
+                cache_files.append((file_stat.st_mtime_ns, file_stat.st_size, path))
+
+            except FileNotFoundError:
+                # Removed by another process
+                continue
+
+        total_size = sum(size for _, size, _ in cache_files)
+        for _, size, path in sorted(cache_files):
+            if total_size <= self.max_size:
+                break
+
+            try:
+                path.unlink()
+
+            except FileNotFoundError:
+                pass
+
+            total_size -= size
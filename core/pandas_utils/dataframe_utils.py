@@ -1,10 +1,22 @@
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, Iterator, List, Optional, Union
 
 from pandas import DataFrame
 import pandas as pd
 
 from core.errors.generic_errors import GenericError
+from core.lib.compression import open_compressed_file
+from core.pandas_utils.dataframe_cache import get_dataframe_cache
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+except ImportError:     # pragma: no cover
+    pyarrow = None      # pylint: disable=invalid-name
+
+COLUMNAR_FILE_SUFFIXES = ('.parquet', '.arrow')
 
 
 def load_csv_to_dataframe(
@@ -12,14 +24,18 @@ def load_csv_to_dataframe(
         fill_empty_values: bool = True,
         fillna_value: Union[str, int] = 0,
         verify_columns: List[str] = None,
-        strict: bool = False
+        strict: bool = False,
+        columns: List[str] = None,
+        dtypes: Dict[str, Any] = None,
+        cache_dir: str = None
 ) -> DataFrame:
-    """Read CSV file and load data to DataFrame
+    """Read CSV file and load data to DataFrame. Parquet (`.parquet`) and Arrow IPC (`.arrow`) result files are also
+    supported, these are read without parsing text.
 
     Parameters
     -----------
     file_path: str
-        Path to CSV file containing data
+        Path to CSV (or Parquet, Arrow IPC) file containing data
     fill_empty_values: bool
         Boolean flag to specify if empty values should be filled in DataFrame
     fillna_value: Union[str, int]
@@ -28,6 +44,15 @@ def load_csv_to_dataframe(
         Verify that these columns exist in the CSV file
     strict: bool
         Set this flag to raise Generic error if any columns are missing from the data frame.
+    columns: List[str]
+        Only these columns are loaded. Default: all columns
+    dtypes: Dict[str, Any]
+        dtype of columns, e.g. `core.models.packet_schema.get_pandas_dtypes()` for result files. Values are parsed
+        to these types while CSV file is read. Default: types are inferred by pandas
+    cache_dir: str
+        Directory of cached columnar copies of CSV files, see `DataFrameCache`. All columns of a CSV file are read
+        when it is first loaded, and later loads read `columns` from cached copy until CSV file changes. Default:
+        `DATAFRAME_CACHE_DIR` environment variable. CSV files are not cached if neither is set.
 
     Returns
     -------
@@ -38,7 +63,7 @@ def load_csv_to_dataframe(
     ------
     GenericError
         If no file exists at specified path, or specified path is a directory
-        If data from CSV file can not be loaded in to DataFrame
+        If data from CSV file can not be loaded in to DataFrame, e.g. if `columns` are not in the file
         If one or more columns specified in `verify_cloumns` do not exist in data file, and strict flag is set
     """
     file_path = Path(file_path)
@@ -46,20 +71,170 @@ def load_csv_to_dataframe(
         raise GenericError('File does not exist at specified path: `{}`'.format(file_path))
 
     try:
-        data = pd.read_csv(file_path)
+        dataframe_cache = None
+        if file_path.suffix not in COLUMNAR_FILE_SUFFIXES:
+            dataframe_cache = get_dataframe_cache(cache_dir)
+
+        if dataframe_cache is None:
+            data = read_data_file(file_path, columns=columns, dtypes=dtypes)
+
+        else:
+            data = dataframe_cache.load(
+                file_path, lambda: read_data_file(file_path, dtypes=dtypes), columns=columns, dtypes=dtypes)
+
         if fill_empty_values is True:
-            data.fillna(fillna_value, inplace=True)
+            fill_empty_values_in_dataframe(data, fillna_value)
 
     except Exception as ex:
         raise GenericError('Can not read file specified at `{}`. Error: {}'.format(file_path, ex))
 
     missing_columns = verify_columns_exist_in_dataframe(data, verify_columns)
-    if strict is True and not missing_columns:
+    if strict is True and missing_columns:
         raise GenericError('`{}` not found in input csv file'.format(','.join(missing_columns)))
 
     return data
 
 
+def read_data_file(
+        file_path: Path,
+        columns: List[str] = None,
+        dtypes: Dict[str, Any] = None,
+        chunk_size: int = None
+) -> Union[DataFrame, Iterator[DataFrame]]:
+    """Read data file to DataFrame, using reader for file type (based on file extension). Compressed csv files are
+    decompressed while these are read. Only `columns` are read (default: all columns), and columns are converted to
+    `dtypes`. If `chunk_size` is set, an iterator of data frames with at most `chunk_size` rows is returned (rows of
+    Arrow IPC files are read in record batches written to the file)."""
+    if file_path.suffix == '.parquet':
+        if chunk_size:
+            return (
+                apply_dtypes(batch.to_pandas(), dtypes)
+                for batch in pyarrow.parquet.ParquetFile(str(file_path)).iter_batches(chunk_size, columns=columns)
+            )
+
+        return apply_dtypes(pd.read_parquet(file_path, columns=columns), dtypes)
+
+    if file_path.suffix == '.arrow':
+        if chunk_size:
+            return read_arrow_file_batches(file_path, columns, dtypes)
+
+        # Feather v2 is the Arrow IPC file format
+        return apply_dtypes(pd.read_feather(file_path, columns=columns), dtypes)
+
+    if chunk_size:
+        return read_csv_file_chunks(file_path, columns, dtypes, chunk_size)
+
+    with open_compressed_file(str(file_path), mode='rb') as data_file:
+        return pd.read_csv(data_file, usecols=columns, dtype=dtypes)
+
+
+def read_csv_file_chunks(
+        file_path: Path,
+        columns: Optional[List[str]],
+        dtypes: Optional[Dict[str, Any]],
+        chunk_size: int
+) -> Iterator[DataFrame]:
+    with open_compressed_file(str(file_path), mode='rb') as data_file:
+        yield from pd.read_csv(data_file, usecols=columns, dtype=dtypes, chunksize=chunk_size)
+
+
+def read_arrow_file_batches(
+        file_path: Path,
+        columns: Optional[List[str]],
+        dtypes: Optional[Dict[str, Any]]
+) -> Iterator[DataFrame]:
+    with pyarrow.memory_map(str(file_path)) as source:
+        reader = pyarrow.ipc.open_file(source)
+        for index in range(reader.num_record_batches):
+            batch = reader.get_batch(index)
+            if columns is not None:
+                batch = batch.select(columns)
+            yield apply_dtypes(batch.to_pandas(), dtypes)
+
+
+def apply_dtypes(data: DataFrame, dtypes: Optional[Dict[str, Any]]) -> DataFrame:
+    """Convert columns of data frame to given dtypes, e.g. columns read from a columnar file. Columns which are not in
+    data frame are ignored."""
+    if not dtypes:
+        return data
+
+    dtypes = {column: dtype for column, dtype in dtypes.items() if column in data.columns}
+    return data.astype(dtypes) if dtypes else data
+
+
+def fill_empty_values_in_dataframe(data: DataFrame, fillna_value: Union[str, int] = 0) -> None:
+    """Fill empty cells of data frame in place. `fillna_value` is added to categories of categorical columns, and text
+    columns are converted to object columns if `fillna_value` is not text."""
+    for column in data.columns:
+        if not data[column].hasnans:
+            continue
+
+        if isinstance(data[column].dtype, pd.CategoricalDtype):
+            if fillna_value not in data[column].cat.categories:
+                data[column] = data[column].cat.add_categories([fillna_value])
+
+        elif isinstance(data[column].dtype, pd.StringDtype) and not isinstance(fillna_value, str):
+            data[column] = data[column].astype(object)
+
+    data.fillna(fillna_value, inplace=True)
+
+
+def read_data_file_chunks(
+        file_path: Union[Path, str],
+        chunk_size: int = None,
+        fill_empty_values: bool = True,
+        fillna_value: Union[str, int] = 0,
+        columns: List[str] = None,
+        dtypes: Dict[str, Any] = None
+) -> Iterator[DataFrame]:
+    """Read data file in chunks of rows, so that whole file does not need to fit in memory.
+
+    Parameters
+    -----------
+    file_path: str
+        Path to CSV (or Parquet, Arrow IPC) file containing data
+    chunk_size: int
+        Number of rows in each chunk. If not set, whole file is read as a single chunk. Rows of Arrow IPC files are
+        read in record batches written to the file.
+    fill_empty_values: bool
+        Boolean flag to specify if empty values should be filled in DataFrame
+    fillna_value: Union[str, int]
+        Default value for filling empty cells in DataFrame
+    columns: List[str]
+        Only these columns are loaded. Default: all columns
+    dtypes: Dict[str, Any]
+        dtype of columns, see `load_csv_to_dataframe`. Categories of categorical columns are the values in each chunk.
+
+    Returns
+    -------
+    chunks: Iterator[DataFrame]
+        Data frames with rows of file, in order
+
+    Raises
+    ------
+    GenericError
+        If no file exists at specified path, or specified path is a directory
+        If data from file can not be loaded in to DataFrame
+    """
+    file_path = Path(file_path)
+    if not chunk_size:
+        yield load_csv_to_dataframe(
+            file_path, fill_empty_values=fill_empty_values, fillna_value=fillna_value, columns=columns, dtypes=dtypes)
+        return
+
+    if file_path.exists() is False or file_path.is_dir() is True:
+        raise GenericError('File does not exist at specified path: `{}`'.format(file_path))
+
+    try:
+        for data in read_data_file(file_path, columns=columns, dtypes=dtypes, chunk_size=chunk_size):
+            if fill_empty_values is True:
+                fill_empty_values_in_dataframe(data, fillna_value)
+            yield data
+
+    except Exception as ex:
+        raise GenericError('Can not read file specified at `{}`. Error: {}'.format(file_path, ex))
+
+
 def verify_columns_exist_in_dataframe(data: DataFrame, verify_columns: List[str]) -> List[str]:
     """Verify that specific set of columns exist in given data frame.
     Parameters
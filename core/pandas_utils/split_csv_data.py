@@ -2,14 +2,21 @@ import logging
 import time
 import os
 
+from collections import OrderedDict
 from pathlib import Path
-from typing import Any, List, Union, Dict, Callable
+from typing import Any, List, Optional, Union, Dict, Callable, Iterator, Tuple
 from munch import DefaultMunch
+import numpy as np
 import pandas as pd
 from pandas import DataFrame
 
 from core.errors.generic_errors import GenericError
-from core.pandas_utils.dataframe_utils import load_csv_to_dataframe, write_dataframe_to_csv_file
+from core.lib.compression import open_compressed_file
+from core.models.packet_schema import PACKET_DATA_SCHEMA, get_pandas_dtypes
+from core.pandas_utils.dataframe_utils import COLUMNAR_FILE_SUFFIXES, read_data_file_chunks, \
+    verify_columns_exist_in_dataframe, write_dataframe_to_csv_file
+
+DEFAULT_MAX_OPEN_FILES = 128
 
 
 def extract_data_as_separate_csv(
@@ -17,7 +24,10 @@ def extract_data_as_separate_csv(
         result_folder: Path = Path(os.getcwd()),
         filter_columns: List[str] = None,
         sort_by_columns: List[str] = None,
-        transform_function: Callable[[Union[int, str]], str] = None
+        transform_function: Callable[[Union[int, str]], str] = None,
+        chunk_size: int = None,
+        max_open_files: int = DEFAULT_MAX_OPEN_FILES,
+        dtypes: Dict[str, Any] = None
 ) -> Dict[str, Any]:
     """Read a CSV file from specified path, and extract the unique values from specified `filter_columns` in separate
     CSV files.
@@ -31,6 +41,8 @@ def extract_data_as_separate_csv(
     the function will provide summary object where keys are unique MAC addresses, and values contain path to output
     file, and number of rows in the output file for specific MAC address.
 
+    Rows are split to output files in a single pass over the data (see `get_partitions`), and the input file can be
+    read in chunks of rows, so that it does not need to fit in memory.
 
     Parameters
     -----------
@@ -41,10 +53,21 @@ def extract_data_as_separate_csv(
         Path to folder where output CSV files should be written. default: current working directory
     filter_columns: List[str]
         columns from where unique values are extracted
+    sort_by_columns: List[str]
+        Rows of output files are sorted by these columns. Rows with equal values are kept in order of input file.
     transform_function: function
         This function is used to transform unique values to human-understandable format. For example, data file
         contains MAC address as integer. If filtering is done over mac address, you can pass a transform function which\
          converts integer representation to MAC to be used in file-names, and summary data
+    chunk_size: int
+        Number of rows of CSV file read at once. Default: whole file is read at once. If set, and `sort_by_columns` is
+        given, each output file is sorted after all rows are written.
+    max_open_files: int
+        Maximum number of output files kept open at once, least recently written files are closed when more files are
+        needed. Default: 128
+    dtypes: Dict[str, Any]
+        dtype of columns of CSV file. Default: see `get_split_dtypes`, values are written to output files as these are
+        in input file, whether or not the file is read in chunks.
 
     Returns
     -------
@@ -58,6 +81,7 @@ def extract_data_as_separate_csv(
         - Input file does not exist, or specified path is directory
         - Output folder path does not exist or specified path is not a directory
         - Data can not be loaded to DataFrame from a CSV file
+        - Filter columns or sort columns do not exist in data file
         - Data can not be written from DataFrame to a CSV file
     """
     output_folder = Path(result_folder)
@@ -66,36 +90,48 @@ def extract_data_as_separate_csv(
     if output_folder.exists() is False:
         os.makedirs(output_folder, exist_ok=True)
 
-    data = load_csv_to_dataframe(file_path, fill_empty_values=True, verify_columns=filter_columns)
+    file_path = Path(file_path)
     base_filename_id = file_path.name.strip().split('.')[0]
     summary_data = DefaultMunch()
+    output_files = {}   # type: Dict[Any, Tuple[str, str]]
+    time_taken = {}     # type: Dict[str, float]
+    if dtypes is None:
+        dtypes = get_split_dtypes(file_path, sort_by_columns)
+
+    with PartitionFileWriter(max_open_files=max_open_files) as writer:
+        for data in read_data_file_chunks(file_path, chunk_size=chunk_size, dtypes=dtypes):
+            missing_columns = verify_columns_exist_in_dataframe(data, (filter_columns or []) + (sort_by_columns or []))
+            if missing_columns:
+                raise GenericError('Specified columns: `{}` not found in input data file. Columns available in data '
+                                   'file: `{}`'.format(', '.join(missing_columns), list(data.columns)))
+
+            if sort_by_columns and not chunk_size:
+                # Whole file is read at once, so rows of all partitions are sorted at once
+                data = data.sort_values(by=sort_by_columns, kind='mergesort')
 
-    unique_values = []
-    for col in filter_columns:
-        unique_values.extend(list(data[col].unique()))
+            for val, partition in get_partitions(data, filter_columns):
+                st = time.time()
+                if val not in output_files:
+                    str_val = transform_function(val) if transform_function is not None else val
+                    output_files[val] = str(str_val), '{folder}/{prefix}-{value}.csv'.format(
+                        folder=output_folder,
+                        prefix=base_filename_id,
+                        value=str_val
+                    )
 
-    unique_values = set(unique_values)
-    logging.debug('`%s` unique values', len(unique_values))
+                output_file_path = output_files[val][1]
+                writer.write(output_file_path, partition)
+                time_taken[output_file_path] = time_taken.get(output_file_path, 0) + time.time() - st
 
-    for val in unique_values:
+    for str_val, output_file_path in output_files.values():
         st = time.time()
-        if transform_function is not None:
-            str_val = transform_function(val)
-        else:
-            str_val = val
-
-        output_file_path = '{folder}/{prefix}-{value}.csv'.format(
-            folder=output_folder,
-            prefix=base_filename_id,
-            value=str_val
-        )
-        filtered_data = get_filtered_data_from_data_frame(data, filter_columns, val, sort_by_columns)
-        write_dataframe_to_csv_file(filtered_data, output_file_path, True, header=True, index=False)
+        if sort_by_columns and chunk_size:
+            sort_csv_file(output_file_path, sort_by_columns, dtypes=dtypes)
 
         summary_data[str_val] = DefaultMunch(
             file=output_file_path,
-            row_count=filtered_data.shape[0],
-            time_taken=time.time() - st
+            row_count=writer.row_counts[output_file_path],
+            time_taken=time_taken[output_file_path] + time.time() - st
         )
         logging.debug(
             'Successfully filtered data for value = `%s` to `%s` in `%s` seconds',
@@ -107,6 +143,131 @@ def extract_data_as_separate_csv(
     return summary_data
 
 
+def get_split_dtypes(file_path: Path, sort_by_columns: List[str] = None) -> Optional[Dict[str, Any]]:
+    """Get dtypes of columns of CSV file for splitting the file. Types of columns inferred by pandas depend on values in
+    each chunk of rows, e.g. an integer column containing empty cells is read as float, so a value could be written as
+    `1` or `1.0` depending on its chunk. Columns are read as text instead, except sort columns which are packet data
+    fields (read with dtypes of `get_pandas_dtypes`, text fields as text). Types of other sort columns are inferred.
+
+    Returns
+    -------
+    dtypes: Optional[Dict[str, Any]]
+        dtype of columns, None for Parquet and Arrow IPC files (types are stored in file), or if file does not exist
+    """
+    file_path = Path(file_path)
+    if file_path.suffix in COLUMNAR_FILE_SUFFIXES or file_path.is_file() is False:
+        return None
+
+    try:
+        with open_compressed_file(str(file_path), mode='rb') as data_file:
+            columns = pd.read_csv(data_file, nrows=0).columns
+
+    except Exception as ex:
+        raise GenericError('Can not read file specified at `{}`. Error: {}'.format(file_path, ex))
+
+    dtypes = {column: str for column in columns}    # type: Dict[str, Any]
+    packet_dtypes = get_pandas_dtypes()
+    for column in sort_by_columns or []:
+        if column not in PACKET_DATA_SCHEMA:
+            dtypes.pop(column, None)
+        elif packet_dtypes[column] != 'category':
+            dtypes[column] = packet_dtypes[column]
+
+    return dtypes
+
+
+def get_partitions(data: DataFrame, filter_columns: List[str]) -> Iterator[Tuple[Any, DataFrame]]:
+    """Split rows of data frame by values of `filter_columns` in a single pass. Each row is included once in partition
+    of each distinct value in its filter columns, e.g. a packet is in partitions of both its source and destination MAC
+    addresses. Rows of each partition are in the same order as in data frame.
+
+    Parameters
+    -----------
+    data: DataFrame
+        Data frame containing data loaded from csv file
+    filter_columns: List[str]
+        Columns whose values partition the rows
+
+    Returns
+    -------
+    partitions: Iterator[Tuple[Any, DataFrame]]
+        Value, and rows containing the value in one of `filter_columns`, for each distinct value
+    """
+    if data.empty or not filter_columns:
+        return
+
+    rows = DataFrame({
+        'value': pd.concat([data[col] for col in filter_columns], ignore_index=True),
+        'position': np.tile(np.arange(data.shape[0]), len(filter_columns)),
+    }).drop_duplicates()
+    for value, positions in rows.groupby('value', sort=False)['position']:
+        yield value, data.iloc[np.sort(positions.to_numpy())]
+
+
+def sort_csv_file(file_path: str, sort_by_columns: List[str], dtypes: Dict[str, Any] = None) -> None:
+    """Sort rows of CSV file by given columns (keeping order of rows with equal values), and rewrite the file. Columns
+    are read as `dtypes` (default: inferred by pandas)."""
+    try:
+        data = pd.read_csv(file_path, dtype=dtypes)
+
+    except Exception as ex:
+        raise GenericError('Can not read file specified at `{}`. Error: {}'.format(file_path, ex))
+
+    data.sort_values(by=sort_by_columns, kind='mergesort', inplace=True)
+    write_dataframe_to_csv_file(data, file_path, True, header=True, index=False)
+
+
+class PartitionFileWriter:
+    def __init__(self, max_open_files: int = DEFAULT_MAX_OPEN_FILES):
+        """Writer of partitions of data to separate CSV files. Rows of a partition can be written in several parts,
+        which are appended to its file. Files are kept open between writes, and least recently written files are closed
+        (and opened again for appending when needed) so that at most `max_open_files` files are open at once.
+
+        Parameters
+        ----------
+        max_open_files: int
+            Maximum number of files open at once
+        """
+        self.max_open_files = max(1, max_open_files)
+        self.open_files = OrderedDict()     # type: OrderedDict
+        self.row_counts = {}                # type: Dict[str, int]
+
+    def __enter__(self) -> 'PartitionFileWriter':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def write(self, file_path: str, data: DataFrame) -> None:
+        """Write rows to CSV file. Header is written with the first rows, and an existing file is overwritten.
+
+        Raises
+        ------
+        GenericError: Exception
+            If data can not be written to specified path
+        """
+        try:
+            partition_file = self.open_files.pop(file_path, None)
+            if partition_file is None:
+                if len(self.open_files) >= self.max_open_files:
+                    self.open_files.popitem(last=False)[1].close()
+                partition_file = open(file_path, 'a' if file_path in self.row_counts else 'w', newline='')
+
+            self.open_files[file_path] = partition_file
+            data.to_csv(partition_file, header=file_path not in self.row_counts, index=False)
+
+        except Exception as ex:
+            raise GenericError(
+                'Could not write dataframe to csv file at specified path: `{}`. Error: `{}`'.format(file_path, ex)
+            )
+
+        self.row_counts[file_path] = self.row_counts.get(file_path, 0) + data.shape[0]
+
+    def close(self) -> None:
+        while self.open_files:
+            self.open_files.popitem()[1].close()
+
+
 def get_filtered_data_from_data_frame(
         data: DataFrame,
         filter_columns: List[str],
@@ -148,7 +309,7 @@ def get_filtered_data_from_data_frame(
             'Invalid data provided as filter_columns. expected: <List>, provided: `{}`'.format(type(filter_columns))
         )
 
-    columns_to_be_processed = filter_columns or [] + sort_by_columns or []
+    columns_to_be_processed = (filter_columns or []) + (sort_by_columns or [])
     data_columns = data.columns
     for col in columns_to_be_processed:
         if col not in data_columns:
@@ -158,9 +319,9 @@ def get_filtered_data_from_data_frame(
     if value is None:
         return data
 
-    intermediate_filtered_data = [data[data[col] == value] for col in data_columns]
-    filtered_data = pd.concat(intermediate_filtered_data, ignore_index=True)
+    # Rows containing the value in several filter columns are included once
+    filtered_data = data[np.logical_or.reduce([(data[col] == value).to_numpy() for col in filter_columns])]
     if sort_by_columns:
-        filtered_data.sort_values(by=sort_by_columns, inplace=True)
+        filtered_data = filtered_data.sort_values(by=sort_by_columns, kind='mergesort')
 
     return filtered_data
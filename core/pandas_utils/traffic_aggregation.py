@@ -0,0 +1,180 @@
+"""Aggregation of packet data extracted from pcap files (see `PacketData`) to traffic statistics.
+
+Packet count, total data, packet and data rates, and average packet size are computed for the whole trace, for
+incoming and outgoing packets, for each layer 3, layer 4 and layer 7 protocol, and for each IP address. Tables are
+computed by grouping rows of the data frame in a pass over the data, instead of filtering the data frame for each value.
+"""
+import math
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+from munch import Munch
+from pandas import DataFrame
+
+# Columns of packet data used for aggregation
+SIZE_COLUMN = 'size'
+TIMESTAMP_COLUMN = 'timestamp'
+OUTGOING_COLUMN = 'outgoing'
+SRC_IP_COLUMN = 'src_ip'
+DST_IP_COLUMN = 'dst_ip'
+PROTOCOL_COLUMNS = Munch(layer3='eth_type', layer4='ip_proto', layer7='layer7_proto')
+AGGREGATION_COLUMNS = [TIMESTAMP_COLUMN, SIZE_COLUMN, OUTGOING_COLUMN, SRC_IP_COLUMN, DST_IP_COLUMN] + \
+    list(PROTOCOL_COLUMNS.values())
+
+# Columns of aggregated tables
+COUNT = 'count'
+TOTAL_DATA = 'total_data'
+PACKET_RATE = 'packet_rate'
+DATA_RATE = 'data_rate'
+AVG_PACKET_SIZE = 'avg_packet_size'
+DATA_TO_IP = 'data_to_ip'
+DATA_FROM_IP = 'data_from_ip'
+OUTGOING = 'outgoing'
+INCOMING = 'incoming'
+
+
+def get_trace_summary(data: DataFrame) -> Munch:
+    """Get packet count, start and stop time, duration (seconds), packet rate (packets/second), total data (bytes),
+    data rate (bytes/second) and average packet size (bytes) of packets in data frame. Rates are NaN if duration of
+    trace is zero."""
+    summary = Munch()
+    summary.packet_count = data.shape[0]
+    summary.start_time = data[TIMESTAMP_COLUMN].iloc[0] if summary.packet_count else math.nan
+    summary.stop_time = data[TIMESTAMP_COLUMN].iloc[-1] if summary.packet_count else math.nan
+    summary.duration = summary.stop_time - summary.start_time
+    summary.total_data = data[SIZE_COLUMN].sum()
+    summary.packet_rate = divide(summary.packet_count, summary.duration)
+    summary.data_rate = divide(summary.total_data, summary.duration)
+    summary.average_packet_size = divide(summary.total_data, summary.packet_count)
+
+    return summary
+
+
+def divide(value: float, divisor: float) -> float:
+    return value / divisor if divisor else math.nan
+
+
+def add_rates(table: DataFrame, duration: float) -> DataFrame:
+    """Add packet rate, data rate and average packet size columns to table of packet counts and total data."""
+    duration = duration or np.nan
+    table[PACKET_RATE] = table[COUNT] / duration
+    table[DATA_RATE] = table[TOTAL_DATA] / duration
+    table[AVG_PACKET_SIZE] = table[TOTAL_DATA] / table[COUNT].where(table[COUNT] > 0, 1)
+
+    return table
+
+
+def aggregate_by(data: DataFrame, key: Any, duration: float) -> DataFrame:
+    """Get table of packet count, total data, rates and average packet size for each value of `key`.
+
+    Parameters
+    ----------
+    data: DataFrame
+        Packet data
+    key: Any
+        Column name or series by which packets are grouped. Missing values are a group.
+    duration: float
+        Duration of trace in seconds, for computing rates
+
+    Returns
+    -------
+    table: DataFrame
+        Table indexed by values of `key`, with `count`, `total_data`, `packet_rate`, `data_rate` and `avg_packet_size`
+        columns
+    """
+    table = data.groupby(key, dropna=False, observed=True, sort=False)[SIZE_COLUMN].agg(['size', 'sum'])
+    table.columns = [COUNT, TOTAL_DATA]
+
+    return add_rates(table, duration)
+
+
+def get_direction_data(data: DataFrame, duration: float) -> DataFrame:
+    """Get table of statistics of outgoing and incoming packets, indexed by `outgoing` and `incoming`. Packets are
+    outgoing if `outgoing` column is set (True or 1)."""
+    outgoing = data[OUTGOING_COLUMN].fillna(False).astype(bool)
+    direction = pd.Series(np.where(outgoing, OUTGOING, INCOMING), index=data.index, name='direction')
+
+    return aggregate_by(data, direction, duration).reindex([OUTGOING, INCOMING], fill_value=0)
+
+
+def get_ip_data(data: DataFrame, duration: float) -> DataFrame:
+    """Get table of statistics of packets sent to or from each IP address, indexed by IP address.
+
+    `count` and `total_data` include each packet sent to or from IP address once, `data_to_ip` is the data of packets
+    whose destination is the IP address and `data_from_ip` is the data of packets whose source is the IP address.
+    Packets without IP addresses are not included.
+    """
+    from_ip = data.groupby(SRC_IP_COLUMN, observed=True, sort=False)[SIZE_COLUMN].agg(['size', 'sum'])
+    to_ip = data.groupby(DST_IP_COLUMN, observed=True, sort=False)[SIZE_COLUMN].agg(['size', 'sum'])
+    # Packets from an IP address to itself are included in both groups, but counted once in totals
+    # Categories of (categorical) source and destination IP columns are different, so values are compared
+    loopback_data = data[data[SRC_IP_COLUMN].astype(object) == data[DST_IP_COLUMN].astype(object)]
+    to_self = loopback_data.groupby(SRC_IP_COLUMN, observed=True, sort=False)[SIZE_COLUMN].agg(['size', 'sum'])
+
+    table = from_ip.add(to_ip, fill_value=0).sub(to_self, fill_value=0)
+    table.columns = [COUNT, TOTAL_DATA]
+    table.index.name = 'ip'
+    table[DATA_TO_IP] = to_ip['sum'].reindex(table.index, fill_value=0)
+    table[DATA_FROM_IP] = from_ip['sum'].reindex(table.index, fill_value=0)
+    table[COUNT] = table[COUNT].astype(int)
+
+    return add_rates(table, duration)
+
+
+def aggregate_traffic(data: DataFrame) -> Munch:
+    """Aggregate packet data to traffic statistics.
+
+    Parameters
+    ----------
+    data: DataFrame
+        Packet data, in order of timestamps, with columns of `AGGREGATION_COLUMNS`
+
+    Returns
+    -------
+    aggregates: Munch
+        `summary` of trace (see `get_trace_summary`), and tables of statistics (see `aggregate_by`) by `direction`
+        (see `get_direction_data`), `layer3`, `layer4` and `layer7` protocols, and by `ip` (see `get_ip_data`)
+    """
+    aggregates = Munch()
+    aggregates.summary = get_trace_summary(data)
+    duration = aggregates.summary.duration
+    aggregates.direction = get_direction_data(data, duration)
+    for layer, column in PROTOCOL_COLUMNS.items():
+        aggregates[layer] = aggregate_by(data, column, duration)
+    aggregates.ip = get_ip_data(data, duration)
+
+    return aggregates
+
+
+def table_to_dict(table: DataFrame) -> Dict[Any, Dict[str, Any]]:
+    """Convert table to dictionary of rows, which can be written as JSON (see `NpEncoder`). Missing values in index
+    are converted to None."""
+    return {
+        to_json_key(key): {column: to_json_value(value) for column, value in row.items()}
+        for key, row in table.to_dict(orient='index').items()
+    }
+
+
+def to_json_key(key: Any) -> Any:
+    if pd.isna(key):
+        return None
+
+    return key.item() if isinstance(key, np.generic) else key
+
+
+def to_json_value(value: Any) -> Any:
+    if value is pd.NA:
+        return None
+
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def aggregates_to_summary(aggregates: Munch) -> Munch:
+    """Convert aggregates (see `aggregate_traffic`) to summary, which can be written as JSON."""
+    summary = Munch((key, to_json_value(value)) for key, value in aggregates.summary.items())
+    for name in ['direction'] + list(PROTOCOL_COLUMNS) + ['ip']:
+        summary['{}_data'.format(name)] = table_to_dict(aggregates[name])
+
+    return summary
+
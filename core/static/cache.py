@@ -0,0 +1,127 @@
+"""Cache of static data tables (see `StaticData`) compiled from data files in `core/static`.
+
+Each table is a set of NumPy arrays, saved as `.npy` files in a directory named by the table and version of the table,
+in a cache directory named by hash of the data files. Tables are compiled again when a data file or the version of a
+table changes. Cached arrays are memory mapped read-only, so processes using the same cache share pages of the cache
+files in page cache. Arrays are loaded without pickle, so cache files can not contain executable objects.
+
+The cache is only used if a cache directory is given, or set in `STATIC_DATA_CACHE_DIR` environment variable.
+"""
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+from typing import Callable, Dict, Iterable
+
+import numpy as np
+
+# Increase when format of cache files changes, so that tables cached by an older version are not used
+STATIC_DATA_CACHE_VERSION = 2
+STATIC_DATA_CACHE_DIR_ENV = 'STATIC_DATA_CACHE_DIR'
+ARRAY_FILE_SUFFIX = '.npy'
+
+
+def get_files_hash(file_paths: Iterable[str]) -> str:
+    """Get hash of contents of files and version of cache format. Missing files are hashed as empty files with a
+    different marker."""
+    files_hash = hashlib.sha256(str(STATIC_DATA_CACHE_VERSION).encode())
+    for file_path in file_paths:
+        try:
+            with open(file_path, 'rb') as data_file:
+                files_hash.update(b'file:' + hashlib.sha256(data_file.read()).digest())
+
+        except OSError:
+            files_hash.update(b'missing')
+
+    return files_hash.hexdigest()
+
+
+def read_array_files(dir_path: str) -> Dict[str, np.ndarray]:
+    """Memory map arrays of a table read-only. Raises FileNotFoundError if table is not cached."""
+    arrays = {}
+    for file_name in os.listdir(dir_path):
+        if file_name.endswith(ARRAY_FILE_SUFFIX):
+            array = np.load(os.path.join(dir_path, file_name), mmap_mode='r', allow_pickle=False)
+            # Plain array view of the memory map, indexing `np.memmap` is slower
+            arrays[file_name[:-len(ARRAY_FILE_SUFFIX)]] = np.asarray(array)
+
+    return arrays
+
+
+def write_array_files(dir_path: str, arrays: Dict[str, np.ndarray]) -> None:
+    """Write arrays of a table to a temporary directory, which is renamed to `dir_path`, so that other processes never
+    read a partially written table."""
+    temp_dir_path = tempfile.mkdtemp(dir=os.path.dirname(dir_path), suffix='.tmp')
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(temp_dir_path, name + ARRAY_FILE_SUFFIX), array, allow_pickle=False)
+        os.rename(temp_dir_path, dir_path)
+
+    except OSError:
+        shutil.rmtree(temp_dir_path, ignore_errors=True)
+        # Table was written by another process
+        if not os.path.isdir(dir_path):
+            raise
+
+
+class StaticDataCache:
+    def __init__(self, source_file_paths: Iterable[str], cache_dir: str = None):
+        """Cache of tables compiled from static data files.
+
+        Parameters
+        ----------
+        source_file_paths: Iterable[str]
+            Paths of data files from which tables are compiled
+        cache_dir: str, optional
+            Directory of cached tables. Default: `STATIC_DATA_CACHE_DIR` environment variable. Tables are not cached if
+            neither is set (or set to empty string).
+        """
+        if cache_dir is None:
+            cache_dir = os.environ.get(STATIC_DATA_CACHE_DIR_ENV)
+        self.cache_dir = cache_dir
+        self.cache_path = None
+        if cache_dir:
+            self.cache_path = os.path.join(cache_dir, get_files_hash(source_file_paths))
+
+    def get(self, name: str, build_arrays: Callable[[], Dict[str, np.ndarray]], version: int) -> Dict[str, np.ndarray]:
+        """Load arrays of table from cache, or build the table and save it to cache.
+
+        Parameters
+        ----------
+        name: str
+            Name of table, used as name of cache directory of table
+        build_arrays: Callable[[], Dict[str, np.ndarray]]
+            Function which compiles the table from data files, as arrays by name. Arrays must not contain Python
+            objects, e.g. strings are stored in unicode arrays.
+        version: int
+            Version of table. Increase when compiling of table, or arrays of table change.
+
+        Returns
+        -------
+        arrays: Dict[str, np.ndarray]
+            Arrays of cached (read-only) or compiled table. Errors in reading or writing cache are logged, and the table
+            is compiled.
+        """
+        if self.cache_path is None:
+            return build_arrays()
+
+        dir_path = os.path.join(self.cache_path, '{}-v{}'.format(name, version))
+        try:
+            return read_array_files(dir_path)
+
+        except FileNotFoundError:
+            pass
+
+        except Exception as ex:
+            logging.warning('Unable to load cached static data from `%s`. Error: `%s`', dir_path, ex)
+
+        arrays = build_arrays()
+        try:
+            os.makedirs(self.cache_path, exist_ok=True)
+            write_array_files(dir_path, arrays)
+
+        except Exception as ex:
+            logging.warning('Unable to save static data to cache `%s`. Error: `%s`', dir_path, ex)
+
+        return arrays
@@ -10,6 +10,7 @@ ETHER_TYPES_DATA_FILE_PATH = os.path.join(STATICS_DIR_PATH, 'ethertype_data.json
 LAYER4_PORTS_DATA_FILE_PATH = os.path.join(STATICS_DIR_PATH, 'layer4_port_data.json')
 TCP_FLAGS_DATA_FILE_PATH = os.path.join(STATICS_DIR_PATH, 'tcp_flags_data.json')
 MANUF_DATA_FILE_PATH = os.path.join(STATICS_DIR_PATH, 'manuf')
+P0F_FINGERPRINT_FILE_PATH = os.path.join(os.path.dirname(STATICS_DIR_PATH), 'bin', 'p0f.fp')
 IEEE80211_PROTOCOL_NUMBER = 34958
 EXCLUDED_MACS = [
     'FF:FF:FF:FF:FF:FF',       # Broadcast
@@ -0,0 +1,49 @@
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+class NameTable:
+    def __init__(self, codes: np.ndarray, names: np.ndarray, default: Callable[[int], Optional[str]] = None):
+        """Table of names of values (e.g. ether types or port numbers), stored as arrays which can be memory mapped
+        from cache, see `StaticDataCache`.
+
+        Parameters
+        ----------
+        codes: np.ndarray
+            Index of name of each value in `names`, -1 for values without name
+        names: np.ndarray
+            Distinct names (unicode array)
+        default: Callable[[int], Optional[str]], optional
+            Function which returns name of a value without name. Default: None is the name of values without name.
+        """
+        self.codes = codes
+        self.names = names
+        self.default = default
+
+    @staticmethod
+    def build_arrays(names: Sequence[Optional[str]]) -> Dict[str, np.ndarray]:
+        """Get arrays of table from list of names indexed by value (None for values without name)."""
+        distinct_names = sorted({name for name in names if name is not None})
+        indices = {name: index for index, name in enumerate(distinct_names)}
+        return {
+            'codes': np.array([-1 if name is None else indices[name] for name in names], dtype=np.int32),
+            'names': np.array(distinct_names, dtype=str),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], default: Callable[[int], Optional[str]] = None) -> 'NameTable':
+        return cls(arrays['codes'], arrays['names'], default=default)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, value: int) -> Optional[str]:
+        code = self.codes.item(value)
+        if code < 0:
+            return None if self.default is None else self.default(value)
+
+        return self.names.item(code)
+
+    def to_list(self) -> List[Optional[str]]:
+        return [self[value] for value in range(len(self))]
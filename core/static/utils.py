@@ -1,24 +1,181 @@
 import logging
 import socket
-from typing import Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+import numpy as np
 from munch import Munch, DefaultMunch
 
 from core.file_processor.errors import FileError
 from core.file_processor.json_file import JsonFileProcessor
-from core.lib.manuf_file import load_manuf_file
+from core.lib.manuf_file import OuiIndex, load_manuf_file
+from core.static.cache import StaticDataCache
 from core.static.constants import IP_PROTOCOLS_DATA_FILE_PATH, LAYER4_PORTS_DATA_FILE_PATH, TCP_FLAGS_DATA_FILE_PATH, \
     MANUF_DATA_FILE_PATH, ETHER_TYPES_DATA_FILE_PATH, IP_OPTIONS_DATA_FILE_PATH
+from core.static.patterns import LAYER4_PROTOCOLS
+from core.static.tables import NameTable
+
+ETHER_TYPE_COUNT = 65536
+IP_PROTOCOL_COUNT = 256
+PORT_COUNT = 65536
+STATIC_DATA_FILE_PATHS = (
+    IP_PROTOCOLS_DATA_FILE_PATH, IP_OPTIONS_DATA_FILE_PATH, LAYER4_PORTS_DATA_FILE_PATH, TCP_FLAGS_DATA_FILE_PATH,
+    ETHER_TYPES_DATA_FILE_PATH, MANUF_DATA_FILE_PATH,
+)
 
 
 class StaticData:
-    def __init__(self):
-        self.ip_protocol_data = self.load_ip_protocols_data()
-        self.ip_options_data = self.load_ip_options_data()
-        self.layer4_ports_data = self.load_layer4_ports_data()
-        self.tcp_flag_data = self.load_tcp_flag_data()
-        self.ether_types_data = self.load_ether_types_data()
-        self.manuf_data = self.load_manuf_data()
+    # Versions of compiled tables, increase when compiling of a table changes, see `StaticDataCache.get`
+    NAME_TABLE_VERSION = 1
+    OUI_INDEX_VERSION = 1
+
+    def __init__(self, cache_dir: str = None):
+        """Protocol, port and manufacturer data loaded from files in `core/static`. Data files are loaded when these
+        are used. Lookup tables compiled from the files can be cached, see `StaticDataCache`.
+
+        Parameters
+        ----------
+        cache_dir: str, optional
+            Directory of cached tables, see `StaticDataCache`. Default: `STATIC_DATA_CACHE_DIR` environment variable.
+            Tables are not cached if neither is set.
+        """
+        self.cache = StaticDataCache(STATIC_DATA_FILE_PATHS, cache_dir=cache_dir)
+        self._data = {}     # type: Dict[str, Optional[Munch]]
+        self._oui_index = None
+        # Names of ether types, IP protocols and ports, compiled on first use, see `get_ether_type_names`
+        self._lookup_tables = {}  # type: Dict[str, NameTable]
+
+    def get_data(self, name: str, load_data: Callable[[], Optional[Munch]]) -> Optional[Munch]:
+        if name not in self._data:
+            self._data[name] = load_data()
+
+        return self._data[name]
+
+    @property
+    def ip_protocol_data(self) -> Optional[Munch]:
+        return self.get_data('ip_protocol_data', self.load_ip_protocols_data)
+
+    @property
+    def ip_options_data(self) -> Optional[Munch]:
+        return self.get_data('ip_options_data', self.load_ip_options_data)
+
+    @property
+    def layer4_ports_data(self) -> Optional[Munch]:
+        return self.get_data('layer4_ports_data', self.load_layer4_ports_data)
+
+    @property
+    def tcp_flag_data(self) -> Optional[Munch]:
+        return self.get_data('tcp_flag_data', self.load_tcp_flag_data)
+
+    @property
+    def ether_types_data(self) -> Optional[Munch]:
+        return self.get_data('ether_types_data', self.load_ether_types_data)
+
+    @property
+    def manuf_data(self) -> Optional[Munch]:
+        return self.get_data('manuf_data', self.load_manuf_data)
+
+    def get_oui_index(self) -> OuiIndex:
+        """Get index of manufacturers by MAC address prefixes, see `OuiIndex`. Index is empty if manufacturer data is
+        not available."""
+        if self._oui_index is None:
+            def build_arrays() -> Dict[str, np.ndarray]:
+                return OuiIndex.build_arrays(load_manuf_file(manuf_file_path=MANUF_DATA_FILE_PATH) or {})
+
+            self._oui_index = OuiIndex.from_arrays(
+                self.cache.get('oui_index', build_arrays, version=self.OUI_INDEX_VERSION))
+
+        return self._oui_index
+
+    def get_lookup_table(
+            self,
+            name: str,
+            build_table: Callable[[], List[Optional[str]]],
+            default: Callable[[int], Optional[str]] = None
+    ) -> NameTable:
+        """Get lookup table from memory or cache, or build it."""
+        table = self._lookup_tables.get(name)
+        if table is None:
+            arrays = self.cache.get(
+                name, lambda: NameTable.build_arrays(build_table()), version=self.NAME_TABLE_VERSION)
+            table = self._lookup_tables[name] = NameTable.from_arrays(arrays, default=default)
+
+        return table
+
+    def get_ether_type_names(self) -> NameTable:
+        """Get names of ether types (lowercase protocol abbreviation, or hexadecimal ether type if abbreviation is not
+        known), indexed by ether type."""
+        def build_table() -> List[Optional[str]]:
+            ether_types_data = self.ether_types_data or {}
+            return [
+                ether_types_data.get(hex(ether_type)[2:], {}).get('protocol_abbrv', '').lower() or None
+                for ether_type in range(ETHER_TYPE_COUNT)
+            ]
+
+        return self.get_lookup_table('ether_type_names', build_table, default=lambda ether_type: hex(ether_type)[2:])
+
+    def get_ip_protocol_names(self) -> NameTable:
+        """Get names of IP protocols (protocol keyword, or protocol number if keyword is not known), indexed by protocol
+        number."""
+        def build_table() -> List[Optional[str]]:
+            ip_protocol_data = self.ip_protocol_data or {}
+            return [
+                ip_protocol_data.get(str(proto_num), {}).get('keyword', '') or None
+                for proto_num in range(IP_PROTOCOL_COUNT)
+            ]
+
+        return self.get_lookup_table('ip_protocol_names', build_table, default=str)
+
+    def get_layer4_port_names(self, protocol_type: str, delimiter: str) -> NameTable:
+        """Get names of protocols using TCP or UDP ports, indexed by port number. Name is protocol abbreviation, or
+        protocol description if abbreviation is not known, and None for unknown ports. Names of multiple protocols
+        using the same port are joined with `delimiter`.
+
+        Parameters
+        ----------
+        protocol_type: str
+            `tcp` or `udp`
+        delimiter: str
+            Delimiter of multiple values in a field, i.e. `FieldDelimiter` in configuration
+        """
+        def build_table() -> List[Optional[str]]:
+            names = [None] * PORT_COUNT     # type: List[Optional[str]]
+            for port, protocol_data in (self.layer4_ports_data or {}).items():
+                if 0 <= int(port) < PORT_COUNT:
+                    protocol_abbrv, protocol_description = self.get_port_protocol_info(
+                        protocol_data, protocol_type, delimiter)
+                    names[int(port)] = protocol_abbrv or protocol_description
+            return names
+
+        # Name of cache directory must not contain characters of delimiter
+        name = 'layer4_port_names_{}_{}'.format(protocol_type, delimiter.encode().hex())
+        return self.get_lookup_table(name, build_table)
+
+    @staticmethod
+    def get_port_protocol_info(data: Any, protocol_type: str, delimiter: str) -> Tuple:
+        """Get abbreviations and descriptions of protocols from data of a port in `layer4_ports_data`, joined with
+        `delimiter`. Only protocols using `protocol_type` (`tcp` or `udp`) are included."""
+        if isinstance(data, dict):
+            data = [data]
+
+        elif not isinstance(data, list):
+            # Unexpected (invalid) data type
+            return None, None
+
+        protocol_info = [StaticData.get_protocol_info(item, protocol_type, delimiter) for item in data]
+        return delimiter.join([abbrv for abbrv, _ in protocol_info if abbrv]), \
+            delimiter.join([description for _, description in protocol_info if description])
+
+    @staticmethod
+    def get_protocol_info(data: dict, protocol_type: str, delimiter: str) -> Tuple:
+        """Get abbreviation and description of a protocol using a port, if it uses `protocol_type`."""
+        protocol_abbrv = ''
+        protocol_description = ''
+
+        if protocol_type in LAYER4_PROTOCOLS and data[protocol_type] is True:
+            protocol_abbrv = data.get('abbrv')
+            protocol_description = data.get('description')
+
+        return protocol_abbrv.replace(',', delimiter), protocol_description.replace(',', delimiter)
 
     @staticmethod
     def load_manuf_data(file_path: str = MANUF_DATA_FILE_PATH) -> Optional[Munch]:
@@ -2,7 +2,8 @@
 
 # This script converts pcapng files to pcap format. In some cases, pcap files saved from 
 # Wireshark are of pcapng format. Therefore, they need to be converted to pcap before we 
-# can process the files
+# can process the files. PcapProcessor reads pcapng files directly, so this conversion is only
+# needed for other tools which do not support pcapng.
 
 
 import os
@@ -0,0 +1,188 @@
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+
+import dpkt
+
+from core.analyzer.pcap_processor import PcapProcessor
+from core.configuration.data import ConfigurationData
+from core.file_processor.errors import FileError
+from core.lib.packet_filter import PacketFilter
+from core.static.constants import P0F_FINGERPRINT_FILE_PATH
+from core.static.utils import StaticData
+from tests.core.lib.common import CONFIGURATION_DATA, CONFIGURATION_OBJ
+from tests.fixtures.packets import START_TIMESTAMP, build_mixed_packets, build_tcp_packet, write_pcap_file, \
+    write_pcapng_file
+
+P0F_WD = os.path.dirname(P0F_FINGERPRINT_FILE_PATH)
+
+
+class PcapProcessorTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pcap_processor = PcapProcessor(config=CONFIGURATION_OBJ, static_data=StaticData())
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.packets = build_mixed_packets(60)
+        self.pcap_file_path = write_pcap_file(os.path.join(self.temp_dir, 'test.pcap'), self.packets)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def read_file(self, file_path: str) -> str:
+        with open(file_path) as data_file:
+            return data_file.read()
+
+    def process(self, input_file: str, output_name: str, pcap_processor: PcapProcessor = None, pcap_filter: str = '') \
+            -> str:
+        output_file = os.path.join(self.temp_dir, output_name)
+        (pcap_processor or self.pcap_processor).process(
+            input_file=input_file, output_file=output_file, pcap_filter=pcap_filter)
+
+        return self.read_file(output_file)
+
+    def test_pcapng_file_is_processed_same_as_pcap_file(self):
+        pcapng_file_path = write_pcapng_file(os.path.join(self.temp_dir, 'test.pcapng'), self.packets, tsresols=(6,))
+        # pcapng files are often saved with .pcap extension
+        pcapng_file_with_pcap_ext = write_pcapng_file(
+            os.path.join(self.temp_dir, 'test_ng.pcap'), self.packets, tsresols=(6,), big_endian=True)
+
+        expected_output = self.process(self.pcap_file_path, 'expected.csv')
+
+        self.assertEqual(expected_output, self.process(pcapng_file_path, 'pcapng.csv'))
+        self.assertEqual(expected_output, self.process(pcapng_file_with_pcap_ext, 'pcapng_ext.csv'))
+
+    def test_pcap_file_is_processed_same_with_mmap_reader(self):
+        config = ConfigurationData.load(dict(CONFIGURATION_DATA, use_mmap_reader=True))
+        mmap_pcap_processor = PcapProcessor(config=config, static_data=self.pcap_processor.static_data)
+
+        self.assertEqual(
+            self.process(self.pcap_file_path, 'expected.csv'),
+            self.process(self.pcap_file_path, 'mmap.csv', pcap_processor=mmap_pcap_processor)
+        )
+
+    def test_only_packets_matching_filter_are_processed(self):
+        pcap_filter = 'udp and not ip6 or time >= {}'.format(START_TIMESTAMP + 10)
+        packets = PacketFilter(pcap_filter).filter(self.packets)
+        filtered_file_path = write_pcap_file(os.path.join(self.temp_dir, 'filtered.pcap'), list(packets))
+        pcapng_file_path = write_pcapng_file(os.path.join(self.temp_dir, 'test.pcapng'), self.packets, tsresols=(6,))
+        config = ConfigurationData.load(dict(CONFIGURATION_DATA, use_mmap_reader=True))
+        mmap_pcap_processor = PcapProcessor(config=config, static_data=self.pcap_processor.static_data)
+
+        expected_output = self.process(filtered_file_path, 'expected.csv')
+
+        self.assertEqual(expected_output, self.process(self.pcap_file_path, 'pcap.csv', pcap_filter=pcap_filter))
+        self.assertEqual(expected_output, self.process(pcapng_file_path, 'pcapng.csv', pcap_filter=pcap_filter))
+        self.assertEqual(expected_output, self.process(
+            self.pcap_file_path, 'mmap.csv', pcap_processor=mmap_pcap_processor, pcap_filter=pcap_filter))
+        with self.assertRaises(FileError):
+            self.process(self.pcap_file_path, 'invalid.csv', pcap_filter='udp and')
+
+    def test_processing_is_resumed_from_checkpoint(self):
+        expected_output = self.process(self.pcap_file_path, 'expected.csv')
+        output_file = os.path.join(self.temp_dir, 'resumed.csv')
+        checkpoints = []
+
+        def interrupt_after_second_checkpoint(checkpoint):
+            checkpoints.append(checkpoint)
+            if len(checkpoints) == 2:
+                raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            self.pcap_processor.process_resumable(
+                self.pcap_file_path, output_file, checkpoint_callback=interrupt_after_second_checkpoint,
+                checkpoint_interval=20)
+
+        pcap_file_info = self.pcap_processor.process_resumable(
+            self.pcap_file_path, output_file, checkpoint=checkpoints[0], checkpoint_interval=20)
+
+        self.assertEqual(expected_output, self.read_file(output_file))
+        self.assertEqual(len(self.packets), pcap_file_info.packet_count)
+        self.assertEqual(self.packets[0][0], pcap_file_info.start_time)
+
+    @unittest.skipUnless(os.access(os.path.join(P0F_WD, 'p0f'), os.X_OK), 'p0f executable is not available')
+    def test_syn_packets_are_fingerprinted_same_with_p0f_process(self):
+        mss_option = b'\x02\x04\x05\xb4'
+        syn_packets = [
+            (START_TIMESTAMP + i * 1.5 + 0.1, build_tcp_packet(
+                sport=30000 + i, flags=dpkt.tcp.TH_SYN, payload=b'', opts=mss_option + b'\x01' * (i % 3 * 4)))
+            for i in range(10)
+        ]
+        pcap_file_path = write_pcap_file(
+            os.path.join(self.temp_dir, 'syn.pcap'), sorted(self.packets + syn_packets, key=lambda packet: packet[0]))
+        config = ConfigurationData.load(dict(
+            CONFIGURATION_DATA, syn_fingerprint_backend='p0f', p0f_wd=P0F_WD, p0f_executable='./p0f', p0f_batch_size=4))
+        p0f_pcap_processor = PcapProcessor(config=config, static_data=self.pcap_processor.static_data)
+
+        try:
+            output = self.process(pcap_file_path, 'p0f.csv', pcap_processor=p0f_pcap_processor)
+
+        finally:
+            p0f_pcap_processor.close()
+
+        self.assertEqual(self.process(pcap_file_path, 'expected.csv'), output)
+        self.assertIn('4:64+0:0:1460:mss*44;0:mss:df;id+:0', output)
+
+    def test_pcap_file_is_processed_same_without_batch_decoding(self):
+        config = ConfigurationData.load(dict(CONFIGURATION_DATA, decode_batch_size=0))
+        dpkt_pcap_processor = PcapProcessor(config=config, static_data=self.pcap_processor.static_data)
+
+        self.assertIsNone(dpkt_pcap_processor.batch_decoder)
+        self.assertEqual(
+            self.process(self.pcap_file_path, 'dpkt.csv', pcap_processor=dpkt_pcap_processor),
+            self.process(self.pcap_file_path, 'expected.csv')
+        )
+
+    def test_only_result_fields_are_written(self):
+        fields = ['timestamp', 'src_ip', 'dst_port', 'tcp_ack_flag', 'dns_query_domain']
+        config = ConfigurationData.load(dict(CONFIGURATION_DATA, ResultFields=fields))
+        pcap_processor = PcapProcessor(config=config, static_data=self.pcap_processor.static_data)
+
+        expected_rows = list(csv.DictReader(self.process(self.pcap_file_path, 'expected.csv').splitlines()))
+        rows = list(csv.DictReader(self.process(self.pcap_file_path, 'fields.csv', pcap_processor).splitlines()))
+
+        self.assertEqual(fields, list(rows[0].keys()))
+        self.assertEqual([{field: row[field] for field in fields} for row in expected_rows], rows)
+
+    def test_results_are_partitioned_by_values_of_partition_fields(self):
+        fields = ['timestamp', 'src_ip', 'dst_port']
+        config = ConfigurationData.load(dict(
+            CONFIGURATION_DATA, ResultFields=fields, ResultPartitionFields=['src_mac', 'dst_mac'],
+            ResultPartitionMaxOpenFiles=1
+        ))
+        pcap_processor = PcapProcessor(config=config, static_data=self.pcap_processor.static_data)
+
+        expected_rows = list(csv.DictReader(self.process(self.pcap_file_path, 'expected.csv').splitlines()))
+        partitions = list(csv.DictReader(self.process(self.pcap_file_path, 'devices.csv', pcap_processor).splitlines()))
+
+        self.assertEqual(
+            sorted({row['src_mac'] for row in expected_rows} | {row['dst_mac'] for row in expected_rows}),
+            sorted(partition['partition'] for partition in partitions)
+        )
+        for partition in partitions:
+            with self.subTest(partition=partition['partition']):
+                self.assertEqual('devices-{}.csv'.format(partition['partition']), partition['file'])
+                rows = list(csv.DictReader(self.read_file(os.path.join(self.temp_dir, partition['file'])).splitlines()))
+                self.assertEqual(
+                    [{field: row[field] for field in fields} for row in expected_rows
+                     if partition['partition'] in (row['src_mac'], row['dst_mac'])],
+                    rows
+                )
+                self.assertEqual(len(rows), int(partition['row_count']))
+
+    def test_layers_not_needed_for_result_fields_are_not_processed(self):
+        config = ConfigurationData.load(dict(CONFIGURATION_DATA, ResultFields=['timestamp', 'src_mac', 'src_port']))
+        pcap_processor = PcapProcessor(config=config, static_data=self.pcap_processor.static_data)
+        packet = build_tcp_packet(flags=dpkt.tcp.TH_SYN, payload=b'')
+
+        packet_data = pcap_processor.extract_stats_from_packet(START_TIMESTAMP, packet, START_TIMESTAMP)
+
+        self.assertIsNotNone(packet_data.src_mac)
+        self.assertEqual(50123, packet_data.src_port)
+        self.assertIsNone(packet_data.src_ip)
+        self.assertIsNone(packet_data.syn_signature)
+        # SYN packets are decoded in batches, when these are not fingerprinted
+        self.assertIsNotNone(pcap_processor.batch_decoder.decode([packet])[0])
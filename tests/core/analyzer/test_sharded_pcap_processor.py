@@ -0,0 +1,125 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from core.analyzer.pcap_processor import PcapProcessor
+from core.analyzer.sharded_pcap_processor import ShardedPcapProcessor, close_shard_worker_processor, \
+    get_shard_worker_processor
+from core.configuration.data import ConfigurationData
+from core.file_processor.result_writer import ColumnarResultWriter
+from core.models.packet_record import PacketRecord
+from core.static.utils import StaticData
+from tests.core.lib.common import CONFIGURATION_DATA, CONFIGURATION_OBJ
+from tests.fixtures.packets import build_mixed_packets, write_pcap_file
+
+
+class ShardedPcapProcessorTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.static_data = StaticData()
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.pcap_file_path = write_pcap_file(os.path.join(self.temp_dir, 'test.pcap'), build_mixed_packets(300))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_sharded_processing_output_matches_single_process_output(self):
+        single_output = os.path.join(self.temp_dir, 'single.csv')
+        sharded_output = os.path.join(self.temp_dir, 'sharded.csv')
+
+        single_info = PcapProcessor(config=CONFIGURATION_OBJ, static_data=self.static_data).process(
+            input_file=self.pcap_file_path, output_file=single_output)
+        sharded_info = ShardedPcapProcessor(
+            config=CONFIGURATION_OBJ, static_data=self.static_data, shard_count=3, min_shard_size=1
+        ).process(input_file=self.pcap_file_path, output_file=sharded_output)
+
+        with open(single_output) as single_file, open(sharded_output) as sharded_file:
+            self.assertEqual(single_file.read(), sharded_file.read())
+        self.assertEqual(single_info.packet_count, sharded_info.packet_count)
+        self.assertEqual(single_info.total_data, sharded_info.total_data)
+        self.assertEqual(single_info.start_time, sharded_info.start_time)
+        self.assertEqual(single_info.stop_time, sharded_info.stop_time)
+        self.assertEqual(['sharded.csv', 'single.csv', 'test.pcap'], sorted(os.listdir(self.temp_dir)))
+
+    def test_sharded_parquet_output_matches_single_process_output(self):
+        config = ConfigurationData.load(dict(CONFIGURATION_DATA, ResultFileFormat='parquet', ResultBatchSize=50))
+        single_output = os.path.join(self.temp_dir, 'single.parquet')
+        sharded_output = os.path.join(self.temp_dir, 'sharded.parquet')
+
+        PcapProcessor(config=config, static_data=self.static_data).process(
+            input_file=self.pcap_file_path, output_file=single_output)
+        ShardedPcapProcessor(
+            config=config, static_data=self.static_data, shard_count=3, min_shard_size=1
+        ).process(input_file=self.pcap_file_path, output_file=sharded_output)
+
+        pd.testing.assert_frame_equal(pd.read_parquet(single_output), pd.read_parquet(sharded_output))
+        self.assertEqual(300, len(pd.read_parquet(sharded_output)))
+
+    def test_shard_worker_processor_is_closed_when_worker_exits(self):
+        processor = get_shard_worker_processor(CONFIGURATION_OBJ)
+        self.assertIs(processor, get_shard_worker_processor(CONFIGURATION_OBJ))
+
+        with mock.patch.object(processor, 'close') as close:
+            close_shard_worker_processor()
+
+        close.assert_called_once_with()
+        self.assertIsNot(processor, get_shard_worker_processor(CONFIGURATION_OBJ))
+        close_shard_worker_processor()
+
+    def test_columnar_shard_files_are_merged_in_timestamp_order(self):
+        config = ConfigurationData.load(dict(CONFIGURATION_DATA, ResultFields=['timestamp', 'size']))
+        processor = ShardedPcapProcessor(config=config, static_data=self.static_data, shard_count=3, min_shard_size=1)
+        shard_timestamps = [[1.0, 2.0, 2.0, 5.0, 6.0], [0.5, 2.0, 3.0, 3.0, 7.0, 8.0], [], [2.0, 9.0]]
+        shard_files = []
+        for shard_index, timestamps in enumerate(shard_timestamps):
+            shard_file = os.path.join(self.temp_dir, 'shard-{}.arrow'.format(shard_index))
+            with ColumnarResultWriter(shard_file, file_format='arrow', batch_size=2, fields=processor.result_fields) \
+                    as shard_writer:
+                for row_index, timestamp in enumerate(timestamps):
+                    shard_writer.write(PacketRecord(timestamp=timestamp, size=shard_index * 100 + row_index))
+            shard_files.append(shard_file)
+        output_file = os.path.join(self.temp_dir, 'merged.parquet')
+
+        result_writer = ColumnarResultWriter(output_file, batch_size=3, fields=processor.result_fields)
+        processor.merge_columnar_shard_files(shard_files, result_writer)
+        result_writer.close()
+
+        expected_data = pd.concat([pd.read_feather(shard_file) for shard_file in shard_files], ignore_index=True)
+        expected_data = expected_data.sort_values('timestamp', kind='stable', ignore_index=True)
+        pd.testing.assert_frame_equal(expected_data, pd.read_parquet(output_file))
+        self.assertEqual([0.5, 1.0, 2.0, 2.0, 2.0, 2.0], pd.read_parquet(output_file).timestamp.tolist()[:6])
+
+    def test_sharded_output_with_result_fields_matches_single_process_output(self):
+        for fields in (['src_ip', 'timestamp', 'dst_port'], ['src_ip', 'dst_port']):
+            config = ConfigurationData.load(dict(CONFIGURATION_DATA, ResultFields=fields))
+            single_output = os.path.join(self.temp_dir, 'single.csv')
+            sharded_output = os.path.join(self.temp_dir, 'sharded.csv')
+
+            PcapProcessor(config=config, static_data=self.static_data).process(
+                input_file=self.pcap_file_path, output_file=single_output)
+            ShardedPcapProcessor(
+                config=config, static_data=self.static_data, shard_count=3, min_shard_size=1
+            ).process(input_file=self.pcap_file_path, output_file=sharded_output)
+
+            with open(single_output) as single_file, open(sharded_output) as sharded_file:
+                self.assertEqual(single_file.read(), sharded_file.read())
+
+    def test_sharded_output_with_filter_matches_single_process_output(self):
+        single_output = os.path.join(self.temp_dir, 'single.csv')
+        sharded_output = os.path.join(self.temp_dir, 'sharded.csv')
+
+        PcapProcessor(config=CONFIGURATION_OBJ, static_data=self.static_data).process(
+            input_file=self.pcap_file_path, output_file=single_output, pcap_filter='tcp port 443')
+        sharded_info = ShardedPcapProcessor(
+            config=CONFIGURATION_OBJ, static_data=self.static_data, shard_count=3, min_shard_size=1
+        ).process(input_file=self.pcap_file_path, output_file=sharded_output, pcap_filter='tcp port 443')
+
+        with open(single_output) as single_file, open(sharded_output) as sharded_file:
+            self.assertEqual(single_file.read(), sharded_file.read())
+        self.assertEqual(100, sharded_info.packet_count)
@@ -0,0 +1,163 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from core.configuration.data import ConfigurationData
+from core.file_processor.errors import FileError
+from core.file_processor.result_writer import CsvResultWriter, ColumnarResultWriter, get_result_writer
+from core.lib.compression import COMPRESSIONS, get_compression_extension
+from core.models.packet_data import PACKET_DATA_FIELDS
+from core.models.packet_record import PacketRecord
+from core.pandas_utils.dataframe_utils import load_csv_to_dataframe
+from tests.core.lib.common import CONFIGURATION_DATA
+
+
+class ResultWriterTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.records = [
+            PacketRecord(timestamp=1.5, size=60, src_mac='00:11:22:33:44:55', src_port=53, tcp_syn_flag=True,
+                         ip_proto='TCP', dns_query_domain='example.com'),
+            PacketRecord(timestamp=2.0, size=1514, eth_payload_size=1500.0, ip_do_not_fragment=0, src_ip=3232235521),
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_csv_result_writer_writes_headers_and_rows(self):
+        file_path = os.path.join(self.temp_dir, 'sub', 'results.csv')
+        with CsvResultWriter(file_path, delimiter=',') as result_writer:
+            for record in self.records:
+                result_writer.write(record)
+
+        with open(file_path) as result_file:
+            lines = result_file.read().splitlines()
+
+        self.assertEqual(','.join(PACKET_DATA_FIELDS), lines[0])
+        self.assertEqual([record.to_csv_string() for record in self.records], lines[1:])
+
+    def test_buffered_csv_result_writer_writes_same_data(self):
+        expected_lines = [','.join(PACKET_DATA_FIELDS)] + [record.to_csv_string() for record in self.records * 50]
+        for background in [False, True]:
+            file_path = os.path.join(self.temp_dir, 'results.csv')
+            with CsvResultWriter(file_path, buffer_size=1000, background=background) as result_writer:
+                for record in self.records * 50:
+                    result_writer.write(record)
+
+            with open(file_path) as result_file:
+                self.assertEqual(expected_lines, result_file.read().splitlines())
+
+    def test_background_csv_result_writer_raises_write_errors(self):
+        result_writer = CsvResultWriter(os.path.join(self.temp_dir, 'results.csv'), buffer_size=1, background=True)
+        result_writer.result_file.close()   # Writes in background thread fail
+
+        with self.assertRaises(FileError):
+            for record in self.records * 10:
+                result_writer.write(record)
+            result_writer.close()
+
+    def test_columnar_result_writer_writes_typed_columns(self):
+        for file_format in ['parquet', 'arrow']:
+            file_path = os.path.join(self.temp_dir, 'results.{}'.format(file_format))
+            with ColumnarResultWriter(file_path, file_format=file_format, batch_size=1) as result_writer:
+                for record in self.records:
+                    result_writer.write(record)
+
+            if file_format == 'parquet':
+                data = pd.read_parquet(file_path)
+            else:
+                data = pd.read_feather(file_path)
+
+            self.assertEqual(list(PACKET_DATA_FIELDS), list(data.columns))
+            self.assertEqual([1.5, 2.0], data.timestamp.tolist())
+            self.assertEqual(53, data.src_port[0])
+            self.assertEqual(1500, data.eth_payload_size[1])
+            self.assertEqual([True, None], data.tcp_syn_flag.tolist())
+            self.assertEqual(False, data.ip_do_not_fragment[1])
+            self.assertEqual('3232235521', data.src_ip[1])
+
+    def test_result_writers_write_selected_fields(self):
+        fields = ['src_port', 'timestamp']
+        csv_file_path = os.path.join(self.temp_dir, 'results.csv')
+        with CsvResultWriter(csv_file_path, fields=fields) as result_writer:
+            for record in self.records:
+                result_writer.write(record)
+
+        with open(csv_file_path) as result_file:
+            self.assertEqual(['src_port,timestamp', '53,1.5', ',2.0'], result_file.read().splitlines())
+
+        parquet_file_path = os.path.join(self.temp_dir, 'results.parquet')
+        with ColumnarResultWriter(parquet_file_path, fields=['src_port']) as result_writer:
+            for record in self.records:
+                result_writer.write(record)
+
+        data = pd.read_parquet(parquet_file_path)
+        self.assertEqual(['src_port'], list(data.columns))
+        self.assertEqual(53, data.src_port[0])
+
+    def test_columnar_result_writer_writes_empty_file(self):
+        file_path = os.path.join(self.temp_dir, 'results.parquet')
+        ColumnarResultWriter(file_path).close()
+
+        data = pd.read_parquet(file_path)
+
+        self.assertEqual(0, len(data))
+        self.assertEqual(list(PACKET_DATA_FIELDS), list(data.columns))
+
+    def test_compressed_result_files_can_be_loaded(self):
+        for file_format, compression, file_name in [
+                ('csv', 'zstd', 'results.csv.zst'),
+                ('csv', 'gzip', 'results.csv.gz'),
+                ('parquet', 'zstd', 'results.parquet')
+        ]:
+            config = ConfigurationData.load(dict(CONFIGURATION_DATA, ResultFileFormat=file_format,
+                                                 ResultFileCompression=compression))
+            file_path = os.path.join(self.temp_dir, file_name)
+            with get_result_writer(config, file_path) as result_writer:
+                for record in self.records:
+                    result_writer.write(record)
+
+            data = load_csv_to_dataframe(file_path, fill_empty_values=False)
+
+            self.assertEqual([1.5, 2.0], data.timestamp.tolist())
+            self.assertEqual('example.com', data.dns_query_domain[0])
+
+    def test_partitioned_result_files_can_be_loaded(self):
+        # Writer of first partition is closed when other partitions are written, and its file is appended to (or its
+        # next part file is written) when the partition is used again
+        formats = [('csv', None, 'results.csv'), ('parquet', None, 'results.parquet')] + [
+            ('csv', compression, 'results.csv' + get_compression_extension(compression)) for compression in COMPRESSIONS
+        ]
+        for file_format, compression, file_name in formats:
+            config = ConfigurationData.load(dict(
+                CONFIGURATION_DATA, ResultFileFormat=file_format, ResultFileCompression=compression,
+                ResultPartitionFields=['src_mac', 'src_ip'], ResultPartitionMaxOpenFiles=1
+            ))
+            file_path = os.path.join(self.temp_dir, file_name)
+            with get_result_writer(config, file_path) as result_writer:
+                for record in self.records + self.records[:1] + [PacketRecord(timestamp=3.0)]:
+                    result_writer.write(record)
+
+            index = load_csv_to_dataframe(file_path, fill_empty_values=False)
+            self.assertEqual(['00:11:22:33:44:55', '3232235521', 'unknown'], index.partition.astype(str).tolist())
+            self.assertEqual([2, 1, 1], index.row_count.tolist())
+            for partition_file, timestamps in zip(index.file, [[1.5, 1.5], [2.0], [3.0]]):
+                partition_path = os.path.join(self.temp_dir, partition_file)
+                if file_format == 'csv':
+                    data = load_csv_to_dataframe(partition_path, fill_empty_values=False)
+                else:
+                    data = pd.read_parquet(partition_path)
+                self.assertEqual(timestamps, data.timestamp.tolist(), msg=compression)
+
+            if file_format == 'parquet':
+                self.assertEqual(['part-00000.parquet', 'part-00001.parquet'],
+                                 sorted(os.listdir(os.path.join(self.temp_dir, 'results-00:11:22:33:44:55'))))
+
+    def test_get_result_writer_raises_error_for_unsupported_format(self):
+        config = ConfigurationData.load(dict(CONFIGURATION_DATA, ResultFileFormat='xlsx'))
+
+        with self.assertRaises(FileError):
+            get_result_writer(config, os.path.join(self.temp_dir, 'results.xlsx'))
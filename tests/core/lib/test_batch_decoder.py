@@ -0,0 +1,79 @@
+import unittest
+
+import dpkt
+
+from core.analyzer.pcap_processor import PcapProcessor
+from core.configuration.data import ConfigurationData
+from core.static.utils import StaticData
+from tests.core.lib.common import CONFIGURATION_DATA, CONFIGURATION_OBJ
+from tests.fixtures.packets import build_arp_packet, build_dns_query_packet, build_mixed_packets, build_tcp_packet, \
+    build_udp6_packet, build_udp_packet
+
+
+class BatchPacketDecoderTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.static_data = StaticData()
+        cls.pcap_processor = PcapProcessor(config=CONFIGURATION_OBJ, static_data=cls.static_data)
+
+    def assert_decoded_same_as_dpkt(self, pcap_processor: PcapProcessor, packets: list) -> None:
+        records = pcap_processor.batch_decoder.decode(packets)
+        self.assertEqual(len(packets), len(records))
+        for packet, record in zip(packets, records):
+            if record is not None:
+                expected = pcap_processor.extract_stats_from_packet(ts=0, packet=packet, initial_timestamp=0)
+                self.assertEqual(expected.to_dict(), record.to_dict())
+
+    def test_common_packets_are_decoded_same_as_with_dpkt(self):
+        packets = [
+            build_tcp_packet(),
+            build_tcp_packet(sport=443, dport=50123, flags=dpkt.tcp.TH_FIN | dpkt.tcp.TH_ACK, opts=b'\x01' * 8),
+            build_tcp_packet(flags=dpkt.tcp.TH_SYN | dpkt.tcp.TH_ACK, payload=b'', ttl=128),
+            build_udp_packet(),
+            build_udp_packet(sport=9999, dport=8080, payload=b''),
+            build_udp6_packet(),
+            build_tcp_packet() + bytes(10),     # Ethernet trailer
+        ]
+        records = self.pcap_processor.batch_decoder.decode(packets)
+
+        self.assertNotIn(None, records)
+        self.assert_decoded_same_as_dpkt(self.pcap_processor, packets)
+        self.assertEqual('ipv4', records[0].eth_type)
+        self.assertEqual('TCP', records[0].ip_proto)
+        self.assertEqual(len(b'payload'), records[0].layer4_payload_size)
+        self.assertIs(True, records[0].ip_do_not_fragment)
+        self.assertIs(True, records[1].tcp_fin_flag)
+
+    def test_common_packets_are_decoded_same_as_with_dpkt_with_numeric_values(self):
+        config = ConfigurationData.load(dict(CONFIGURATION_DATA, use_numeric_values=True))
+        pcap_processor = PcapProcessor(config=config, static_data=self.static_data)
+        packets = [packet for _, packet in build_mixed_packets(20)]
+
+        self.assert_decoded_same_as_dpkt(pcap_processor, packets)
+        self.assertEqual(1, pcap_processor.batch_decoder.decode([build_tcp_packet()])[0].tcp_ack_flag)
+
+    def test_other_packets_are_not_decoded(self):
+        vlan_packet = build_tcp_packet()
+        vlan_packet = vlan_packet[:12] + b'\x81\x00\x00\x05' + vlan_packet[12:]
+        ip_options_packet = bytearray(build_udp_packet())
+        ip_options_packet[14] = 0x46
+        packets = [
+            build_tcp_packet(flags=dpkt.tcp.TH_SYN, payload=b''),   # SYN packets are fingerprinted
+            build_dns_query_packet(),
+            build_udp_packet(dport=123),
+            build_arp_packet(),
+            build_tcp_packet()[:40],        # Truncated
+            vlan_packet,
+            bytes(ip_options_packet),
+            b'',
+        ]
+
+        self.assertEqual([None] * len(packets), self.pcap_processor.batch_decoder.decode(packets))
+
+    def test_packets_of_batch_are_decoded_independently(self):
+        packets = [build_tcp_packet()[:30], build_udp_packet(), build_dns_query_packet(), build_udp6_packet()]
+
+        records = self.pcap_processor.batch_decoder.decode(packets)
+
+        self.assertEqual([False, True, False, True], [record is not None for record in records])
+        self.assert_decoded_same_as_dpkt(self.pcap_processor, packets)
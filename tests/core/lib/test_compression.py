@@ -0,0 +1,96 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from core.analyzer.pcap_processor import PcapProcessor
+from core.file_processor.errors import FileError
+from core.lib.compression import COMPRESSIONS, COMPRESSION_FILE_EXTENSIONS, detect_compression, \
+    open_compressed_file, split_compression_extension
+from core.static.utils import StaticData
+from tests.core.lib.common import CONFIGURATION_OBJ
+from tests.fixtures.packets import build_mixed_packets, write_pcap_file
+
+
+class CompressionTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_compressed_file_is_written_and_detected_and_read(self):
+        for compression in COMPRESSIONS:
+            file_path = os.path.join(self.temp_dir, 'data.csv.' + COMPRESSION_FILE_EXTENSIONS[compression])
+            with open_compressed_file(file_path, mode='w', compression=compression) as data_file:
+                data_file.write('a,b\n1,2\n' * 100)
+
+            self.assertEqual(compression, detect_compression(file_path))
+            with open_compressed_file(file_path, mode='r') as data_file:
+                self.assertEqual('a,b\n1,2\n' * 100, data_file.read())
+
+    def test_data_appended_to_compressed_file_is_read_after_existing_data(self):
+        for compression in COMPRESSIONS:
+            file_path = os.path.join(self.temp_dir, 'data.csv.' + COMPRESSION_FILE_EXTENSIONS[compression])
+            with open_compressed_file(file_path, mode='w', compression=compression) as data_file:
+                data_file.write('a,b\n1,2\n')
+            for mode in ['a', 'ab']:
+                with open_compressed_file(file_path, mode=mode, compression=compression) as data_file:
+                    data_file.write('3,4\n' if mode == 'a' else b'5,6\n')
+
+            with self.subTest(compression=compression), open_compressed_file(file_path, mode='r') as data_file:
+                self.assertEqual('a,b\n1,2\n3,4\n5,6\n', data_file.read())
+
+    def test_concatenated_compressed_files_are_read_as_one_file(self):
+        for compression in COMPRESSIONS:
+            file_paths = [os.path.join(self.temp_dir, '{}-{}'.format(compression, index)) for index in range(3)]
+            for index, file_path in enumerate(file_paths[:2]):
+                with open_compressed_file(file_path, mode='wb', compression=compression) as data_file:
+                    data_file.write('part {}\n'.format(index).encode() * 1000)
+            with open(file_paths[2], 'wb') as data_file:
+                for file_path in file_paths[:2]:
+                    with open(file_path, 'rb') as part_file:
+                        data_file.write(part_file.read())
+
+            with self.subTest(compression=compression), open_compressed_file(file_paths[2], mode='rb') as data_file:
+                self.assertEqual(b'part 0\n' * 1000 + b'part 1\n' * 1000, data_file.read())
+
+    def test_open_compressed_file_raises_error_for_unsupported_mode(self):
+        with self.assertRaises(FileError):
+            open_compressed_file(os.path.join(self.temp_dir, 'data.csv.gz'), mode='r+b', compression='gzip')
+
+    def test_uncompressed_file_is_not_detected_as_compressed(self):
+        file_path = os.path.join(self.temp_dir, 'data.csv')
+        with open(file_path, 'w') as data_file:
+            data_file.write('a,b\n')
+
+        self.assertIsNone(detect_compression(file_path))
+
+    def test_split_compression_extension(self):
+        self.assertEqual(('/a/test.pcap', 'gzip'), split_compression_extension('/a/test.pcap.gz'))
+        self.assertEqual(('/a/test.pcap', 'zstd'), split_compression_extension('/a/test.pcap.zst'))
+        self.assertEqual(('/a/test.pcap', None), split_compression_extension('/a/test.pcap'))
+
+    def test_open_compressed_file_raises_error_for_unsupported_compression(self):
+        with self.assertRaises(FileError):
+            open_compressed_file(os.path.join(self.temp_dir, 'data.csv.bz2'), mode='w', compression='bzip2')
+
+    def test_compressed_pcap_files_are_processed_same_as_uncompressed_files(self):
+        pcap_file_path = write_pcap_file(os.path.join(self.temp_dir, 'test.pcap'), build_mixed_packets(50))
+        pcap_processor = PcapProcessor(config=CONFIGURATION_OBJ, static_data=StaticData())
+        expected_output = os.path.join(self.temp_dir, 'expected.csv')
+        pcap_processor.process(input_file=pcap_file_path, output_file=expected_output)
+        with open(pcap_file_path, 'rb') as pcap_file:
+            pcap_data = pcap_file.read()
+
+        for compression in COMPRESSIONS:
+            compressed_file_path = pcap_file_path + '.' + COMPRESSION_FILE_EXTENSIONS[compression]
+            with open_compressed_file(compressed_file_path, mode='wb', compression=compression) as compressed_file:
+                compressed_file.write(pcap_data)
+
+            output = os.path.join(self.temp_dir, '{}.csv'.format(compression))
+            pcap_file_info = pcap_processor.process(input_file=compressed_file_path, output_file=output)
+
+            self.assertEqual(50, pcap_file_info.packet_count)
+            with open(expected_output) as expected_file, open(output) as output_file:
+                self.assertEqual(expected_file.read(), output_file.read())
@@ -1,14 +1,19 @@
 import socket
 import unittest
+from unittest.mock import patch
 
 import dpkt
 from dpkt.dns import DNS
 from dpkt.ntp import NTP
+from munch import Munch
 
+from core.analyzer.pcap_processor import PcapProcessor
 from core.lib.dpkt_utils import DpktUtils
 from core.lib.mac_utils import MacAddressUtils
 from core.models.packet_data import PacketData
+from core.models.packet_layers import APPLICATION_LAYER
 from tests.core.lib.common import CONFIGURATION_OBJ
+from tests.fixtures.packets import build_tcp_packet
 
 
 class DpktUtilsTest(unittest.TestCase):
@@ -195,3 +200,38 @@ class DpktUtilsTest(unittest.TestCase):
         self.assertEqual('', data.dns_ans_name)
         self.assertEqual('', data.dns_ans_ip)
         self.assertIsNone(data.dns_ans_ttl)
+
+    def test_layer7_packet_is_loaded_by_ports_of_protocols(self):
+        udp_packet = dpkt.udp.UDP(data=bytes(DNS()))
+
+        # DNS has higher priority than NTP
+        dns_packet = self.dpkt_utils.load_layer7_packet(udp_packet, PacketData(src_port=123, dst_port=53))
+        no_packet = self.dpkt_utils.load_layer7_packet(udp_packet, PacketData(src_port=50123, dst_port=443))
+        tcp_packet = self.dpkt_utils.load_layer7_packet(dpkt.tcp.TCP(), PacketData(src_port=50123, dst_port=53))
+
+        self.assertIsInstance(dns_packet, DNS)
+        self.assertIsNone(no_packet)
+        self.assertIsNone(tcp_packet)
+        self.assertEqual([53, 67, 68, 123, 1900, 5351, 5353, 60300, 60301], DpktUtils.get_layer7_ports(dpkt.udp.UDP))
+
+    def test_registered_layer7_protocol_is_processed(self):
+        class HelloPacketParser:
+            def __init__(self, config):
+                self.config = config
+
+            def extract_data(self, packet):
+                return Munch(dns_query_domain=packet.decode())
+
+        with patch.dict(DpktUtils.layer7_packet_loaders), \
+                patch.dict(DpktUtils.packet_parser_classes[APPLICATION_LAYER]):
+            DpktUtils.register_layer7_protocol(dpkt.tcp.TCP, [7777], lambda tcp_packet: bytes(tcp_packet.data))
+            DpktUtils.register_packet_parser(APPLICATION_LAYER, bytes, HelloPacketParser)
+            pcap_processor = PcapProcessor(config=CONFIGURATION_OBJ)
+            packet = build_tcp_packet(dport=7777, payload=b'hello')
+
+            self.assertEqual([None], pcap_processor.batch_decoder.decode([packet]))
+            packet_data = pcap_processor.extract_stats_from_packet(ts=0, packet=packet, initial_timestamp=0)
+
+        self.assertEqual('hello', packet_data.dns_query_domain)
+        self.assertEqual(7777, packet_data.dst_port)
+        self.assertNotIn(7777, DpktUtils.get_layer7_ports(dpkt.tcp.TCP))
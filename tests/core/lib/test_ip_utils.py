@@ -14,3 +14,20 @@ class IpUtilsTests(unittest.TestCase):
         ip_utils = IpAddrUtils()
         for ip_addr in IPv6_ADDRESSES:
             self.assertTrue(ip_utils.is_valid_ip(ip_addr))
+
+    def test_packed_addresses_are_converted_without_validation(self):
+        ip_utils = IpAddrUtils()
+        test_cases = [
+            (b'\xc0\xa8\x64\x01', '192.168.100.1', 3232261121),
+            (b'\xfe\x80' + bytes(13) + b'\x01', 'fe80::1', 0xfe80 << 112 | 1),
+            (bytearray(b'\x08\x08\x08\x08'), '8.8.8.8', 0x08080808),
+        ]
+        for inet, ip_address, ip_integer in test_cases:
+            with self.subTest(ip_address=ip_address):
+                self.assertEqual(ip_address, ip_utils.inet_to_str(inet))
+                self.assertEqual(ip_integer, ip_utils.inet_to_int(inet))
+                self.assertEqual(ip_integer, ip_utils.ip_to_int(ip_address))
+                self.assertEqual(ip_address, ip_utils.int_to_ip(ip_integer))
+
+        self.assertIsNone(ip_utils.inet_to_str(b'\x01\x02\x03'))
+        self.assertIsNone(ip_utils.inet_to_int(b'\x01\x02\x03'))
@@ -38,3 +38,13 @@ class MacUtilsTests(unittest.TestCase):
         self.assertIsNone(self.mac_utils.convert_string_mac_to_byte_array(mac_address=None))            # MAC is None
         self.assertIsNone(self.mac_utils.convert_string_mac_to_byte_array(mac_address=''))              # MAC is empty
         self.assertIsNone(self.mac_utils.convert_string_mac_to_byte_array(mac_address='invalidmac'))    # MAC is invalid
+
+    def test_binary_mac_addresses_are_converted_without_validation(self):
+        for mac_addr in MAC_ADDRESSES:
+            byte_mac = bytes(self.mac_utils.convert_string_mac_to_byte_array(mac_addr))
+            self.assertEqual(mac_addr, self.mac_utils.convert_hexadecimal_mac_to_readable_mac(byte_mac))
+            self.assertEqual(self.mac_utils.mac_to_int(mac_addr), self.mac_utils.mac_bytes_to_int(byte_mac))
+
+        self.assertIsNone(self.mac_utils.convert_hexadecimal_mac_to_readable_mac(b'\x01\x02\x03'))
+        self.assertIsNone(self.mac_utils.mac_bytes_to_int(b'\x01\x02\x03'))
+        self.assertIsNone(self.mac_utils.int_to_mac(1 << 48))
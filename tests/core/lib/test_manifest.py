@@ -0,0 +1,82 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from core.configuration.data import ConfigurationData
+from core.lib.manifest import ProcessingCheckpoint, ProcessingManifest, get_configuration_hash, get_file_fingerprint, \
+    load_processing_state, save_processing_state
+from tests.core.lib.common import CONFIGURATION_DATA, CONFIGURATION_OBJ
+
+
+class ManifestTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.pcap_file_path = self.write_file('test.pcap', b'\x01' * 5000)
+        self.results_file_path = self.write_file('test_data.csv', b'results')
+        self.manifest_file_path = os.path.join(self.temp_dir, 'manifest.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_file(self, file_name: str, data: bytes) -> str:
+        file_path = os.path.join(self.temp_dir, file_name)
+        with open(file_path, 'wb') as data_file:
+            data_file.write(data)
+
+        return file_path
+
+    def create_manifest(self, config: ConfigurationData = CONFIGURATION_OBJ, processor_version: int = 1):
+        return ProcessingManifest(self.manifest_file_path, config=config, processor_version=processor_version)
+
+    def test_file_fingerprint_changes_with_content(self):
+        fingerprint = get_file_fingerprint(self.pcap_file_path, block_size=1000)
+        self.write_file('test.pcap', b'\x01' * 4999 + b'\x02')
+
+        self.assertNotEqual(fingerprint.content_hash, get_file_fingerprint(self.pcap_file_path).content_hash)
+
+    def test_configuration_hash_ignores_options_not_affecting_results(self):
+        config_hash = get_configuration_hash(CONFIGURATION_OBJ)
+
+        self.assertEqual(config_hash, get_configuration_hash(
+            ConfigurationData.load(dict(CONFIGURATION_DATA, ResultWriteInBackground=True, use_mmap_reader=True))))
+        self.assertNotEqual(config_hash, get_configuration_hash(
+            ConfigurationData.load(dict(CONFIGURATION_DATA, use_numeric_values=True))))
+
+    def test_processed_file_is_recorded_in_manifest(self):
+        manifest = self.create_manifest()
+        self.assertFalse(manifest.is_processed(self.pcap_file_path, self.results_file_path))
+
+        manifest.mark_processed(manifest.create_entry(self.pcap_file_path, self.results_file_path))
+
+        self.assertTrue(manifest.is_processed(self.pcap_file_path, self.results_file_path))
+        self.assertTrue(self.create_manifest().is_processed(self.pcap_file_path, self.results_file_path))
+
+    def test_file_is_not_processed_if_processing_or_source_file_changed(self):
+        manifest = self.create_manifest()
+        manifest.mark_processed(manifest.create_entry(self.pcap_file_path, self.results_file_path))
+        # Same content with new modification time
+        os.utime(self.pcap_file_path, (0, 0))
+        self.assertTrue(manifest.is_processed(self.pcap_file_path, self.results_file_path))
+
+        self.assertFalse(self.create_manifest(processor_version=2).is_processed(
+            self.pcap_file_path, self.results_file_path))
+        self.assertFalse(self.create_manifest(
+            config=ConfigurationData.load(dict(CONFIGURATION_DATA, use_numeric_values=True))
+        ).is_processed(self.pcap_file_path, self.results_file_path))
+
+        self.write_file('test.pcap', b'\x02' * 5000)
+        self.assertFalse(manifest.is_processed(self.pcap_file_path, self.results_file_path))
+
+    def test_processing_state_is_removed_when_file_is_processed(self):
+        manifest = self.create_manifest()
+        entry = manifest.create_entry(self.pcap_file_path, self.results_file_path)
+        checkpoint = ProcessingCheckpoint(offset=100, packet_count=5, results_size=7)
+        save_processing_state(entry.copy(update=dict(checkpoint=checkpoint)))
+
+        state = load_processing_state(self.results_file_path)
+        self.assertTrue(state.is_same_processing(entry))
+        self.assertEqual(checkpoint, state.checkpoint)
+
+        manifest.mark_processed(entry)
+        self.assertIsNone(load_processing_state(self.results_file_path))
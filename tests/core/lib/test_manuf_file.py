@@ -0,0 +1,59 @@
+import unittest
+
+import numpy as np
+
+from core.lib.manuf_file import OuiIndex, parse_mac_prefix
+
+MANUFS = {
+    '00:1B:C5': ['IeeeRegi', 'IEEE Registration Authority'],
+    '00:1B:C5:00:00:00/36': ['Convergi', 'Converging Systems Inc.'],
+    '00:1B:C5:00:10:00/36': ['OpenrbCo', 'OpenRB.com, Direct SIA'],
+    '00:55:DA:00:00:00/28': ['Shinko', 'Shinko Technos co.,ltd.'],
+    'B8:27:EB': ['Raspberr', 'Raspberry Pi Foundation'],
+    '': [],
+}
+
+
+class OuiIndexTests(unittest.TestCase):
+    def __init__(self, *args, **kwargs):
+        super(OuiIndexTests, self).__init__(*args, **kwargs)
+        self.oui_index = OuiIndex(MANUFS)
+
+    def test_mac_prefixes_are_parsed(self):
+        self.assertEqual((0x001BC5, 24), parse_mac_prefix('00:1B:C5'))
+        self.assertEqual((0x001BC5001, 36), parse_mac_prefix('00:1B:C5:00:10:00/36'))
+        self.assertEqual((0x0055DA0, 28), parse_mac_prefix('00-55-DA-00-00-00/28'))
+        for prefix in ['', 'XX:1B:C5', '00:1B:C5/49', '00:1B:C5/x', '00:1B:C5:00:10:00:00']:
+            with self.subTest(prefix=prefix):
+                self.assertIsNone(parse_mac_prefix(prefix))
+
+    def test_vendor_is_found_with_longest_prefix_match(self):
+        test_cases = {
+            '00:1b:c5:00:00:01': 'Convergi',
+            '00:1B:C5:00:10:FF': 'OpenrbCo',
+            '00:1b:c5:00:20:00': 'IeeeRegi',
+            '00:55:da:0f:ff:ff': 'Shinko',
+            '00:55:da:10:00:00': None,
+            'b8-27-eb-01-02-03': 'Raspberr',
+            b'\xb8\x27\xeb\x01\x02\x03': 'Raspberr',
+            0x001BC5001001: 'OpenrbCo',
+            'ff:ff:ff:ff:ff:ff': None,
+            'b8:27:eb': None,
+            None: None,
+        }
+        for mac_address, vendor in test_cases.items():
+            with self.subTest(mac_address=mac_address):
+                self.assertEqual(vendor, self.oui_index.get_vendor(mac_address))
+
+        self.assertEqual(list(test_cases.values()), self.oui_index.get_vendors(list(test_cases)))
+
+    def test_vendors_of_arrays_of_mac_addresses_are_found_at_once(self):
+        mac_addresses = [b'\x00\x1b\xc5\x00\x10\x01', b'\xb8\x27\xeb\x01\x02\x03', b'\x00\x00\x00\x00\x00\x00']
+
+        self.assertEqual(['OpenrbCo', 'Raspberr', None],
+                         self.oui_index.get_vendors(np.array(mac_addresses, dtype='V6')))
+        self.assertEqual(
+            ['OpenrbCo', 'Raspberr', None, None],
+            self.oui_index.get_vendors(np.array([0x001BC5001001, 0xB827EB010203, -1, 1 << 48], dtype=np.int64)))
+        self.assertEqual([], self.oui_index.get_vendors([]))
+        self.assertEqual(5, len(self.oui_index))
@@ -0,0 +1,102 @@
+import unittest
+
+import dpkt
+
+from core.lib.packet_filter import PacketFilter
+from tests.fixtures.mac_addresses import MAC_ADDRESSES
+from tests.fixtures.packets import START_TIMESTAMP, build_arp_packet, build_dns_query_packet, build_tcp_packet, \
+    build_udp6_packet, build_udp_packet
+
+TCP_PACKET = build_tcp_packet()                 # 192.168.100.2:50123 -> 52.18.1.10:443
+UDP_PACKET = build_udp_packet()                 # 192.168.100.2:50123 -> 192.168.100.1:9999
+DNS_PACKET = build_dns_query_packet()           # 192.168.100.2:50123 -> 8.8.8.8:53
+UDP6_PACKET = build_udp6_packet()               # [fe80::1]:50123 -> [fe80::2]:9999
+ARP_PACKET = build_arp_packet()
+PACKETS = [TCP_PACKET, UDP_PACKET, DNS_PACKET, UDP6_PACKET, ARP_PACKET]
+
+
+class PacketFilterTest(unittest.TestCase):
+    def get_matching_packets(self, expression: str, packets: list = None) -> list:
+        packet_filter = PacketFilter(expression)
+        return [packet for packet in (packets or PACKETS) if packet_filter.match(START_TIMESTAMP, packet)]
+
+    def test_empty_filter_matches_all_packets(self):
+        self.assertEqual(PACKETS, self.get_matching_packets(''))
+        self.assertEqual(PACKETS, self.get_matching_packets('  '))
+
+    def test_packets_are_filtered_by_primitives(self):
+        test_cases = {
+            'tcp': [TCP_PACKET],
+            'udp': [UDP_PACKET, DNS_PACKET, UDP6_PACKET],
+            'ip': [TCP_PACKET, UDP_PACKET, DNS_PACKET],
+            'ip6': [UDP6_PACKET],
+            'arp': [ARP_PACKET],
+            'ether proto 0x0806': [ARP_PACKET],
+            'ip6 proto udp': [UDP6_PACKET],
+            'ip proto 6': [TCP_PACKET],
+            'proto 17': [UDP_PACKET, DNS_PACKET, UDP6_PACKET],
+            'ether src host {}'.format(MAC_ADDRESSES[0]): [TCP_PACKET, UDP_PACKET, DNS_PACKET],
+            'ether dst host {}'.format(MAC_ADDRESSES[0]): [],
+            'host {}'.format(MAC_ADDRESSES[5].upper()): [ARP_PACKET],
+            'host 8.8.8.8': [DNS_PACKET],
+            'src host 8.8.8.8': [],
+            'dst net 192.168.100.0/24': [UDP_PACKET],
+            'net 192.168.0.0/16': [TCP_PACKET, UDP_PACKET, DNS_PACKET],
+            'host fe80::2': [UDP6_PACKET],
+            'net fe80::/64': [UDP6_PACKET],
+            'port 53': [DNS_PACKET],
+            'dst port 9999': [UDP_PACKET, UDP6_PACKET],
+            'src port 9999': [],
+            'tcp port 50123': [TCP_PACKET],
+            'udp src portrange 50000-50200': [UDP_PACKET, DNS_PACKET, UDP6_PACKET],
+        }
+        for expression, expected_packets in test_cases.items():
+            with self.subTest(expression=expression):
+                self.assertEqual(expected_packets, self.get_matching_packets(expression))
+
+    def test_primitives_are_combined_with_boolean_operators(self):
+        test_cases = {
+            'udp and not port 53': [UDP_PACKET, UDP6_PACKET],
+            'udp && !ip6 && !port 53': [UDP_PACKET],
+            'tcp or arp': [TCP_PACKET, ARP_PACKET],
+            'tcp || arp and ether src host {}'.format(MAC_ADDRESSES[4]): [ARP_PACKET],   # Evaluated left to right
+            'tcp or (arp and ether src host {})'.format(MAC_ADDRESSES[0]): [TCP_PACKET],
+            'not (tcp or udp)': [ARP_PACKET],
+        }
+        for expression, expected_packets in test_cases.items():
+            with self.subTest(expression=expression):
+                self.assertEqual(expected_packets, self.get_matching_packets(expression))
+
+    def test_packets_are_filtered_by_time(self):
+        captures = [(START_TIMESTAMP + i, TCP_PACKET) for i in range(5)]
+
+        packet_filter = PacketFilter('time >= {} and time < {}'.format(START_TIMESTAMP + 1, START_TIMESTAMP + 3))
+
+        self.assertEqual(captures[1:3], list(packet_filter.filter(captures)))
+        self.assertFalse(packet_filter.uses_headers)
+
+    def test_headers_are_read_from_vlan_tagged_and_truncated_packets(self):
+        vlan_packet = TCP_PACKET[:12] + b'\x81\x00\x00\x05' + TCP_PACKET[12:]
+        fragment = bytearray(UDP_PACKET)
+        fragment[20:22] = b'\x00\x10'       # Non-first fragment does not have UDP header
+
+        self.assertEqual([vlan_packet], self.get_matching_packets('tcp dst port 443', [vlan_packet]))
+        self.assertEqual([], self.get_matching_packets('port 9999', [bytes(fragment)]))
+        self.assertEqual([bytes(fragment)], self.get_matching_packets('udp', [bytes(fragment)]))
+        self.assertEqual([], self.get_matching_packets('host 52.18.1.10 or port 443', [TCP_PACKET[:30], b'']))
+        self.assertEqual([TCP_PACKET], self.get_matching_packets('port 443', [memoryview(TCP_PACKET)]))
+
+    def test_invalid_expressions_are_not_accepted(self):
+        for expression in ['tcp and', 'port', 'port 70000', 'host 1.2.3', 'ether host 1.2.3.4', 'net x/24',
+                           '(tcp', 'tcp)', 'tcp udp', 'time = 1', 'foo', 'tcp & udp']:
+            with self.subTest(expression=expression):
+                with self.assertRaises(ValueError):
+                    PacketFilter(expression)
+
+    def test_packets_are_filtered_same_as_with_dpkt(self):
+        packets = [build_tcp_packet(sport=sport, flags=dpkt.tcp.TH_SYN) for sport in (80, 443, 8080)]
+
+        matching_packets = self.get_matching_packets('tcp src port 443', packets)
+
+        self.assertEqual(
+            [packet for packet in packets if dpkt.ethernet.Ethernet(packet).data.data.sport == 443], matching_packets)
@@ -0,0 +1,104 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import dpkt
+
+from core.file_processor.errors import FileError
+from core.lib.pcap_utils import PcapMmapReader, PcapRangeReader, PcapngReader, find_pcap_shard_boundaries, \
+    detect_capture_file_format, PCAP_GLOBAL_HEADER_SIZE, PCAPNG_FORMAT
+from tests.fixtures.packets import build_mixed_packets, write_pcap_file, write_pcapng_file
+
+
+class PcapUtilsTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.packets = build_mixed_packets(count=120)
+        self.pcap_file_path = write_pcap_file(os.path.join(self.temp_dir, 'test.pcap'), self.packets)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_find_pcap_shard_boundaries_covers_whole_file(self):
+        shards = find_pcap_shard_boundaries(self.pcap_file_path, shard_count=4)
+
+        self.assertEqual(4, len(shards))
+        self.assertEqual(PCAP_GLOBAL_HEADER_SIZE, shards[0][0])
+        self.assertEqual(os.path.getsize(self.pcap_file_path), shards[-1][1])
+        for (_, end), (start, _) in zip(shards[:-1], shards[1:]):
+            self.assertEqual(end, start)
+
+    def test_find_pcap_shard_boundaries_returns_fewer_shards_for_small_files(self):
+        pcap_file_path = write_pcap_file(os.path.join(self.temp_dir, 'small.pcap'), self.packets[:2])
+        shards = find_pcap_shard_boundaries(pcap_file_path, shard_count=8)
+
+        self.assertEqual(2, len(shards))
+
+    def test_pcap_range_reader_reads_same_packets_as_dpkt_reader(self):
+        with open(self.pcap_file_path, 'rb') as pcap_file:
+            expected_packets = list(dpkt.pcap.Reader(pcap_file))
+
+        captures = PcapRangeReader(self.pcap_file_path)
+        packets = list(captures)
+        captures.close()
+
+        self.assertEqual(expected_packets, packets)
+
+    def test_pcap_range_readers_read_all_packets_over_shards(self):
+        packets = []
+        for start, end in find_pcap_shard_boundaries(self.pcap_file_path, shard_count=3):
+            captures = PcapRangeReader(self.pcap_file_path, start=start, end=end)
+            packets.extend(captures)
+            captures.close()
+
+        self.assertEqual(len(self.packets), len(packets))
+        self.assertEqual([packet for _, packet in self.packets], [packet for _, packet in packets])
+
+    def test_pcap_range_reader_raises_error_for_invalid_pcap_file(self):
+        invalid_file_path = os.path.join(self.temp_dir, 'invalid.pcap')
+        with open(invalid_file_path, 'wb') as invalid_file:
+            invalid_file.write(b'\x00' * 100)
+
+        with self.assertRaises(FileError):
+            PcapRangeReader(invalid_file_path)
+
+    def test_pcap_mmap_reader_reads_same_packets_as_dpkt_reader(self):
+        with open(self.pcap_file_path, 'rb') as pcap_file:
+            expected_packets = list(dpkt.pcap.Reader(pcap_file))
+
+        captures = PcapMmapReader(self.pcap_file_path)
+        packets = [(ts, bytes(packet)) for ts, packet in captures]
+        captures.close()
+
+        self.assertEqual(expected_packets, packets)
+
+    def test_pcap_mmap_readers_read_all_packets_over_shards(self):
+        packets = []
+        for start, end in find_pcap_shard_boundaries(self.pcap_file_path, shard_count=3):
+            captures = PcapMmapReader(self.pcap_file_path, start=start, end=end)
+            packets.extend(bytes(packet) for _, packet in captures)
+            captures.close()
+
+        self.assertEqual([packet for _, packet in self.packets], packets)
+
+    def test_pcapng_reader_reads_same_packets_as_pcap_reader(self):
+        with open(self.pcap_file_path, 'rb') as pcap_file:
+            expected_packets = list(dpkt.pcap.Reader(pcap_file))
+
+        for big_endian in [False, True]:
+            pcapng_file_path = write_pcapng_file(
+                os.path.join(self.temp_dir, 'test.pcapng'), self.packets, tsresols=(6, 9), big_endian=big_endian)
+            with open(pcapng_file_path, 'rb') as pcapng_file:
+                self.assertEqual(PCAPNG_FORMAT, detect_capture_file_format(pcapng_file.read(4)))
+                pcapng_file.seek(0)
+                packets = list(PcapngReader(pcapng_file))
+
+            self.assertEqual([packet for _, packet in expected_packets], [packet for _, packet in packets])
+            for (expected_ts, _), (ts, _) in zip(expected_packets, packets):
+                self.assertAlmostEqual(expected_ts, ts, places=6)
+
+    def test_pcapng_reader_raises_error_for_invalid_file(self):
+        with open(self.pcap_file_path, 'rb') as pcap_file:
+            with self.assertRaises(FileError):
+                PcapngReader(pcap_file)
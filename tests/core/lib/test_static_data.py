@@ -1,7 +1,13 @@
+import os
+import shutil
+import tempfile
 import unittest
+from unittest import mock
 
+import numpy as np
 from munch import Munch
 
+from core.static.cache import STATIC_DATA_CACHE_DIR_ENV, StaticDataCache
 from core.static.utils import StaticData
 from tests.fixtures.protocols import IP_TCP_PROTOCOL, LAYER4_9898_PROTOCOL_INFO
 
@@ -49,3 +55,88 @@ class StaticDataTests(unittest.TestCase):
         self.assertIsInstance(layer4_ports_data["9898"], list)
         self.assertIsInstance(layer4_ports_data["9898"][0], dict)
         self.assertEqual(layer4_ports_data["9898"], LAYER4_9898_PROTOCOL_INFO)
+
+    def test_lookup_tables_contain_names_of_all_values(self):
+        static_data = StaticData(cache_dir='')
+
+        ether_type_names = static_data.get_ether_type_names()
+        ip_protocol_names = static_data.get_ip_protocol_names()
+        tcp_port_names = static_data.get_layer4_port_names('tcp', ';')
+
+        self.assertEqual(65536, len(ether_type_names))
+        self.assertEqual('ipv4', ether_type_names[0x0800])
+        self.assertEqual('1234', ether_type_names[0x1234])
+        self.assertEqual(256, len(ip_protocol_names))
+        self.assertEqual('TCP', ip_protocol_names[6])
+        self.assertEqual('254', ip_protocol_names[254])
+        self.assertEqual(65536, len(tcp_port_names))
+        self.assertEqual('HTTPS', tcp_port_names[443].upper())
+        self.assertIsNone(tcp_port_names[35000])
+        self.assertIs(tcp_port_names, static_data.get_layer4_port_names('tcp', ';'))
+        self.assertIsNot(tcp_port_names, static_data.get_layer4_port_names('udp', ';'))
+
+    def test_tables_are_not_cached_by_default(self):
+        with mock.patch.dict(os.environ, {STATIC_DATA_CACHE_DIR_ENV: ''}):
+            self.assertIsNone(StaticData().cache.cache_path)
+
+    def test_cached_static_data_is_same_as_loaded_data(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            static_data = StaticData(cache_dir=cache_dir)
+            ether_type_names = static_data.get_ether_type_names().to_list()
+            oui_index = static_data.get_oui_index()
+            cached_static_data = StaticData(cache_dir=cache_dir)
+
+            self.assertEqual(1, len(os.listdir(cache_dir)))
+            cached_ether_type_names = cached_static_data.get_ether_type_names()
+            self.assertIsInstance(cached_ether_type_names.codes.base, np.memmap)
+            self.assertEqual(ether_type_names, cached_ether_type_names.to_list())
+            cached_oui_index = cached_static_data.get_oui_index()
+            self.assertEqual(len(oui_index), len(cached_oui_index))
+            self.assertEqual('Raspberr', cached_oui_index.get_vendor('b8:27:eb:01:02:03'))
+            self.assertEqual(StaticData.load_layer4_ports_data(), cached_static_data.layer4_ports_data)
+            self.assertIsNone(cached_static_data.ip_protocol_data['non-existing-key'])
+            self.assertEqual(StaticData.load_manuf_data(), cached_static_data.manuf_data)
+
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_static_data_cache_is_rebuilt_when_source_file_or_version_changes(self):
+        cache_dir = tempfile.mkdtemp()
+        source_file_path = os.path.join(cache_dir, 'source.txt')
+
+        def get_table(value: int, version: int = 1, table_cache_dir: str = cache_dir) -> int:
+            arrays = StaticDataCache([source_file_path], table_cache_dir).get(
+                'table', lambda: {'values': np.array([value])}, version=version)
+            return arrays['values'].item(0)
+
+        try:
+            with open(source_file_path, 'w') as source_file:
+                source_file.write('a')
+            self.assertEqual(1, get_table(1))
+            self.assertEqual(1, get_table(2))
+            self.assertEqual(3, get_table(3, version=2))
+
+            with open(source_file_path, 'w') as source_file:
+                source_file.write('b')
+            self.assertEqual(4, get_table(4))
+            self.assertEqual(5, get_table(5, table_cache_dir=''))
+
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_cached_arrays_are_loaded_without_pickle(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            cache = StaticDataCache([], cache_dir)
+            cache.get('table', lambda: {'values': np.array([1])}, version=1)
+            array_file_path = os.path.join(cache.cache_path, 'table-v1', 'values.npy')
+            np.save(array_file_path, np.array([None, 1], dtype=object), allow_pickle=True)
+
+            with self.assertLogs(level='WARNING'):
+                arrays = cache.get('table', lambda: {'values': np.array([2])}, version=1)
+
+            self.assertEqual([2], arrays['values'].tolist())
+
+        finally:
+            shutil.rmtree(cache_dir)
@@ -0,0 +1,30 @@
+import unittest
+
+from core.errors.generic_errors import GenericError
+from core.models.packet_data import PACKET_DATA_FIELDS
+from core.models.packet_layers import APPLICATION_LAYER, ETHERNET_LAYER, NETWORK_LAYER, PACKET_LAYER_FIELDS, \
+    PACKET_METADATA_FIELDS, SYN_FINGERPRINT, TRANSPORT_LAYER, get_required_layers, get_result_fields
+
+
+class PacketLayersTests(unittest.TestCase):
+    def test_each_packet_data_field_belongs_to_one_layer(self):
+        layer_fields = [field for fields in PACKET_LAYER_FIELDS.values() for field in fields]
+
+        self.assertEqual(sorted(PACKET_DATA_FIELDS), sorted(list(PACKET_METADATA_FIELDS) + layer_fields))
+        self.assertIn('dns_query_domain', PACKET_LAYER_FIELDS[APPLICATION_LAYER])
+
+    def test_get_result_fields_validates_fields(self):
+        self.assertEqual(PACKET_DATA_FIELDS, get_result_fields(None))
+        self.assertEqual(('src_ip', 'timestamp'), get_result_fields(['src_ip', 'timestamp']))
+
+        with self.assertRaises(GenericError):
+            get_result_fields(['src_ip', 'unknown_field'])
+        with self.assertRaises(GenericError):
+            get_result_fields(['src_ip', 'src_ip'])
+
+    def test_get_required_layers_includes_dependencies(self):
+        self.assertEqual(frozenset(), get_required_layers(['timestamp', 'size']))
+        self.assertEqual(frozenset([ETHERNET_LAYER, NETWORK_LAYER]), get_required_layers(['src_mac', 'src_ip']))
+        self.assertEqual(frozenset([TRANSPORT_LAYER, SYN_FINGERPRINT]), get_required_layers(['client_os']))
+        self.assertEqual(frozenset([TRANSPORT_LAYER, APPLICATION_LAYER]), get_required_layers(['dns_query_domain']))
+        self.assertEqual(frozenset(PACKET_LAYER_FIELDS), get_required_layers(PACKET_DATA_FIELDS))
@@ -0,0 +1,33 @@
+import unittest
+
+from core.models.packet_data import PacketData, PACKET_DATA_FIELDS
+from core.models.packet_record import PacketRecord
+
+
+class PacketRecordTests(unittest.TestCase):
+    def test_packet_record_has_same_fields_as_packet_data(self):
+        self.assertEqual(list(PacketData.__fields__), list(PACKET_DATA_FIELDS))
+        self.assertEqual(PacketData.packet_data_file_headers(), PacketRecord.packet_data_file_headers())
+
+    def test_to_csv_string_matches_packet_data(self):
+        # PacketData fields are assigned without validation during packet processing
+        values = dict(timestamp=1.5, size=60, src_mac='00:11:22:33:44:55', src_port=53, tcp_syn_flag=True,
+                      tcp_ack_flag=False, dns_query_domain='example.com')
+        packet_record = PacketRecord(**values)
+
+        self.assertEqual(
+            PacketData.construct(**values).to_csv_string(delimiter=';'),
+            packet_record.to_csv_string(delimiter=';')
+        )
+        self.assertEqual(PacketData().to_csv_string(), PacketRecord().to_csv_string())
+
+    def test_to_packet_data_validates_values(self):
+        packet_data = PacketRecord(src_port='53', dst_port=80).to_packet_data(validate=True)
+
+        self.assertIsInstance(packet_data, PacketData)
+        self.assertEqual(53, packet_data.src_port)
+        self.assertEqual(80, packet_data.dst_port)
+
+    def test_packet_record_rejects_unknown_fields(self):
+        with self.assertRaises(AttributeError):
+            PacketRecord(unknown_field=1)
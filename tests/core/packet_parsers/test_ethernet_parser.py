@@ -54,3 +54,14 @@ class EthernetFrameParserTests(BasePacketParserTests):
 
         self.assertEqual(src_mac, mock_src_mac)
         self.assertEqual(dst_mac, mock_dst_mac)
+
+    def test_vendors_of_mac_addresses_are_extracted(self):
+        eth_frame = dpkt.ethernet.Ethernet()
+        eth_frame.src = self.mac_utils.convert_string_mac_to_byte_array('00:1b:c5:00:10:01')
+        eth_frame.dst = self.mac_utils.convert_string_mac_to_byte_array('ff:ff:ff:ff:ff:ff')
+        eth_frame.type = 2048
+
+        eth_data = self.eth_frame_parser.extract_data(eth_frame)
+
+        self.assertEqual(eth_data.src_mac_vendor, 'OpenrbCo')      # From /36 block of 00:1B:C5 OUI
+        self.assertIsNone(eth_data.dst_mac_vendor)
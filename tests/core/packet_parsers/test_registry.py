@@ -0,0 +1,22 @@
+from core.packet_parsers.dns_parser import DnsPacketParser
+from core.packet_parsers.layer4_parser import TcpPacketParser
+from core.packet_parsers.registry import PacketParserRegistry
+from tests.core.packet_parsers.common import BasePacketParserTests
+
+
+class PacketParserRegistryTests(BasePacketParserTests):
+    def __init__(self, *args, **kwargs):
+        super(PacketParserRegistryTests, self).__init__(*args, **kwargs)
+        self.registry = PacketParserRegistry(config=self.config, static_data=self.static_data)
+
+    def test_get_parser_returns_same_instance_for_each_call(self):
+        parser = self.registry.get_parser(DnsPacketParser)
+
+        self.assertIsInstance(parser, DnsPacketParser)
+        self.assertIs(parser, self.registry.get_parser(DnsPacketParser))
+
+    def test_get_parser_shares_static_data_with_parsers(self):
+        parser = self.registry.get_parser(TcpPacketParser)
+
+        self.assertIs(self.static_data, parser.static_data)
+        self.assertIs(self.config, parser.config)
@@ -0,0 +1,106 @@
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+import dpkt
+
+from core.configuration.data import ConfigurationData
+from core.errors.generic_errors import GenericError
+from core.lib.p0f_process import P0fResult
+from core.lib.syn_fingerprint import P0fFingerprintDatabase, build_tcp_syn_signature
+from core.packet_parsers.syn_parser import SynPacketParser
+from core.static.constants import P0F_FINGERPRINT_FILE_PATH
+from tests.core.lib.common import CONFIGURATION_DATA
+from tests.core.packet_parsers.common import BasePacketParserTests
+from tests.fixtures.packets import build_tcp_packet
+
+P0F_WD = os.path.dirname(P0F_FINGERPRINT_FILE_PATH)
+P0F_CONFIGURATION_DATA = dict(
+    CONFIGURATION_DATA, syn_fingerprint_backend='p0f', p0f_wd=P0F_WD, p0f_executable='./p0f', p0f_batch_size=2)
+# mss, sok, ts, nop, ws options sent by Linux
+LINUX_TCP_OPTIONS = b'\x02\x04\x05\xb4' + b'\x04\x02' + b'\x08\x0a' + struct.pack('!II', 12345, 0) + b'\x01' + \
+    b'\x03\x03\x07'
+
+
+def build_ip_packet(**kwargs) -> dpkt.ip.IP:
+    return dpkt.ethernet.Ethernet(build_tcp_packet(**kwargs)).data
+
+
+class SynPacketParserTests(BasePacketParserTests):
+    def __init__(self, *args, **kwargs):
+        super(SynPacketParserTests, self).__init__(*args, **kwargs)
+        self.syn_packet_parser = SynPacketParser(config=self.config)
+
+    def test_signature_and_os_are_extracted_from_syn_packet(self):
+        ip_packet = build_ip_packet(flags=dpkt.tcp.TH_SYN, payload=b'', opts=LINUX_TCP_OPTIONS, ttl=62)
+
+        syn_data = self.syn_packet_parser.extract_data(ip_packet)
+
+        self.assertStrEqual('4:62+2:0:1460:mss*44;7:mss;sok;ts;nop;ws:df;id+:0', syn_data.syn_signature)
+        self.assertStrEqual('Linux 2.2.x-3.x', syn_data.client_os)
+
+    def test_unknown_os_is_reported_for_unmatched_signature(self):
+        ip_packet = build_ip_packet(flags=dpkt.tcp.TH_SYN, payload=b'', opts=b'\x04\x02\x01\x01\x02\x04\x05\xb4')
+
+        syn_data = self.syn_packet_parser.extract_data(ip_packet)
+
+        self.assertStrEqual('4:64+0:0:1460:mss*44;0:sok;nop;nop;mss:df;id+:0', syn_data.syn_signature)
+        self.assertStrEqual('???', syn_data.client_os)
+
+    def test_no_signature_is_extracted_from_packets_not_fingerprinted_by_p0f(self):
+        for flags in (dpkt.tcp.TH_SYN | dpkt.tcp.TH_ACK, dpkt.tcp.TH_SYN | dpkt.tcp.TH_RST, dpkt.tcp.TH_ACK):
+            ip_packet = build_ip_packet(flags=flags, opts=LINUX_TCP_OPTIONS)
+
+            self.assertIsNone(build_tcp_syn_signature(ip_packet))
+            syn_data = self.syn_packet_parser.extract_data(ip_packet)
+            self.assertStrEqual('', syn_data.syn_signature)
+            self.assertStrEqual('', syn_data.client_os)
+
+    def test_fingerprint_database_from_p0f_working_directory_is_used(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            shutil.copy(P0F_FINGERPRINT_FILE_PATH, os.path.join(temp_dir, 'p0f.fp'))
+            config = ConfigurationData.load(dict(CONFIGURATION_DATA, p0f_wd=temp_dir))
+            syn_packet_parser = SynPacketParser(config=config)
+
+            self.assertEqual(os.path.join(temp_dir, 'p0f.fp'), syn_packet_parser.get_fingerprint_file_path())
+            self.assertEqual(P0F_FINGERPRINT_FILE_PATH, self.syn_packet_parser.get_fingerprint_file_path())
+
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_fingerprint_database_is_indexed_by_option_layout(self):
+        database = P0fFingerprintDatabase(P0F_FINGERPRINT_FILE_PATH)
+
+        for olayout, fingerprints in database.fingerprints.items():
+            self.assertTrue(all(fingerprint.olayout == olayout for fingerprint in fingerprints))
+        self.assertIn('mss,sok,ts,nop,ws', database.fingerprints)
+
+    def test_unsupported_backend_raises_error(self):
+        with self.assertRaises(GenericError):
+            SynPacketParser(config=ConfigurationData.load(dict(CONFIGURATION_DATA, syn_fingerprint_backend='nmap')))
+
+    @unittest.skipUnless(os.access(os.path.join(P0F_WD, 'p0f'), os.X_OK), 'p0f executable is not available')
+    def test_p0f_process_results_are_same_as_native_fingerprinting(self):
+        syn_packet_parser = SynPacketParser(config=ConfigurationData.load(P0F_CONFIGURATION_DATA))
+        p0f_process = syn_packet_parser.start_p0f_process()
+        ip_packets = [
+            build_ip_packet(flags=dpkt.tcp.TH_SYN, payload=b'', opts=LINUX_TCP_OPTIONS, ttl=62),
+            build_ip_packet(flags=dpkt.tcp.TH_SYN | dpkt.tcp.TH_RST, opts=LINUX_TCP_OPTIONS),
+            build_ip_packet(flags=dpkt.tcp.TH_SYN, payload=b'', opts=b'\x04\x02\x01\x01\x02\x04\x05\xb4'),
+        ]
+        try:
+            results = [syn_packet_parser.extract_data(ip_packet).syn_signature for ip_packet in ip_packets]
+            self.assertTrue(all(isinstance(result, P0fResult) for result in results))
+            p0f_process.sync()
+
+        finally:
+            p0f_process.close()
+
+        for ip_packet, result in zip(ip_packets, results):
+            syn_data = self.syn_packet_parser.extract_data(ip_packet)
+            self.assertTrue(result.ready)
+            self.assertEqual(syn_data.syn_signature or None, result.syn_signature)
+            self.assertEqual(syn_data.client_os or None, result.client_os)
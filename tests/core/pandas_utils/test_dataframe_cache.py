@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+from core.models.packet_schema import get_pandas_dtypes
+from core.pandas_utils.dataframe_cache import DataFrameCache
+from core.pandas_utils.dataframe_utils import load_csv_to_dataframe
+
+CSV_DATA = (
+    'timestamp,src_mac,ip_ttl\n'
+    '1.5,aa:aa:aa:aa:aa:aa,64\n'
+    '2.5,bb:bb:bb:bb:bb:bb,\n'
+)
+
+
+class DataFrameCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache_dir = Path(self.temp_dir) / 'cache'
+        self.file_path = Path(self.temp_dir) / 'results.csv'
+        self.file_path.write_text(CSV_DATA)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def load(self, **kwargs) -> pd.DataFrame:
+        return load_csv_to_dataframe(self.file_path, cache_dir=str(self.cache_dir), dtypes=get_pandas_dtypes(),
+                                     **kwargs)
+
+    def rewrite_file_keeping_size_and_mtime(self, data: str) -> None:
+        file_stat = self.file_path.stat()
+        self.file_path.write_text(data)
+        os.utime(str(self.file_path), ns=(file_stat.st_atime_ns, file_stat.st_mtime_ns))
+
+    def test_cached_copy_is_loaded_until_file_changes(self):
+        data = self.load(fill_empty_values=False)
+        self.assertEqual(1, len(list(self.cache_dir.glob('*.parquet'))))
+
+        # Cached copy is loaded, because file has same size and modification time
+        self.rewrite_file_keeping_size_and_mtime(CSV_DATA.replace('64', '99'))
+        cached_data = self.load(fill_empty_values=False)
+        pd.testing.assert_frame_equal(data, cached_data)
+        self.assertIsInstance(cached_data['src_mac'].dtype, pd.CategoricalDtype)
+        self.assertEqual('Int64', cached_data['ip_ttl'].dtype)
+
+        self.file_path.write_text(CSV_DATA + '3.5,aa:aa:aa:aa:aa:aa,32\n')
+        self.assertEqual([64, 0, 32], self.load()['ip_ttl'].tolist())
+        self.assertEqual(1, len(list(self.cache_dir.glob('*.parquet'))))
+
+    def test_only_specified_columns_are_loaded_from_cache(self):
+        self.assertEqual(['ip_ttl'], self.load(columns=['ip_ttl']).columns.tolist())
+
+        data = self.load(columns=['src_mac', 'ip_ttl'])
+
+        self.assertEqual(['src_mac', 'ip_ttl'], data.columns.tolist())
+        self.assertEqual([64, 0], data['ip_ttl'].tolist())
+
+    def test_files_are_not_cached_if_cache_dir_is_not_set(self):
+        load_csv_to_dataframe(self.file_path, cache_dir='')
+
+        self.assertFalse(self.cache_dir.exists())
+
+    def test_least_recently_used_files_are_removed_when_cache_is_full(self):
+        file_paths = [Path(self.temp_dir) / 'results-{}.csv'.format(index) for index in range(3)]
+        for file_path in file_paths:
+            file_path.write_text(CSV_DATA)
+
+        cache = DataFrameCache(self.cache_dir)
+        cache.load(file_paths[0], lambda: pd.read_csv(file_paths[0]))
+        cache_file_size = sum(path.stat().st_size for path in self.cache_dir.glob('*.parquet'))
+        cache.max_size = 2 * cache_file_size
+        cache.load(file_paths[1], lambda: pd.read_csv(file_paths[1]))
+        os.utime(str(cache.get_cache_file_path(file_paths[0], None)), ns=(0, 0))
+
+        cache.load(file_paths[2], lambda: pd.read_csv(file_paths[2]))
+
+        self.assertEqual(
+            {cache.get_cache_file_path(file_path, None) for file_path in file_paths[1:]},
+            set(self.cache_dir.glob('*.parquet'))
+        )
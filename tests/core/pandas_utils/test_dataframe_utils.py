@@ -0,0 +1,90 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+from core.errors.generic_errors import GenericError
+from core.models.packet_schema import get_pandas_dtypes
+from core.pandas_utils.dataframe_utils import load_csv_to_dataframe, read_data_file_chunks
+
+
+class DataFrameUtilsTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_path = Path(self.temp_dir) / 'results.csv'
+        self.file_path.write_text(
+            'frame_num,timestamp,src_mac,src_ip,tcp_syn_flag,ip_ttl\n'
+            '1,1.5,aa:aa:aa:aa:aa:aa,10.0.0.1,True,64\n'
+            '2,2.5,bb:bb:bb:bb:bb:bb,,,\n'
+            '3,3.5,aa:aa:aa:aa:aa:aa,10.0.0.1,,128\n'
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_columns_are_loaded_with_schema_dtypes(self):
+        data = load_csv_to_dataframe(self.file_path, fill_empty_values=False, dtypes=get_pandas_dtypes())
+
+        self.assertEqual('float64', data['timestamp'].dtype)
+        self.assertIsInstance(data['src_mac'].dtype, pd.CategoricalDtype)
+        self.assertEqual({'aa:aa:aa:aa:aa:aa', 'bb:bb:bb:bb:bb:bb'}, set(data['src_mac'].cat.categories))
+        self.assertEqual('boolean', data['tcp_syn_flag'].dtype)
+        self.assertEqual([True, False, False], data['tcp_syn_flag'].fillna(False).tolist())
+        self.assertEqual('Int64', data['ip_ttl'].dtype)
+        self.assertTrue(pd.isna(data['ip_ttl'][1]))
+
+    def test_empty_values_are_filled_in_categorical_columns(self):
+        data = load_csv_to_dataframe(
+            self.file_path, fillna_value='', columns=['src_ip'], dtypes=get_pandas_dtypes(['src_ip']))
+
+        self.assertIsInstance(data['src_ip'].dtype, pd.CategoricalDtype)
+        self.assertEqual(['10.0.0.1', '', '10.0.0.1'], data['src_ip'].tolist())
+
+    def test_only_specified_columns_are_loaded(self):
+        data = load_csv_to_dataframe(self.file_path, columns=['frame_num', 'src_mac'], dtypes=get_pandas_dtypes())
+
+        self.assertEqual(['frame_num', 'src_mac'], data.columns.tolist())
+
+        with self.assertRaises(GenericError):
+            load_csv_to_dataframe(self.file_path, columns=['frame_num', 'dst_mac'])
+
+    def test_empty_values_are_filled_with_default_value(self):
+        data = load_csv_to_dataframe(self.file_path)
+
+        self.assertEqual(['10.0.0.1', 0, '10.0.0.1'], data['src_ip'].tolist())
+        self.assertEqual([64, 0, 128], data['ip_ttl'].tolist())
+
+    def test_missing_columns_are_not_accepted_in_strict_mode(self):
+        self.assertEqual(3, len(load_csv_to_dataframe(self.file_path, verify_columns=['src_mac'], strict=True)))
+
+        with self.assertRaises(GenericError):
+            load_csv_to_dataframe(self.file_path, verify_columns=['dst_mac'], strict=True)
+
+    def test_chunks_have_same_rows_as_whole_file(self):
+        dtypes = get_pandas_dtypes()
+        data = load_csv_to_dataframe(self.file_path, columns=['frame_num', 'ip_ttl'], dtypes=dtypes)
+
+        chunks = list(read_data_file_chunks(self.file_path, chunk_size=2, columns=['frame_num', 'ip_ttl'],
+                                            dtypes=dtypes))
+
+        self.assertEqual([2, 1], [len(chunk) for chunk in chunks])
+        pd.testing.assert_frame_equal(data, pd.concat(chunks, ignore_index=True))
+
+    def test_columnar_files_are_loaded_with_projection_and_dtypes(self):
+        data = load_csv_to_dataframe(self.file_path, fill_empty_values=False)
+        for file_name, write_file in [('results.parquet', data.to_parquet), ('results.arrow', data.to_feather)]:
+            with self.subTest(file_name=file_name):
+                file_path = Path(self.temp_dir) / file_name
+                write_file(file_path)
+
+                loaded_data = load_csv_to_dataframe(
+                    file_path, fill_empty_values=False, columns=['src_mac', 'ip_ttl'], dtypes=get_pandas_dtypes())
+                chunks = list(read_data_file_chunks(
+                    file_path, chunk_size=2, fill_empty_values=False, columns=['src_mac'], dtypes=get_pandas_dtypes()))
+
+                self.assertEqual(['src_mac', 'ip_ttl'], loaded_data.columns.tolist())
+                self.assertIsInstance(loaded_data['src_mac'].dtype, pd.CategoricalDtype)
+                self.assertEqual('Int64', loaded_data['ip_ttl'].dtype)
+                self.assertEqual(data['src_mac'].tolist(), pd.concat(chunks)['src_mac'].astype(str).tolist())
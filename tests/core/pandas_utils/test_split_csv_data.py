@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+from core.errors.generic_errors import GenericError
+from core.pandas_utils.split_csv_data import extract_data_as_separate_csv, get_filtered_data_from_data_frame
+
+
+class SplitCsvDataTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.data = pd.DataFrame({
+            'timestamp': [5, 4, 3, 2, 1, 0],
+            'src_mac': ['a', 'b', 'a', 'c', 'c', 'b'],
+            'dst_mac': ['b', 'a', 'c', 'c', 'a', 'x'],
+            'size': [60, 70, 80, 90, 100, 110],
+        })
+        self.file_path = Path(self.temp_dir) / 'results.csv'
+        self.data.to_csv(self.file_path, index=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def split(self, **kwargs) -> dict:
+        return extract_data_as_separate_csv(
+            file_path=self.file_path, result_folder=Path(self.temp_dir) / 'split',
+            filter_columns=['src_mac', 'dst_mac'], **kwargs
+        )
+
+    def test_rows_are_split_by_values_of_filter_columns(self):
+        summary = self.split(sort_by_columns=['timestamp'])
+
+        self.assertEqual({'a', 'b', 'c', 'x'}, set(summary))
+        expected_sizes_by_value = {'a': [100, 80, 70, 60], 'b': [110, 70, 60], 'c': [100, 90, 80], 'x': [110]}
+        for value, expected_sizes in expected_sizes_by_value.items():
+            with self.subTest(value=value):
+                self.assertEqual(os.path.join(self.temp_dir, 'split', 'results-{}.csv'.format(value)),
+                                 summary[value].file)
+                self.assertEqual(len(expected_sizes), summary[value].row_count)
+                self.assertEqual(expected_sizes, pd.read_csv(summary[value].file)['size'].tolist())
+
+    def test_chunked_split_writes_same_files(self):
+        summary = self.split(sort_by_columns=['timestamp'])
+        expected_data = {value: pd.read_csv(summary[value].file) for value in summary}
+
+        chunked_summary = self.split(sort_by_columns=['timestamp'], chunk_size=2, max_open_files=1,
+                                     transform_function=str.upper)
+
+        self.assertEqual({'A', 'B', 'C', 'X'}, set(chunked_summary))
+        for value, data in expected_data.items():
+            with self.subTest(value=value):
+                pd.testing.assert_frame_equal(data, pd.read_csv(chunked_summary[value.upper()].file))
+
+    def test_values_are_written_in_same_format_in_each_chunk(self):
+        self.file_path.write_text(
+            'timestamp,src_mac,dst_mac,ip_ttl,ref_time\n'
+            '2.0,a,b,,0.50\n'
+            '1.0,b,a,64,\n'
+            '3.0,a,c,,0.25\n'
+        )
+
+        expected_lines = {
+            'a': ['timestamp,src_mac,dst_mac,ip_ttl,ref_time', '1.0,b,a,64,0', '2.0,a,b,0,0.50', '3.0,a,c,0,0.25'],
+            'c': ['timestamp,src_mac,dst_mac,ip_ttl,ref_time', '3.0,a,c,0,0.25'],
+        }
+        for chunk_size in [None, 1, 2]:
+            summary = self.split(sort_by_columns=['timestamp'], chunk_size=chunk_size)
+            for value, expected in expected_lines.items():
+                with self.subTest(chunk_size=chunk_size, value=value):
+                    self.assertEqual(expected, Path(summary[value].file).read_text().splitlines())
+
+    def test_missing_filter_columns_are_not_accepted(self):
+        with self.assertRaises(GenericError):
+            extract_data_as_separate_csv(file_path=self.file_path, result_folder=Path(self.temp_dir),
+                                         filter_columns=['vendor'])
+
+    def test_filtered_data_contains_rows_with_value_in_filter_columns(self):
+        filtered_data = get_filtered_data_from_data_frame(self.data, ['src_mac', 'dst_mac'], 'c', ['timestamp'])
+
+        self.assertEqual([100, 90, 80], filtered_data['size'].tolist())
@@ -0,0 +1,86 @@
+import json
+import math
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from core.lib.numpy_utils import NpEncoder
+from core.models.packet_schema import get_pandas_dtypes
+from core.pandas_utils.traffic_aggregation import AGGREGATION_COLUMNS, aggregate_traffic, aggregates_to_summary, \
+    get_trace_summary
+
+
+class TrafficAggregationTests(unittest.TestCase):
+    def setUp(self):
+        self.data = pd.DataFrame({
+            'timestamp': [0.0, 1.0, 2.0, 3.0, 4.0],
+            'size': [100.0, 200.0, 50.0, 60.0, 40.0],
+            'outgoing': [True, None, True, None, None],
+            'src_ip': ['10.0.0.1', '1.1.1.1', '10.0.0.1', '10.0.0.2', None],
+            'dst_ip': ['1.1.1.1', '10.0.0.1', '10.0.0.2', '10.0.0.2', None],
+            'eth_type': ['ipv4', 'ipv4', 'ipv4', 'ipv4', 'arp'],
+            'ip_proto': ['TCP', 'TCP', 'UDP', 'UDP', None],
+            'layer7_proto': ['HTTPS', 'HTTPS', 'DNS', None, None],
+        })
+
+    def test_summary_of_trace_is_computed(self):
+        summary = get_trace_summary(self.data)
+
+        self.assertEqual(5, summary.packet_count)
+        self.assertEqual(4.0, summary.duration)
+        self.assertEqual(450.0, summary.total_data)
+        self.assertEqual(1.25, summary.packet_rate)
+        self.assertEqual(112.5, summary.data_rate)
+        self.assertEqual(90.0, summary.average_packet_size)
+        self.assertTrue(math.isnan(get_trace_summary(self.data.iloc[:1]).packet_rate))
+
+    def test_packets_are_aggregated_by_direction_and_protocols(self):
+        aggregates = aggregate_traffic(self.data)
+
+        self.assertEqual({'outgoing': [2, 150.0], 'incoming': [3, 300.0]},
+                         aggregates.direction[['count', 'total_data']].T.to_dict(orient='list'))
+        self.assertEqual({'ipv4': 4, 'arp': 1}, aggregates.layer3['count'].to_dict())
+        self.assertEqual(75.0, aggregates.layer4.loc['TCP', 'data_rate'])
+        self.assertEqual(55.0, aggregates.layer4.loc['UDP', 'avg_packet_size'])
+        layer7 = aggregates.layer7['total_data']
+        self.assertEqual(100.0, layer7[layer7.index.isna()].iloc[0])
+
+    def test_packets_are_aggregated_by_ip_address(self):
+        ip_data = aggregate_traffic(self.data).ip
+
+        self.assertEqual({'10.0.0.1', '10.0.0.2', '1.1.1.1'}, set(ip_data.index))
+        expected_data = {
+            # count, total_data, data_to_ip, data_from_ip
+            '10.0.0.1': [3, 350.0, 200.0, 150.0],
+            '1.1.1.1': [2, 300.0, 100.0, 200.0],
+            '10.0.0.2': [2, 110.0, 110.0, 60.0],    # Packet from 10.0.0.2 to itself is counted once in total
+        }
+        for ip, expected in expected_data.items():
+            with self.subTest(ip=ip):
+                self.assertEqual(expected, ip_data.loc[ip, ['count', 'total_data', 'data_to_ip', 'data_from_ip']]
+                                 .tolist())
+
+    def test_aggregates_are_same_for_typed_data(self):
+        typed_data = self.data.astype(get_pandas_dtypes(AGGREGATION_COLUMNS))
+
+        aggregates = aggregate_traffic(self.data)
+        typed_aggregates = aggregate_traffic(typed_data)
+
+        for name in ['direction', 'layer3', 'layer4', 'ip']:
+            with self.subTest(name=name):
+                pd.testing.assert_frame_equal(
+                    aggregates[name].sort_index(), typed_aggregates[name].set_axis(
+                        typed_aggregates[name].index.astype(object)).sort_index(),
+                    check_index_type=False
+                )
+
+    def test_summary_can_be_written_as_json(self):
+        summary = aggregates_to_summary(aggregate_traffic(self.data.astype({'size': np.float32})))
+
+        summary = json.loads(json.dumps(summary, cls=NpEncoder))
+
+        self.assertEqual(5, summary['packet_count'])
+        self.assertEqual(3, summary['ip_data']['10.0.0.1']['count'])
+        self.assertEqual(1, summary['layer4_data']['null']['count'])
+        self.assertEqual(['outgoing', 'incoming'], list(summary['direction_data']))
@@ -0,0 +1,151 @@
+import socket
+import struct
+from typing import List, Tuple
+
+import dpkt
+
+from tests.fixtures.mac_addresses import MAC_ADDRESSES
+
+START_TIMESTAMP = 1590000000.5
+
+
+def mac_to_bytes(mac_address: str) -> bytes:
+    return bytes.fromhex(mac_address.replace(':', ''))
+
+
+def build_tcp_packet(
+        src_mac: str = MAC_ADDRESSES[0],
+        dst_mac: str = MAC_ADDRESSES[1],
+        src_ip: str = '192.168.100.2',
+        dst_ip: str = '52.18.1.10',
+        sport: int = 50123,
+        dport: int = 443,
+        flags: int = dpkt.tcp.TH_ACK,
+        payload: bytes = b'payload',
+        opts: bytes = b'',
+        ttl: int = 64
+) -> bytes:
+    tcp = dpkt.tcp.TCP(sport=sport, dport=dport, flags=flags, seq=1000, data=payload, opts=opts, win=64240)
+    tcp.off = (20 + len(opts)) // 4
+    ip = dpkt.ip.IP(src=socket.inet_aton(src_ip), dst=socket.inet_aton(dst_ip), p=dpkt.ip.IP_PROTO_TCP, ttl=ttl,
+                    id=1234, data=tcp)
+    ip.df = 1
+    ip.len = len(ip)
+    eth = dpkt.ethernet.Ethernet(src=mac_to_bytes(src_mac), dst=mac_to_bytes(dst_mac), type=dpkt.ethernet.ETH_TYPE_IP,
+                                 data=ip)
+
+    return bytes(eth)
+
+
+def build_udp_packet(
+        src_mac: str = MAC_ADDRESSES[0],
+        dst_mac: str = MAC_ADDRESSES[1],
+        src_ip: str = '192.168.100.2',
+        dst_ip: str = '192.168.100.1',
+        sport: int = 50123,
+        dport: int = 9999,
+        payload: bytes = b'payload'
+) -> bytes:
+    udp = dpkt.udp.UDP(sport=sport, dport=dport, data=payload)
+    udp.ulen = len(udp)
+    ip = dpkt.ip.IP(src=socket.inet_aton(src_ip), dst=socket.inet_aton(dst_ip), p=dpkt.ip.IP_PROTO_UDP, ttl=64,
+                    data=udp)
+    ip.len = len(ip)
+    eth = dpkt.ethernet.Ethernet(src=mac_to_bytes(src_mac), dst=mac_to_bytes(dst_mac), type=dpkt.ethernet.ETH_TYPE_IP,
+                                 data=ip)
+
+    return bytes(eth)
+
+
+def build_dns_query_packet(domain: str = 'example.com', **kwargs) -> bytes:
+    dns = dpkt.dns.DNS(id=100, qd=[dpkt.dns.DNS.Q(name=domain, type=dpkt.dns.DNS_A, cls=dpkt.dns.DNS_IN)])
+
+    return build_udp_packet(dport=53, dst_ip='8.8.8.8', payload=bytes(dns), **kwargs)
+
+
+def build_udp6_packet(
+        src_mac: str = MAC_ADDRESSES[2],
+        dst_mac: str = MAC_ADDRESSES[3],
+        src_ip: str = 'fe80::1',
+        dst_ip: str = 'fe80::2',
+        sport: int = 50123,
+        dport: int = 9999,
+        payload: bytes = b'payload'
+) -> bytes:
+    udp = dpkt.udp.UDP(sport=sport, dport=dport, data=payload)
+    udp.ulen = len(udp)
+    ip6 = dpkt.ip6.IP6(src=socket.inet_pton(socket.AF_INET6, src_ip), dst=socket.inet_pton(socket.AF_INET6, dst_ip),
+                       nxt=dpkt.ip.IP_PROTO_UDP, hlim=255, data=udp, plen=len(udp))
+    eth = dpkt.ethernet.Ethernet(src=mac_to_bytes(src_mac), dst=mac_to_bytes(dst_mac),
+                                 type=dpkt.ethernet.ETH_TYPE_IP6, data=ip6)
+
+    return bytes(eth)
+
+
+def build_arp_packet(src_mac: str = MAC_ADDRESSES[4], dst_mac: str = MAC_ADDRESSES[5]) -> bytes:
+    arp = dpkt.arp.ARP(sha=mac_to_bytes(src_mac), tha=mac_to_bytes(dst_mac), spa=socket.inet_aton('192.168.100.4'),
+                       tpa=socket.inet_aton('192.168.100.1'), op=dpkt.arp.ARP_OP_REQUEST)
+    eth = dpkt.ethernet.Ethernet(src=mac_to_bytes(src_mac), dst=mac_to_bytes(dst_mac), type=dpkt.ethernet.ETH_TYPE_ARP,
+                                 data=arp)
+
+    return bytes(eth)
+
+
+def build_mixed_packets(count: int = 100) -> List[Tuple[float, bytes]]:
+    """Build a list of (timestamp, packet) tuples with a mix of TCP, UDP, DNS, IPv6 and ARP packets."""
+    builders = [
+        lambda i: build_tcp_packet(sport=40000 + i, payload=b'x' * (i % 50)),
+        lambda i: build_tcp_packet(src_mac=MAC_ADDRESSES[1], dst_mac=MAC_ADDRESSES[0], src_ip='52.18.1.10',
+                                   dst_ip='192.168.100.2', sport=443, dport=40000 + i),
+        lambda i: build_dns_query_packet(domain='host{}.example.com'.format(i)),
+        lambda i: build_udp6_packet(sport=30000 + i),
+        lambda i: build_arp_packet(),
+        lambda i: build_udp_packet(sport=20000 + i, payload=b'y' * (i % 30)),
+    ]
+
+    return [(START_TIMESTAMP + i * 0.25, builders[i % len(builders)](i)) for i in range(count)]
+
+
+def write_pcap_file(file_path: str, packets: List[Tuple[float, bytes]]) -> str:
+    with open(file_path, 'wb') as pcap_file:
+        writer = dpkt.pcap.Writer(pcap_file)
+        for ts, packet in packets:
+            writer.writepkt(packet, ts=ts)
+
+    return file_path
+
+
+def _pcapng_block(byte_order: str, block_type: int, body: bytes) -> bytes:
+    body += b'\x00' * (-len(body) % 4)
+    block_length = len(body) + 12
+
+    return struct.pack(byte_order + 'II', block_type, block_length) + body + struct.pack(byte_order + 'I', block_length)
+
+
+def write_pcapng_file(
+        file_path: str,
+        packets: List[Tuple[float, bytes]],
+        tsresols: Tuple[int, ...] = (6, 9),
+        big_endian: bool = False
+) -> str:
+    """Write packets to a pcapng file with an interface for each `if_tsresol` value in `tsresols`. Packets are assigned
+    to interfaces in round robin order."""
+    byte_order = '>' if big_endian else '<'
+    with open(file_path, 'wb') as pcapng_file:
+        shb_body = struct.pack(byte_order + 'IHHq', 0x1A2B3C4D, 1, 0, -1)
+        pcapng_file.write(_pcapng_block(byte_order, 0x0A0D0D0A, shb_body))
+        for tsresol in tsresols:
+            options = struct.pack(byte_order + 'HH', 9, 1) + bytes([tsresol]) + b'\x00' * 3 + b'\x00' * 4
+            idb_body = struct.pack(byte_order + 'HHI', 1, 0, 65535) + options
+            pcapng_file.write(_pcapng_block(byte_order, 1, idb_body))
+
+        for i, (ts, packet) in enumerate(packets):
+            interface_id = i % len(tsresols)
+            units_per_second = 10 ** tsresols[interface_id]
+            seconds, fraction = divmod(round(ts * 1000000), 1000000)
+            timestamp = seconds * units_per_second + fraction * units_per_second // 1000000
+            epb_body = struct.pack(byte_order + 'IIIII', interface_id, timestamp >> 32, timestamp & 0xffffffff,
+                                   len(packet), len(packet)) + packet
+            pcapng_file.write(_pcapng_block(byte_order, 6, epb_body))
+
+    return file_path
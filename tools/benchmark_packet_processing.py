@@ -0,0 +1,100 @@
+import os
+import sys
+import time
+from typing import List, Tuple
+
+import click
+import dpkt
+
+sys.path.append(os.getcwd())
+
+from core.analyzer.pcap_processor import PcapProcessor
+from core.configuration.manager import ConfigurationManager
+from core.packet_parsers.registry import PacketParserRegistry
+from core.static.utils import StaticData
+
+
+class UncachedPacketParserRegistry(PacketParserRegistry):
+    """Registry which creates a new parser for every packet, used as baseline for comparison. Parsers are given the
+    registry's `StaticData`, so lookup tables are compiled once and the baseline measures only construction of parsers
+    (and of their `MacAddressUtils`/`IpAddrUtils`) per packet, not loading of static data per parser."""
+    def get_parser(self, parser_class):
+        return self.create_parser(parser_class)
+
+
+def load_packets(pcap_file_path: str, max_packets: int) -> List[Tuple[float, bytes]]:
+    packets = []
+    with open(pcap_file_path, 'rb') as pcap_file:
+        for ts, buff in dpkt.pcap.Reader(pcap_file):
+            packets.append((ts, buff))
+            if len(packets) >= max_packets:
+                break
+
+    return packets
+
+
+def time_packet_processing(pcap_processor: PcapProcessor, packets: List[Tuple[float, bytes]], repeat: int) -> float:
+    """Return best time (in microseconds) per packet over `repeat` runs of extracting data from all packets."""
+    initial_ts = packets[0][0]
+    best_time = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        for ts, buff in packets:
+            pcap_processor.extract_stats_from_packet(ts=ts, packet=buff, initial_timestamp=initial_ts)
+        elapsed_time = time.perf_counter() - start_time
+        if best_time is None or elapsed_time < best_time:
+            best_time = elapsed_time
+
+    return best_time * 1e6 / len(packets)
+
+
+def time_batch_processing(pcap_processor: PcapProcessor, packets: List[Tuple[float, bytes]], repeat: int) -> float:
+    """Return best time (in microseconds) per packet over `repeat` runs of extracting data from all packets, where
+    headers of common packets are decoded in batches and other packets are processed using dpkt."""
+    initial_ts = packets[0][0]
+    best_time = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        for ts, buff, packet_data in pcap_processor.decode_captures(packets):
+            if packet_data is None:
+                pcap_processor.extract_stats_from_packet(ts=ts, packet=buff, initial_timestamp=initial_ts)
+        elapsed_time = time.perf_counter() - start_time
+        if best_time is None or elapsed_time < best_time:
+            best_time = elapsed_time
+
+    return best_time * 1e6 / len(packets)
+
+
+@click.command()
+@click.option('-c', '--config-file-path', required=True, type=str, help='Path to configuration file')
+@click.option('-i', '--input-file', required=True, type=str, help='Path to pcap file used for benchmark')
+@click.option('-n', '--max-packets', default=10000, type=int, help='Maximum number of packets read from pcap file')
+@click.option('-r', '--repeat', default=3, type=int, help='Number of runs, best run is reported. Default: 3')
+def benchmark(config_file_path, input_file, max_packets, repeat):
+    """Compare per-packet processing cost with shared parser instances, with parsers created for each packet (sharing
+    one `StaticData`), and with batch decoding of packet headers."""
+    config = ConfigurationManager().load_data_from_configuration_file(config_file_path)
+    static_data = StaticData()
+    packets = load_packets(input_file, max_packets)
+    if not packets:
+        click.echo('No packets found in `{}`'.format(input_file))
+        return
+
+    pcap_processor = PcapProcessor(config=config, static_data=static_data)
+    baseline_processor = PcapProcessor(config=config, static_data=static_data)
+    baseline_processor.dpkt_utils.parsers = UncachedPacketParserRegistry(config=config, static_data=static_data)
+
+    baseline_time = time_packet_processing(baseline_processor, packets, repeat)
+    shared_time = time_packet_processing(pcap_processor, packets, repeat)
+    batch_time = time_batch_processing(pcap_processor, packets, repeat)
+
+    click.echo('Packets: {}'.format(len(packets)))
+    click.echo('Parsers created per packet (shared StaticData): {:.2f} us/packet'.format(baseline_time))
+    click.echo('Shared parsers:                                 {:.2f} us/packet'.format(shared_time))
+    click.echo('Speedup (parser construction only):             {:.2f}x'.format(baseline_time / shared_time))
+    click.echo('Batch decoding:                                 {:.2f} us/packet'.format(batch_time))
+    click.echo('Speedup (batch decoding):                       {:.2f}x'.format(shared_time / batch_time))
+
+
+if __name__ == '__main__':
+    benchmark()
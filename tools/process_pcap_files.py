@@ -1,27 +1,43 @@
 import gc
+import multiprocessing.util
 import os
 import sys
 import logging
 import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
 
 
 sys.path.append(os.getcwd())
 
-from typing import Optional, Union, Dict, Any, Tuple
+from typing import Optional, Union, Dict, Any, Tuple, List
 
 import click
 
 from munch import Munch
 
-from core.analyzer.pcap_processor import PcapProcessor
+from core.analyzer.pcap_processor import DEFAULT_CHECKPOINT_INTERVAL, PROCESSOR_VERSION, PcapProcessor
+from core.analyzer.sharded_pcap_processor import ShardedPcapProcessor
 from core.configuration.data import ConfigurationData
 from core.configuration.manager import ConfigurationManager
 from core.errors.generic_errors import GenericError
+from core.file_processor.result_writer import get_result_file_extension
 from core.lib.common import write_json_to_file
+from core.lib.compression import COMPRESSION_EXTENSIONS, split_compression_extension
 from core.lib.file_utils import list_files_in_directory, get_filename_and_ext, remove_file
+from core.lib.manifest import ManifestEntry, ProcessingCheckpoint, ProcessingManifest, load_processing_state, \
+    save_processing_state
+from core.lib.pcap_utils import PCAP_FILE_EXTENSIONS
 from core.models.pcap_file_info import PcapFileInfo
 from core.static.utils import StaticData
 
+MANIFEST_FILE_NAME = 'processing_manifest.jsonl'
+
+# PcapProcessor owned by a worker process of the process pool. It is created lazily on the first file processed by the
+# worker, so StaticData is loaded once per worker rather than once per file.
+_worker_pcap_processor = None  # pylint: disable=invalid-name
+
 
 def configure_logging(log_file_path: str = None, verbose: bool = False):
     logging_args = dict(format='%(asctime)s - %(name)s %(levelname)s - %(message)s')
@@ -48,27 +64,100 @@ def get_results_file_path(
         pcap_file_path: str = '',
         source_directory: str = '',
         output_directory: str = '',
-        suffix: str = 'data'
+        suffix: str = 'data',
+        extension: str = 'csv'
 ) -> str:
-    filename, ext = get_filename_and_ext(pcap_file_path)
-    results_file_name = os.path.basename(pcap_file_path)[:-len(ext)-1] + '_{}.csv'.format(suffix)
-    sub_directory_path = os.path.dirname(pcap_file_path).replace(source_directory + '/', '')
-    results_file_path = os.path.join(output_directory, sub_directory_path, results_file_name)
+    uncompressed_file_path, _ = split_compression_extension(pcap_file_path)
+    filename, ext = get_filename_and_ext(uncompressed_file_path)
+    results_file_name = filename[:-len(ext)-1] + '_{}.{}'.format(suffix, extension)
+    sub_directory_path = os.path.relpath(os.path.dirname(pcap_file_path), source_directory)
+    results_file_path = os.path.normpath(os.path.join(output_directory, sub_directory_path, results_file_name))
 
     return results_file_path
 
 
+def list_pcap_files_in_directory(directory: str) -> List[str]:
+    """List pcap and pcapng files, including compressed files (e.g. `.pcap.gz`), in directory and its
+    sub-directories."""
+    extensions = list(PCAP_FILE_EXTENSIONS) + list(COMPRESSION_EXTENSIONS)
+    files = list_files_in_directory(directory, extensions=extensions, recursive=True)
+
+    return [
+        file_path for file_path in files
+        if get_filename_and_ext(split_compression_extension(file_path)[0])[1] in PCAP_FILE_EXTENSIONS
+    ]
+
+
+def should_process_pcap_file(
+        manifest: Optional[ProcessingManifest],
+        pcap_file: str,
+        results_file_path: str,
+        overwrite_results: bool = True
+) -> bool:
+    """Check if a pcap file needs to be processed. Files which are recorded in manifest as processed, and have not
+    changed since, are skipped unless results are overwritten. Files which were processed with a different processor
+    version or configuration, or whose processing was interrupted, are processed again. Without a manifest entry, file
+    is skipped if its result file already exists and results are not overwritten."""
+    if overwrite_results is True or manifest is None:
+        return overwrite_results is True or os.path.exists(results_file_path) is False
+
+    if manifest.is_processed(pcap_file, results_file_path):
+        logging.info('Pcap file `%s` is already processed to `%s`, skipping', pcap_file, results_file_path)
+        return False
+
+    if manifest.has_entry(pcap_file) or load_processing_state(results_file_path) is not None:
+        return True
+
+    if os.path.exists(results_file_path) is True:
+        logging.info('Results file already exist at path: `%s`. skipping because overwrite is `%s`',
+                     results_file_path, overwrite_results)
+        return False
+
+    return True
+
+
+def process_pcap_with_checkpoints(
+        pcap_processor: PcapProcessor,
+        pcap_file: str,
+        results_file_path: str,
+        manifest_entry: ManifestEntry,
+        checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL
+) -> PcapFileInfo:
+    """Process a pcap file, and save processing state with periodic checkpoints next to the result file. Processing is
+    resumed from the last checkpoint if an earlier processing of the same file (with same processor version and
+    configuration) was interrupted."""
+    checkpoint = None
+    state = load_processing_state(results_file_path)
+    if state is not None and state.is_same_processing(manifest_entry):
+        checkpoint = state.checkpoint
+
+    def save_checkpoint(new_checkpoint: Optional[ProcessingCheckpoint]) -> None:
+        save_processing_state(manifest_entry.copy(update=dict(checkpoint=new_checkpoint)))
+
+    save_checkpoint(checkpoint)     # Marks processing of the file as started
+    return pcap_processor.process_resumable(
+        input_file=pcap_file,
+        output_file=results_file_path,
+        checkpoint=checkpoint,
+        checkpoint_callback=save_checkpoint,
+        checkpoint_interval=checkpoint_interval
+    )
+
+
 def process_pcap(
         pcap_processor: PcapProcessor,
         pcap_file: str = '',
         results_file_path: str = '',
-        overwrite_results: bool = True
+        overwrite_results: bool = True,
+        manifest_entry: ManifestEntry = None,
+        checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL
 ) -> Tuple[Optional[PcapFileInfo], float]:
     gc.collect()    # Force garbage collection to minimize memory collection
     if os.path.exists(pcap_file or '') is False:
         logging.error('Invalid pcap file path specified: `%s`', pcap_file)
 
-    if os.path.exists(results_file_path) is True and overwrite_results is False:
+    # With a manifest entry, caller has already checked if the file should be processed
+    if manifest_entry is None and os.path.exists(results_file_path) is True and overwrite_results is False:
         logging.info('Results file already exist at path: `%s`. skipping because overwrite is `%s`',
                      results_file_path, overwrite_results)
         return None, 0
@@ -78,7 +167,12 @@ def process_pcap(
     st = time.time()
 
     try:
-        pcap_summary = pcap_processor.process(input_file=pcap_file, output_file=results_file_path)
+        if manifest_entry is None:
+            pcap_summary = pcap_processor.process(input_file=pcap_file, output_file=results_file_path)
+
+        else:
+            pcap_summary = process_pcap_with_checkpoints(
+                pcap_processor, pcap_file, results_file_path, manifest_entry, checkpoint_interval)
 
     except GenericError as ex:
         logging.error(ex.message)
@@ -111,10 +205,12 @@ def process_pcap_files(
         output_directory: str,
         remove_original: bool = False,
         overwrite_results: bool = True,
-        results_file_suffix: str = 'data'
+        results_file_suffix: str = 'data',
+        manifest: ProcessingManifest = None,
+        checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL
 ) -> Union[Munch, dict]:
     # Get all source files
-    pcap_files = list_files_in_directory(source_directory, extensions=['pcap'], recursive=True)
+    pcap_files = list_pcap_files_in_directory(source_directory)
 
     summary_results = dict(items=[])
     for pcap_file in pcap_files:
@@ -123,17 +219,27 @@ def process_pcap_files(
                 pcap_file_path=pcap_file,
                 source_directory=source_directory,
                 output_directory=output_directory,
-                suffix=results_file_suffix
+                suffix=results_file_suffix,
+                extension=get_result_file_extension(pcap_processor.config)
             )
+            if not should_process_pcap_file(manifest, pcap_file, result_file_path, overwrite_results):
+                continue
+
+            manifest_entry = manifest.create_entry(pcap_file, result_file_path) if manifest is not None else None
             pcap_summary, processing_time = process_pcap(
                 pcap_processor=pcap_processor,
                 pcap_file=pcap_file,
                 results_file_path=result_file_path,
-                overwrite_results=overwrite_results
+                overwrite_results=overwrite_results,
+                manifest_entry=manifest_entry,
+                checkpoint_interval=checkpoint_interval
             )
             if pcap_summary is None:
                 continue
 
+            if manifest is not None:
+                manifest.mark_processed(manifest_entry)
+
             summary_data = get_summary_for_pcap_processor(pcap_summary, processing_time)
             logging.debug('Summary data from pcap file: `%s`', summary_data)
             summary_results['items'].append(summary_data)
@@ -148,6 +254,224 @@ def process_pcap_files(
     return summary_results
 
 
+def get_worker_pcap_processor(config: ConfigurationData) -> PcapProcessor:
+    global _worker_pcap_processor  # pylint: disable=global-statement,invalid-name
+    if _worker_pcap_processor is None:
+        _worker_pcap_processor = PcapProcessor(config=config, static_data=StaticData())
+        # Worker processes exit without running `atexit` handlers, but run multiprocessing finalizers
+        multiprocessing.util.Finalize(None, close_worker_pcap_processor, exitpriority=10)
+
+    return _worker_pcap_processor
+
+
+def close_worker_pcap_processor() -> None:
+    """Close PcapProcessor of worker process (e.g. stop its p0f process) when the worker exits."""
+    global _worker_pcap_processor  # pylint: disable=global-statement,invalid-name
+    if _worker_pcap_processor is not None:
+        _worker_pcap_processor.close()
+        _worker_pcap_processor = None
+
+
+def process_pcap_in_worker(
+        config: ConfigurationData,
+        pcap_file: str = '',
+        results_file_path: str = '',
+        overwrite_results: bool = True,
+        manifest_entry: ManifestEntry = None,
+        checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL
+) -> Union[Munch, Dict[str, Any]]:
+    """Process a single pcap file inside a worker process and return its summary data.
+
+    Parameters
+    ----------
+    config: ConfigurationData
+        Application configuration data, used to build the worker's PcapProcessor on the first call
+    pcap_file: str
+        Path to pcap file which needs to be processed
+    results_file_path: str
+        Path to output file where results should be written
+    overwrite_results: bool
+        Overwrite results file if it already exists
+    manifest_entry: ManifestEntry
+        Manifest entry for processing the file. If given, processing state is saved with periodic checkpoints.
+    checkpoint_interval: int
+        Number of packets processed between checkpoints
+
+    Returns
+    -------
+    summary_data: dict
+        Summary data for processed pcap file. Empty if the file was skipped or could not be processed.
+    """
+    # Errors are logged here rather than raised to the parent process, because the application errors can not be
+    # pickled back across the process boundary.
+    try:
+        pcap_processor = get_worker_pcap_processor(config)
+        pcap_summary, processing_time = process_pcap(
+            pcap_processor=pcap_processor,
+            pcap_file=pcap_file,
+            results_file_path=results_file_path,
+            overwrite_results=overwrite_results,
+            manifest_entry=manifest_entry,
+            checkpoint_interval=checkpoint_interval
+        )
+
+        return get_summary_for_pcap_processor(pcap_summary, processing_time)
+
+    except Exception as ex:
+        logging.error('Error processing pcap file: `%s`. Error `%s`', pcap_file, ex)
+
+    return {}
+
+
+def process_pcap_files_in_parallel(
+        config: ConfigurationData,
+        source_directory: str,
+        output_directory: str,
+        workers: int = os.cpu_count(),
+        remove_original: bool = False,
+        overwrite_results: bool = True,
+        results_file_suffix: str = 'data',
+        manifest: ProcessingManifest = None,
+        checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL
+) -> Union[Munch, dict]:
+    """Process all pcap files in source directory using a pool of worker processes, one file per task.
+
+    Each worker builds its own PcapProcessor (and StaticData) once and reuses it for all files it processes. An error
+    in processing one file is logged and does not affect other files. A worker process which dies (e.g. killed by the
+    OOM killer) breaks the whole pool, so files which were in flight at that time are retried, one at a time, in an
+    isolated pool to find out which file actually crashed the worker.
+
+    Parameters
+    ----------
+    config: ConfigurationData
+        Application configuration data
+    source_directory: str
+        Path to directory containing pcap files which should be processed
+    output_directory: str
+        Path to directory where output should be written
+    workers: int
+        Number of worker processes. Default: number of CPUs
+    remove_original: bool
+        Remove source pcap file after it is successfully processed
+    overwrite_results: bool
+        Overwrite result files if they already exist in output folder
+    results_file_suffix: str
+        Suffix added to processed file
+    manifest: ProcessingManifest
+        Manifest of processed files. Files which are already processed are skipped, and processed files are recorded
+        in the manifest by the parent process.
+    checkpoint_interval: int
+        Number of packets processed between checkpoints, when a manifest is used
+
+    Returns
+    -------
+    summary_results: dict
+        Summary data for all processed pcap files, in the order files were listed from source directory.
+    """
+    pcap_files = list_pcap_files_in_directory(source_directory)
+    results_file_paths = {
+        pcap_file: get_results_file_path(
+            pcap_file_path=pcap_file,
+            source_directory=source_directory,
+            output_directory=output_directory,
+            suffix=results_file_suffix,
+            extension=get_result_file_extension(config)
+        ) for pcap_file in pcap_files
+    }
+    manifest_entries = dict()
+    if manifest is not None:
+        pcap_files = [
+            pcap_file for pcap_file in pcap_files
+            if should_process_pcap_file(manifest, pcap_file, results_file_paths[pcap_file], overwrite_results)
+        ]
+        manifest_entries = {
+            pcap_file: manifest.create_entry(pcap_file, results_file_paths[pcap_file]) for pcap_file in pcap_files
+        }
+
+    pool_options = dict(
+        overwrite_results=overwrite_results, manifest_entries=manifest_entries, checkpoint_interval=checkpoint_interval)
+    summaries = dict()
+    suspect_files = run_worker_pool(config, pcap_files, results_file_paths, summaries, workers, **pool_options)
+    for pcap_file in suspect_files:
+        if run_worker_pool(config, [pcap_file], results_file_paths, summaries, 1, **pool_options):
+            logging.error('Worker process died while processing pcap file: `%s`. Skipping file', pcap_file)
+
+    summary_results = dict(items=[])
+    for pcap_file in pcap_files:
+        summary_data = summaries.get(pcap_file)
+        if not summary_data:
+            continue
+
+        summary_results['items'].append(summary_data)
+        if manifest is not None:
+            manifest.mark_processed(manifest_entries[pcap_file])
+
+        if remove_original is True:
+            logging.info('Removing source pcap file at `%s`', pcap_file)
+            remove_file(pcap_file)
+
+    return summary_results
+
+
+def run_worker_pool(
+        config: ConfigurationData,
+        pcap_files: List[str],
+        results_file_paths: Dict[str, str],
+        summaries: Dict[str, Any],
+        workers: int,
+        overwrite_results: bool = True,
+        manifest_entries: Dict[str, ManifestEntry] = None,
+        checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL
+) -> List[str]:
+    """Process given pcap files in a process pool, and collect their summaries in `summaries`.
+
+    At most `workers` files are submitted to the pool at a time, so that only those files are affected if a worker
+    process dies. The pool is then replaced by a new one, which continues with the remaining files.
+
+    Returns
+    -------
+    suspect_files: List[str]
+        Pcap files which were in flight when a worker process died.
+    """
+    manifest_entries = manifest_entries or dict()
+    queued_files = deque(pcap_files)
+    suspect_files = []
+    while queued_files:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = dict()
+            pool_broken = False
+            while (queued_files or futures) and pool_broken is False:
+                while queued_files and len(futures) < workers:
+                    pcap_file = queued_files.popleft()
+                    future = executor.submit(
+                        process_pcap_in_worker,
+                        config,
+                        pcap_file,
+                        results_file_paths[pcap_file],
+                        overwrite_results,
+                        manifest_entries.get(pcap_file),
+                        checkpoint_interval
+                    )
+                    futures[future] = pcap_file
+
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pcap_file = futures.pop(future)
+                    try:
+                        summaries[pcap_file] = future.result()
+                        logging.debug('Summary data from pcap file: `%s`', summaries[pcap_file])
+
+                    except BrokenProcessPool:
+                        pool_broken = True
+                        suspect_files.append(pcap_file)
+
+            if pool_broken is True:
+                logging.warning('Worker process died, restarting process pool')
+                suspect_files.extend(futures.values())
+
+    return suspect_files
+
+
 @click.command()
 @click.option('-c', '--config-file-path', required=True, type=str, help='Path to configuration file')
 @click.option('-s', '--source-directory', required=True, type=str,
@@ -160,6 +484,17 @@ def process_pcap_files(
 @click.option('--remove-original', is_flag=True, default=False, help="Remove source pcap file after processing")
 @click.option('--overwrite', is_flag=True, default=False,
               help="Overwrite result files if they already exist in output folder.")
+@click.option('-w', '--workers', default=1, type=int,
+              help='Number of worker processes used to process pcap files in parallel. Default: 1')
+@click.option('--shards', default=1, type=int,
+              help='Number of processes used to process each (large) pcap file in byte range shards, when files are '
+                   'processed sequentially. Default: 1')
+@click.option('--manifest-file', default='', type=str,
+              help='Path to manifest of processed files, which is used to skip files that have not changed since they '
+                   'were processed. Default: {} in output directory'.format(MANIFEST_FILE_NAME))
+@click.option('--checkpoint-interval', default=DEFAULT_CHECKPOINT_INTERVAL, type=int,
+              help='Number of packets processed between checkpoints, from which processing of a file is resumed if it '
+                   'is interrupted. Use 0 to disable checkpoints. Default: {}'.format(DEFAULT_CHECKPOINT_INTERVAL))
 @click.option('-v', '--verbose', is_flag=True, default=False, help="Print debug logs")
 def process(
         config_file_path,
@@ -169,6 +504,10 @@ def process(
         output_suffix,
         remove_original,
         overwrite,
+        workers,
+        shards,
+        manifest_file,
+        checkpoint_interval,
         verbose
 ):
     # configure logging
@@ -176,18 +515,47 @@ def process(
 
     # load configuration
     config = load_configuration(config_file_path=config_file_path)
-
-    pcap_processor = PcapProcessor(config=config, static_data=StaticData())
+    manifest = ProcessingManifest(
+        file_path=manifest_file or os.path.join(output_directory, MANIFEST_FILE_NAME),
+        config=config,
+        processor_version=PROCESSOR_VERSION
+    )
 
     # process files
-    summary_results = process_pcap_files(
-        pcap_processor=pcap_processor,
-        source_directory=source_directory,
-        output_directory=output_directory,
-        remove_original=remove_original,
-        overwrite_results=overwrite,
-        results_file_suffix=output_suffix
-    )
+    if workers > 1:
+        summary_results = process_pcap_files_in_parallel(
+            config=config,
+            source_directory=source_directory,
+            output_directory=output_directory,
+            workers=workers,
+            remove_original=remove_original,
+            overwrite_results=overwrite,
+            results_file_suffix=output_suffix,
+            manifest=manifest,
+            checkpoint_interval=checkpoint_interval
+        )
+
+    else:
+        if shards > 1:
+            pcap_processor = ShardedPcapProcessor(config=config, static_data=StaticData(), shard_count=shards)
+
+        else:
+            pcap_processor = PcapProcessor(config=config, static_data=StaticData())
+
+        try:
+            summary_results = process_pcap_files(
+                pcap_processor=pcap_processor,
+                source_directory=source_directory,
+                output_directory=output_directory,
+                remove_original=remove_original,
+                overwrite_results=overwrite,
+                results_file_suffix=output_suffix,
+                manifest=manifest,
+                checkpoint_interval=checkpoint_interval
+            )
+
+        finally:
+            pcap_processor.close()
 
     # Write results to a file
     write_json_to_file(
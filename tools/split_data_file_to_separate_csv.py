@@ -2,6 +2,8 @@ from pathlib import Path  # noqa
 import os
 import sys
 
+import click
+
 sys.path.append(os.getcwd())
 
 # pylint: disable=wrong-import-position
@@ -9,17 +11,29 @@ from core.lib.mac_utils import MacAddressUtils  # noqa
 from core.lib.common import print_json  # noqa
 from core.pandas_utils.split_csv_data import extract_data_as_separate_csv  # noqa
 
+SCRIPTS_DIR_PATH = Path(os.path.abspath(__file__)).parent
+PROJECT_DIR_PATH = SCRIPTS_DIR_PATH.parent
 
-if __name__ == '__main__':
-    scripts_dir_path = Path(os.path.abspath(__file__)).parent
-    project_dir_path = scripts_dir_path.parent
-    input_file_path = project_dir_path / 'fixtures/results/results.csv'
-    result_dir_path = project_dir_path / 'fixtures/results/splitted/'
+
+@click.command()
+@click.option('-i', '--input-file', default=str(PROJECT_DIR_PATH / 'fixtures/results/results.csv'), type=str,
+              help='Path to data file which should be split. Default: fixtures/results/results.csv')
+@click.option('-o', '--output-directory', default=str(PROJECT_DIR_PATH / 'fixtures/results/splitted/'), type=str,
+              help='Path to directory where split files should be written. Default: fixtures/results/splitted/')
+@click.option('--chunk-size', default=0, type=int,
+              help='Number of rows read from data file at once, so that large files do not need to fit in memory. '
+                   'Default: whole file is read at once')
+def split(input_file, output_directory, chunk_size):
     summary = extract_data_as_separate_csv(
-        file_path=input_file_path,
-        result_folder=result_dir_path,
+        file_path=Path(input_file),
+        result_folder=Path(output_directory),
         filter_columns=['src_mac', 'dst_mac'],
         sort_by_columns=['timestamp'],
-        transform_function=MacAddressUtils().int_to_mac
+        transform_function=MacAddressUtils().int_to_mac,
+        chunk_size=chunk_size or None
     )
     print_json(summary)
+
+
+if __name__ == '__main__':
+    split()